@@ -3,6 +3,7 @@ AI Culinary Expert - Main Application Orchestrator
 Implements the complete workflow from menu processing to report generation
 """
 
+import copy
 import json
 from pathlib import Path
 from typing import List, Dict, Any, Optional
@@ -12,7 +13,13 @@ from core.wine_similarity import WineSimilarityAnalyzer
 from core.pairing_engine import PairingEngine
 from core.wine_ranker import WineRanker
 from core.report_generator import ReportGenerator
+from core.knowledge_base import KnowledgeBase, get_knowledge_base
 from utils.config import DEFAULT_MENU_PROFILE_PATH
+from utils.structured_log import configure_from_env, run_context
+from utils.metrics import format_summary_table
+from utils.tracing import configure_tracing_from_env, export_chrome_trace
+from utils.profiling import add_profile_argument, maybe_profiled
+from utils.gemini_cassette import configure_cassette_from_env
 
 
 class CulinaryExpertApp:
@@ -20,24 +27,64 @@ class CulinaryExpertApp:
     Main application orchestrator that implements the simplified workflow
     """
     
-    def __init__(self):
-        """Initialize all core modules"""
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None):
+        """
+        Initialize all core modules
+        
+        Args:
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
+        """
         print("Initializing AI Culinary Expert...")
-        self.menu_processor = MenuProcessor()
-        self.wine_manager = WineManager()
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.menu_processor = MenuProcessor(knowledge_base=self.knowledge_base)
+        self.wine_manager = WineManager(knowledge_base=self.knowledge_base)
         self.similarity_analyzer = WineSimilarityAnalyzer()
-        self.pairing_engine = PairingEngine()
+        self.pairing_engine = PairingEngine(
+            menu_processor=self.menu_processor,
+            knowledge_base=self.knowledge_base
+        )
         self.wine_ranker = WineRanker()
         self.report_generator = ReportGenerator()
         
-        # State tracking
+        self._reset_state()
+    
+    def _reset_state(self):
+        """Reset the per-run state tracking"""
         self.menu_profile = None
+        self.extracted_wines = []
         self.wines = []
         self.similar_pairs = []
         self.pairings = {}
         self.wine_rankings = []
         self.reports = {}
     
+    def new_session(self) -> "CulinaryExpertApp":
+        """
+        Create an app with empty state that shares this app's components
+        
+        The core modules and knowledge base are stateless between calls, so
+        sessions only differ in their menu profile, wines, pairings, etc.
+        
+        Returns:
+            New CulinaryExpertApp instance
+        """
+        # Shallow copy shares the modules; state is then replaced, not mutated
+        session = copy.copy(self)
+        session._reset_state()
+        return session
+    
+    def session_state(self) -> Dict[str, Any]:
+        """Per-run state (everything not shared with other sessions)"""
+        return {
+            "menu_profile": self.menu_profile,
+            "extracted_wines": self.extracted_wines,
+            "wines": self.wines,
+            "similar_pairs": self.similar_pairs,
+            "pairings": self.pairings,
+            "wine_rankings": self.wine_rankings,
+            "reports": self.reports,
+        }
+    
     def process_menu(
         self, 
         menu_files: Optional[List[str]] = None,
@@ -390,8 +437,16 @@ class CulinaryExpertApp:
 
 def main():
     """CLI interface for the application"""
+    import argparse
     import sys
     
+    parser = argparse.ArgumentParser(description="AI Culinary Expert CLI")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
+    configure_from_env()
+    tracing = configure_tracing_from_env()
+    configure_cassette_from_env()
     app = CulinaryExpertApp()
     
     print("\n" + "=" * 70)
@@ -429,13 +484,25 @@ def main():
     analyze_similarity = analyze_sim != "n"
     
     # Run workflow
-    results = app.run_full_workflow(
-        menu_files=menu_files,
-        menu_profile_path=menu_profile_path,
-        wine_files=wine_files,
-        analyze_similarity=analyze_similarity,
-        output_format="text"
-    )
+    with run_context() as run_id, maybe_profiled(args.profile, "app"):
+        results = app.run_full_workflow(
+            menu_files=menu_files,
+            menu_profile_path=menu_profile_path,
+            wine_files=wine_files,
+            analyze_similarity=analyze_similarity,
+            output_format="text"
+        )
+    
+    if tracing:
+        trace_path = export_chrome_trace(run_id, f"traces/trace-{run_id}.json")
+        print(f"\n✓ Trace written to {trace_path} (open in chrome://tracing or https://ui.perfetto.dev)")
+    
+    summary = format_summary_table()
+    if summary:
+        print("\n" + "=" * 70)
+        print("STAGE METRICS")
+        print("=" * 70)
+        print(summary)
     
     if results["success"]:
         # Display report
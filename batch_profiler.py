@@ -4,11 +4,13 @@ Processes all restaurant recipes to create menu flavor profiles
 """
 
 import json
-import os
 import re
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-import google.genai as genai
+
+from utils.gemini_client import get_api_key, create_client, generate_content
+from utils.metrics import timed_stage
+from utils.profiling import add_profile_argument, maybe_profiled
 
 
 class MenuProfiler:
@@ -17,25 +19,22 @@ class MenuProfiler:
     References WineSommelier logic for ingredient-compound mapping
     """
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-3-flash-preview"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gemini-3-flash-preview",
+        knowledge_base=None
+    ):
         """
         Initialize the Menu Profiler
         
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
             model_name: Gemini model to use (default: gemini-3-flash-preview)
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
         """
         # Get API key from parameter or environment
-        if api_key is None:
-            api_key = os.getenv("GOOGLE_AI_API_KEY")
-            if api_key is None:
-                # Try .env file
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("GOOGLE_AI_API_KEY")
-                except ImportError:
-                    pass
+        api_key = get_api_key(api_key)
         
         if not api_key:
             raise ValueError(
@@ -43,24 +42,29 @@ class MenuProfiler:
                 "or pass api_key parameter."
             )
         
-        # Configure Gemini
-        self.client = genai.Client(api_key=api_key)
+        # Gemini client is created on first use (see client property)
+        self.api_key = api_key
         self.model_name = model_name
-        
-        # Load ingredient flavor map (reuse WineSommelier logic)
-        self.ingredient_flavor_map = None
-        self._load_ingredient_map()
+        self._client = None
+        
+        # Attach knowledge base (ingredient map loads on first access)
+        if knowledge_base is None:
+            # Imported here: core imports this module via MenuProcessor
+            from core.knowledge_base import get_knowledge_base
+            knowledge_base = get_knowledge_base()
+        self.knowledge_base = knowledge_base
     
-    def _load_ingredient_map(self):
-        """Load ingredient flavor map from processed data"""
-        ingredient_path = Path("processed_data") / "ingredient_flavor_map.json"
-        if not ingredient_path.exists():
-            raise FileNotFoundError(f"Ingredient flavor map not found: {ingredient_path}")
-        
-        with open(ingredient_path, 'r', encoding='utf-8') as f:
-            self.ingredient_flavor_map = json.load(f)
-        
-        print(f"Loaded {len(self.ingredient_flavor_map)} ingredients from flavor map")
+    @property
+    def client(self):
+        """Gemini client, created on first use"""
+        if self._client is None:
+            self._client = create_client(self.api_key)
+        return self._client
+    
+    @property
+    def ingredient_flavor_map(self) -> Dict[str, Any]:
+        """Ingredient flavor map from the shared knowledge base"""
+        return self.knowledge_base.ingredient_flavor_map
     
     def _clean_ingredient_name(self, name: str) -> str:
         """Clean ingredient name for matching (reuse WineSommelier logic)"""
@@ -87,9 +91,9 @@ class MenuProfiler:
             return self.ingredient_flavor_map[ingredient].get("compounds", [])
         
         # Try cleaned name match
-        for map_ingredient, data in self.ingredient_flavor_map.items():
-            if data.get("cleaned_name") == cleaned:
-                return data.get("compounds", [])
+        map_ingredient = self.knowledge_base.find_ingredient_by_cleaned_name(cleaned)
+        if map_ingredient is not None:
+            return self.ingredient_flavor_map[map_ingredient].get("compounds", [])
         
         # Try partial match
         for map_ingredient, data in self.ingredient_flavor_map.items():
@@ -119,7 +123,10 @@ Format: ["compound1", "compound2", "compound3", "compound4", "compound5"]
 Ingredient: {ingredient}"""
         
         try:
-            response = self.client.models.generate_content(
+            response = generate_content(
+                self.client,
+                "recipe_ingredient_compounds",
+                trace_attributes={"ingredient": ingredient},
                 model=self.model_name,
                 contents=prompt,
                 config={
@@ -203,7 +210,10 @@ Recipe/Dish: """
                 else:
                     image = recipe_content  # Assume it's already a PIL Image
                 
-                response = self.client.models.generate_content(
+                response = generate_content(
+                    self.client,
+                    "recipe_extraction",
+                    trace_attributes={"input": "image"},
                     model=self.model_name,
                     contents=[prompt, image],
                     config={
@@ -214,7 +224,10 @@ Recipe/Dish: """
                 )
             else:
                 full_prompt = prompt + recipe_content
-                response = self.client.models.generate_content(
+                response = generate_content(
+                    self.client,
+                    "recipe_extraction",
+                    trace_attributes={"input": "text"},
                     model=self.model_name,
                     contents=full_prompt,
                     config={
@@ -393,6 +406,7 @@ Recipe/Dish: """
             print(f"  Error processing {file_path.name}: {e}")
             return None
     
+    @timed_stage("extraction")
     def process_recipes_folder(self, recipes_folder: Path = Path("recipes")) -> Dict[str, Dict[str, Any]]:
         """
         Process all recipes in a folder
@@ -462,8 +476,13 @@ Recipe/Dish: """
 
 def main():
     """Main function to run batch profiling"""
+    import argparse
     import sys
     
+    parser = argparse.ArgumentParser(description="Build the menu flavor profile from recipe files")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
     # Initialize profiler
     try:
         profiler = MenuProfiler()
@@ -476,7 +495,8 @@ def main():
     
     # Process recipes
     recipes_folder = Path("recipes")
-    menu_profile = profiler.process_recipes_folder(recipes_folder)
+    with maybe_profiled(args.profile, "batch_profiler"):
+        menu_profile = profiler.process_recipes_folder(recipes_folder)
     
     # Save results
     if menu_profile:
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for AI Culinary Expert
+Run individual benchmarks with `python -m benchmarks.<name>`
+"""
@@ -0,0 +1,341 @@
+"""
+Core algorithm microbenchmarks
+Times the compound-matching, similarity, pairing and ranking hot paths on
+seeded synthetic catalogs of 10^2 to 10^5 wines (compounds drawn from the real
+vocabulary, see benchmarks/synthetic.py). Runs offline: no Gemini calls.
+
+Results are JSON; a saved baseline turns the run into a regression check (a
+case fails when its median time exceeds the baseline by more than the
+tolerance). Baselines are machine-specific: compare runs from the same host.
+
+Usage:
+    python -m benchmarks.core_algorithms
+    python -m benchmarks.core_algorithms --sizes 100 1000 --cases find_similar_pairs rank_wines
+    python -m benchmarks.core_algorithms --save-baseline   # writes benchmarks/baselines/core_algorithms.json
+    python -m benchmarks.core_algorithms --baseline        # exits 1 on a regression
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional
+
+from benchmarks.synthetic import default_sampler, make_menu_profile, make_wines
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "baselines" / "core_algorithms.json"
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+# Cases that are quadratic in the number of wines are skipped above this size
+DEFAULT_MAX_QUADRATIC_SIZE = 1000
+# Dishes on the synthetic menu (pairing cost is dishes x wines)
+DEFAULT_DISHES = 20
+# Timing: repeat until this much time was spent (at least one call, at most MAX_REPEATS)
+MIN_MEASURE_SECONDS = 1.0
+MAX_REPEATS = 7
+# Allowed median slowdown over the baseline
+DEFAULT_TOLERANCE = 0.5
+# Dish ingredients for the sommelier candidate search (in the real ingredient map)
+SOMMELIER_INGREDIENTS = ["beef", "mushroom", "garlic", "thyme", "butter", "lamb"]
+
+
+class Fixture:
+    """Synthetic data generated once at the largest size; cases use prefixes of it"""
+
+    def __init__(self, max_size: int, dishes: int = DEFAULT_DISHES, seed: int = 0):
+        from core.knowledge_base import KnowledgeBase
+
+        sampler = default_sampler()
+        self.all_wines = make_wines(max_size, seed, sampler=sampler)
+        self.menu_profile = make_menu_profile(dishes, seed, ingredient_names=SOMMELIER_INGREDIENTS, sampler=sampler)
+        try:
+            self.ingredient_flavor_map = KnowledgeBase().ingredient_flavor_map
+        except FileNotFoundError:
+            from benchmarks.synthetic import make_ingredient_map
+            self.ingredient_flavor_map = make_ingredient_map(500, seed, sampler=sampler)
+        self.query_compounds = next(iter(self.menu_profile.values()))["compounds"]
+
+    def wines(self, size: int) -> List[Dict[str, Any]]:
+        return self.all_wines[:size]
+
+    def sommelier(self, size: int):
+        """WineSommelier over the first `size` wines (placeholder key: the client is never created)"""
+        from core.knowledge_base import KnowledgeBase
+        from wine_sommelier import WineSommelier
+        knowledge_base = KnowledgeBase.from_data(self.wines(size), self.ingredient_flavor_map)
+        return WineSommelier(knowledge_base=knowledge_base)
+
+    def pairing_engine(self, size: int):
+        from core.knowledge_base import KnowledgeBase
+        from core.menu_processor import MenuProcessor
+        from core.pairing_engine import PairingEngine
+        from core.wine_sommelier_wrapper import WineSommelierWrapper
+        knowledge_base = KnowledgeBase.from_data(self.wines(size), self.ingredient_flavor_map)
+        return PairingEngine(
+            sommelier=WineSommelierWrapper(api_key="offline", knowledge_base=knowledge_base),
+            menu_processor=MenuProcessor(api_key="offline", knowledge_base=knowledge_base),
+            knowledge_base=knowledge_base
+        )
+
+
+# Each case builds its inputs outside the timed call and returns the call
+def _search_wines_by_compounds(fixture: Fixture, size: int) -> Callable[[], Any]:
+    sommelier = fixture.sommelier(size)
+    # Catalog feature blocks are built once per knowledge base
+    sommelier.knowledge_base.wine_features
+    return lambda: sommelier.search_wines_by_compounds(fixture.query_compounds)
+
+
+def _find_best_wines_for_compounds(fixture: Fixture, size: int) -> Callable[[], Any]:
+    sommelier = fixture.pairing_engine(size).sommelier
+    wines = fixture.wines(size)
+    # Wine-list feature blocks are built on the first search and reused
+    sommelier.find_best_wines_for_compounds(fixture.query_compounds, wines=wines, max_wines=3)
+    return lambda: sommelier.find_best_wines_for_compounds(fixture.query_compounds, wines=wines, max_wines=3)
+
+
+def _find_similar_pairs(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.wine_similarity import WineSimilarityAnalyzer
+    analyzer = WineSimilarityAnalyzer()
+    wines = fixture.wines(size)
+    return lambda: analyzer.find_similar_pairs(wines)
+
+
+def _group_similar_wines(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.wine_similarity import WineSimilarityAnalyzer
+    analyzer = WineSimilarityAnalyzer()
+    wines = fixture.wines(size)
+    return lambda: analyzer.group_similar_wines(wines)
+
+
+def _pair_wines_to_dishes(fixture: Fixture, size: int) -> Callable[[], Any]:
+    engine = fixture.pairing_engine(size)
+    wines = fixture.wines(size)
+    return lambda: engine.pair_wines_to_dishes(dishes=fixture.menu_profile, wines=wines)
+
+
+def _rank_wines(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.wine_ranker import WineRanker
+    engine = fixture.pairing_engine(size)
+    wines = fixture.wines(size)
+    pairings = engine.pair_wines_to_dishes(dishes=fixture.menu_profile, wines=wines)
+    ranker = WineRanker()
+    return lambda: ranker.rank_wines(wines, pairings, fixture.menu_profile, pairing_engine=engine)
+
+
+def _find_candidate_wines(fixture: Fixture, size: int) -> Callable[[], Any]:
+    sommelier = fixture.sommelier(size)
+    return lambda: sommelier._find_candidate_wines(SOMMELIER_INGREDIENTS)
+
+
+def _rule_scores(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.pairing_rules import dish_attributes, rule_score
+    wines = fixture.wines(size)
+    dishes = [dish_attributes(dish["ingredients"], dish.get("tags"), dish.get("name"))
+              for dish in fixture.menu_profile.values()]
+    return lambda: [[rule_score(wine, dish)[0] for wine in wines] for dish in dishes]
+
+
+def _rule_score_matrix(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.pairing_rules import WineRuleColumns, dish_attribute_matrix, rule_score_matrix
+    columns = WineRuleColumns.from_wines(fixture.wines(size))
+    dish_matrix = dish_attribute_matrix(list(fixture.menu_profile.values()))
+    return lambda: rule_score_matrix(columns, dish_matrix)
+
+
+def _hybrid_score_matrix(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.scoring import DishFeatures, ScoringEngine, WineFeatures
+    engine = ScoringEngine()
+    wines = WineFeatures.from_wines(fixture.wines(size))
+    dishes = DishFeatures.from_menu_profile(fixture.menu_profile, wines)
+    return lambda: engine.score(dishes, wines).score
+
+
+def _hybrid_score_matrix_pruned(fixture: Fixture, size: int) -> Callable[[], Any]:
+    from core.compound_stats import CompoundStats
+    from core.scoring import DishFeatures, ScoringEngine, WineFeatures
+    engine = ScoringEngine()
+    stats = CompoundStats.compile(fixture.ingredient_flavor_map, fixture.wines(size))
+    wines = WineFeatures.from_wines(fixture.wines(size), excluded=stats.pruned_compounds())
+    dishes = DishFeatures.from_menu_profile(fixture.menu_profile, wines)
+    return lambda: engine.score(dishes, wines).score
+
+
+# Case name -> (setup, quadratic in the number of wines)
+CASES: Dict[str, tuple] = {
+    "search_wines_by_compounds": (_search_wines_by_compounds, False),
+    "find_best_wines_for_compounds": (_find_best_wines_for_compounds, False),
+    "find_similar_pairs": (_find_similar_pairs, True),
+    "group_similar_wines": (_group_similar_wines, True),
+    "pair_wines_to_dishes": (_pair_wines_to_dishes, False),
+    "rank_wines": (_rank_wines, False),
+    # Harmonize matches are deduplicated by scanning all compound matches
+    "_find_candidate_wines": (_find_candidate_wines, True),
+    # PairingLogic per dish x wine pair in Python (capped like the quadratic cases) vs. one broadcast
+    "rule_scores": (_rule_scores, True),
+    "rule_score_matrix": (_rule_score_matrix, False),
+    # Every signal of core.scoring over precomputed feature blocks, in one pass
+    "hybrid_score_matrix": (_hybrid_score_matrix, False),
+    # The same over the pruned vocabulary (hub and very-high-frequency compounds dropped)
+    "hybrid_score_matrix_pruned": (_hybrid_score_matrix_pruned, False),
+}
+
+
+def measure(call: Callable[[], Any]) -> Dict[str, Any]:
+    """
+    Time a call repeatedly (until MIN_MEASURE_SECONDS or MAX_REPEATS)
+
+    Returns:
+        Dictionary with median_s, min_s, repeats and items (result length)
+    """
+    times = []
+    result = None
+    while len(times) < MAX_REPEATS and (not times or sum(times) < MIN_MEASURE_SECONDS):
+        started = time.perf_counter()
+        result = call()
+        times.append(time.perf_counter() - started)
+    return {
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "repeats": len(times),
+        "items": len(result) if hasattr(result, "__len__") else None,
+    }
+
+
+def run_benchmarks(
+    sizes: List[int] = None,
+    cases: Optional[List[str]] = None,
+    max_quadratic_size: int = DEFAULT_MAX_QUADRATIC_SIZE,
+    dishes: int = DEFAULT_DISHES,
+    seed: int = 0,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """
+    Run the microbenchmarks
+
+    Args:
+        sizes: Wine counts (default: DEFAULT_SIZES)
+        cases: Case names (default: all)
+        max_quadratic_size: Largest size for quadratic cases
+        dishes: Dishes on the synthetic menu
+        seed: Random seed
+        verbose: Print each result as it completes
+
+    Returns:
+        Dictionary with 'config' and 'results' (one entry per case and size)
+
+    Raises:
+        ValueError: If a case name is unknown
+    """
+    sizes = sorted(sizes or DEFAULT_SIZES)
+    cases = cases or list(CASES)
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        raise ValueError(f"Unknown benchmark cases: {', '.join(unknown)}. Available: {', '.join(CASES)}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixture = Fixture(max(sizes), dishes, seed)
+    results = []
+    for name in cases:
+        setup, quadratic = CASES[name]
+        for size in sizes:
+            if quadratic and size > max_quadratic_size:
+                continue
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = measure(setup(fixture, size))
+            results.append({"case": name, "size": size, **stats})
+            if verbose:
+                print(f"  {name:<30} {size:>7} wines  median {stats['median_s'] * 1000:10.2f}ms  "
+                      f"min {stats['min_s'] * 1000:10.2f}ms  ({stats['repeats']} runs)")
+
+    return {
+        "config": {
+            "sizes": sizes,
+            "dishes": dishes,
+            "seed": seed,
+            "max_quadratic_size": max_quadratic_size,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+        },
+        "results": results,
+    }
+
+
+def compare_to_baseline(
+    results: List[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """
+    Find cases whose median time grew beyond the baseline
+
+    Args:
+        results: Results from run_benchmarks
+        baseline: Saved run
+        tolerance: Allowed relative slowdown
+
+    Returns:
+        Regression messages (empty if within budget)
+    """
+    expected = {(entry["case"], entry["size"]): entry["median_s"] for entry in baseline.get("results", [])}
+    regressions = []
+    for entry in results:
+        baseline_s = expected.get((entry["case"], entry["size"]))
+        if baseline_s is None:
+            continue
+        if entry["median_s"] > baseline_s * (1 + tolerance):
+            regressions.append(
+                f"{entry['case']} @ {entry['size']}: {entry['median_s'] * 1000:.2f}ms "
+                f"vs baseline {baseline_s * 1000:.2f}ms ({entry['median_s'] / baseline_s:.1f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark the core scoring algorithms")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Wine counts")
+    parser.add_argument("--cases", nargs="+", default=None, help=f"Cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--max-quadratic-size", type=int, default=DEFAULT_MAX_QUADRATIC_SIZE,
+                        help="Largest size for quadratic cases (similarity, candidate search)")
+    parser.add_argument("--dishes", type=int, default=DEFAULT_DISHES, help="Dishes on the synthetic menu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="Write the results JSON to this file")
+    parser.add_argument("--baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help=f"Fail if a case is slower than this saved run (default: {DEFAULT_BASELINE.relative_to(PROJECT_ROOT)})")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown over the baseline")
+    parser.add_argument("--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help="Save the results as the baseline")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmarks(args.sizes, args.cases, args.max_quadratic_size, args.dishes, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+            print(f"✓ Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report["results"], baseline, args.tolerance)
+        if regressions:
+            print("\nPerformance regressions:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\n✓ All cases within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
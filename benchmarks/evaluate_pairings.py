@@ -0,0 +1,526 @@
+"""
+Pairing quality evaluation
+Replays the food items of Datasets/wine_food_pairings.csv (35k rated
+wine-type/food pairings) through the local Stage 2 ranking variants and scores
+each ranking against the ratings: NDCG@k and recall@k, next to per-query
+latency and peak memory. Runs offline: no Gemini calls.
+
+Each food item becomes a query of knowledge-base ingredients (FOOD_INGREDIENTS).
+Catalog wines are judged through the rated wine types they belong to (grape,
+wine type, region; see core.pairing_priors.WINE_TYPE_RULES): a wine's gain is
+the mean rating of its types minus 1, and it is relevant when that rating beats
+the food item's average rating. Unjudged wines count as gain 0; `judged@k` reports how much of
+each top k could be judged at all.
+
+The catalog is processed_data/processed_wines.json when present, otherwise it
+is built in memory from Datasets/XWines_Slim_1K_wines.csv.
+
+Usage:
+    python -m benchmarks.evaluate_pairings
+    python -m benchmarks.evaluate_pairings --engines sommelier_candidates random --k 5 10 20
+    python -m benchmarks.evaluate_pairings --json --output eval.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional
+
+from benchmarks.load_test import percentile
+from core.pairing_priors import rated_wine_types
+from core.pairing_rules import rank_by_rules
+from utils.config import (
+    DEFAULT_INGREDIENT_MAP_PATH,
+    DEFAULT_PAIRING_PRIORS_PATH,
+    DEFAULT_PAIRING_RATINGS_PATH,
+    DEFAULT_SOMMELIER_CANDIDATES,
+    DEFAULT_WINES_PATH
+)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_RATINGS_PATH = PROJECT_ROOT / DEFAULT_PAIRING_RATINGS_PATH
+DEFAULT_WINES_CSV = PROJECT_ROOT / "Datasets" / "XWines_Slim_1K_wines.csv"
+DEFAULT_K = [5, 10]
+
+# Rated food item -> ingredient flavor map keys standing in for the dish
+FOOD_INGREDIENTS: Dict[str, List[str]] = {
+    "Indian vindaloo": ["pork", "chili", "vinegar", "garlic", "ginger", "cumin"],
+    "Sichuan noodles": ["pasta", "chili", "pepper", "garlic", "soybean", "sesame"],
+    "Thai curry": ["chicken", "coconut", "chili", "lime", "ginger", "coriander"],
+    "alfredo pasta": ["pasta", "cream", "butter", "parmesan_cheese", "garlic"],
+    "bacon burger": ["hamburger", "pork", "cheddar_cheese", "bread", "onion", "ketchup"],
+    "bbq brisket": ["beef", "molasses", "onion", "garlic", "pepper"],
+    "bbq ribs": ["pork", "molasses", "ketchup", "garlic", "pepper"],
+    "beef stew": ["beef", "potato", "carrot", "onion", "red_wine", "thyme"],
+    "caprese salad": ["tomato", "mozzarella_cheese", "basil", "olive"],
+    "carbonara": ["pasta", "egg", "ham", "parmesan_cheese", "pepper"],
+    "charcuterie board": ["sausage", "ham", "pate", "olive", "bread"],
+    "cheese platter": ["cheese", "camembert_cheese", "blue_cheese", "grape", "walnut"],
+    "cheesecake": ["cream_cheese", "sugar", "egg", "biscuit", "vanilla"],
+    "chicken curry": ["chicken", "onion", "tomato", "ginger", "turmeric", "cumin"],
+    "chocolate mousse": ["chocolate", "cream", "egg", "sugar"],
+    "citrus salad": ["orange", "grapefruit", "lemon", "mint", "lettuce"],
+    "cream of mushroom soup": ["mushroom", "cream", "butter", "onion", "thyme"],
+    "duck à l’orange": ["squab", "orange", "butter", "sugar"],
+    "fish tacos": ["fish", "tortilla", "cabbage", "lime", "coriander"],
+    "fondue": ["gruyere_cheese", "swiss_cheese", "white_wine", "garlic", "bread"],
+    "gazpacho": ["tomato", "cucumber", "red_bell_pepper", "garlic", "vinegar"],
+    "grilled burger": ["hamburger", "beef", "bread", "onion", "tomato"],
+    "grilled ribeye": ["beef", "pepper", "garlic", "rosemary", "butter"],
+    "grilled salmon": ["salmon", "lemon", "dill", "butter"],
+    "lemon tart": ["lemon", "sugar", "egg", "butter", "pie_crust"],
+    "mac and cheese": ["macaroni", "cheddar_cheese", "milk", "butter"],
+    "mixed nuts": ["mixed_nut", "almond", "cashew_nut", "salt"],
+    "mushroom risotto": ["rice", "mushroom", "parmesan_cheese", "butter", "white_wine"],
+    "olives and cheese": ["olive", "feta_cheese", "cheese"],
+    "oysters": ["oyster", "lemon", "shallot", "vinegar"],
+    "pork tenderloin": ["pork", "garlic", "rosemary", "apple"],
+    "roast chicken with herbs": ["chicken", "thyme", "rosemary", "garlic", "lemon"],
+    "roast lamb": ["lamb", "rosemary", "garlic"],
+    "shrimp scampi": ["shrimp", "garlic", "butter", "lemon", "white_wine", "pasta"],
+    "smoked sausage": ["sausage", "pork", "mustard"],
+    "sorbet": ["lemon", "raspberry", "sugar"],
+    "stir-fried tofu": ["tofu", "soybean", "ginger", "garlic", "broccoli"],
+    "vegetable curry": ["potato", "cauliflower", "chickpea", "tomato", "turmeric", "coconut"],
+}
+
+
+def load_ratings(path: Path = DEFAULT_RATINGS_PATH) -> Dict[str, Dict[str, Any]]:
+    """
+    Mean rating per food item and wine type
+
+    Args:
+        path: wine_food_pairings.csv
+
+    Returns:
+        food_item -> {'food_category', 'mean_quality', 'wine_types': {wine_type: mean quality}}
+
+    Raises:
+        FileNotFoundError: If the ratings file does not exist
+    """
+    import csv
+
+    totals = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    categories = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            food_item = row["food_item"]
+            entry = totals[food_item][row["wine_type"]]
+            entry[0] += int(row["pairing_quality"])
+            entry[1] += 1
+            categories.setdefault(food_item, row["food_category"])
+
+    ratings = {}
+    for food_item, wine_types in totals.items():
+        means = {wine_type: total / count for wine_type, (total, count) in wine_types.items()}
+        ratings[food_item] = {
+            "food_category": categories[food_item],
+            "mean_quality": sum(total for total, _ in wine_types.values()) / sum(count for _, count in wine_types.values()),
+            "wine_types": means,
+        }
+    return ratings
+
+
+def load_catalog(wines_csv: Path = DEFAULT_WINES_CSV):
+    """
+    Knowledge base to evaluate against
+
+    Uses processed_data/processed_wines.json when present, otherwise processes
+    the XWines CSV in memory (nothing is written to processed_data).
+
+    Returns:
+        KnowledgeBase with wines and the ingredient flavor map
+
+    Raises:
+        FileNotFoundError: If no ingredient flavor map is available
+    """
+    from core.knowledge_base import KnowledgeBase
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        knowledge_base = KnowledgeBase(PROJECT_ROOT / DEFAULT_WINES_PATH, PROJECT_ROOT / DEFAULT_INGREDIENT_MAP_PATH,
+                                       pairing_priors_path=PROJECT_ROOT / DEFAULT_PAIRING_PRIORS_PATH,
+                                       pairing_ratings_path=PROJECT_ROOT / DEFAULT_PAIRING_RATINGS_PATH)
+        ingredient_flavor_map = knowledge_base.ingredient_flavor_map
+        if knowledge_base.has_wines:
+            return knowledge_base
+        # processing needs pandas/numpy: only imported when there is no processed catalog
+        from processing import FlavorBridge, WineProcessor
+        wines = WineProcessor.process_wines(str(wines_csv))
+        FlavorBridge.create_flavor_bridge(wines, ingredient_flavor_map)
+    in_memory = KnowledgeBase.from_data(wines, ingredient_flavor_map)
+    in_memory.pairing_priors_path = knowledge_base.pairing_priors_path
+    in_memory.pairing_ratings_path = knowledge_base.pairing_ratings_path
+    return in_memory
+
+
+def build_queries(
+    ratings: Dict[str, Dict[str, Any]],
+    ingredient_flavor_map: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    One query per rated food item with a FOOD_INGREDIENTS entry
+
+    Ingredients missing from the flavor map are dropped; so are items left
+    without any.
+
+    Returns:
+        Queries with 'food_item', 'food_category', 'ingredients', 'compounds'
+        and 'menu_profile' (a one-dish menu profile)
+    """
+    queries = []
+    for food_item in sorted(ratings):
+        ingredients = [name for name in FOOD_INGREDIENTS.get(food_item, []) if name in ingredient_flavor_map]
+        if not ingredients:
+            continue
+        compounds = sorted({c for name in ingredients for c in ingredient_flavor_map[name].get("compounds", [])})
+        queries.append({
+            "food_item": food_item,
+            "food_category": ratings[food_item]["food_category"],
+            "ingredients": ingredients,
+            "compounds": compounds,
+            "menu_profile": {"query": {"dish_id": "query", "name": food_item,
+                                       "ingredients": ingredients, "compounds": compounds}},
+        })
+    return queries
+
+
+def dcg(gains: List[float]) -> float:
+    return sum(gain / math.log2(rank + 2) for rank, gain in enumerate(gains))
+
+
+def score_ranking(
+    ranked_ids: List[int],
+    gains: Dict[int, float],
+    relevant: set,
+    k: int
+) -> Dict[str, Optional[float]]:
+    """
+    NDCG@k, recall@k and judged@k of one ranking
+
+    Args:
+        ranked_ids: Wine ids, best first
+        gains: Graded gain per judged wine id
+        relevant: Relevant wine ids
+        k: Cutoff
+
+    Returns:
+        Dictionary with 'ndcg', 'recall' (None without relevant wines) and 'judged'
+    """
+    top = ranked_ids[:k]
+    ideal = dcg(sorted(gains.values(), reverse=True)[:k])
+    return {
+        "ndcg": dcg([gains.get(wine_id, 0.0) for wine_id in top]) / ideal if ideal > 0 else 0.0,
+        "recall": len(relevant.intersection(top)) / min(k, len(relevant)) if relevant else None,
+        "judged": sum(1 for wine_id in top if wine_id in gains) / k,
+    }
+
+
+# Engines: factory(knowledge_base, depth, seed) -> callable(query) -> ranked wine ids
+def _sommelier(knowledge_base):
+    from wine_sommelier import WineSommelier
+    return WineSommelier(knowledge_base=knowledge_base)
+
+
+def _pairing_engine(knowledge_base):
+    from core.menu_processor import MenuProcessor
+    from core.pairing_engine import PairingEngine
+    from core.wine_sommelier_wrapper import WineSommelierWrapper
+    return PairingEngine(
+        sommelier=WineSommelierWrapper(api_key="offline", knowledge_base=knowledge_base),
+        menu_processor=MenuProcessor(api_key="offline", knowledge_base=knowledge_base),
+        knowledge_base=knowledge_base
+    )
+
+
+def _sommelier_candidates(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    sommelier = _sommelier(knowledge_base)
+    return lambda query: [match["wine"]["wine_id"]
+                          for match in sommelier._find_candidate_wines(query["ingredients"], max_candidates=depth)]
+
+
+def _pairing_priors(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    sommelier = _sommelier(knowledge_base)
+    priors = knowledge_base.pairing_priors
+
+    def rank(query):
+        candidates = sommelier._find_candidate_wines(query["ingredients"], max_candidates=DEFAULT_SOMMELIER_CANDIDATES)
+        return [match["wine"]["wine_id"]
+                for match in priors.rerank(candidates, query["ingredients"], dish_description=query["food_item"])[:depth]]
+    return rank
+
+
+def _pairing_rules(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    sommelier = _sommelier(knowledge_base)
+
+    def rank(query):
+        candidates = sommelier._find_candidate_wines(query["ingredients"], max_candidates=DEFAULT_SOMMELIER_CANDIDATES)
+        return [match["wine"]["wine_id"]
+                for match in rank_by_rules(candidates, query["ingredients"], dish_description=query["food_item"])[:depth]]
+    return rank
+
+
+def _hybrid(knowledge_base, depth: int, seed: int, wine_features=None) -> Callable[[Dict[str, Any]], List[int]]:
+    from core.scoring import DishFeatures, ScoringEngine
+    engine = ScoringEngine()
+    wine_features = wine_features or knowledge_base.wine_features
+
+    def rank(query):
+        dish = {"compounds": query["compounds"], "ingredients": query["ingredients"], "description": query["food_item"]}
+        scores = engine.score(DishFeatures.from_dishes([dish], wine_features), wine_features)
+        return [int(wine_features.wine_ids[j]) for j in scores.ranked(0, depth)]
+    return rank
+
+
+def _hybrid_pruned(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    from core.scoring import WineFeatures
+    excluded = knowledge_base.compound_stats.pruned_compounds()
+    return _hybrid(knowledge_base, depth, seed, WineFeatures.from_wines(knowledge_base.wines, excluded=excluded))
+
+
+def _compound_search(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    sommelier = _sommelier(knowledge_base)
+    return lambda query: [match["wine"]["wine_id"]
+                          for match in sommelier.search_wines_by_compounds(query["compounds"])[:depth]]
+
+
+def _pair_wines_to_dish(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    engine = _pairing_engine(knowledge_base)
+    wines = knowledge_base.wines
+    return lambda query: engine.pair_wines_to_dish("query", wines, query["menu_profile"], max_wines=depth)
+
+
+def _jaccard(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    engine = _pairing_engine(knowledge_base)
+    wines = knowledge_base.wines
+
+    def rank(query):
+        scores = [(engine.calculate_pairing_score("query", wine, query["menu_profile"]), wine["wine_id"]) for wine in wines]
+        scores.sort(key=lambda item: item[0], reverse=True)
+        return [wine_id for score, wine_id in scores[:depth] if score > 0]
+    return rank
+
+
+def _random(knowledge_base, depth: int, seed: int) -> Callable[[Dict[str, Any]], List[int]]:
+    rng = random.Random(seed)
+    wine_ids = [wine["wine_id"] for wine in knowledge_base.wines]
+    return lambda query: rng.sample(wine_ids, min(depth, len(wine_ids)))
+
+
+ENGINES: Dict[str, Callable] = {
+    "sommelier_candidates": _sommelier_candidates,
+    # Stage 2 candidates re-ranked by the rated-pairing priors (compiled from the same ratings: in-sample)
+    "pairing_priors": _pairing_priors,
+    # Stage 2 candidates re-ranked by the sommelier rules (core.pairing_rules)
+    "pairing_rules": _pairing_rules,
+    # Whole catalog scored by core.scoring with the default weights
+    "hybrid": _hybrid,
+    # The same without hub and very-high-frequency compounds (core.compound_stats)
+    "hybrid_pruned": _hybrid_pruned,
+    "compound_search": _compound_search,
+    "pair_wines_to_dish": _pair_wines_to_dish,
+    "jaccard": _jaccard,
+    # Chance level for the metrics
+    "random": _random,
+}
+
+
+def _judgements(
+    knowledge_base,
+    ratings: Dict[str, Dict[str, Any]]
+) -> Dict[str, tuple]:
+    """food_item -> (gain per judged wine id, relevant wine ids)"""
+    wine_types = {wine["wine_id"]: rated_wine_types(wine) for wine in knowledge_base.wines}
+    judgements = {}
+    for food_item, rating in ratings.items():
+        gains = {}
+        relevant = set()
+        for wine_id, types in wine_types.items():
+            qualities = [rating["wine_types"][t] for t in types if t in rating["wine_types"]]
+            if not qualities:
+                continue
+            quality = sum(qualities) / len(qualities)
+            gains[wine_id] = quality - 1
+            if quality > rating["mean_quality"]:
+                relevant.add(wine_id)
+        judgements[food_item] = (gains, relevant)
+    return judgements
+
+
+def evaluate_engine(
+    rank: Callable[[Dict[str, Any]], List[int]],
+    queries: List[Dict[str, Any]],
+    judgements: Dict[str, tuple],
+    ks: List[int]
+) -> Dict[str, Any]:
+    """
+    Quality, latency and memory of one engine over all queries
+
+    Latency is measured without tracemalloc; a second pass records the peak
+    traced memory of each query.
+
+    Returns:
+        Dictionary with per-k mean 'ndcg'/'recall'/'judged', 'latency_ms'
+        (mean/p50/p95/max), 'peak_kb' (mean/max) and 'per_query'
+    """
+    per_query = []
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        ranked = rank(query)
+        latencies.append((time.perf_counter() - started) * 1000)
+        gains, relevant = judgements[query["food_item"]]
+        per_query.append({
+            "food_item": query["food_item"],
+            "returned": len(ranked),
+            **{f"@{k}": score_ranking(ranked, gains, relevant, k) for k in ks},
+        })
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for query in queries:
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            rank(query)
+            peaks.append((tracemalloc.get_traced_memory()[1] - current) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    summary = {}
+    for k in ks:
+        scores = [entry[f"@{k}"] for entry in per_query]
+        recalls = [s["recall"] for s in scores if s["recall"] is not None]
+        summary[f"@{k}"] = {
+            "ndcg": statistics.mean(s["ndcg"] for s in scores),
+            "recall": statistics.mean(recalls) if recalls else None,
+            "judged": statistics.mean(s["judged"] for s in scores),
+        }
+    return {
+        **summary,
+        "latency_ms": {
+            "mean": statistics.mean(latencies),
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "max": max(latencies),
+        },
+        "peak_kb": {"mean": statistics.mean(peaks), "max": max(peaks)},
+        "per_query": per_query,
+    }
+
+
+def run_evaluation(
+    engines: Optional[List[str]] = None,
+    ks: List[int] = None,
+    knowledge_base=None,
+    ratings_path: Path = DEFAULT_RATINGS_PATH,
+    seed: int = 0,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Evaluate Stage 2 ranking variants against the rated pairings
+
+    Args:
+        engines: Engine names (default: all of ENGINES)
+        ks: Cutoffs (default: DEFAULT_K)
+        knowledge_base: Catalog to rank (default: load_catalog())
+        ratings_path: wine_food_pairings.csv
+        seed: Random seed (random baseline)
+        verbose: Print each engine's summary as it completes
+
+    Returns:
+        Dictionary with 'config', 'catalog' (wine and judged counts) and
+        'engines' (evaluate_engine results)
+
+    Raises:
+        ValueError: If an engine name is unknown or no query can be built
+    """
+    engines = engines or list(ENGINES)
+    unknown = [name for name in engines if name not in ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown engines: {', '.join(unknown)}. Available: {', '.join(ENGINES)}")
+    ks = sorted(ks or DEFAULT_K)
+
+    knowledge_base = knowledge_base or load_catalog()
+    ratings = load_ratings(ratings_path)
+    queries = build_queries(ratings, knowledge_base.ingredient_flavor_map)
+    if not queries:
+        raise ValueError("No rated food item maps onto the ingredient flavor map")
+    judgements = _judgements(knowledge_base, ratings)
+    judged_wines = set().union(*(gains.keys() for gains, _ in judgements.values()))
+
+    results = {}
+    for name in engines:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rank = ENGINES[name](knowledge_base, max(ks), seed)
+            results[name] = evaluate_engine(rank, queries, judgements, ks)
+        if verbose:
+            print(f"  {format_engine(name, results[name], ks)}")
+
+    return {
+        "config": {"ks": ks, "seed": seed, "ratings": str(ratings_path)},
+        "catalog": {
+            "wines": len(knowledge_base.wines),
+            "judged_wines": len(judged_wines),
+            "queries": len(queries),
+            "food_items": len(ratings),
+        },
+        "engines": results,
+    }
+
+
+def format_engine(name: str, result: Dict[str, Any], ks: List[int]) -> str:
+    quality = "  ".join(
+        f"nDCG@{k} {result[f'@{k}']['ndcg']:.3f}  R@{k} "
+        + (f"{result[f'@{k}']['recall']:.3f}" if result[f'@{k}']['recall'] is not None else "  -  ")
+        for k in ks
+    )
+    latency = result["latency_ms"]
+    return (f"{name:<22} {quality}  judged@{ks[-1]} {result[f'@{ks[-1]}']['judged']:.0%}  "
+            f"p50 {latency['p50']:8.2f}ms  p95 {latency['p95']:8.2f}ms  peak {result['peak_kb']['max']:8.1f}KB")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    catalog = report["catalog"]
+    lines = [
+        f"Pairing quality: {catalog['queries']}/{catalog['food_items']} food items, "
+        f"{catalog['wines']} wines ({catalog['judged_wines']} judged)",
+    ]
+    for name, result in report["engines"].items():
+        lines.append(f"  {format_engine(name, result, report['config']['ks'])}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate Stage 2 wine ranking against rated food pairings")
+    parser.add_argument("--engines", nargs="+", default=None, help=f"Engines to evaluate (default: all of {', '.join(ENGINES)})")
+    parser.add_argument("--k", type=int, nargs="+", default=DEFAULT_K, help="Cutoffs for NDCG/recall")
+    parser.add_argument("--ratings", type=Path, default=DEFAULT_RATINGS_PATH, help="Rated pairings CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    parser.add_argument("--output", type=Path, default=None, help="Write the report JSON to this file")
+    args = parser.parse_args()
+
+    try:
+        report = run_evaluation(args.engines, args.k, ratings_path=args.ratings, seed=args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else format_report(report))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"✓ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Startup import-time benchmark
+Imports each entrypoint in a fresh interpreter with `-X importtime` and checks
+the cumulative import time against a budget.
+
+Usage:
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time app --budget-ms 100 --runs 7
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Entrypoint -> cumulative import budget in milliseconds
+DEFAULT_BUDGETS_MS = {
+    "app": 150,
+    "web_ui.server": 750,
+    "api.index": 750,
+}
+
+# Dependencies that must only be imported inside the code paths that use them
+DEFERRED_MODULES = ["google.genai", "numpy", "pandas", "PIL", "pdfplumber", "openpyxl"]
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse `-X importtime` output
+
+    Args:
+        stderr: Interpreter stderr
+
+    Returns:
+        List of (module, self_us, cumulative_us) tuples in import order
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_import(module: str) -> List[Tuple[str, int, int]]:
+    """Import a module in a fresh interpreter and return its importtime rows"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        tail = result.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"Importing {module} failed: {tail[0]}")
+    return parse_importtime(result.stderr)
+
+
+def measure_import(module: str, runs: int = 5, top: int = 10) -> Dict[str, Any]:
+    """
+    Measure the cumulative import time of a module
+
+    Args:
+        module: Dotted module name
+        runs: Number of measured runs (after one warm-up run that compiles .pyc files)
+        top: Number of heaviest imports (by self time) to report
+
+    Returns:
+        Dictionary with median/min cumulative ms, heaviest imports and deferred modules imported
+    """
+    run_import(module)  # warm-up
+
+    totals = []
+    rows = []
+    for _ in range(runs):
+        rows = run_import(module)
+        total = next((cum for name, _, cum in reversed(rows) if name == module), None)
+        if total is None:
+            total = sum(self_us for _, self_us, _ in rows)
+        totals.append(total / 1000)
+
+    imported = {name for name, _, _ in rows}
+    heaviest = sorted(rows, key=lambda row: row[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "median_ms": statistics.median(totals),
+        "min_ms": min(totals),
+        "heaviest": [(name, self_us / 1000) for name, self_us, _ in heaviest],
+        "deferred_imported": [m for m in DEFERRED_MODULES if m in imported],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure startup import time against a budget")
+    parser.add_argument("modules", nargs="*", help=f"Modules to import (default: {', '.join(DEFAULT_BUDGETS_MS)})")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Budget applied to every module (default: per-module budgets)")
+    parser.add_argument("--runs", type=int, default=5, help="Measured runs per module")
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports to list")
+    args = parser.parse_args()
+
+    modules = args.modules or list(DEFAULT_BUDGETS_MS)
+    failed = False
+
+    for module in modules:
+        budget = args.budget_ms if args.budget_ms is not None else DEFAULT_BUDGETS_MS.get(module)
+        stats = measure_import(module, runs=args.runs, top=args.top)
+
+        over_budget = budget is not None and stats["median_ms"] > budget
+        status = "OVER BUDGET" if over_budget else "ok"
+        budget_text = f"{budget:.0f}ms" if budget is not None else "none"
+        print(f"\n{module}: median {stats['median_ms']:.1f}ms, min {stats['min_ms']:.1f}ms "
+              f"(budget {budget_text}) {status}")
+        for name, self_ms in stats["heaviest"]:
+            print(f"  {self_ms:8.1f}ms  {name}")
+        if stats["deferred_imported"]:
+            print(f"  Eagerly imported heavy dependencies: {', '.join(stats['deferred_imported'])}")
+
+        failed = failed or over_budget or bool(stats["deferred_imported"])
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+HTTP load test for the web server with a fake Gemini backend
+Simulates N restaurants, each driving the API sequence the web UI uses
+(process-menu -> process-wines -> pair-wines -> rank-wines -> generate-report)
+in its own session, concurrently. Every LLM call is answered by
+utils.fake_gemini after a simulated latency, against a synthetic catalog, so
+the run is fully offline.
+
+Requests go through the real FastAPI app (middleware, worker pools, session
+store) over an in-process ASGI transport; socket and uvicorn overhead are not
+included. Reports throughput, p50/p95/p99 latency and error rate per endpoint.
+
+Usage:
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --restaurants 50 --iterations 3 --latency-ms 800
+    python -m benchmarks.load_test --restaurants 20 --llm-workers 32   # pool sizing
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from benchmarks.synthetic import default_sampler, make_menu_text, make_wine_list, synthetic_knowledge_base, write_catalog
+
+# Simulated Gemini latency (log-normal around the median)
+DEFAULT_LATENCY_MS = 300.0
+DEFAULT_SIGMA = 0.4
+# Endpoints in the order each restaurant calls them
+ENDPOINTS = ["process-menu", "process-wines", "pair-wines", "rank-wines", "generate-report"]
+# Client-side timeout per request
+REQUEST_TIMEOUT_SECONDS = 600
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """
+    Percentile with linear interpolation between closest ranks
+
+    Args:
+        values: Samples
+        q: Percentile in [0, 100]
+
+    Returns:
+        The percentile, or None without samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class LoadRecorder:
+    """Latency and outcome of every request, per endpoint"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors: Dict[str, Dict[str, int]] = {endpoint: {} for endpoint in ENDPOINTS}
+        self.workflows_completed = 0
+        self.workflows_failed = 0
+
+    def record(self, endpoint: str, seconds: float, error: Optional[str] = None):
+        self.latencies[endpoint].append(seconds)
+        if error is not None:
+            self.errors[endpoint][error] = self.errors[endpoint].get(error, 0) + 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint in ENDPOINTS:
+            latencies = self.latencies[endpoint]
+            error_count = sum(self.errors[endpoint].values())
+            endpoints[endpoint] = {
+                "requests": len(latencies),
+                "errors": error_count,
+                "error_rate": round(error_count / len(latencies), 4) if latencies else 0.0,
+                "error_kinds": dict(sorted(self.errors[endpoint].items())),
+                "requests_per_s": round(len(latencies) / wall_seconds, 3) if wall_seconds else 0.0,
+                **{
+                    f"p{q}_ms": round(value * 1000, 1) if value is not None else None
+                    for q in (50, 95, 99) for value in [percentile(latencies, q)]
+                },
+                "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+            }
+        requests = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "wall_s": round(wall_seconds, 3),
+            "requests": requests,
+            "requests_per_s": round(requests / wall_seconds, 3) if wall_seconds else 0.0,
+            "workflows_completed": self.workflows_completed,
+            "workflows_failed": self.workflows_failed,
+            "workflows_per_min": round(self.workflows_completed * 60 / wall_seconds, 2) if wall_seconds else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+async def _call(client, recorder: LoadRecorder, endpoint: str, **kwargs):
+    """POST to an endpoint, recording its latency; returns the JSON body or None on error"""
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"/api/{endpoint}", **kwargs)
+    except Exception as e:
+        recorder.record(endpoint, time.perf_counter() - started, type(e).__name__)
+        return None
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        recorder.record(endpoint, elapsed, f"HTTP {response.status_code}")
+        return None
+    recorder.record(endpoint, elapsed)
+    return response.json()
+
+
+async def run_restaurant(client, recorder: LoadRecorder, session_id: str, menu_text: str, iterations: int):
+    """
+    One simulated restaurant: run the full API sequence iterations times in one session
+
+    A workflow stops at its first failed request (later steps depend on it).
+    """
+    headers = {"X-Session-ID": session_id}
+    for _ in range(iterations):
+        menu = await _call(client, recorder, "process-menu", headers=headers,
+                           files={"files": ("menu.txt", menu_text.encode("utf-8"), "text/plain")})
+        steps = [
+            ("process-wines", lambda: {"data": {
+                "use_detected_wines": "true",
+                "detected_wines": json.dumps(menu["extracted_wines"]),
+            }, "params": {"limit": 20}}),
+            ("pair-wines", dict),
+            ("rank-wines", lambda: {"params": {"limit": 20}}),
+            ("generate-report", lambda: {"data": {"format": "dict"}}),
+        ]
+        ok = menu is not None
+        for endpoint, request_kwargs in steps:
+            if not ok:
+                break
+            ok = await _call(client, recorder, endpoint, headers=headers, **request_kwargs()) is not None
+        if ok:
+            recorder.workflows_completed += 1
+        else:
+            recorder.workflows_failed += 1
+
+
+async def _drive(server_app, restaurants: List[Dict[str, str]], iterations: int, recorder: LoadRecorder):
+    import httpx
+
+    transport = httpx.ASGITransport(app=server_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest",
+                                 timeout=REQUEST_TIMEOUT_SECONDS) as client:
+        await asyncio.gather(*(
+            run_restaurant(client, recorder, restaurant["session_id"], restaurant["menu"], iterations)
+            for restaurant in restaurants
+        ))
+
+
+def run_load_test(
+    restaurants: int = 10,
+    iterations: int = 2,
+    dishes: int = 6,
+    unknown_ingredients: int = 2,
+    list_wines: int = 20,
+    unknown_wines: int = 3,
+    kb_wines: int = 1000,
+    latency_ms: float = DEFAULT_LATENCY_MS,
+    sigma: float = DEFAULT_SIGMA,
+    llm_workers: Optional[int] = None,
+    cpu_workers: Optional[int] = None,
+    seed: int = 0,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Drive the web server with concurrent simulated restaurants
+
+    Args:
+        restaurants: Concurrent restaurants (one session each)
+        iterations: Full API sequences per restaurant
+        dishes: Dishes per menu
+        unknown_ingredients: Ingredients per menu missing from the flavor map
+            (one ingredient_compounds call each, on the first iteration)
+        list_wines: Knowledge-base wines on each menu
+        unknown_wines: Wines per menu missing from the knowledge base (one
+            wine_enrichment call each, every iteration)
+        kb_wines: Wines in the synthetic knowledge base
+        latency_ms: Median simulated LLM latency
+        sigma: Log-normal spread of the latency
+        llm_workers: LLM worker pool size (server default if None)
+        cpu_workers: CPU worker pool size (server default if None)
+        seed: Random seed (catalog, menus and latency)
+        verbose: Show the pipeline's own progress output
+
+    Returns:
+        Dictionary with 'config', throughput, per-endpoint latency and
+        errors, and 'llm_calls' (per call site)
+
+    Raises:
+        ValueError: If restaurants or iterations is not positive
+    """
+    from app import CulinaryExpertApp
+    from utils.fake_gemini import FakeGeminiClient, LatencyModel, use_fake_gemini
+
+    if restaurants < 1 or iterations < 1:
+        raise ValueError("restaurants and iterations must be at least 1")
+    config = {
+        "restaurants": restaurants, "iterations": iterations, "dishes": dishes,
+        "unknown_ingredients": unknown_ingredients, "list_wines": list_wines, "unknown_wines": unknown_wines,
+        "kb_wines": kb_wines, "latency_ms": latency_ms, "sigma": sigma,
+        "llm_workers": llm_workers, "cpu_workers": cpu_workers, "seed": seed,
+    }
+    sampler = default_sampler()
+    fake = FakeGeminiClient(
+        latency=LatencyModel(latency_ms, sigma, seed=seed),
+        vocabulary=sampler.names[:500],
+        seed=seed
+    )
+    recorder = LoadRecorder()
+
+    with tempfile.TemporaryDirectory(prefix="load-test-") as directory, \
+            contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+        # Ingredient enrichment writes back to the map file, so it must live here
+        paths = write_catalog(directory, kb_wines, 0, list_wine_count=0, seed=seed, sampler=sampler)
+        with open(paths["ingredient_map"], 'r', encoding='utf-8') as f:
+            ingredient_names = list(json.load(f))
+        with open(paths["wines"], 'r', encoding='utf-8') as f:
+            kb_catalog = json.load(f)
+
+        menus = []
+        for index in range(restaurants):
+            wine_list = make_wine_list(kb_catalog, list_wines, unknown_wines, seed + index)
+            menus.append({
+                "session_id": f"loadtest-{seed}-{index:05d}",
+                "menu": make_menu_text(
+                    ingredient_names, wine_list, dishes,
+                    unknown_ingredient_count=unknown_ingredients, first_unknown=index * unknown_ingredients,
+                    seed=seed + index, title=f"Restaurant {index + 1}"
+                ),
+            })
+
+        with use_fake_gemini(fake):
+            import web_ui.server as server
+
+            state = server.app.state
+            saved = (server.culinary_app, state.llm_executor, state.cpu_executor)
+            server.culinary_app = CulinaryExpertApp(knowledge_base=synthetic_knowledge_base(paths))
+            if llm_workers:
+                state.llm_executor = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="llm")
+            if cpu_workers:
+                state.cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="cpu")
+            try:
+                started = time.perf_counter()
+                asyncio.run(_drive(server.app, menus, iterations, recorder))
+                wall_seconds = time.perf_counter() - started
+            finally:
+                for executor in (state.llm_executor, state.cpu_executor):
+                    if executor not in saved:
+                        executor.shutdown(wait=False)
+                server.culinary_app, state.llm_executor, state.cpu_executor = saved
+                for menu in menus:
+                    server.session_store.delete(menu["session_id"])
+
+    return {"config": config, **recorder.summary(wall_seconds), "llm_calls": dict(sorted(fake.calls.items()))}
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Throughput line followed by a per-endpoint latency table"""
+    config = report["config"]
+    lines = [
+        f"Load test: {config['restaurants']} restaurants x {config['iterations']} workflows, "
+        f"{config['dishes']} dishes, {config['list_wines']} + {config['unknown_wines']} unknown wines per menu, "
+        f"LLM median {config['latency_ms']:.0f}ms (sigma {config['sigma']})",
+        f"  {report['workflows_completed']} workflows completed, {report['workflows_failed']} failed in "
+        f"{report['wall_s']:.1f}s: {report['workflows_per_min']:.1f} workflows/min, "
+        f"{report['requests_per_s']:.2f} requests/s",
+        f"  {'Endpoint':<16} {'Requests':>8} {'Errors':>7} {'p50':>10} {'p95':>10} {'p99':>10} {'Max':>10}",
+    ]
+
+    def ms(value):
+        return f"{value:.1f}ms" if value is not None else "-"
+
+    for endpoint, entry in report["endpoints"].items():
+        lines.append(
+            f"  {endpoint:<16} {entry['requests']:>8} {entry['error_rate']:>7.1%} {ms(entry['p50_ms']):>10} "
+            f"{ms(entry['p95_ms']):>10} {ms(entry['p99_ms']):>10} {ms(entry['max_ms']):>10}"
+        )
+        for kind, count in entry["error_kinds"].items():
+            lines.append(f"    {kind}: {count}")
+    lines.append("LLM calls: " + ", ".join(f"{site}={count}" for site, count in report["llm_calls"].items()))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the web server offline with a fake Gemini backend")
+    parser.add_argument("--restaurants", type=int, default=10, help="Concurrent restaurants (one session each)")
+    parser.add_argument("--iterations", type=int, default=2, help="Full API sequences per restaurant")
+    parser.add_argument("--dishes", type=int, default=6, help="Dishes per menu")
+    parser.add_argument("--unknown-ingredients", type=int, default=2, help="Ingredients per menu missing from the flavor map")
+    parser.add_argument("--list-wines", type=int, default=20, help="Knowledge-base wines per menu")
+    parser.add_argument("--unknown-wines", type=int, default=3, help="Wines per menu missing from the knowledge base")
+    parser.add_argument("--kb-wines", type=int, default=1000, help="Wines in the synthetic knowledge base")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Median simulated LLM latency")
+    parser.add_argument("--sigma", type=float, default=DEFAULT_SIGMA, help="Log-normal spread of the latency")
+    parser.add_argument("--llm-workers", type=int, default=None, help="LLM worker pool size (default: server setting)")
+    parser.add_argument("--cpu-workers", type=int, default=None, help="CPU worker pool size (default: server setting)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None, help="Write the report JSON to this file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    try:
+        report = run_load_test(
+            args.restaurants, args.iterations, args.dishes, args.unknown_ingredients, args.list_wines,
+            args.unknown_wines, args.kb_wines, args.latency_ms, args.sigma, args.llm_workers,
+            args.cpu_workers, args.seed, args.verbose
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"✓ Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+"""
+Pipeline memory profile
+Runs each CulinaryExpertApp step on a synthetic catalog under tracemalloc and
+reports the net and peak allocations per stage, the process RSS and the top
+allocation sites. Runs offline (no Gemini calls): every listed wine is in the
+synthetic knowledge base.
+
+Compare against a saved baseline to catch memory regressions: a stage fails
+when its peak exceeds the baseline by more than the tolerance.
+
+Usage:
+    python -m benchmarks.memory_profile
+    python -m benchmarks.memory_profile --kb-wines 5000 --list-wines 500 --dishes 100 --top 15
+    python -m benchmarks.memory_profile --save-baseline   # writes benchmarks/baselines/memory_profile.json
+    python -m benchmarks.memory_profile --baseline        # exits 1 on a regression
+
+Stage times include tracemalloc overhead (several times slower than normal).
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import linecache
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional
+
+from benchmarks.synthetic import write_catalog, synthetic_knowledge_base
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_BASELINE = PROJECT_ROOT / "benchmarks" / "baselines" / "memory_profile.json"
+# Allowed peak growth over the baseline, relative and absolute (small stages
+# are dominated by allocator noise)
+DEFAULT_TOLERANCE = 0.25
+MIN_SLACK_BYTES = 512 * 1024
+# Frames kept per allocation (enough to reach pipeline code from json/stdlib internals)
+TRACEBACK_FRAMES = 6
+
+# Allocation sites in these files are profiler overhead, not pipeline memory
+_IGNORED_FILES = (tracemalloc.__file__, linecache.__file__, "<frozen importlib._bootstrap>",
+                  "<frozen importlib._bootstrap_external>", "<unknown>")
+# Frames under the project root (except benchmarks/) are pipeline code
+_PIPELINE_PREFIX = str(PROJECT_ROOT) + os.sep
+_BENCHMARKS_PREFIX = str(PROJECT_ROOT / "benchmarks") + os.sep
+
+
+def _mb(size: int) -> float:
+    return size / (1024 * 1024)
+
+
+def _rss_bytes() -> int:
+    """Current resident set size (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+@functools.lru_cache(maxsize=None)
+def _short(filename: str) -> str:
+    path = Path(filename)
+    try:
+        return str(path.relative_to(PROJECT_ROOT))
+    except ValueError:
+        return "/".join(path.parts[-2:])
+
+
+def _site(traceback: tracemalloc.Traceback) -> Optional[str]:
+    """
+    Allocation site label: the innermost pipeline frame, followed by the
+    innermost frame when that is library code (e.g. "core/x.py:12 > json/decoder.py:353")
+
+    Returns:
+        The label, or None for the profiler's own allocations
+    """
+    frames = list(traceback)
+    innermost = frames[-1]
+    # Only frames below the profiler count (its callers may be project code too)
+    for frame in reversed(frames):
+        if frame.filename == __file__:
+            return None
+        if frame.filename.startswith(_PIPELINE_PREFIX) and not frame.filename.startswith(_BENCHMARKS_PREFIX):
+            label = f"{_short(frame.filename)}:{frame.lineno}"
+            if frame is not innermost:
+                label += f" > {_short(innermost.filename)}:{innermost.lineno}"
+            return label
+    return f"{_short(innermost.filename)}:{innermost.lineno}"
+
+
+def _sites(snapshot: tracemalloc.Snapshot) -> Dict[str, List[int]]:
+    """Allocation site -> [size, count] (profiler overhead excluded)"""
+    sites: Dict[str, List[int]] = {}
+    for stat in snapshot.statistics("traceback"):
+        site = _site(stat.traceback)
+        if site is None or stat.traceback[-1].filename in _IGNORED_FILES:
+            continue
+        totals = sites.setdefault(site, [0, 0])
+        totals[0] += stat.size
+        totals[1] += stat.count
+    return sites
+
+
+@contextlib.contextmanager
+def offline_api_key():
+    """
+    Run the enclosed block without Gemini: an empty GOOGLE_AI_API_KEY (which
+    also skips the .env lookup) disables wine enrichment and report
+    explanations; the previous value is restored afterwards
+    """
+    previous = os.environ.get("GOOGLE_AI_API_KEY")
+    os.environ["GOOGLE_AI_API_KEY"] = ""
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("GOOGLE_AI_API_KEY", None)
+        else:
+            os.environ["GOOGLE_AI_API_KEY"] = previous
+
+
+def offline_app(knowledge_base):
+    """
+    CulinaryExpertApp for use inside offline_api_key()
+
+    The menu components require a key at construction but never use it when
+    a menu profile is loaded, so the app is built with a placeholder; the
+    report generator (which keeps its key) is then rebuilt without one.
+    """
+    from app import CulinaryExpertApp
+    from core.report_generator import ReportGenerator
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        os.environ["GOOGLE_AI_API_KEY"] = "offline"
+        try:
+            app = CulinaryExpertApp(knowledge_base=knowledge_base)
+        finally:
+            os.environ["GOOGLE_AI_API_KEY"] = ""
+        app.report_generator = ReportGenerator()
+    return app
+
+
+class StageMemoryProfiler:
+    """
+    Per-stage tracemalloc reports; each stage's closing snapshot is the next
+    stage's opening one (grouping a snapshot dominates the profiler's cost)
+
+    Usage:
+        profiler = StageMemoryProfiler(top=10)
+        profiler.start()
+        profiler.run("load_wines", lambda: app.load_wines(...))
+        profiler.stop()
+        print(profiler.stages)
+    """
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.stages: List[Dict[str, Any]] = []
+        self._sites: Dict[str, List[int]] = {}
+
+    def start(self):
+        tracemalloc.start(TRACEBACK_FRAMES)
+        self._sites = _sites(tracemalloc.take_snapshot())
+
+    def stop(self):
+        tracemalloc.stop()
+        self._sites = {}
+
+    def run(self, name: str, step: Callable[[], Any]) -> Any:
+        """
+        Run one step and record its report (seconds, net_bytes, peak_bytes,
+        rss_bytes and the top_sites by net growth)
+
+        Args:
+            name: Stage name
+            step: Callable running the step
+
+        Returns:
+            The step's result
+        """
+        current_before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+
+        result = step()
+
+        seconds = time.perf_counter() - started
+        current_after, peak = tracemalloc.get_traced_memory()
+        before, after = self._sites, _sites(tracemalloc.take_snapshot())
+        self._sites = after
+
+        diffs = []
+        for site in after.keys() | before.keys():
+            size_after, count_after = after.get(site, (0, 0))
+            size_before, count_before = before.get(site, (0, 0))
+            if size_after != size_before:
+                diffs.append((site, size_after - size_before, count_after - count_before))
+        diffs.sort(key=lambda diff: abs(diff[1]), reverse=True)
+
+        self.stages.append({
+            "stage": name,
+            "seconds": seconds,
+            "net_bytes": current_after - current_before,
+            "peak_bytes": peak - current_before,
+            "rss_bytes": _rss_bytes(),
+            "top_sites": [
+                {"site": site, "size_diff": size_diff, "count_diff": count_diff}
+                for site, size_diff, count_diff in diffs[:self.top]
+            ],
+        })
+        return result
+
+
+def profile_workflow(
+    kb_wines: int = 1000,
+    list_wines: int = 200,
+    dishes: int = 50,
+    seed: int = 0,
+    top: int = 10,
+    verbose: bool = False
+) -> Dict[str, Any]:
+    """
+    Profile the memory of each pipeline step on a synthetic catalog
+
+    Args:
+        kb_wines: Wines in the synthetic knowledge base
+        list_wines: Wines on the restaurant wine list
+        dishes: Dishes on the menu
+        seed: Catalog random seed
+        top: Allocation sites reported per stage
+        verbose: Show the pipeline's own progress output
+
+    Returns:
+        Dictionary with 'config' and 'stages' (one report per step)
+    """
+    config = {"kb_wines": kb_wines, "list_wines": list_wines, "dishes": dishes, "seed": seed}
+    with tempfile.TemporaryDirectory(prefix="memory-profile-") as directory, offline_api_key():
+        paths = write_catalog(directory, kb_wines, dishes, list_wine_count=list_wines, seed=seed)
+        app = offline_app(synthetic_knowledge_base(paths))
+
+        steps = [
+            ("process_menu", lambda: app.process_menu(menu_profile_path=str(paths["menu_profile"]))),
+            ("load_wines", lambda: app.load_wines(wine_files=[str(paths["wine_list"])])),
+            ("analyze_wine_similarity", app.analyze_wine_similarity),
+            ("pair_wines_to_dishes", app.pair_wines_to_dishes),
+            ("rank_wines", app.rank_wines),
+            ("generate_reports", app.generate_reports),
+        ]
+
+        profiler = StageMemoryProfiler(top)
+        profiler.start()
+        try:
+            with contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+                for name, step in steps:
+                    profiler.run(name, step)
+        finally:
+            profiler.stop()
+
+    return {"config": config, "stages": profiler.stages}
+
+
+def compare_to_baseline(
+    stages: List[Dict[str, Any]],
+    baseline: Dict[str, Any],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """
+    Find stages whose peak grew beyond the baseline
+
+    Args:
+        stages: Stage reports from profile_workflow
+        baseline: Saved profile (same catalog config)
+        tolerance: Allowed relative growth
+
+    Returns:
+        Regression messages (empty if within budget)
+    """
+    baseline_peaks = {stage["stage"]: stage["peak_bytes"] for stage in baseline.get("stages", [])}
+    regressions = []
+    for stage in stages:
+        expected = baseline_peaks.get(stage["stage"])
+        if expected is None:
+            continue
+        allowed = max(expected * (1 + tolerance), expected + MIN_SLACK_BYTES)
+        if stage["peak_bytes"] > allowed:
+            regressions.append(
+                f"{stage['stage']}: peak {_mb(stage['peak_bytes']):.1f}MB > "
+                f"{_mb(allowed):.1f}MB (baseline {_mb(expected):.1f}MB)"
+            )
+    return regressions
+
+
+def format_report(profile: Dict[str, Any], top: int = 10) -> str:
+    """Per-stage table followed by the top allocation sites of each stage"""
+    config = profile["config"]
+    lines = [
+        f"Memory profile: {config['kb_wines']} KB wines, {config['list_wines']} listed, "
+        f"{config['dishes']} dishes (seed {config['seed']})",
+        f"  {'Stage':<25} {'Time':>8} {'Net':>10} {'Peak':>10} {'RSS':>10}",
+    ]
+    for stage in profile["stages"]:
+        lines.append(
+            f"  {stage['stage']:<25} {stage['seconds']:>7.2f}s {_mb(stage['net_bytes']):>8.1f}MB "
+            f"{_mb(stage['peak_bytes']):>8.1f}MB {_mb(stage['rss_bytes']):>8.1f}MB"
+        )
+    for stage in profile["stages"]:
+        lines.append(f"\n{stage['stage']} - top allocation sites (net):")
+        for site in stage["top_sites"][:top]:
+            lines.append(f"  {site['size_diff'] / 1024:>10.1f}KB {site['count_diff']:>+8}  {site['site']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile pipeline memory per stage on a synthetic catalog")
+    parser.add_argument("--kb-wines", type=int, default=1000, help="Wines in the synthetic knowledge base")
+    parser.add_argument("--list-wines", type=int, default=200, help="Wines on the restaurant wine list")
+    parser.add_argument("--dishes", type=int, default=50, help="Dishes on the menu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites listed per stage")
+    parser.add_argument("--baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help=f"Fail if a stage's peak exceeds this saved profile (default: {DEFAULT_BASELINE.relative_to(PROJECT_ROOT)})")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed peak growth over the baseline")
+    parser.add_argument("--save-baseline", type=Path, nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help="Save per-stage net/peak bytes as the baseline")
+    parser.add_argument("--json", action="store_true", help="Print the profile as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    profile = profile_workflow(args.kb_wines, args.list_wines, args.dishes, args.seed, args.top, args.verbose)
+    print(json.dumps(profile, indent=2) if args.json else format_report(profile, args.top))
+
+    if args.save_baseline:
+        args.save_baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline = {
+            "config": profile["config"],
+            "stages": [
+                {"stage": stage["stage"], "net_bytes": stage["net_bytes"], "peak_bytes": stage["peak_bytes"]}
+                for stage in profile["stages"]
+            ],
+        }
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"\n✓ Baseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("config") != profile["config"]:
+            print(f"\nBaseline config {baseline.get('config')} differs from this run; rerun with the same options")
+            sys.exit(1)
+        regressions = compare_to_baseline(profile["stages"], baseline, args.tolerance)
+        if regressions:
+            print("\nMemory regressions:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print(f"\n✓ All stages within {args.tolerance:.0%} of the baseline peak")
+
+
+if __name__ == "__main__":
+    main()
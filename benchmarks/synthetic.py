@@ -0,0 +1,379 @@
+"""
+Synthetic catalogs for benchmarks
+Generates knowledge-base wines, an ingredient flavor map, a menu profile and
+a restaurant wine list of any size, in the same formats as processed_data/.
+Compounds are drawn from the real vocabulary (processed_data/
+ingredient_flavor_map.json) weighted by how many ingredients contain them, so
+a few compounds appear in most wines and dishes, as in the real data.
+
+Usage:
+    python -m benchmarks.synthetic --wines 5000 --dishes 100 --out /tmp/catalog
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+import random
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from utils.config import DEFAULT_INGREDIENT_MAP_PATH
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+# Used when the real ingredient map is missing
+DEFAULT_VOCABULARY_SIZE = 2000
+# Averages of the real knowledge base
+DEFAULT_COMPOUNDS_PER_WINE = 175
+DEFAULT_COMPOUNDS_PER_DISH = 60
+DEFAULT_COMPOUNDS_PER_INGREDIENT = 40
+
+WINE_TYPES = ["Red", "White", "Sparkling", "Rosé", "Dessert"]
+BODIES = ["Light-bodied", "Medium-bodied", "Full-bodied"]
+ACIDITIES = ["Low", "Medium", "High"]
+# Normalized 1-5 values of the catalog labels (processing.WineProcessor mappings)
+WINE_TYPE_IDS = {"Sparkling": 1, "White": 2, "Rosé": 3, "Red": 4, "Dessert": 5, "Dessert/Port": 5}
+BODY_LEVELS = {"Very light-bodied": 1, "Light-bodied": 2, "Medium-bodied": 3, "Full-bodied": 4,
+               "Very full-bodied": 5}
+ACIDITY_LEVELS = {"Very Low": 1, "Low": 2, "Medium": 3, "High": 4, "Very High": 5}
+GRAPES = ["Cabernet Sauvignon", "Merlot", "Pinot Noir", "Syrah", "Chardonnay",
+          "Sauvignon Blanc", "Riesling", "Nebbiolo", "Tempranillo", "Grenache"]
+REGIONS = ["Bordeaux", "Burgundy", "Rioja", "Piedmont", "Napa Valley", "Mosel", "Barossa Valley"]
+TAGS = ["Creamy", "Rich", "Savory", "Spicy", "Fresh", "Herbal", "Sweet", "Smoky"]
+HARMONIZE = ["Beef", "Lamb", "Poultry", "Pork", "Shellfish", "Rich Fish", "Lean Fish", "Pasta",
+             "Cheese", "Mushrooms", "Vegetarian", "Spicy Food", "Dessert", "Appetizer"]
+
+
+class CompoundSampler:
+    """Draws distinct compound names with fixed relative frequencies"""
+
+    def __init__(self, names: List[str], weights: List[float]):
+        self.names = names
+        self._cum_weights = list(itertools.accumulate(weights))
+
+    @classmethod
+    def synthetic(cls, vocabulary_size: int = DEFAULT_VOCABULARY_SIZE, exponent: float = 0.8) -> "CompoundSampler":
+        """Made-up vocabulary with Zipf-like frequencies"""
+        names = [f"Compound-{i:05d}" for i in range(vocabulary_size)]
+        return cls(names, [1.0 / (rank + 1) ** exponent for rank in range(vocabulary_size)])
+
+    @classmethod
+    def from_ingredient_map(cls, path: Path = PROJECT_ROOT / DEFAULT_INGREDIENT_MAP_PATH) -> "CompoundSampler":
+        """
+        Real vocabulary, weighted by the number of ingredients containing each compound
+
+        Raises:
+            FileNotFoundError: If the ingredient map does not exist
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            ingredient_map = json.load(f)
+        counts = Counter(compound for data in ingredient_map.values() for compound in data.get("compounds", []))
+        names = sorted(counts, key=lambda name: (-counts[name], name))
+        return cls(names, [counts[name] for name in names])
+
+    def sample(self, rng: random.Random, count: int) -> List[str]:
+        """Draw up to count distinct compounds"""
+        count = min(count, len(self.names))
+        names, cum_weights = self.names, self._cum_weights
+        total = cum_weights[-1]
+        chosen = set()
+        while len(chosen) < count:
+            # Oversample: frequent compounds are drawn repeatedly
+            for _ in range(2 * (count - len(chosen))):
+                chosen.add(names[bisect.bisect(cum_weights, rng.random() * total)])
+                if len(chosen) == count:
+                    break
+        return sorted(chosen)
+
+
+def default_sampler() -> CompoundSampler:
+    """Real vocabulary if processed_data/ has the ingredient map, else a synthetic one"""
+    try:
+        return CompoundSampler.from_ingredient_map()
+    except FileNotFoundError:
+        return CompoundSampler.synthetic()
+
+
+def make_wine(
+    wine_id: int,
+    wine_name: Optional[str] = None,
+    type_name: str = "Red",
+    body_name: str = "Medium-bodied",
+    acidity_name: str = "Medium",
+    flavor_compounds: Optional[List[str]] = None,
+    **fields
+) -> Dict[str, Any]:
+    """
+    One knowledge-base wine (processed_wines.json format)
+
+    The type/body/acidity integers follow the labels; any other field
+    (grapes, region, harmonize, ...) can be given as a keyword.
+
+    Args:
+        wine_id: Wine id
+        wine_name: Wine name ("Wine <id>" if None)
+        type_name: Key of WINE_TYPE_IDS
+        body_name: Key of BODY_LEVELS
+        acidity_name: Key of ACIDITY_LEVELS
+        flavor_compounds: Compound names
+        **fields: Fields added or overridden
+    """
+    wine = {
+        "wine_id": wine_id,
+        "wine_name": wine_name or f"Wine {wine_id}",
+        "type": WINE_TYPE_IDS[type_name],
+        "type_name": type_name,
+        "body": BODY_LEVELS[body_name],
+        "body_name": body_name,
+        "acidity": ACIDITY_LEVELS[acidity_name],
+        "acidity_name": acidity_name,
+        "grapes": [],
+        "abv": None,
+        "country": "Synthetia",
+        "region": "",
+        "winery": "",
+        "harmonize": [],
+        "flavor_compounds": list(flavor_compounds or []),
+    }
+    wine.update(fields)
+    return wine
+
+
+def make_wines(
+    count: int,
+    seed: int = 0,
+    compounds_per_wine: int = DEFAULT_COMPOUNDS_PER_WINE,
+    sampler: Optional[CompoundSampler] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate knowledge-base wines (processed_wines.json format)
+
+    Args:
+        count: Number of wines
+        seed: Random seed
+        compounds_per_wine: Average compounds per wine
+        sampler: Compound sampler (default_sampler() if None)
+    """
+    rng = random.Random(seed)
+    sampler = sampler or default_sampler()
+    wines = []
+    for i in range(count):
+        wine_type = rng.choice(WINE_TYPES)
+        compound_count = max(1, int(rng.gauss(compounds_per_wine, compounds_per_wine / 4)))
+        body = rng.choice(BODIES)
+        acidity = rng.choice(ACIDITIES)
+        wines.append(make_wine(
+            100001 + i,
+            f"Synthetic Wine {i:06d}",
+            wine_type,
+            body,
+            acidity,
+            grapes=rng.sample(GRAPES, rng.randint(1, 3)),
+            abv=round(rng.uniform(7.5, 16.0), 1),
+            region=rng.choice(REGIONS),
+            winery=f"Winery {rng.randint(1, max(1, count // 10)):04d}",
+            harmonize=rng.sample(HARMONIZE, rng.randint(2, 5)),
+            flavor_compounds=sampler.sample(rng, compound_count),
+        ))
+    return wines
+
+
+def make_ingredient_map(
+    count: int,
+    seed: int = 0,
+    compounds_per_ingredient: int = DEFAULT_COMPOUNDS_PER_INGREDIENT,
+    sampler: Optional[CompoundSampler] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Generate an ingredient flavor map (ingredient_flavor_map.json format)"""
+    rng = random.Random(seed + 1)
+    sampler = sampler or default_sampler()
+    ingredient_map = {}
+    for i in range(count):
+        name = f"ingredient {i:05d}"
+        ingredient_map[name] = {
+            "cleaned_name": name,
+            "compounds": sampler.sample(rng, compounds_per_ingredient),
+        }
+    return ingredient_map
+
+
+def make_menu_profile(
+    count: int,
+    seed: int = 0,
+    compounds_per_dish: int = DEFAULT_COMPOUNDS_PER_DISH,
+    ingredient_names: List[str] = None,
+    sampler: Optional[CompoundSampler] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Generate a menu profile (menu_flavor_profile.json format)"""
+    rng = random.Random(seed + 2)
+    sampler = sampler or default_sampler()
+    ingredient_names = ingredient_names or [f"ingredient {i:05d}" for i in range(100)]
+    menu_profile = {}
+    for i in range(count):
+        dish_id = f"dish_{i:05d}"
+        menu_profile[dish_id] = {
+            "dish_id": dish_id,
+            "name": f"Synthetic Dish {i:05d}",
+            "compounds": sampler.sample(rng, max(1, int(rng.gauss(compounds_per_dish, compounds_per_dish / 4)))),
+            "tags": rng.sample(TAGS, 3),
+            "suggested_wine_type": rng.choice(WINE_TYPES[:3]),
+            "ingredients": rng.sample(ingredient_names, min(6, len(ingredient_names))),
+        }
+    return menu_profile
+
+
+def make_wine_list(
+    wines: List[Dict[str, Any]],
+    count: int = None,
+    unknown_count: int = 0,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Generate a restaurant wine list naming knowledge-base wines
+
+    Args:
+        wines: Knowledge-base wines to draw from
+        count: Number of knowledge-base wines listed (all if None)
+        unknown_count: Extra wines missing from the knowledge base (these
+            would need LLM enrichment)
+        seed: Random seed
+    """
+    rng = random.Random(seed + 3)
+    listed = wines if count is None or count >= len(wines) else rng.sample(wines, count)
+    wine_list = [
+        {"wine_name": wine["wine_name"], "type_name": wine["type_name"], "region": wine["region"]}
+        for wine in listed
+    ]
+    for i in range(unknown_count):
+        wine_list.append({
+            "wine_name": f"Unlisted Wine {i:06d}",
+            "type_name": rng.choice(WINE_TYPES),
+            "grapes": [rng.choice(GRAPES)],
+        })
+    return wine_list
+
+
+def make_menu_text(
+    ingredient_names: List[str],
+    wine_list: List[Dict[str, Any]],
+    dish_count: int,
+    ingredients_per_dish: int = 6,
+    unknown_ingredient_count: int = 0,
+    first_unknown: int = 0,
+    seed: int = 0,
+    title: str = "Synthetic Bistro"
+) -> str:
+    """
+    Generate a plain-text menu with a wine section (the layout read by
+    utils.fake_gemini.parse_menu_text)
+
+    Args:
+        ingredient_names: Ingredients in the flavor map to draw from
+        wine_list: Wines for the wine section (see make_wine_list)
+        dish_count: Number of dishes
+        ingredients_per_dish: Ingredients listed per dish
+        unknown_ingredient_count: Extra ingredients missing from the flavor map,
+            spread over the dishes (these would need LLM enrichment)
+        first_unknown: Number of the first unknown ingredient (keeps names
+            distinct across menus)
+        seed: Random seed
+        title: Menu title
+    """
+    rng = random.Random(seed + 4)
+    unknown = [f"foraged herb {i:04d}" for i in range(first_unknown, first_unknown + unknown_ingredient_count)]
+    sections = ["STARTERS", "MAINS", "DESSERTS"]
+    lines = [title.upper(), ""]
+    for section_index, section in enumerate(sections):
+        lines.append(section)
+        for i in range(section_index, dish_count, len(sections)):
+            ingredients = rng.sample(ingredient_names, min(ingredients_per_dish, len(ingredient_names)))
+            ingredients += unknown[i::dish_count]
+            lines.append(f"Synthetic Dish {i:05d} - {', '.join(ingredients)}")
+        lines.append("")
+    lines.append("WINE LIST")
+    for wine in wine_list:
+        fields = [wine["wine_name"], wine.get("type_name", ""), wine.get("region", ""), ", ".join(wine.get("grapes", []))]
+        lines.append(" | ".join(fields).rstrip(" |"))
+    return "\n".join(lines) + "\n"
+
+
+def write_catalog(
+    directory: Path,
+    wine_count: int,
+    dish_count: int,
+    list_wine_count: int = None,
+    ingredient_count: int = 500,
+    unknown_wine_count: int = 0,
+    seed: int = 0,
+    sampler: Optional[CompoundSampler] = None
+) -> Dict[str, Path]:
+    """
+    Write a synthetic catalog
+
+    Args:
+        directory: Output directory
+        wine_count: Knowledge-base wines
+        dish_count: Dishes in the menu profile
+        list_wine_count: Knowledge-base wines on the wine list (all if None)
+        ingredient_count: Ingredients in the flavor map
+        unknown_wine_count: Wine-list entries missing from the knowledge base
+        seed: Random seed
+        sampler: Compound sampler (default_sampler() if None)
+
+    Returns:
+        Paths of 'wines', 'ingredient_map', 'menu_profile', 'wine_list' and
+        'snapshot_dir' (not created, so the JSON files are used)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    sampler = sampler or default_sampler()
+
+    wines = make_wines(wine_count, seed, sampler=sampler)
+    ingredient_map = make_ingredient_map(ingredient_count, seed, sampler=sampler)
+    menu_profile = make_menu_profile(dish_count, seed, ingredient_names=list(ingredient_map), sampler=sampler)
+    wine_list = make_wine_list(wines, list_wine_count, unknown_wine_count, seed)
+
+    paths = {
+        "wines": directory / "processed_wines.json",
+        "ingredient_map": directory / "ingredient_flavor_map.json",
+        "menu_profile": directory / "menu_flavor_profile.json",
+        "wine_list": directory / "wine_list.json",
+        "snapshot_dir": directory / "kb_snapshot",
+    }
+    for key, data in (("wines", wines), ("ingredient_map", ingredient_map),
+                      ("menu_profile", menu_profile), ("wine_list", wine_list)):
+        with open(paths[key], 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    return paths
+
+
+def synthetic_knowledge_base(paths: Dict[str, Path]):
+    """KnowledgeBase reading a catalog written by write_catalog"""
+    from core.knowledge_base import KnowledgeBase
+    return KnowledgeBase(
+        wines_path=paths["wines"],
+        ingredient_map_path=paths["ingredient_map"],
+        snapshot_dir=paths["snapshot_dir"]
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic wine/menu catalog")
+    parser.add_argument("--wines", type=int, default=1000, help="Knowledge-base wines")
+    parser.add_argument("--dishes", type=int, default=50, help="Dishes in the menu profile")
+    parser.add_argument("--list-wines", type=int, default=None, help="Knowledge-base wines on the wine list (default: all)")
+    parser.add_argument("--ingredients", type=int, default=500, help="Ingredients in the flavor map")
+    parser.add_argument("--unknown-wines", type=int, default=0, help="Wine-list entries missing from the knowledge base")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, required=True, help="Output directory")
+    args = parser.parse_args()
+
+    paths = write_catalog(args.out, args.wines, args.dishes, args.list_wines, args.ingredients, args.unknown_wines, args.seed)
+    for key, path in paths.items():
+        if path.exists():
+            print(f"  {key:<15} {path} ({path.stat().st_size / 1024:.0f}KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+End-to-end workflow benchmark with a fake Gemini backend
+Runs CulinaryExpertApp.run_full_workflow on generated text menus (dishes plus
+a wine section) against a synthetic catalog, with every LLM call answered by
+utils.fake_gemini after a simulated latency. Reports each stage's wall time
+split into LLM wait (time inside llm.* spans) and local time (the rest), with
+the stage's CPU time and LLM call count. No network calls and no quota.
+With --record / --replay, real Gemini responses are captured once and then
+replayed offline (see utils.gemini_cassette); the synthetic catalog is rebuilt
+from the seed, so replays see the same requests.
+
+Usage:
+    python -m benchmarks.workflow
+    python -m benchmarks.workflow --latency-ms 800 --sigma 0.5 --dishes 30 --unknown-wines 10
+    python -m benchmarks.workflow --latency-ms 0 --dishes 200 --kb-wines 20000   # local cost only
+    python -m benchmarks.workflow --menu-file menu.pdf --record cassettes/menu.jsonl   # real API, once
+    python -m benchmarks.workflow --menu-file menu.pdf --replay cassettes/menu.jsonl   # offline, repeatable
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from benchmarks.synthetic import (
+    default_sampler,
+    make_menu_text,
+    make_wine_list,
+    synthetic_knowledge_base,
+    write_catalog,
+)
+
+# Simulated Gemini latency (log-normal around the median)
+DEFAULT_LATENCY_MS = 300.0
+DEFAULT_SIGMA = 0.4
+
+
+def _merge_intervals(intervals: List[List[int]]) -> int:
+    """Total length covered by (start, end) intervals"""
+    total = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def stage_breakdown(spans: List[Any]) -> Dict[str, Any]:
+    """
+    Split each stage span's wall time into LLM wait and local time
+
+    Args:
+        spans: Finished spans of one run (see utils.tracing.tracer)
+
+    Returns:
+        Dictionary with 'stages' (per stage name, in order of first start) and
+        'total' (the root span)
+    """
+    by_id = {span.span_id: span for span in spans}
+
+    def stage_of(span) -> Optional[Any]:
+        parent = by_id.get(span.parent_id)
+        while parent is not None and not parent.name.startswith("stage."):
+            parent = by_id.get(parent.parent_id)
+        return parent
+
+    llm_intervals: Dict[str, List[List[int]]] = {}
+    llm_calls: Dict[str, int] = {}
+    all_llm = []
+    for span in spans:
+        if not span.name.startswith("llm."):
+            continue
+        all_llm.append([span.start_ns, span.end_ns])
+        stage = stage_of(span)
+        if stage is not None:
+            llm_intervals.setdefault(stage.span_id, []).append([span.start_ns, span.end_ns])
+            if span.name != "llm.retry_sleep":
+                llm_calls[stage.span_id] = llm_calls.get(stage.span_id, 0) + 1
+
+    stages: Dict[str, Dict[str, Any]] = {}
+    for span in sorted(spans, key=lambda span: span.start_ns):
+        if not span.name.startswith("stage."):
+            continue
+        wall_ns = span.end_ns - span.start_ns
+        wait_ns = _merge_intervals(llm_intervals.get(span.span_id, []))
+        entry = stages.setdefault(span.name[len("stage."):], {
+            "runs": 0, "wall_ms": 0.0, "llm_wait_ms": 0.0, "local_ms": 0.0, "cpu_ms": 0.0, "llm_calls": 0
+        })
+        entry["runs"] += 1
+        entry["wall_ms"] += wall_ns / 1e6
+        entry["llm_wait_ms"] += wait_ns / 1e6
+        entry["local_ms"] += (wall_ns - wait_ns) / 1e6
+        entry["cpu_ms"] += span.attributes.get("cpu_ms", 0.0)
+        entry["llm_calls"] += llm_calls.get(span.span_id, 0)
+
+    roots = [span for span in spans if span.parent_id is None and span.name == "benchmark.workflow"]
+    total = {}
+    if roots:
+        root = roots[0]
+        wall_ns = root.end_ns - root.start_ns
+        wait_ns = _merge_intervals(all_llm)
+        total = {
+            "wall_ms": wall_ns / 1e6,
+            "llm_wait_ms": wait_ns / 1e6,
+            "local_ms": (wall_ns - wait_ns) / 1e6,
+            "cpu_ms": root.attributes.get("cpu_ms", 0.0),
+            "llm_calls": sum(1 for span in spans if span.name.startswith("llm.") and span.name != "llm.retry_sleep"),
+            "outside_stages_ms": (wall_ns - sum(
+                span.end_ns - span.start_ns for span in spans
+                if span.name.startswith("stage.") and stage_of(span) is None
+            )) / 1e6,
+        }
+    for entry in list(stages.values()) + ([total] if total else []):
+        for key, value in entry.items():
+            if key.endswith("_ms"):
+                entry[key] = round(value, 3)
+    return {"stages": stages, "total": total}
+
+
+def run_workflow_benchmark(
+    kb_wines: int = 1000,
+    list_wines: int = 40,
+    unknown_wines: int = 5,
+    dishes: int = 12,
+    unknown_ingredients: int = 6,
+    menus: int = 1,
+    latency_ms: float = DEFAULT_LATENCY_MS,
+    sigma: float = DEFAULT_SIGMA,
+    per_token_ms: float = 0.0,
+    seed: int = 0,
+    verbose: bool = False,
+    menu_files: Optional[List[str]] = None,
+    record: Optional[str] = None,
+    replay: Optional[str] = None,
+    replay_latency: bool = True
+) -> Dict[str, Any]:
+    """
+    Run the full workflow offline and break its time down per stage
+
+    Args:
+        kb_wines: Wines in the synthetic knowledge base
+        list_wines: Knowledge-base wines on the menus' wine sections
+        unknown_wines: Listed wines missing from the knowledge base (one
+            wine_enrichment call each)
+        dishes: Dishes across all menus
+        unknown_ingredients: Ingredients missing from the flavor map (one
+            ingredient_compounds call each)
+        menus: Number of menu files the dishes and wines are split across
+        latency_ms: Median simulated LLM latency
+        sigma: Log-normal spread of the latency
+        per_token_ms: Extra latency per output token
+        seed: Random seed (catalog, menus and latency)
+        verbose: Show the pipeline's own progress output
+        menu_files: Menus to run instead of generated ones
+        record: Call the real Gemini API and record the calls to this
+            cassette (see utils.gemini_cassette)
+        replay: Answer LLM calls from this cassette instead of the fake client
+        replay_latency: Reproduce the recorded latencies when replaying
+
+    Returns:
+        Dictionary with 'config', 'stages', 'total', 'llm_calls' (per call
+        site) and 'success'
+
+    Raises:
+        ValueError: If menus is not positive, or recording without an API key
+        FileNotFoundError: If the replay cassette does not exist
+    """
+    from app import CulinaryExpertApp
+    from utils.fake_gemini import FakeGeminiClient, LatencyModel, use_fake_gemini
+    from utils.gemini_cassette import record_gemini, replay_gemini
+    from utils.structured_log import run_context
+    from utils.tracing import enable_tracing, span, tracer
+
+    if menus < 1:
+        raise ValueError("menus must be at least 1")
+    config = {
+        "kb_wines": kb_wines, "list_wines": list_wines, "unknown_wines": unknown_wines,
+        "dishes": dishes, "unknown_ingredients": unknown_ingredients, "menus": menus,
+        "latency_ms": latency_ms, "sigma": sigma, "per_token_ms": per_token_ms, "seed": seed,
+        "backend": "replay" if replay else "record" if record else "fake",
+    }
+    sampler = default_sampler()
+    if replay:
+        backend = replay_gemini(replay, reproduce_latency=replay_latency)
+    elif record:
+        backend = record_gemini(record)
+    else:
+        backend = use_fake_gemini(FakeGeminiClient(
+            latency=LatencyModel(latency_ms, sigma, per_token_ms, seed=seed),
+            vocabulary=sampler.names[:500],
+            seed=seed
+        ))
+
+    with tempfile.TemporaryDirectory(prefix="workflow-benchmark-") as directory:
+        # Ingredient enrichment writes back to the map file, so it must live here
+        paths = write_catalog(directory, kb_wines, 0, list_wine_count=0, seed=seed, sampler=sampler)
+        with open(paths["ingredient_map"], 'r', encoding='utf-8') as f:
+            ingredient_names = list(json.load(f))
+        with open(paths["wines"], 'r', encoding='utf-8') as f:
+            wine_list = make_wine_list(json.load(f), list_wines, unknown_wines, seed)
+
+        generated_menus = [] if menu_files else range(menus)
+        menu_files = list(menu_files or [])
+        first_unknown = 0
+        for index in generated_menus:
+            menu_path = Path(directory) / f"menu_{index + 1}.txt"
+            menu_dishes = dishes // menus + (1 if index < dishes % menus else 0)
+            menu_unknown = unknown_ingredients // menus + (1 if index < unknown_ingredients % menus else 0)
+            menu_path.write_text(make_menu_text(
+                ingredient_names, wine_list[index::menus], menu_dishes,
+                unknown_ingredient_count=menu_unknown, first_unknown=first_unknown,
+                seed=seed + index, title=f"Menu {index + 1}"
+            ), encoding='utf-8')
+            menu_files.append(str(menu_path))
+            first_unknown += menu_unknown
+
+        was_enabled = tracer.enabled
+        enable_tracing()
+        try:
+            with backend as llm_backend, \
+                    contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO()):
+                app = CulinaryExpertApp(knowledge_base=synthetic_knowledge_base(paths))
+                with run_context() as run_id:
+                    with span("benchmark.workflow") as root:
+                        cpu_started = time.thread_time()
+                        result = app.run_full_workflow(menu_files=menu_files, output_format="dict")
+                        root.set(cpu_ms=(time.thread_time() - cpu_started) * 1000)
+            spans = tracer.spans(run_id)
+        finally:
+            enable_tracing(was_enabled)
+
+    breakdown = stage_breakdown(spans)
+    report = {
+        "config": config,
+        "success": result.get("success", False),
+        "error": result.get("error"),
+        "stages": breakdown["stages"],
+        "total": breakdown["total"],
+        "llm_calls": dict(sorted(Counter(
+            span.name[len("llm."):] for span in spans
+            if span.name.startswith("llm.") and span.name != "llm.retry_sleep"
+        ).items())),
+    }
+    if replay:
+        report["cassette_misses"] = llm_backend.misses
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Per-stage table of wall, LLM-wait, local and CPU time"""
+    config = report["config"]
+    lines = [
+        f"Workflow benchmark: {config['dishes']} dishes ({config['unknown_ingredients']} unknown ingredients), "
+        f"{config['list_wines']} + {config['unknown_wines']} unknown wines, {config['kb_wines']} KB wines, "
+        + (f"LLM median {config['latency_ms']:.0f}ms (sigma {config['sigma']})" if config["backend"] == "fake"
+           else f"LLM {config['backend']}"),
+        f"  {'Stage':<12} {'Wall':>10} {'LLM wait':>10} {'Local':>10} {'CPU':>10} {'Local %':>8} {'Calls':>6}",
+    ]
+    rows = list(report["stages"].items())
+    if report["total"]:
+        rows.append(("total", report["total"]))
+    for name, entry in rows:
+        share = entry["local_ms"] / entry["wall_ms"] if entry["wall_ms"] else 0.0
+        lines.append(
+            f"  {name:<12} {entry['wall_ms']:>8.1f}ms {entry['llm_wait_ms']:>8.1f}ms {entry['local_ms']:>8.1f}ms "
+            f"{entry['cpu_ms']:>8.1f}ms {share:>7.1%} {entry['llm_calls']:>6}"
+        )
+    if report["total"]:
+        lines.append(f"  (outside stages: {report['total']['outside_stages_ms']:.1f}ms)")
+    lines.append("LLM calls: " + ", ".join(f"{site}={count}" for site, count in report["llm_calls"].items()))
+    if report.get("cassette_misses"):
+        lines.append(f"✗ {report['cassette_misses']} requests were not in the cassette")
+    if not report["success"]:
+        lines.append(f"✗ Workflow failed: {report['error']}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full workflow offline with a fake Gemini backend")
+    parser.add_argument("--kb-wines", type=int, default=1000, help="Wines in the synthetic knowledge base")
+    parser.add_argument("--list-wines", type=int, default=40, help="Knowledge-base wines on the menus")
+    parser.add_argument("--unknown-wines", type=int, default=5, help="Listed wines missing from the knowledge base")
+    parser.add_argument("--dishes", type=int, default=12, help="Dishes across all menus")
+    parser.add_argument("--unknown-ingredients", type=int, default=6, help="Ingredients missing from the flavor map")
+    parser.add_argument("--menus", type=int, default=1, help="Menu files")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_LATENCY_MS, help="Median simulated LLM latency")
+    parser.add_argument("--sigma", type=float, default=DEFAULT_SIGMA, help="Log-normal spread of the latency")
+    parser.add_argument("--per-token-ms", type=float, default=0.0, help="Extra latency per output token")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--menu-file", dest="menu_files", action="append", default=None, metavar="FILE",
+                        help="Menu to run instead of generated ones (repeatable)")
+    backend = parser.add_mutually_exclusive_group()
+    backend.add_argument("--record", metavar="CASSETTE", help="Call the real Gemini API and record the calls")
+    backend.add_argument("--replay", metavar="CASSETTE", help="Answer LLM calls from a recorded cassette")
+    parser.add_argument("--no-replay-latency", dest="replay_latency", action="store_false",
+                        help="Replay without the recorded latencies")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    try:
+        report = run_workflow_benchmark(
+            args.kb_wines, args.list_wines, args.unknown_wines, args.dishes, args.unknown_ingredients,
+            args.menus, args.latency_ms, args.sigma, args.per_token_ms, args.seed, args.verbose,
+            args.menu_files, args.record, args.replay, args.replay_latency
+        )
+    except (ValueError, FileNotFoundError) as e:
+        parser.error(str(e))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,8 @@ from .report_generator import ReportGenerator
 from .menu_processor import MenuProcessor
 from .wine_sommelier_wrapper import WineSommelierWrapper
 from .menu_extractor import MenuExtractor
+from .knowledge_base import KnowledgeBase, get_knowledge_base
+from .session_store import SessionStore, Session
 
 __all__ = [
     'WineManager',
@@ -20,4 +22,8 @@ __all__ = [
     'MenuProcessor',
     'WineSommelierWrapper',
     'MenuExtractor',
+    'KnowledgeBase',
+    'get_knowledge_base',
+    'SessionStore',
+    'Session',
 ]
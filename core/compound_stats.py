@@ -0,0 +1,199 @@
+"""
+Compound statistics module
+Document frequency of every flavor compound across the ingredient flavor map
+(all ingredients and FlavorGraph hub ingredients) and the wine catalog, plus
+the FlavorGraph compound category (food / drug).
+
+Compounds shared by most ingredients or most wines carry little pairing signal
+but inflate every compound set. pruned_compounds() names them so the scoring
+feature blocks can drop them at build time (KnowledgeBase prune_compounds).
+"""
+
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, FrozenSet
+
+from utils.config import (
+    DEFAULT_COMPOUND_STATS_PATH,
+    DEFAULT_HUB_COMPOUND_SHARE,
+    DEFAULT_MAX_COMPOUND_WINE_SHARE
+)
+
+
+class CompoundStats:
+    """
+    Per-compound document frequencies
+
+    Args:
+        ingredient_total: Ingredients in the flavor map
+        hub_total: Hub ingredients among them
+        wine_total: Wines in the catalog
+        ingredient_counts: compound -> ingredients listing it
+        hub_counts: compound -> hub ingredients listing it
+        wine_counts: compound -> wines listing it
+        categories: compound -> FlavorGraph category ('food' / 'drug'), where known
+        source_hash: Hash of the inputs the stats were compiled from
+    """
+
+    def __init__(
+        self,
+        ingredient_total: int,
+        hub_total: int,
+        wine_total: int,
+        ingredient_counts: Dict[str, int],
+        hub_counts: Dict[str, int],
+        wine_counts: Dict[str, int],
+        categories: Optional[Dict[str, str]] = None,
+        source_hash: Optional[str] = None
+    ):
+        self.ingredient_total = ingredient_total
+        self.hub_total = hub_total
+        self.wine_total = wine_total
+        self.ingredient_counts = dict(ingredient_counts)
+        self.hub_counts = dict(hub_counts)
+        self.wine_counts = dict(wine_counts)
+        self.categories = dict(categories or {})
+        self.source_hash = source_hash
+
+    @classmethod
+    def compile(
+        cls,
+        ingredient_flavor_map: Dict[str, Any],
+        wines: Iterable[Dict[str, Any]],
+        hub_ingredients: Optional[Iterable[str]] = None,
+        compound_categories: Optional[Dict[str, str]] = None,
+        source_hash: Optional[str] = None
+    ) -> "CompoundStats":
+        """
+        Count compound document frequencies
+
+        Args:
+            ingredient_flavor_map: Ingredient -> {'cleaned_name', 'compounds'} map
+            wines: Wine dictionaries with 'flavor_compounds'
+            hub_ingredients: FlavorGraph hub ingredient names (every mapped
+                ingredient if None: FlavorGraph only links hubs to compounds)
+            compound_categories: FlavorGraph compound name -> category
+            source_hash: Recorded as the stats' source hash
+
+        Returns:
+            CompoundStats instance
+        """
+        hubs = set(ingredient_flavor_map) if hub_ingredients is None else set(hub_ingredients)
+        ingredient_counts, hub_counts = Counter(), Counter()
+        hub_total = 0
+        for name, data in ingredient_flavor_map.items():
+            compounds = set(data.get("compounds", []))
+            ingredient_counts.update(compounds)
+            if name in hubs:
+                hub_total += 1
+                hub_counts.update(compounds)
+
+        wine_counts = Counter()
+        wine_total = 0
+        for wine in wines:
+            wine_total += 1
+            wine_counts.update(set(wine.get("flavor_compounds", [])))
+
+        vocabulary = set(ingredient_counts) | set(wine_counts)
+        categories = {c: category for c, category in (compound_categories or {}).items() if c in vocabulary}
+        return cls(len(ingredient_flavor_map), hub_total, wine_total, ingredient_counts, hub_counts,
+                   wine_counts, categories, source_hash)
+
+    def to_dict(self) -> Dict[str, Any]:
+        compounds = sorted(set(self.ingredient_counts) | set(self.wine_counts))
+        return {
+            "source_hash": self.source_hash,
+            "ingredients": self.ingredient_total,
+            "hub_ingredients": self.hub_total,
+            "wines": self.wine_total,
+            "compounds": {
+                compound: {
+                    "ingredients": self.ingredient_counts.get(compound, 0),
+                    "hub_ingredients": self.hub_counts.get(compound, 0),
+                    "wines": self.wine_counts.get(compound, 0),
+                    "category": self.categories.get(compound),
+                }
+                for compound in compounds
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CompoundStats":
+        compounds = data["compounds"]
+        return cls(
+            data["ingredients"], data["hub_ingredients"], data["wines"],
+            {c: entry["ingredients"] for c, entry in compounds.items() if entry["ingredients"]},
+            {c: entry["hub_ingredients"] for c, entry in compounds.items() if entry["hub_ingredients"]},
+            {c: entry["wines"] for c, entry in compounds.items() if entry["wines"]},
+            {c: entry["category"] for c, entry in compounds.items() if entry.get("category")},
+            data.get("source_hash")
+        )
+
+    def save(self, path: Path = DEFAULT_COMPOUND_STATS_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+            f.write("\n")
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_COMPOUND_STATS_PATH) -> "CompoundStats":
+        """
+        Raises:
+            FileNotFoundError: If the compiled stats do not exist
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def hub_share(self, compound: str) -> float:
+        """Share of hub ingredients listing the compound"""
+        return self.hub_counts.get(compound, 0) / self.hub_total if self.hub_total else 0.0
+
+    def wine_share(self, compound: str) -> float:
+        """Share of wines listing the compound"""
+        return self.wine_counts.get(compound, 0) / self.wine_total if self.wine_total else 0.0
+
+    def hub_compounds(self, hub_share: float = DEFAULT_HUB_COMPOUND_SHARE) -> List[str]:
+        """Compounds linked to at least hub_share of the hub ingredients, most common first"""
+        return sorted((c for c in self.hub_counts if self.hub_share(c) >= hub_share),
+                      key=lambda c: (-self.hub_counts[c], c))
+
+    def pruned_compounds(
+        self,
+        hub_share: Optional[float] = DEFAULT_HUB_COMPOUND_SHARE,
+        wine_share: Optional[float] = DEFAULT_MAX_COMPOUND_WINE_SHARE
+    ) -> FrozenSet[str]:
+        """
+        Compounds dropped from the pruned vocabulary
+
+        Args:
+            hub_share: Hub compound threshold (None keeps hub compounds)
+            wine_share: Drop compounds in at least this share of wines (None keeps them)
+
+        Returns:
+            Frozen set of compound names
+        """
+        pruned = set(self.hub_compounds(hub_share)) if hub_share is not None else set()
+        if wine_share is not None:
+            pruned.update(c for c in self.wine_counts if self.wine_share(c) >= wine_share)
+        return frozenset(pruned)
+
+
+def load_compound_stats(
+    path: Optional[Path] = DEFAULT_COMPOUND_STATS_PATH,
+    ingredient_flavor_map: Optional[Dict[str, Any]] = None,
+    wines: Optional[Iterable[Dict[str, Any]]] = None
+) -> CompoundStats:
+    """
+    Compiled stats from disk, else compiled in memory from the given data
+    (without FlavorGraph node metadata)
+
+    Raises:
+        FileNotFoundError: If the file is missing and no data is given
+    """
+    if path is not None and Path(path).exists():
+        return CompoundStats.load(path)
+    if ingredient_flavor_map is not None and wines is not None:
+        return CompoundStats.compile(ingredient_flavor_map, wines)
+    raise FileNotFoundError(f"No compound stats: {path} does not exist")
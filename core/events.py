@@ -0,0 +1,118 @@
+"""
+In-process event bus
+Pipeline stages publish fine-grained progress events; subscribers (e.g. the
+job registry behind the SSE endpoint) receive them synchronously.
+
+Publishing is cheap when nobody listens: with no subscribers, publish() only
+does a dictionary lookup and returns.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Any, Optional, Callable
+
+# Job the current thread/task is working for (propagated into worker pools
+# by copying the context, see web_ui/server.py run_in_pool)
+current_job_id: ContextVar[Optional[str]] = ContextVar("current_job_id", default=None)
+
+# Event types published by the pipeline
+MENU_FILE_EXTRACTED = "menu.file_extracted"
+MENU_DISH_COMPOUNDS_BUILT = "menu.dish_compounds_built"
+WINE_ENRICHED = "wines.wine_enriched"
+REPORT_EXPLANATION_GENERATED = "report.explanation_generated"
+JOB_STARTED = "job.started"
+JOB_COMPLETED = "job.completed"
+JOB_FAILED = "job.failed"
+
+# Wildcard subscription key
+ALL_EVENTS = "*"
+
+
+class EventBus:
+    """
+    Synchronous publish/subscribe bus
+
+    Subscribers are called in the publishing thread, so they must be quick
+    (e.g. hand the event to a queue).
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None], event_type: str = ALL_EVENTS) -> Callable[[], None]:
+        """
+        Register a subscriber
+
+        Args:
+            callback: Called with each event dictionary
+            event_type: Event type to receive (ALL_EVENTS for every event)
+
+        Returns:
+            Function that removes the subscription
+        """
+        with self._lock:
+            self._subscribers[event_type].append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._subscribers.get(event_type, [])
+                if callback in callbacks:
+                    callbacks.remove(callback)
+
+        return unsubscribe
+
+    def publish(self, event_type: str, job_id: Optional[str] = None, **data) -> Optional[Dict[str, Any]]:
+        """
+        Publish an event
+
+        Args:
+            event_type: Event type (e.g. WINE_ENRICHED)
+            job_id: Job the event belongs to (defaults to current_job_id)
+            **data: Event payload (e.g. current, total, message)
+
+        Returns:
+            The published event, or None if there were no subscribers
+        """
+        callbacks = self._subscribers.get(event_type, []) + self._subscribers.get(ALL_EVENTS, [])
+        if not callbacks:
+            return None
+
+        event = {
+            "type": event_type,
+            "job_id": job_id if job_id is not None else current_job_id.get(),
+            "timestamp": time.time(),
+            **data
+        }
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"  Warning: Event subscriber failed for {event_type}: {e}")
+        return event
+
+
+_event_bus = EventBus()
+
+
+def get_event_bus() -> EventBus:
+    """Get the process-wide event bus"""
+    return _event_bus
+
+
+def publish(event_type: str, **data) -> Optional[Dict[str, Any]]:
+    """Publish an event on the process-wide bus (see EventBus.publish)"""
+    return _event_bus.publish(event_type, **data)
+
+
+@contextmanager
+def job_context(job_id: str):
+    """Attribute events published inside the block to job_id"""
+    token = current_job_id.set(job_id)
+    try:
+        yield
+    finally:
+        current_job_id.reset(token)
@@ -0,0 +1,151 @@
+"""
+Background job registry
+Tracks long-running pipeline jobs and buffers their progress events for
+streaming (Server-Sent Events) to any number of listeners.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+from core.events import EventBus, get_event_bus, JOB_STARTED, JOB_COMPLETED, JOB_FAILED
+
+# Job statuses
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+# Events after which a job publishes nothing more
+TERMINAL_EVENTS = {JOB_COMPLETED, JOB_FAILED}
+
+
+class Job:
+    """
+    A single background job and its event history
+
+    Events can arrive from any thread; listeners are asyncio queues that are
+    fed through their event loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, kind: str, session_id: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        # Session that started the job (only it may read the job)
+        self.session_id = session_id
+        self.status = STATUS_PENDING
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.result = None
+        self.error = None
+        self.events: List[Dict[str, Any]] = []
+        self._listeners: List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (STATUS_SUCCEEDED, STATUS_FAILED)
+
+    def add_event(self, event: Dict[str, Any]):
+        """Record an event and forward it to every listener"""
+        with self._lock:
+            self.events.append(event)
+            self.updated_at = event.get("timestamp", time.time())
+            listeners = list(self._listeners)
+        for loop, queue in listeners:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Listener's loop already closed
+                pass
+
+    def listen(self) -> Tuple[asyncio.Queue, List[Dict[str, Any]]]:
+        """
+        Register an asyncio listener (must be called from the listener's loop)
+
+        Returns:
+            (queue receiving future events, events already recorded)
+        """
+        queue = asyncio.Queue()
+        with self._lock:
+            backlog = list(self.events)
+            self._listeners.append((asyncio.get_running_loop(), queue))
+        return queue, backlog
+
+    def stop_listening(self, queue: asyncio.Queue):
+        with self._lock:
+            self._listeners = [(loop, q) for loop, q in self._listeners if q is not queue]
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "event_count": len(self.events),
+            "error": self.error,
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Registry of background jobs
+
+    Subscribes to the event bus and routes every event carrying a job_id to
+    that job. Only the most recent max_jobs jobs are kept.
+    """
+
+    def __init__(self, event_bus: Optional[EventBus] = None, max_jobs: int = 100):
+        self.event_bus = event_bus or get_event_bus()
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._unsubscribe = self.event_bus.subscribe(self._route_event)
+
+    def _route_event(self, event: Dict[str, Any]):
+        job = self.get(event.get("job_id"))
+        if job is not None:
+            job.add_event(event)
+
+    def create(self, kind: str, session_id: Optional[str] = None) -> Job:
+        """Create and register a new pending job owned by session_id"""
+        job = Job(kind, session_id)
+        with self._lock:
+            self._jobs[job.id] = job
+            # Evict the oldest finished jobs beyond the retention limit
+            while len(self._jobs) > self.max_jobs:
+                oldest_id = next((jid for jid, j in self._jobs.items() if j.finished), None)
+                if oldest_id is None:
+                    break
+                del self._jobs[oldest_id]
+        return job
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        if job_id is None:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def mark_running(self, job: Job):
+        job.status = STATUS_RUNNING
+        self.event_bus.publish(JOB_STARTED, job_id=job.id, kind=job.kind)
+
+    def mark_succeeded(self, job: Job, result: Any):
+        job.result = result
+        job.status = STATUS_SUCCEEDED
+        self.event_bus.publish(JOB_COMPLETED, job_id=job.id, kind=job.kind)
+
+    def mark_failed(self, job: Job, error: str):
+        job.error = error
+        job.status = STATUS_FAILED
+        self.event_bus.publish(JOB_FAILED, job_id=job.id, kind=job.kind, error=error)
+
+    def close(self):
+        self._unsubscribe()
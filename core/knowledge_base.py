@@ -0,0 +1,366 @@
+"""
+Knowledge base module
+Process-wide registry for the wine database, ingredient flavor map and derived indexes
+"""
+
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from utils.config import (
+    DEFAULT_WINES_PATH,
+    DEFAULT_INGREDIENT_MAP_PATH,
+    DEFAULT_KB_SNAPSHOT_DIR,
+    DEFAULT_PAIRING_PRIORS_PATH,
+    DEFAULT_PAIRING_RATINGS_PATH,
+    DEFAULT_COMPOUND_STATS_PATH,
+    DEFAULT_PRUNE_COMPOUNDS
+)
+
+
+def clean_ingredient_name(name: str) -> str:
+    """Clean ingredient name for matching (same rules as WineSommelier/MenuProfiler)"""
+    name = name.lower().strip()
+    name = re.sub(r'[^a-z0-9\s]', '', name)
+    name = re.sub(r'[_\s]+', ' ', name)
+    return name.strip()
+
+
+class KnowledgeBase:
+    """
+    Wines, ingredient flavor map and lookup indexes, loaded once and shared
+
+    Each collection is loaded on first access. Components receive the same
+    instance by reference (see get_knowledge_base), so the data is read from
+    disk once per process no matter how many components are constructed.
+    """
+
+    def __init__(
+        self,
+        wines_path: Path = DEFAULT_WINES_PATH,
+        ingredient_map_path: Path = DEFAULT_INGREDIENT_MAP_PATH,
+        snapshot_dir: Path = DEFAULT_KB_SNAPSHOT_DIR,
+        pairing_priors_path: Path = DEFAULT_PAIRING_PRIORS_PATH,
+        pairing_ratings_path: Path = DEFAULT_PAIRING_RATINGS_PATH,
+        compound_stats_path: Optional[Path] = DEFAULT_COMPOUND_STATS_PATH,
+        prune_compounds: bool = DEFAULT_PRUNE_COMPOUNDS
+    ):
+        """
+        Initialize the Knowledge Base (nothing is loaded until first use)
+
+        Args:
+            wines_path: Path to processed_wines.json
+            ingredient_map_path: Path to ingredient_flavor_map.json
+            snapshot_dir: Path to the binary snapshot directory
+            pairing_priors_path: Path to pairing_priors.json
+            pairing_ratings_path: Rated pairings CSV (priors are compiled from it if pairing_priors.json is missing)
+            compound_stats_path: Path to compound_stats.json (compiled from the loaded data if missing or None)
+            prune_compounds: Build the scoring feature blocks without the pruned compounds
+        """
+        self.wines_path = Path(wines_path)
+        self.ingredient_map_path = Path(ingredient_map_path)
+        self.snapshot_dir = Path(snapshot_dir)
+        self.pairing_priors_path = Path(pairing_priors_path)
+        self.pairing_ratings_path = Path(pairing_ratings_path)
+        self.compound_stats_path = Path(compound_stats_path) if compound_stats_path is not None else None
+        self.prune_compounds = prune_compounds
+        self._lock = threading.RLock()
+        self._wines = None
+        self._ingredient_flavor_map = None
+        self._pairing_priors = None
+        self._compound_stats = None
+        self._wine_rule_columns = None
+        self._wine_features = None
+        self._wine_by_id = None
+        self._wine_by_name = None
+        self._cleaned_name_index = None
+
+    @classmethod
+    def from_data(
+        cls,
+        wines: List[Dict[str, Any]],
+        ingredient_flavor_map: Optional[Dict[str, Any]] = None,
+        pairing_priors=None,
+        compound_stats=None,
+        prune_compounds: bool = DEFAULT_PRUNE_COMPOUNDS
+    ) -> "KnowledgeBase":
+        """
+        Knowledge base over in-memory data (nothing is read from disk)
+
+        Args:
+            wines: Wine dictionaries (processed_wines.json format)
+            ingredient_flavor_map: Ingredient flavor map (empty if None)
+            pairing_priors: PairingPriors (loaded from the default paths on first use if None)
+            compound_stats: CompoundStats (compiled from wines and the map on first use if None)
+            prune_compounds: Build the scoring feature blocks without the pruned compounds
+
+        Returns:
+            KnowledgeBase instance
+        """
+        knowledge_base = cls(compound_stats_path=None, prune_compounds=prune_compounds)
+        knowledge_base._wines = wines
+        knowledge_base._ingredient_flavor_map = ingredient_flavor_map if ingredient_flavor_map is not None else {}
+        knowledge_base._pairing_priors = pairing_priors
+        knowledge_base._compound_stats = compound_stats
+        return knowledge_base
+
+    @property
+    def wines(self) -> List[Dict[str, Any]]:
+        """
+        Internal wine database
+
+        Raises:
+            FileNotFoundError: If no processed wines are available
+        """
+        if self._wines is None:
+            with self._lock:
+                if self._wines is None:
+                    # Imported lazily: the snapshot loader pulls in numpy
+                    from utils.kb_snapshot import load_processed_wines
+                    self._wines = load_processed_wines(
+                        self.wines_path, self.snapshot_dir, self.ingredient_map_path
+                    )
+                    print(f"Loaded {len(self._wines)} wines")
+        return self._wines
+
+    @property
+    def ingredient_flavor_map(self) -> Dict[str, Any]:
+        """
+        Ingredient -> {'cleaned_name', 'compounds'} map
+
+        Raises:
+            FileNotFoundError: If no ingredient flavor map is available
+        """
+        if self._ingredient_flavor_map is None:
+            with self._lock:
+                if self._ingredient_flavor_map is None:
+                    from utils.kb_snapshot import load_ingredient_flavor_map
+                    self._ingredient_flavor_map = load_ingredient_flavor_map(
+                        self.ingredient_map_path, self.snapshot_dir, self.wines_path
+                    )
+                    print(f"Loaded {len(self._ingredient_flavor_map)} ingredients from flavor map")
+        return self._ingredient_flavor_map
+
+    @property
+    def pairing_priors(self):
+        """
+        PairingPriors compiled from the rated pairings (see core.pairing_priors)
+
+        Raises:
+            FileNotFoundError: If neither pairing_priors.json nor the ratings CSV exists
+        """
+        if self._pairing_priors is None:
+            with self._lock:
+                if self._pairing_priors is None:
+                    # Imported lazily: the priors tables are numpy arrays
+                    from core.pairing_priors import load_pairing_priors
+                    self._pairing_priors = load_pairing_priors(self.pairing_priors_path, self.pairing_ratings_path)
+        return self._pairing_priors
+
+    @property
+    def compound_stats(self):
+        """
+        CompoundStats of the ingredient map and wines (see core.compound_stats)
+
+        Raises:
+            FileNotFoundError: If compound_stats.json is missing and the wines or map cannot be loaded
+        """
+        if self._compound_stats is None:
+            with self._lock:
+                if self._compound_stats is None:
+                    from core.compound_stats import load_compound_stats
+                    if self.compound_stats_path is not None and self.compound_stats_path.exists():
+                        self._compound_stats = load_compound_stats(self.compound_stats_path)
+                    else:
+                        self._compound_stats = load_compound_stats(
+                            None, self.ingredient_flavor_map, self.wines
+                        )
+        return self._compound_stats
+
+    @property
+    def pruned_compounds(self) -> frozenset:
+        """Compounds left out of the scoring feature blocks (empty unless prune_compounds)"""
+        if not self.prune_compounds:
+            return frozenset()
+        return self.compound_stats.pruned_compounds()
+
+    @property
+    def wine_rule_columns(self):
+        """WineRuleColumns of all wines, for vectorised rule scoring (see core.pairing_rules)"""
+        if self._wine_rule_columns is None:
+            with self._lock:
+                if self._wine_rule_columns is None:
+                    # Imported lazily: the columns are numpy arrays
+                    from core.pairing_rules import WineRuleColumns
+                    self._wine_rule_columns = WineRuleColumns.from_wines(self.wines)
+        return self._wine_rule_columns
+
+    @property
+    def wine_features(self):
+        """WineFeatures of all wines, for hybrid pairing scores (see core.scoring)"""
+        if self._wine_features is None:
+            with self._lock:
+                if self._wine_features is None:
+                    # Imported lazily: the feature blocks are numpy arrays
+                    from core.scoring import WineFeatures
+                    self._wine_features = WineFeatures.from_wines(self.wines, excluded=self.pruned_compounds)
+        return self._wine_features
+
+    def is_catalog(self, wines: Any) -> bool:
+        """True if wines is the loaded wine database itself (never triggers a load)"""
+        return wines is not None and wines is self._wines
+
+    @property
+    def has_wines(self) -> bool:
+        try:
+            return len(self.wines) > 0
+        except FileNotFoundError:
+            return False
+
+    @property
+    def has_ingredient_map(self) -> bool:
+        try:
+            self.ingredient_flavor_map
+            return True
+        except FileNotFoundError:
+            return False
+
+    @property
+    def wine_by_id(self) -> Dict[int, Dict[str, Any]]:
+        """wine_id -> wine index (first occurrence wins)"""
+        if self._wine_by_id is None:
+            with self._lock:
+                if self._wine_by_id is None:
+                    index = {}
+                    for wine in self.wines:
+                        wine_id = wine.get("wine_id")
+                        if wine_id is not None:
+                            index.setdefault(wine_id, wine)
+                    self._wine_by_id = index
+        return self._wine_by_id
+
+    @property
+    def wine_by_name(self) -> Dict[str, Dict[str, Any]]:
+        """Lowercased wine_name -> wine index (first occurrence wins)"""
+        if self._wine_by_name is None:
+            with self._lock:
+                if self._wine_by_name is None:
+                    index = {}
+                    for wine in self.wines:
+                        name = wine.get("wine_name", "").lower().strip()
+                        if name:
+                            index.setdefault(name, wine)
+                    self._wine_by_name = index
+        return self._wine_by_name
+
+    @property
+    def cleaned_name_index(self) -> Dict[str, str]:
+        """cleaned_name -> ingredient key index (first occurrence wins)"""
+        if self._cleaned_name_index is None:
+            with self._lock:
+                if self._cleaned_name_index is None:
+                    index = {}
+                    for ingredient, data in self.ingredient_flavor_map.items():
+                        cleaned = data.get("cleaned_name")
+                        if cleaned:
+                            index.setdefault(cleaned, ingredient)
+                    self._cleaned_name_index = index
+        return self._cleaned_name_index
+
+    def get_wine_by_id(self, wine_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get full wine details by ID
+
+        Args:
+            wine_id: Wine ID
+
+        Returns:
+            Wine dictionary or None if not found
+        """
+        try:
+            return self.wine_by_id.get(wine_id)
+        except FileNotFoundError:
+            return None
+
+    def find_ingredient_by_cleaned_name(self, cleaned_name: str) -> Optional[str]:
+        """
+        Find the ingredient map key for a cleaned ingredient name
+
+        Args:
+            cleaned_name: Name already passed through clean_ingredient_name
+
+        Returns:
+            Ingredient key or None if not found
+        """
+        return self.cleaned_name_index.get(cleaned_name)
+
+    def add_ingredient(self, ingredient: str, cleaned_name: str, compounds: List[str]):
+        """
+        Add (or replace) an ingredient in the shared map and keep indexes in sync
+
+        Copy-on-write: readers iterate the map and index without the lock, so
+        both are replaced by updated copies rather than mutated in place.
+
+        Args:
+            ingredient: Ingredient key
+            cleaned_name: Cleaned ingredient name
+            compounds: Flavor compounds for the ingredient
+        """
+        with self._lock:
+            updated = self.ingredient_flavor_map.copy()
+            updated[ingredient] = {
+                "cleaned_name": cleaned_name,
+                "compounds": compounds
+            }
+            self._ingredient_flavor_map = updated
+            index = self._cleaned_name_index
+            if index is not None and cleaned_name and cleaned_name not in index:
+                self._cleaned_name_index = {**index, cleaned_name: ingredient}
+
+    def save_ingredient_flavor_map(self) -> bool:
+        """
+        Write the current ingredient map to ingredient_map_path, if that file exists
+
+        Returns:
+            True if the file was written
+        """
+        with self._lock:
+            if not self.ingredient_map_path.exists():
+                return False
+            with open(self.ingredient_map_path, 'w', encoding='utf-8') as f:
+                # default=dict serialises snapshot-backed map entries
+                json.dump(self.ingredient_flavor_map, f, indent=2, ensure_ascii=False, default=dict)
+        return True
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """
+    Get the process-wide KnowledgeBase, creating it on first call
+
+    Returns:
+        Shared KnowledgeBase instance
+    """
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+    return _knowledge_base
+
+
+def set_knowledge_base(knowledge_base: Optional[KnowledgeBase]):
+    """
+    Replace the process-wide KnowledgeBase (None resets it, e.g. after a rebuild)
+
+    Args:
+        knowledge_base: KnowledgeBase instance or None
+    """
+    global _knowledge_base
+    with _knowledge_base_lock:
+        _knowledge_base = knowledge_base
@@ -4,18 +4,26 @@ Uses Gemini to extract dishes and wines from various file formats
 """
 
 import json
-import os
 import re
 from pathlib import Path
 from typing import Dict, List, Any, Optional
-import google.genai as genai
 from utils.file_parsers import (
     read_excel_content,
     read_csv_content,
-    detect_file_type
+    detect_file_type,
+    read_bytes,
+    source_name,
+    FileSource
 )
 from core.data_formats import normalize_dish_format, normalize_wine_format
-from utils.config import DEFAULT_INGREDIENT_MAP_PATH
+from utils.gemini_client import get_api_key, create_client, upload_file, generate_content, is_rate_limit_error
+from core.knowledge_base import get_knowledge_base
+from core.events import publish, MENU_FILE_EXTRACTED, MENU_DISH_COMPOUNDS_BUILT
+from utils.structured_log import get_logger, log_event
+from utils.metrics import record_cache_lookup, record_llm_retry
+from utils.tracing import span, traced
+
+logger = get_logger("menu_extractor")
 
 
 class MenuExtractor:
@@ -23,25 +31,22 @@ class MenuExtractor:
     Extracts dishes and wines from various file formats using Gemini
     """
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-3-flash-preview"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gemini-3-flash-preview",
+        knowledge_base=None
+    ):
         """
         Initialize the Menu Extractor
         
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
             model_name: Gemini model to use
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
         """
         # Get API key from parameter or environment
-        if api_key is None:
-            api_key = os.getenv("GOOGLE_AI_API_KEY")
-            if api_key is None:
-                # Try .env file
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("GOOGLE_AI_API_KEY")
-                except ImportError:
-                    pass
+        api_key = get_api_key(api_key)
         
         if not api_key:
             raise ValueError(
@@ -49,20 +54,28 @@ class MenuExtractor:
                 "or pass api_key parameter."
             )
         
-        # Configure Gemini
-        self.client = genai.Client(api_key=api_key)
+        # Gemini client is created on first use (see client property)
+        self.api_key = api_key
         self.model_name = model_name
+        self._client = None
         
-        # Load ingredient flavor map for compound mapping
-        self.ingredient_flavor_map = None
-        self._load_ingredient_map()
+        # Ingredient flavor map for compound mapping (loads on first access)
+        self.knowledge_base = knowledge_base or get_knowledge_base()
     
-    def _load_ingredient_map(self):
-        """Load ingredient flavor map from processed data"""
-        ingredient_path = Path(DEFAULT_INGREDIENT_MAP_PATH)
-        if ingredient_path.exists():
-            with open(ingredient_path, 'r', encoding='utf-8') as f:
-                self.ingredient_flavor_map = json.load(f)
+    @property
+    def client(self):
+        """Gemini client, created on first use"""
+        if self._client is None:
+            self._client = create_client(self.api_key)
+        return self._client
+    
+    @property
+    def ingredient_flavor_map(self) -> Optional[Dict[str, Any]]:
+        """Ingredient flavor map from the shared knowledge base (None if unavailable)"""
+        try:
+            return self.knowledge_base.ingredient_flavor_map
+        except FileNotFoundError:
+            return None
     
     def _clean_ingredient_name(self, name: str) -> str:
         """Clean ingredient name for matching"""
@@ -83,9 +96,9 @@ class MenuExtractor:
             return self.ingredient_flavor_map[ingredient].get("compounds", [])
         
         # Try cleaned name match
-        for map_ingredient, data in self.ingredient_flavor_map.items():
-            if data.get("cleaned_name") == cleaned:
-                return data.get("compounds", [])
+        map_ingredient = self.knowledge_base.find_ingredient_by_cleaned_name(cleaned)
+        if map_ingredient is not None:
+            return self.ingredient_flavor_map[map_ingredient].get("compounds", [])
         
         # Try partial match
         for map_ingredient, data in self.ingredient_flavor_map.items():
@@ -114,7 +127,10 @@ Return ONLY a JSON array of compound names (no markdown, no code blocks):
 Focus on the most important and characteristic flavor compounds for this ingredient. Use standard chemical compound names."""
         
         try:
-            response = self.client.models.generate_content(
+            response = generate_content(
+                self.client,
+                "ingredient_compounds",
+                trace_attributes={"ingredient": ingredient},
                 model=self.model_name,
                 contents=prompt,
                 config={
@@ -152,16 +168,8 @@ Focus on the most important and characteristic flavor compounds for this ingredi
             # Save to ingredient flavor map
             if self.ingredient_flavor_map is not None:
                 cleaned_name = self._clean_ingredient_name(ingredient)
-                self.ingredient_flavor_map[ingredient] = {
-                    "cleaned_name": cleaned_name,
-                    "compounds": compounds
-                }
-                
-                # Save to file
-                ingredient_path = Path(DEFAULT_INGREDIENT_MAP_PATH)
-                if ingredient_path.exists():
-                    with open(ingredient_path, 'w', encoding='utf-8') as f:
-                        json.dump(self.ingredient_flavor_map, f, indent=2, ensure_ascii=False)
+                self.knowledge_base.add_ingredient(ingredient, cleaned_name, compounds)
+                if self.knowledge_base.save_ingredient_flavor_map():
                     print(f"  Saved new ingredient '{ingredient}' with {len(compounds)} compounds to flavor map")
             
             return compounds
@@ -178,6 +186,7 @@ Focus on the most important and characteristic flavor compounds for this ingredi
         all_compounds = set()
         for ingredient in ingredients:
             compounds = self._get_compounds_for_ingredient(ingredient)
+            record_cache_lookup("ingredient_compounds", hit=bool(compounds))
             
             # If not found, enrich with Gemini
             if not compounds:
@@ -205,7 +214,7 @@ Focus on the most important and characteristic flavor compounds for this ingredi
                 return "White"
             return "Red"
     
-    def _extract_with_gemini(self, content: Any, is_image: bool = False, is_pdf_file: bool = False, pdf_file_path: str = None) -> Dict[str, Any]:
+    def _extract_with_gemini(self, content: Any, is_image: bool = False, is_pdf_file: bool = False, pdf_file_path: Optional[FileSource] = None) -> Dict[str, Any]:
         """
         Use Gemini to extract dishes and wines from content
         
@@ -213,7 +222,7 @@ Focus on the most important and characteristic flavor compounds for this ingredi
             content: Text content, image bytes, PIL Image, or uploaded file reference
             is_image: Whether content is an image
             is_pdf_file: Whether content is a PDF file (uploaded via Files API)
-            pdf_file_path: Path to PDF file (if is_pdf_file is True)
+            pdf_file_path: PDF path, bytes or file object (if is_pdf_file is True)
             
         Returns:
             Dictionary with 'dishes' and 'wines' arrays
@@ -274,15 +283,17 @@ Document: """
         
         for attempt in range(max_retries):
             try:
-                if is_pdf_file and pdf_file_path:
-                    # Upload PDF file directly to Gemini Files API
-                    # Based on debug logs: client.files.upload() accepts file parameter (path string, PathLike, or file object)
-                    # Signature: (*, file: Union[str, os.PathLike[str], io.IOBase], config: ...)
-                    uploaded_file = self.client.files.upload(file=pdf_file_path)
+                if is_pdf_file and pdf_file_path is not None:
+                    # Upload PDF file directly to Gemini Files API (file objects
+                    # are streamed as-is, without writing a temp file)
+                    uploaded_file = upload_file(self.client, pdf_file_path, "application/pdf")
                     print(f"  Uploaded PDF file: {uploaded_file.name}")
                     
                     # Use uploaded file in prompt
-                    response = self.client.models.generate_content(
+                    response = generate_content(
+                        self.client,
+                        "menu_extraction",
+                        trace_attributes={"input": "pdf"},
                         model=self.model_name,
                         contents=[prompt, uploaded_file],
                         config={
@@ -292,96 +303,102 @@ Document: """
                         }
                     )
                 elif is_image:
-                import PIL.Image
-                import io
-                if isinstance(content, bytes):
-                    image = PIL.Image.open(io.BytesIO(content))
-                else:
-                    image = content  # Assume it's already a PIL Image
+                    import PIL.Image
+                    import io
+                    if isinstance(content, bytes):
+                        image = PIL.Image.open(io.BytesIO(content))
+                    else:
+                        image = content  # Assume it's already a PIL Image
                 
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=[prompt, image],
-                    config={
-                        "temperature": 0.3,
-                        "max_output_tokens": 32768,  # Increased for large menus
-                        "response_mime_type": "application/json"
-                    }
-                )
-            else:
-                full_prompt = prompt + str(content)
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=full_prompt,
-                    config={
-                        "temperature": 0.3,
-                        "max_output_tokens": 32768,  # Increased for large menus
-                        "response_mime_type": "application/json"
-                    }
-                )
-            
-            # Extract text from response
-            if hasattr(response, 'text'):
-                response_text = response.text.strip()
-            elif hasattr(response, 'candidates') and response.candidates:
-                response_text = response.candidates[0].content.parts[0].text.strip()
-            elif isinstance(response, dict) and 'text' in response:
-                response_text = response['text'].strip()
-            else:
-                response_text = str(response).strip()
-            
-            # Clean and parse JSON
-            response_text_cleaned = response_text.strip()
-            if response_text_cleaned.startswith("```json"):
-                response_text_cleaned = response_text_cleaned[7:]
-            if response_text_cleaned.startswith("```"):
-                response_text_cleaned = response_text_cleaned[3:]
-            if response_text_cleaned.endswith("```"):
-                response_text_cleaned = response_text_cleaned[:-3]
-            response_text_cleaned = response_text_cleaned.strip()
-            
-            # Check for truncation indicators
-            is_truncated = (
-                response_text_cleaned.rstrip().endswith('"') and not response_text_cleaned.rstrip().endswith('"}') and not response_text_cleaned.rstrip().endswith('"]') or
-                response_text_cleaned.rstrip().endswith('"dish_') or
-                response_text_cleaned.rstrip().endswith('"wine_') or
-                (response_text_cleaned.count('{') > response_text_cleaned.count('}')) or
-                (response_text_cleaned.count('[') > response_text_cleaned.count(']'))
-            )
+                    response = generate_content(
+                        self.client,
+                        "menu_extraction",
+                        trace_attributes={"input": "image"},
+                        model=self.model_name,
+                        contents=[prompt, image],
+                        config={
+                            "temperature": 0.3,
+                            "max_output_tokens": 32768,  # Increased for large menus
+                            "response_mime_type": "application/json"
+                        }
+                    )
+                else:
+                    full_prompt = prompt + str(content)
+                    response = generate_content(
+                        self.client,
+                        "menu_extraction",
+                        trace_attributes={"input": "text"},
+                        model=self.model_name,
+                        contents=full_prompt,
+                        config={
+                            "temperature": 0.3,
+                            "max_output_tokens": 32768,  # Increased for large menus
+                            "response_mime_type": "application/json"
+                        }
+                    )
             
-            # Try to parse JSON, with fallback for truncated responses
-            try:
-                result = json.loads(response_text_cleaned)
-            except json.JSONDecodeError as parse_error:
-                # If truncated, try to extract partial data
-                if is_truncated or "Unterminated string" in str(parse_error):
-                    # Try to extract valid partial JSON
-                    result = self._recover_partial_json(response_text_cleaned)
+                # Extract text from response
+                if hasattr(response, 'text'):
+                    response_text = response.text.strip()
+                elif hasattr(response, 'candidates') and response.candidates:
+                    response_text = response.candidates[0].content.parts[0].text.strip()
+                elif isinstance(response, dict) and 'text' in response:
+                    response_text = response['text'].strip()
                 else:
-                    raise
+                    response_text = str(response).strip()
+            
+                # Clean and parse JSON
+                response_text_cleaned = response_text.strip()
+                if response_text_cleaned.startswith("```json"):
+                    response_text_cleaned = response_text_cleaned[7:]
+                if response_text_cleaned.startswith("```"):
+                    response_text_cleaned = response_text_cleaned[3:]
+                if response_text_cleaned.endswith("```"):
+                    response_text_cleaned = response_text_cleaned[:-3]
+                response_text_cleaned = response_text_cleaned.strip()
+            
+                # Check for truncation indicators
+                is_truncated = (
+                    response_text_cleaned.rstrip().endswith('"') and not response_text_cleaned.rstrip().endswith('"}') and not response_text_cleaned.rstrip().endswith('"]') or
+                    response_text_cleaned.rstrip().endswith('"dish_') or
+                    response_text_cleaned.rstrip().endswith('"wine_') or
+                    (response_text_cleaned.count('{') > response_text_cleaned.count('}')) or
+                    (response_text_cleaned.count('[') > response_text_cleaned.count(']'))
+                )
             
-            # Ensure required structure
-            if "dishes" not in result:
-                result["dishes"] = []
-            if "wines" not in result:
-                result["wines"] = []
-            
-            # Validate structure
-            if not isinstance(result["dishes"], list):
-                result["dishes"] = []
-            if not isinstance(result["wines"], list):
-                result["wines"] = []
-            
-            # Log extraction results
-            dish_count = len(result["dishes"])
-            wine_count = len(result["wines"])
-            print(f"  Extracted {dish_count} dishes and {wine_count} wines")
-            
-            # Warn if extraction seems incomplete (only a few items from what might be a large document)
-            if wine_count > 0 and wine_count < 5:
-                print(f"  Warning: Only {wine_count} wines extracted - this might be incomplete. Check if document contains more wines.")
-            if dish_count > 0 and dish_count < 3:
-                print(f"  Warning: Only {dish_count} dishes extracted - this might be incomplete. Check if document contains more dishes.")
+                # Try to parse JSON, with fallback for truncated responses
+                try:
+                    result = json.loads(response_text_cleaned)
+                except json.JSONDecodeError as parse_error:
+                    # If truncated, try to extract partial data
+                    if is_truncated or "Unterminated string" in str(parse_error):
+                        # Try to extract valid partial JSON
+                        result = self._recover_partial_json(response_text_cleaned)
+                    else:
+                        raise
+            
+                # Ensure required structure
+                if "dishes" not in result:
+                    result["dishes"] = []
+                if "wines" not in result:
+                    result["wines"] = []
+            
+                # Validate structure
+                if not isinstance(result["dishes"], list):
+                    result["dishes"] = []
+                if not isinstance(result["wines"], list):
+                    result["wines"] = []
+            
+                # Log extraction results
+                dish_count = len(result["dishes"])
+                wine_count = len(result["wines"])
+                print(f"  Extracted {dish_count} dishes and {wine_count} wines")
+            
+                # Warn if extraction seems incomplete (only a few items from what might be a large document)
+                if wine_count > 0 and wine_count < 5:
+                    print(f"  Warning: Only {wine_count} wines extracted - this might be incomplete. Check if document contains more wines.")
+                if dish_count > 0 and dish_count < 3:
+                    print(f"  Warning: Only {dish_count} dishes extracted - this might be incomplete. Check if document contains more dishes.")
             
                 return result
                 
@@ -392,7 +409,7 @@ Document: """
             except Exception as e:
                 error_str = str(e)
                 # Check for 429 rate limit error
-                if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower():
+                if is_rate_limit_error(e):
                     # Extract retry delay from error message if available
                     retry_delay = 15  # Default 15 seconds
                     delay_match = re.search(r'retry in ([\d.]+)s', error_str, re.IGNORECASE)
@@ -402,7 +419,9 @@ Document: """
                     if attempt < max_retries - 1:
                         print(f"  ⚠️  API quota exceeded (429). Retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
                         print(f"  💡 Free tier limit: 20 requests/day. Consider upgrading or waiting until quota resets.")
-                        time.sleep(retry_delay)
+                        record_llm_retry("menu_extraction")
+                        with span("llm.retry_sleep", call_site="menu_extraction", seconds=retry_delay):
+                            time.sleep(retry_delay)
                         continue
                     else:
                         print(f"  ❌ API quota exceeded after {max_retries} attempts.")
@@ -467,27 +486,26 @@ Document: """
         
         return result
     
-    def extract_from_file(self, file_path: str) -> Dict[str, Any]:
+    def extract_from_file(self, file_path: FileSource) -> Dict[str, Any]:
         """
         Extract dishes and wines from any file format
         
         Args:
-            file_path: Path to file (txt, pdf, jpg, png, xlsx, csv)
+            file_path: Path, bytes or binary file object (txt, pdf, jpg, png, xlsx, csv)
             
         Returns:
             Dictionary with 'dishes' and 'wines' arrays (normalized)
         """
-        path = Path(file_path)
-        if not path.exists():
+        if isinstance(file_path, (str, Path)) and not Path(file_path).exists():
             raise FileNotFoundError(f"File not found: {file_path}")
         
         file_type = detect_file_type(file_path)
-        source_file = str(path)
+        source_file = source_name(file_path) or "<upload>"
         
         # Route to appropriate extraction method
         if file_type == 'pdf':
             # Upload PDF directly to Gemini Files API (no text extraction)
-            print(f"  Processing PDF file directly via Gemini Files API: {file_path}")
+            print(f"  Processing PDF file directly via Gemini Files API: {source_file}")
             extracted = self._extract_with_gemini(None, is_image=False, is_pdf_file=True, pdf_file_path=file_path)
         
         elif file_type in ['xlsx', 'xls']:
@@ -502,14 +520,12 @@ Document: """
         
         elif file_type in ['jpg', 'jpeg', 'png']:
             # Read image and send to Gemini
-            with open(path, 'rb') as f:
-                image_bytes = f.read()
+            image_bytes = read_bytes(file_path)
             extracted = self._extract_with_gemini(image_bytes, is_image=True)
         
         elif file_type == 'txt':
             # Read text file
-            with open(path, 'r', encoding='utf-8') as f:
-                text_content = f.read()
+            text_content = read_bytes(file_path).decode('utf-8')
             extracted = self._extract_with_gemini(text_content, is_image=False)
         
         else:
@@ -517,16 +533,11 @@ Document: """
         
         # Normalize dishes
         normalized_dishes = []
-        for dish in extracted.get("dishes", []):
-            # #region agent log
-            log_path = Path(".cursor/debug.log")
-            try:
-                import json as json_module
-                dish_name_raw = dish.get("dish_name") or dish.get("name", "MISSING")
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    f.write(json_module.dumps({"id":"log_dish_norm_1","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:485","message":"Normalizing dish","data":{"dish_name_raw":dish_name_raw,"has_key_ingredients":bool(dish.get("key_ingredients")),"ingredient_count":len(dish.get("key_ingredients", []))},"runId":"run1","hypothesisId":"A"}) + "\n")
-            except: pass
-            # #endregion
+        raw_dishes = extracted.get("dishes", [])
+        for dish_index, dish in enumerate(raw_dishes, 1):
+            log_event(logger, "menu.dish_normalizing", "Normalizing dish",
+                      dish_name_raw=dish.get("dish_name") or dish.get("name", "MISSING"),
+                      ingredient_count=len(dish.get("key_ingredients", [])))
             
             # Build compounds from ingredients
             ingredients = dish.get("key_ingredients", [])
@@ -542,16 +553,23 @@ Document: """
                 normalized_dish["suggested_wine_type"] = "Unknown"
                 normalized_dish["flavor_profile_note"] = "No Flavour Profile could be made, as no ingredients were listed"
                 normalized_dishes.append(normalized_dish)
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json_module.dumps({"id":"log_dish_norm_2","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:500","message":"Dish normalized (no ingredients)","data":{"dish_id":normalized_dish.get("dish_id"),"name":normalized_dish.get("name")},"runId":"run1","hypothesisId":"A"}) + "\n")
-                except: pass
-                # #endregion
+                log_event(logger, "menu.dish_no_ingredients", "Dish normalized (no ingredients)",
+                          dish_id=normalized_dish.get("dish_id"), name=normalized_dish.get("name"))
                 continue
             
             # Build compounds from ingredients (will query Gemini if needed)
-            compounds = self._build_compounds_for_dish(ingredients)
+            dish_name = dish.get("dish_name") or dish.get("name", "Unknown Dish")
+            with span("menu.dish_compounds", dish=dish_name, ingredient_count=len(ingredients)) as dish_span:
+                compounds = self._build_compounds_for_dish(ingredients)
+                dish_span.set(compound_count=len(compounds))
+            publish(
+                MENU_DISH_COMPOUNDS_BUILT,
+                current=dish_index,
+                total=len(raw_dishes),
+                dish=dish_name,
+                compound_count=len(compounds),
+                message=f"Built flavor compounds for {dish_name} ({dish_index}/{len(raw_dishes)})"
+            )
             
             # Suggest wine type
             dominant_flavors = dish.get("dominant_flavors", [])
@@ -567,27 +585,16 @@ Document: """
             normalized_dish["compounds"] = compounds
             normalized_dish["suggested_wine_type"] = suggested_wine_type
             
-            # #region agent log
-            try:
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    f.write(json_module.dumps({"id":"log_dish_norm_3","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:520","message":"Dish normalized (with ingredients)","data":{"dish_id":normalized_dish.get("dish_id"),"name":normalized_dish.get("name"),"compound_count":len(compounds)},"runId":"run1","hypothesisId":"A"}) + "\n")
-            except: pass
-            # #endregion
+            log_event(logger, "menu.dish_normalized", "Dish normalized (with ingredients)",
+                      dish_id=normalized_dish.get("dish_id"), name=normalized_dish.get("name"),
+                      compound_count=len(compounds))
             
             normalized_dishes.append(normalized_dish)
         
         # Normalize wines and remove duplicates
         normalized_wines = []
         seen_wine_names = set()
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            raw_wines = extracted.get("wines", [])
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_wine_norm_1","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:544","message":"Normalizing wines","data":{"raw_wine_count":len(raw_wines)},"runId":"run1","hypothesisId":"E"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "menu.wines_normalizing", "Normalizing wines", raw_wine_count=len(extracted.get("wines", [])))
         
         for wine in extracted.get("wines", []):
             normalized_wine = normalize_wine_format(wine)
@@ -595,23 +602,15 @@ Document: """
             
             # Check for duplicates
             if wine_name and wine_name in seen_wine_names:
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json_module.dumps({"id":"log_wine_norm_2","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:555","message":"Duplicate wine skipped","data":{"wine_name":wine_name},"runId":"run1","hypothesisId":"E"}) + "\n")
-                except: pass
-                # #endregion
+                log_event(logger, "menu.duplicate_wine", "Duplicate wine skipped", wine_name=wine_name)
                 continue
             
             seen_wine_names.add(wine_name)
             normalized_wines.append(normalized_wine)
         
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_wine_norm_3","timestamp":int(__import__('time').time()*1000),"location":"menu_extractor.py:565","message":"Wine normalization complete","data":{"normalized_count":len(normalized_wines),"duplicates_removed":len(extracted.get("wines", [])) - len(normalized_wines)},"runId":"run1","hypothesisId":"E"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "menu.wines_normalized", "Wine normalization complete",
+                  normalized_count=len(normalized_wines),
+                  duplicates_removed=len(extracted.get("wines", [])) - len(normalized_wines))
         
         return {
             "dishes": normalized_dishes,
@@ -619,12 +618,13 @@ Document: """
             "source_file": source_file
         }
     
-    def extract_from_files(self, file_paths: List[str]) -> Dict[str, Any]:
+    @traced("menu.extract_files")
+    def extract_from_files(self, file_paths: List[FileSource]) -> Dict[str, Any]:
         """
         Extract dishes and wines from multiple files
         
         Args:
-            file_paths: List of file paths
+            file_paths: List of file paths, bytes or binary file objects
             
         Returns:
             Dictionary with combined 'dishes' and 'wines' arrays
@@ -633,14 +633,34 @@ Document: """
         all_wines = []
         source_files = []
         
-        for file_path in file_paths:
+        for file_index, file_path in enumerate(file_paths, 1):
+            file_name = Path(source_name(file_path) or "<upload>").name
             try:
-                result = self.extract_from_file(file_path)
+                with span("menu.extract_file", file=file_name) as file_span:
+                    result = self.extract_from_file(file_path)
+                    file_span.set(dish_count=len(result.get("dishes", [])), wine_count=len(result.get("wines", [])))
                 all_dishes.extend(result.get("dishes", []))
                 all_wines.extend(result.get("wines", []))
-                source_files.append(result.get("source_file", file_path))
+                source_files.append(result.get("source_file", file_name))
+                publish(
+                    MENU_FILE_EXTRACTED,
+                    current=file_index,
+                    total=len(file_paths),
+                    file=file_name,
+                    dish_count=len(result.get("dishes", [])),
+                    wine_count=len(result.get("wines", [])),
+                    message=f"Extracted file {file_index}/{len(file_paths)}: {file_name}"
+                )
             except Exception as e:
-                print(f"  Warning: Failed to process {file_path}: {e}")
+                print(f"  Warning: Failed to process {file_name}: {e}")
+                publish(
+                    MENU_FILE_EXTRACTED,
+                    current=file_index,
+                    total=len(file_paths),
+                    file=file_name,
+                    error=str(e),
+                    message=f"Failed to extract file {file_index}/{len(file_paths)}: {file_name}"
+                )
                 continue
         
         return {
@@ -14,7 +14,13 @@ from batch_profiler import MenuProfiler
 
 # Import new extractor
 from core.menu_extractor import MenuExtractor
+from core.knowledge_base import KnowledgeBase, get_knowledge_base
 from utils.config import DEFAULT_MENU_PROFILE_PATH
+from utils.file_parsers import FileSource
+from utils.structured_log import get_logger, log_event
+from utils.metrics import timed_stage
+
+logger = get_logger("menu_processor")
 
 
 class MenuProcessor:
@@ -23,27 +29,35 @@ class MenuProcessor:
     Can process files in various formats and extract dishes and wines
     """
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-3-flash-preview"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gemini-3-flash-preview",
+        knowledge_base: Optional[KnowledgeBase] = None
+    ):
         """
         Initialize the Menu Processor
         
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
             model_name: Gemini model to use
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
         """
-        self.profiler = MenuProfiler(api_key=api_key, model_name=model_name)
-        self.extractor = MenuExtractor(api_key=api_key, model_name=model_name)
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.profiler = MenuProfiler(api_key=api_key, model_name=model_name, knowledge_base=self.knowledge_base)
+        self.extractor = MenuExtractor(api_key=api_key, model_name=model_name, knowledge_base=self.knowledge_base)
     
+    @timed_stage("extraction", count=lambda result: len(result["dishes"]))
     def process_files(
         self,
-        file_paths: List[str],
+        file_paths: List[FileSource],
         extract_wines: bool = True
     ) -> Dict[str, Any]:
         """
         Process multiple files in any format and extract dishes and wines
         
         Args:
-            file_paths: List of file paths (txt, pdf, jpg, png, xlsx, csv)
+            file_paths: List of file paths or in-memory files (txt, pdf, jpg, png, xlsx, csv)
             extract_wines: Whether to extract wines (default: True)
             
         Returns:
@@ -53,11 +67,10 @@ class MenuProcessor:
             - 'has_wines': Boolean indicating if wines were found
             - 'source_files': List of processed file paths
         """
-        # Filter out invalid file paths
+        # Filter out invalid file paths (in-memory files are always valid)
         valid_paths = []
         for path in file_paths:
-            path_obj = Path(path)
-            if path_obj.exists():
+            if not isinstance(path, (str, Path)) or Path(path).exists():
                 valid_paths.append(path)
             else:
                 print(f"  Warning: File not found: {path}")
@@ -75,42 +88,23 @@ class MenuProcessor:
         
         # Convert dishes list to menu profile format (dict by dish_id)
         menu_profile = {}
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            dishes_list = result.get("dishes", [])
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_menu_prof_1","timestamp":int(__import__('time').time()*1000),"location":"menu_processor.py:76","message":"Converting dishes to menu profile","data":{"dish_count":len(dishes_list),"sample_dishes":[{"dish_id":d.get("dish_id"),"name":d.get("name")} for d in dishes_list[:3]]},"runId":"run1","hypothesisId":"B"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "menu.profile_building", "Converting dishes to menu profile",
+                  dish_count=len(result.get("dishes", [])))
         
         for dish in result.get("dishes", []):
             dish_id = dish.get("dish_id")
             dish_name = dish.get("name") or dish.get("dish_name", "MISSING")
-            # #region agent log
-            try:
-                with open(log_path, 'a', encoding='utf-8') as f:
-                    f.write(json_module.dumps({"id":"log_menu_prof_2","timestamp":int(__import__('time').time()*1000),"location":"menu_processor.py:82","message":"Processing dish for menu profile","data":{"dish_id":dish_id,"dish_name":dish_name,"has_dish_id":bool(dish_id)},"runId":"run1","hypothesisId":"B"}) + "\n")
-            except: pass
-            # #endregion
+            log_event(logger, "menu.profile_dish", "Processing dish for menu profile",
+                      dish_id=dish_id, dish_name=dish_name)
             if dish_id:
                 menu_profile[dish_id] = dish
             else:
-                # #region agent log
-                try:
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json_module.dumps({"id":"log_menu_prof_3","timestamp":int(__import__('time').time()*1000),"location":"menu_processor.py:88","message":"Dish skipped - no dish_id","data":{"dish_name":dish_name,"dish_keys":list(dish.keys())},"runId":"run1","hypothesisId":"B"}) + "\n")
-                except: pass
-                # #endregion
+                log_event(logger, "menu.profile_dish_skipped", "Dish skipped - no dish_id",
+                          dish_name=dish_name, dish_keys=list(dish.keys()))
                 print(f"  Warning: Dish '{dish_name}' has no dish_id, skipping from menu profile")
         
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_menu_prof_4","timestamp":int(__import__('time').time()*1000),"location":"menu_processor.py:91","message":"Menu profile created","data":{"menu_profile_size":len(menu_profile),"dish_ids":list(menu_profile.keys())[:5]},"runId":"run1","hypothesisId":"B"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "menu.profile_built", "Menu profile created",
+                  menu_profile_size=len(menu_profile), dish_ids=list(menu_profile)[:5])
         
         return {
             "dishes": result.get("dishes", []),
@@ -1,13 +1,20 @@
 """
 Pairing engine module
-Pairs wines with individual dishes based on flavor compounds
+Pairs wines with individual dishes based on flavor compounds, harmonize tags
+and sommelier rules (hybrid score, see core/scoring.py)
 """
 
 from typing import List, Dict, Any, Set, Optional
-from pathlib import Path
 from .wine_sommelier_wrapper import WineSommelierWrapper
 from .menu_processor import MenuProcessor
-from utils.config import DEFAULT_MAX_WINES_PER_COMBO
+from .knowledge_base import KnowledgeBase, get_knowledge_base
+from .session_store import IdentityCache
+from utils.config import DEFAULT_MAX_WINES_PER_COMBO, DEFAULT_SCORE_CACHE_ENTRIES
+from utils.structured_log import get_logger, log_event
+from utils.metrics import timed_stage
+from utils.tracing import span
+
+logger = get_logger("pairing_engine")
 
 
 class PairingEngine:
@@ -19,7 +26,9 @@ class PairingEngine:
         self, 
         sommelier: Optional[WineSommelierWrapper] = None,
         menu_processor: Optional[MenuProcessor] = None,
-        max_wines_per_dish: int = None
+        max_wines_per_dish: int = None,
+        knowledge_base: Optional[KnowledgeBase] = None,
+        scoring_engine=None
     ):
         """
         Initialize the Pairing Engine
@@ -28,10 +37,64 @@ class PairingEngine:
             sommelier: WineSommelierWrapper instance (creates new if None)
             menu_processor: MenuProcessor instance (creates new if None)
             max_wines_per_dish: Maximum wines per dish (default from config)
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
+            scoring_engine: core.scoring.ScoringEngine (default weights if None)
         """
-        self.sommelier = sommelier or WineSommelierWrapper()
-        self.menu_processor = menu_processor or MenuProcessor()
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.sommelier = sommelier or WineSommelierWrapper(knowledge_base=self.knowledge_base)
+        self.menu_processor = menu_processor or MenuProcessor(knowledge_base=self.knowledge_base)
         self.max_wines_per_dish = max_wines_per_dish or DEFAULT_MAX_WINES_PER_COMBO
+        self._scoring_engine = scoring_engine
+        # PairingScores per (menu_profile, wines); the engine is shared by all sessions
+        self._scores = IdentityCache(DEFAULT_SCORE_CACHE_ENTRIES)
+    
+    @property
+    def scoring_engine(self):
+        """Hybrid pairing scorer, created on first use"""
+        if self._scoring_engine is None:
+            # Imported lazily: the scoring engine is numpy-based
+            from .scoring import ScoringEngine
+            self._scoring_engine = ScoringEngine()
+        return self._scoring_engine
+    
+    def score_menu(
+        self,
+        menu_profile: Dict[str, Dict[str, Any]],
+        wines: List[Dict[str, Any]]
+    ):
+        """
+        Hybrid scores of every dish x wine pair, computed in one pass
+        
+        Results are reused while the same menu_profile and wines objects (with
+        the same dishes, compounds and wine ids) are passed in, so pairing,
+        ranking and reporting share one computation. The cache holds the most
+        recent DEFAULT_SCORE_CACHE_ENTRIES menus, so concurrent sessions do not
+        evict each other's scores.
+        
+        Args:
+            menu_profile: Menu profile dictionary
+            wines: List of wine dictionaries
+            
+        Returns:
+            core.scoring.PairingScores (rows follow menu_profile, columns follow wines)
+        """
+        fingerprint = (
+            tuple((dish_id, len(dish.get("compounds", []))) for dish_id, dish in menu_profile.items()),
+            tuple(wine.get("wine_id") for wine in wines),
+        )
+        cached = self._scores.get((menu_profile, wines), fingerprint)
+        if cached is not None:
+            return cached
+        from .scoring import DishFeatures, WineFeatures
+        if self.knowledge_base.is_catalog(wines):
+            wine_features = self.knowledge_base.wine_features
+        else:
+            wine_features = WineFeatures.from_wines(wines, excluded=self.knowledge_base.pruned_compounds)
+        scores = self.scoring_engine.score(
+            DishFeatures.from_menu_profile(menu_profile, wine_features), wine_features
+        )
+        self._scores.put((menu_profile, wines), fingerprint, scores)
+        return scores
     
     def _get_dish_compounds(
         self, 
@@ -63,6 +126,9 @@ class PairingEngine:
         """
         Find up to max_wines best wines for a single dish
         
+        Wines are ranked by hybrid score; only wines sharing a compound or a
+        harmonize tag with the dish are returned.
+        
         Args:
             dish_id: Dish identifier
             wines: List of wine dictionaries to search
@@ -78,21 +144,26 @@ class PairingEngine:
         if not dish_id or not wines:
             return []
         
-        # Get compounds for this dish
-        compounds = self._get_dish_compounds(dish_id, menu_profile)
-        
-        if not compounds:
+        return self._ranked_wine_ids(dish_id, wines, menu_profile, max_wines, self.score_menu(menu_profile, wines))
+    
+    def _ranked_wine_ids(
+        self,
+        dish_id: str,
+        wines: List[Dict[str, Any]],
+        menu_profile: Dict[str, Dict[str, Any]],
+        max_wines: int,
+        scores
+    ) -> List[int]:
+        """Best max_wines wine IDs of a dish row of score_menu output"""
+        # Dishes without compounds (no flavor profile) are not paired
+        if not self._get_dish_compounds(dish_id, menu_profile):
             return []
-        
-        # Find best wines using compound matching
-        wine_ids = self.sommelier.find_best_wines_for_compounds(
-            compounds=compounds,
-            wines=wines,
-            max_wines=max_wines
-        )
-        
-        return wine_ids
+        dish = scores.dish_index(dish_id)
+        if dish is None:
+            return []
+        return [wines[index].get("wine_id") for index in scores.ranked(dish, max_wines)]
     
+    @timed_stage("pairing")
     def pair_wines_to_dishes(
         self,
         dishes: List[Dict[str, Any]],
@@ -129,22 +200,18 @@ class PairingEngine:
         
         pairings = {}
         
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_pairing_1","timestamp":int(__import__('time').time()*1000),"location":"pairing_engine.py:130","message":"Starting wine-dish pairing","data":{"dish_count":len(dish_ids),"wine_count":len(wines),"max_wines_per_dish":max_wines_per_dish},"runId":"run1","hypothesisId":"D"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "pairing.started", "Starting wine-dish pairing",
+                  dish_count=len(dish_ids), wine_count=len(wines), max_wines_per_dish=max_wines_per_dish)
+        
+        # One scoring pass for the whole menu
+        scores = self.score_menu(menu_profile, wines) if dish_ids and wines else None
         
         for dish_id in dish_ids:
-            wine_ids = self.pair_wines_to_dish(
-                dish_id=dish_id,
-                wines=wines,
-                menu_profile=menu_profile,
-                max_wines=max_wines_per_dish
-            )
+            with span("pairing.dish", dish_id=dish_id, wine_count=len(wines)) as dish_span:
+                wine_ids = self._ranked_wine_ids(
+                    dish_id, wines, menu_profile, max_wines_per_dish, scores
+                ) if dish_id and scores is not None else []
+                dish_span.set(paired_count=len(wine_ids))
             pairings[dish_id] = wine_ids
         
         return pairings
@@ -157,7 +224,8 @@ class PairingEngine:
         menu_profile: Dict[str, Dict[str, Any]]
     ) -> float:
         """
-        Calculate a pairing score between a dish and a wine
+        Calculate a pairing score between a dish and a wine (Jaccard similarity
+        of the compound sets, the 'jaccard' signal of score_menu for one pair)
         
         Args:
             dish_id: Dish identifier
@@ -0,0 +1,428 @@
+"""
+Pairing priors module
+Mean pairing_quality from Datasets/wine_food_pairings.csv compiled into dense
+lookup tables (wine key x food category, wine key x cuisine), plus the
+mappings from catalog wines and dishes onto those keys. Re-ranks Stage 2
+candidates without an LLM call.
+
+Wine keys are the rated wine types (grape/style, see WINE_TYPE_RULES) followed
+by the rated wine categories; a wine that matches no rated type falls back to
+its category row.
+"""
+
+import csv
+import hashlib
+import json
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from utils.config import DEFAULT_PAIRING_PRIORS_PATH, DEFAULT_PAIRING_RATINGS_PATH
+
+# Catalog type_name -> rated wine_category
+WINE_CATEGORIES: Dict[str, str] = {
+    "Red": "Red",
+    "White": "White",
+    "Sparkling": "Sparkling",
+    "Rosé": "Rosé",
+    "Dessert": "Dessert",
+    "Dessert/Port": "Fortified",
+}
+
+# Rated wine type -> the catalog wines it covers. Every given field must match:
+# grapes (any of), types (type_name), regions / names (substring, any of)
+WINE_TYPE_RULES: Dict[str, Dict[str, List[str]]] = {
+    "Albariño": {"grapes": ["Albariño", "Alvarinho"], "types": ["White"]},
+    "Barbera": {"grapes": ["Barbera"], "types": ["Red"]},
+    "Cabernet Sauvignon": {"grapes": ["Cabernet Sauvignon"], "types": ["Red"]},
+    "Cava": {"types": ["Sparkling"], "regions": ["Cava", "Penedès", "Catalunya"]},
+    "Champagne": {"types": ["Sparkling"], "regions": ["Champagne"]},
+    "Chardonnay": {"grapes": ["Chardonnay"], "types": ["White"]},
+    "Chenin Blanc": {"grapes": ["Chenin Blanc"], "types": ["White"]},
+    "Gamay (Beaujolais)": {"grapes": ["Gamay Noir", "Gamay"], "types": ["Red"]},
+    "Gewürztraminer": {"grapes": ["Gewürztraminer"], "types": ["White"]},
+    "Grenache": {"grapes": ["Grenache", "Garnacha", "Garnacha Tinta"], "types": ["Red"]},
+    "Grüner Veltliner": {"grapes": ["Grüner Veltliner"], "types": ["White"]},
+    "Ice Wine": {"types": ["Dessert"], "names": ["Icewine", "Ice Wine", "Eiswein"]},
+    "Madeira": {"regions": ["Madeira"]},
+    "Malbec": {"grapes": ["Malbec"], "types": ["Red"]},
+    "Merlot": {"grapes": ["Merlot"], "types": ["Red"]},
+    "Nebbiolo": {"grapes": ["Nebbiolo"], "types": ["Red"]},
+    "Pinot Noir": {"grapes": ["Pinot Noir", "Spätburgunder"], "types": ["Red"]},
+    "Port": {"types": ["Dessert/Port"], "regions": ["Porto", "Douro"]},
+    "Provence Rosé": {"types": ["Rosé"]},
+    "Riesling (dry)": {"grapes": ["Riesling"], "types": ["White"]},
+    "Sangiovese": {"grapes": ["Sangiovese"], "types": ["Red"]},
+    "Sauternes": {"types": ["Dessert"], "regions": ["Sauternes", "Barsac"]},
+    "Sauvignon Blanc": {"grapes": ["Sauvignon Blanc"], "types": ["White"]},
+    "Syrah/Shiraz": {"grapes": ["Syrah/Shiraz"], "types": ["Red"]},
+    "Tempranillo": {"grapes": ["Tempranillo", "Tinta Roriz", "Aragonez"], "types": ["Red"]},
+    "Torrontés": {"grapes": ["Torrontés"], "types": ["White"]},
+    "Viognier": {"grapes": ["Viognier"], "types": ["White"]},
+    "White Zinfandel": {"grapes": ["Zinfandel", "Primitivo"], "types": ["Rosé"]},
+    "Zinfandel": {"grapes": ["Zinfandel", "Primitivo"], "types": ["Red"]},
+}
+
+# Rated food category -> words in dish ingredients, tags or description
+FOOD_CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "Red Meat": ["beef", "steak", "ribeye", "sirloin", "brisket", "lamb", "mutton", "veal", "venison", "deer",
+                 "buffalo", "bison", "hamburger", "burger", "meatball", "meatloaf", "oxtail"],
+    "Pork": ["pork", "bacon", "ham", "sausage", "prosciutto", "pancetta", "chorizo", "salami", "guanciale"],
+    "Poultry": ["chicken", "turkey", "duck", "quail", "squab", "pheasant", "goose", "poultry"],
+    "Seafood": ["fish", "salmon", "tuna", "cod", "halibut", "trout", "bass", "anchovy", "anchovie", "sardine",
+                "swordfish", "haddock", "turbot", "grouper", "shrimp", "prawn", "oyster", "crab", "lobster",
+                "scallop", "clam", "mussel", "squid", "octopus", "caviar", "seafood"],
+    "Cheese": ["cheese", "parmesan", "mozzarella", "brie", "camembert", "gruyere", "feta", "ricotta",
+               "roquefort", "cheddar", "gouda", "burrata", "pecorino", "fondue"],
+    "Dessert": ["chocolate", "cake", "tart", "mousse", "sorbet", "ice cream", "cheesecake", "caramel",
+                "meringue", "pudding", "cookie", "custard", "dessert", "sweet"],
+    "Vegetarian": ["tofu", "mushroom", "lentil", "chickpea", "eggplant", "bean", "vegetable", "spinach",
+                   "squash", "zucchini", "vegetarian", "vegan"],
+    "Creamy": ["cream", "creamy", "butter", "milk", "alfredo", "bechamel", "mascarpone", "yogurt"],
+    "Acidic": ["lemon", "lime", "tomato", "vinegar", "citrus", "orange", "grapefruit", "ceviche", "gazpacho",
+               "acidic", "tangy"],
+    "Spicy": ["chili", "chile", "chilli", "jalapeno", "curry", "vindaloo", "wasabi", "cayenne", "sriracha",
+              "harissa", "habanero", "spicy"],
+    "Smoky BBQ": ["smoked", "smoky", "barbecue", "bbq"],
+    "Salty Snack": ["olive", "nut", "almond", "cashew", "peanut", "pistachio", "chip", "pretzel",
+                    "charcuterie", "salty"],
+}
+
+# Rated cuisine -> words in a dish description
+CUISINE_KEYWORDS: Dict[str, List[str]] = {
+    "American BBQ": ["american", "bbq", "barbecue"],
+    "Argentinian": ["argentinian", "argentine", "asado", "chimichurri"],
+    "Chinese (Sichuan)": ["chinese", "sichuan", "szechuan", "cantonese"],
+    "Ethiopian": ["ethiopian", "injera", "berbere"],
+    "French": ["french", "provencal", "bourguignon"],
+    "German": ["german", "schnitzel", "bratwurst"],
+    "Greek": ["greek", "souvlaki", "moussaka", "tzatziki"],
+    "Indian": ["indian", "tandoori", "masala", "vindaloo", "tikka"],
+    "Italian": ["italian", "risotto", "pasta", "carbonara", "pizza"],
+    "Japanese": ["japanese", "sushi", "teriyaki", "miso", "ramen"],
+    "Korean": ["korean", "kimchi", "bulgogi", "gochujang"],
+    "Mexican": ["mexican", "taco", "tacos", "mole", "enchilada"],
+    "Middle Eastern": ["middle eastern", "lebanese", "persian", "turkish", "shawarma", "falafel"],
+    "Moroccan": ["moroccan", "tagine", "couscous"],
+    "Spanish": ["spanish", "paella", "tapas", "jamon"],
+    "Thai": ["thai", "pad thai", "lemongrass"],
+    "Vietnamese": ["vietnamese", "pho", "banh mi"],
+}
+
+
+def _keyword_pattern(keywords: List[str]) -> "re.Pattern":
+    """Whole words or phrases, optionally plural"""
+    alternatives = "|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True))
+    return re.compile(rf"\b(?:{alternatives})(?:e?s)?\b")
+
+
+_FOOD_CATEGORY_PATTERNS = {category: _keyword_pattern(words) for category, words in FOOD_CATEGORY_KEYWORDS.items()}
+_CUISINE_PATTERNS = {cuisine: _keyword_pattern(words) for cuisine, words in CUISINE_KEYWORDS.items()}
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"[_\s]+", " ", text.lower())
+
+
+def rated_wine_types(wine: Dict[str, Any]) -> List[str]:
+    """Rated wine types (WINE_TYPE_RULES) a catalog wine belongs to"""
+    grapes = set(wine.get("grapes") or [])
+    type_name = wine.get("type_name", "")
+    region = wine.get("region") or ""
+    name = (wine.get("wine_name") or "").lower()
+    matched = []
+    for wine_type, rule in WINE_TYPE_RULES.items():
+        if "grapes" in rule and not grapes.intersection(rule["grapes"]):
+            continue
+        if "types" in rule and type_name not in rule["types"]:
+            continue
+        if "regions" in rule and not any(part in region for part in rule["regions"]):
+            continue
+        if "names" in rule and not any(part.lower() in name for part in rule["names"]):
+            continue
+        matched.append(wine_type)
+    return matched
+
+
+def dish_food_categories(
+    ingredients: List[str],
+    tags: Optional[List[str]] = None,
+    dish_description: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Rated food categories a dish touches
+
+    Args:
+        ingredients: Ingredient names
+        tags: Dish flavor tags (e.g. 'Spicy', 'Creamy')
+        dish_description: Free-text description
+
+    Returns:
+        food_category -> number of ingredients, tags and description matches
+    """
+    texts = [_normalize_text(text) for text in list(ingredients) + list(tags or []) if text]
+    if dish_description:
+        texts.append(_normalize_text(dish_description))
+    counts = {}
+    for category, pattern in _FOOD_CATEGORY_PATTERNS.items():
+        hits = sum(1 for text in texts if pattern.search(text))
+        if hits:
+            counts[category] = hits
+    return counts
+
+
+def dish_cuisine(dish_description: Optional[str]) -> Optional[str]:
+    """Rated cuisine named in a dish description (first match), or None"""
+    if not dish_description:
+        return None
+    text = _normalize_text(dish_description)
+    for cuisine, pattern in _CUISINE_PATTERNS.items():
+        if pattern.search(text):
+            return cuisine
+    return None
+
+
+def _mean_table(
+    totals: Dict[Tuple[str, str], List[int]],
+    rows: List[str],
+    columns: List[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean and count tables; empty cells take the row mean (the global mean for empty rows)"""
+    sums = np.zeros((len(rows), len(columns)), dtype=np.float64)
+    counts = np.zeros((len(rows), len(columns)), dtype=np.int32)
+    row_index = {key: i for i, key in enumerate(rows)}
+    column_index = {key: j for j, key in enumerate(columns)}
+    for (row, column), (total, count) in totals.items():
+        sums[row_index[row], column_index[column]] += total
+        counts[row_index[row], column_index[column]] += count
+    global_mean = sums.sum() / max(counts.sum(), 1)
+    row_counts = counts.sum(axis=1)
+    row_means = np.where(row_counts > 0, sums.sum(axis=1) / np.maximum(row_counts, 1), global_mean)
+    means = np.where(counts > 0, sums / np.maximum(counts, 1), row_means[:, None])
+    return means.astype(np.float32), counts
+
+
+class PairingPriors:
+    """
+    Dense mean-quality tables over rated wine keys, food categories and cuisines
+
+    Args:
+        wine_keys: Row keys (rated wine types, then wine categories)
+        food_categories: Column keys of category_quality
+        cuisines: Column keys of cuisine_quality
+        category_quality: float32 [wine key, food category] mean pairing_quality
+        cuisine_quality: float32 [wine key, cuisine] mean pairing_quality
+        category_counts: Ratings behind each category_quality cell
+        source_hash: Hash of the ratings file the tables were compiled from
+    """
+
+    def __init__(
+        self,
+        wine_keys: List[str],
+        food_categories: List[str],
+        cuisines: List[str],
+        category_quality: np.ndarray,
+        cuisine_quality: np.ndarray,
+        category_counts: Optional[np.ndarray] = None,
+        source_hash: Optional[str] = None
+    ):
+        self.wine_keys = list(wine_keys)
+        self.food_categories = list(food_categories)
+        self.cuisines = list(cuisines)
+        self.category_quality = np.asarray(category_quality, dtype=np.float32)
+        self.cuisine_quality = np.asarray(cuisine_quality, dtype=np.float32)
+        self.category_counts = (np.asarray(category_counts, dtype=np.int32) if category_counts is not None
+                                else np.zeros(self.category_quality.shape, dtype=np.int32))
+        self.source_hash = source_hash
+        self._wine_key_index = {key: i for i, key in enumerate(self.wine_keys)}
+        self._category_index = {key: j for j, key in enumerate(self.food_categories)}
+        self._cuisine_index = {key: j for j, key in enumerate(self.cuisines)}
+        self._wine_rows: Dict[Any, List[int]] = {}
+
+    @classmethod
+    def compile(cls, ratings_path: Path = DEFAULT_PAIRING_RATINGS_PATH) -> "PairingPriors":
+        """
+        Compile the tables from the rated pairings CSV
+
+        Args:
+            ratings_path: wine_food_pairings.csv
+
+        Returns:
+            PairingPriors instance
+
+        Raises:
+            FileNotFoundError: If the ratings file does not exist
+        """
+        by_category = defaultdict(lambda: [0, 0])
+        by_cuisine = defaultdict(lambda: [0, 0])
+        wine_types, wine_categories, food_categories, cuisines = set(), set(), set(), set()
+        with open(ratings_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                quality = int(row["pairing_quality"])
+                wine_type, wine_category = row["wine_type"], row["wine_category"]
+                wine_types.add(wine_type)
+                wine_categories.add(wine_category)
+                food_categories.add(row["food_category"])
+                cuisines.add(row["cuisine"])
+                # Each rating counts for its wine type and for its wine category
+                for wine_key in (wine_type, wine_category):
+                    for totals, column in ((by_category, row["food_category"]), (by_cuisine, row["cuisine"])):
+                        entry = totals[(wine_key, column)]
+                        entry[0] += quality
+                        entry[1] += 1
+
+        wine_keys = sorted(wine_types) + sorted(wine_categories - wine_types)
+        food_categories, cuisines = sorted(food_categories), sorted(cuisines)
+        category_quality, category_counts = _mean_table(by_category, wine_keys, food_categories)
+        cuisine_quality, _ = _mean_table(by_cuisine, wine_keys, cuisines)
+        return cls(wine_keys, food_categories, cuisines, category_quality, cuisine_quality,
+                   category_counts, ratings_hash(ratings_path))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "source_hash": self.source_hash,
+            "wine_keys": self.wine_keys,
+            "food_categories": self.food_categories,
+            "cuisines": self.cuisines,
+            "category_quality": np.round(self.category_quality, 4).tolist(),
+            "cuisine_quality": np.round(self.cuisine_quality, 4).tolist(),
+            "category_counts": self.category_counts.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PairingPriors":
+        return cls(data["wine_keys"], data["food_categories"], data["cuisines"], data["category_quality"],
+                   data["cuisine_quality"], data.get("category_counts"), data.get("source_hash"))
+
+    def save(self, path: Path = DEFAULT_PAIRING_PRIORS_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+            f.write("\n")
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_PAIRING_PRIORS_PATH) -> "PairingPriors":
+        """
+        Raises:
+            FileNotFoundError: If the compiled priors do not exist
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def wine_rows(self, wine: Dict[str, Any]) -> List[int]:
+        """Table rows of a wine: its rated types, else its category (cached per wine_id)"""
+        wine_id = wine.get("wine_id")
+        rows = self._wine_rows.get(wine_id) if wine_id is not None else None
+        if rows is None:
+            rows = [self._wine_key_index[key] for key in rated_wine_types(wine) if key in self._wine_key_index]
+            if not rows:
+                category = WINE_CATEGORIES.get(wine.get("type_name", ""))
+                if category in self._wine_key_index:
+                    rows = [self._wine_key_index[category]]
+            if wine_id is not None:
+                self._wine_rows[wine_id] = rows
+        return rows
+
+    def dish_weights(
+        self,
+        ingredients: List[str],
+        tags: Optional[List[str]] = None,
+        dish_description: Optional[str] = None
+    ) -> Tuple[np.ndarray, Optional[int]]:
+        """
+        Food category weights (sum 1; uniform if nothing matched) and cuisine column of a dish
+        """
+        weights = np.zeros(len(self.food_categories), dtype=np.float32)
+        for category, hits in dish_food_categories(ingredients, tags, dish_description).items():
+            if category in self._category_index:
+                weights[self._category_index[category]] = hits
+        if not weights.any():
+            weights[:] = 1
+        cuisine = dish_cuisine(dish_description)
+        return weights / weights.sum(), self._cuisine_index.get(cuisine)
+
+    def score_wines(
+        self,
+        wines: List[Dict[str, Any]],
+        category_weights: np.ndarray,
+        cuisine_column: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Expected pairing_quality (1-5) of each wine for a dish
+
+        Category-weighted quality over the wine's rows, averaged with the
+        cuisine column when the cuisine is known. Wines without a row get the
+        dish's mean over all wine keys.
+        """
+        row_scores = self.category_quality @ category_weights
+        if cuisine_column is not None:
+            row_scores = (row_scores + self.cuisine_quality[:, cuisine_column]) / 2
+        default = float(row_scores.mean())
+        scores = np.empty(len(wines), dtype=np.float32)
+        for i, wine in enumerate(wines):
+            rows = self.wine_rows(wine)
+            scores[i] = row_scores[rows].mean() if rows else default
+        return scores
+
+    def rerank(
+        self,
+        candidates: List[Dict[str, Any]],
+        ingredients: List[str],
+        tags: Optional[List[str]] = None,
+        dish_description: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Re-rank Stage 2 candidates by prior quality
+
+        Args:
+            candidates: Match dictionaries with a 'wine' key (see _find_candidate_wines)
+            ingredients: Dish ingredients
+            tags: Dish flavor tags
+            dish_description: Free-text description
+
+        Returns:
+            New list of the candidates with 'prior_quality' added, best first
+            (ties keep the Stage 2 order)
+        """
+        if not candidates:
+            return []
+        weights, cuisine_column = self.dish_weights(ingredients, tags, dish_description)
+        scores = self.score_wines([match["wine"] for match in candidates], weights, cuisine_column)
+        ranked = [{**match, "prior_quality": round(float(score), 3)} for match, score in zip(candidates, scores)]
+        ranked.sort(key=lambda match: match["prior_quality"], reverse=True)
+        return ranked
+
+
+def ratings_hash(ratings_path: Path = DEFAULT_PAIRING_RATINGS_PATH) -> str:
+    """SHA-256 of the ratings file (the priors' source_hash)"""
+    return hashlib.sha256(Path(ratings_path).read_bytes()).hexdigest()
+
+
+def load_pairing_priors(
+    path: Path = DEFAULT_PAIRING_PRIORS_PATH,
+    ratings_path: Path = DEFAULT_PAIRING_RATINGS_PATH
+) -> PairingPriors:
+    """
+    Compiled priors from disk, else compiled in memory from the ratings CSV
+
+    Compiled priors whose source_hash does not match the ratings file are
+    stale and are recompiled in memory (rerun processing.py to update the file).
+
+    Raises:
+        FileNotFoundError: If neither file exists
+    """
+    path = Path(path)
+    ratings_exist = Path(ratings_path).exists()
+    if path.exists():
+        priors = PairingPriors.load(path)
+        if not ratings_exist or priors.source_hash == ratings_hash(ratings_path):
+            return priors
+        print(f"Warning: {path} is out of date with {ratings_path}; recompiling the pairing priors")
+        return PairingPriors.compile(ratings_path)
+    if ratings_exist:
+        return PairingPriors.compile(ratings_path)
+    raise FileNotFoundError(f"No pairing priors: neither {path} nor {ratings_path} exists")
@@ -0,0 +1,425 @@
+"""
+Pairing rules module
+Sommelier rules (PairingLogic) applied to catalog wines and dishes: wine
+structure from the body/acidity/type integers, dish structure from tags and
+ingredient keywords, and a weighted rule score that re-ranks Stage 2
+candidates without an LLM call.
+
+The catalog has no tannin or sweetness columns; both are inferred from the
+wine type (and body / name markers), see wine_profile.
+
+For whole menus and catalogs the same rules run as one NumPy broadcast:
+WineRuleColumns holds the wine structure as int8 columns,
+dish_attribute_matrix the dish structure, and rule_score_matrix returns a
+(dishes x wines) bonus/penalty matrix on the scale of RULE_WEIGHTS.
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+from core.pairing_priors import dish_food_categories
+
+
+class PairingLogic:
+    """
+    Sommelier Rules for Wine-Food Pairing
+    This class defines basic pairing rules that can be referenced by the AI model.
+    """
+
+    # Tannin levels (1-5 scale)
+    TANNIN_SCALE = {
+        'Very Low': 1,
+        'Low': 2,
+        'Medium': 3,
+        'High': 4,
+        'Very High': 5
+    }
+
+    # Acidity levels (1-5 scale)
+    ACIDITY_SCALE = {
+        'Very Low': 1,
+        'Low': 2,
+        'Medium': 3,
+        'High': 4,
+        'Very High': 5
+    }
+
+    # Body levels (1-5 scale)
+    BODY_SCALE = {
+        'Very light-bodied': 1,
+        'Light-bodied': 2,
+        'Medium-bodied': 3,
+        'Full-bodied': 4,
+        'Very full-bodied': 5
+    }
+
+    # The rules are elementwise: NumPy arrays broadcast to boolean arrays
+
+    @staticmethod
+    def tannin_vs_spice_conflict(wine_tannin: int, food_spice: int) -> bool:
+        """
+        High tannin wines conflict with highly spiced foods.
+        Returns True if there's a conflict.
+        """
+        return (wine_tannin >= 4) & (food_spice >= 4)
+
+    @staticmethod
+    def acid_vs_acid_congruence(wine_acid: int, food_acid: int) -> bool:
+        """
+        Acidic wines pair well with acidic foods (congruence).
+        Returns True if pairing is good.
+        """
+        return abs(wine_acid - food_acid) <= 1
+
+    @staticmethod
+    def body_vs_richness_match(wine_body: int, food_richness: int) -> bool:
+        """
+        Full-bodied wines pair with rich foods, light wines with delicate foods.
+        Returns True if pairing is good.
+        """
+        return abs(wine_body - food_richness) <= 1
+
+    @staticmethod
+    def sweetness_balance(wine_sweetness: int, food_sweetness: int) -> bool:
+        """
+        Wine should be as sweet or sweeter than the food.
+        Returns True if pairing is good.
+        """
+        return wine_sweetness >= food_sweetness
+
+
+# Score added when a rule fires (conflicts and imbalances are penalties)
+RULE_WEIGHTS: Dict[str, float] = {
+    "tannin_spice_conflict": -2.0,
+    "acid_congruence": 1.0,
+    "body_richness_match": 1.5,
+    "sweetness_imbalance": -2.0,
+}
+
+# Catalog wine type (processing.WineProcessor.TYPE_MAPPING)
+WINE_TYPE_ROSE = 3
+WINE_TYPE_RED = 4
+WINE_TYPE_DESSERT = 5
+WINE_TYPE_IDS = {"Sparkling": 1, "White": 2, "Rosé": WINE_TYPE_ROSE, "Red": WINE_TYPE_RED,
+                 "Dessert": WINE_TYPE_DESSERT, "Dessert/Port": WINE_TYPE_DESSERT, "Port": WINE_TYPE_DESSERT}
+
+# Columns of dish_attribute_matrix (dish_attributes keys)
+DISH_ATTRIBUTES = ["spice", "acidity", "richness", "sweetness"]
+
+# Off-dry / sweet style words in wine names
+SWEET_WINE_MARKERS = ["demi-sec", "demi sec", "doux", "dolce", "dulce", "doce", "suave", "moscato", "moscatel",
+                      "late harvest", "spätlese", "auslese", "semi-seco", "semi seco", "amabile", "lieblich"]
+_SWEET_WINE_PATTERN = re.compile(r"\b(?:" + "|".join(re.escape(marker) for marker in SWEET_WINE_MARKERS) + r")\b")
+
+# Dish tags (menu profile 'tags' / dominant flavors) moving richness up or down
+RICH_TAGS = {"rich", "heavy", "creamy", "fatty", "buttery"}
+LIGHT_TAGS = {"light", "fresh", "delicate"}
+
+
+def _level(hits: int, baseline: int) -> int:
+    """Baseline without hits, 4 for one hit, 5 for two or more"""
+    if not hits:
+        return baseline
+    return 4 if hits == 1 else 5
+
+
+# Label lookups for uploaded wine lists (case-insensitive)
+_WINE_TYPE_LABELS = {label.lower(): value for label, value in WINE_TYPE_IDS.items()}
+_BODY_LABELS = {label.lower(): value for label, value in PairingLogic.BODY_SCALE.items()}
+_ACIDITY_LABELS = {label.lower(): value for label, value in PairingLogic.ACIDITY_SCALE.items()}
+
+
+def _structure_value(wine: Dict[str, Any], field: str, labels: Dict[str, int], default: int) -> int:
+    """Catalog integer for field, else its *_name or raw string label through labels"""
+    value = wine.get(field)
+    if isinstance(value, (int, np.integer)) and not isinstance(value, bool) and value:
+        return int(value)
+    for label in (wine.get(f"{field}_name"), value):
+        if isinstance(label, str) and label.strip().lower() in labels:
+            return labels[label.strip().lower()]
+    return default
+
+
+def _wine_structure(wine: Dict[str, Any]) -> Tuple[int, int, int, bool]:
+    """(type, body, acidity, sweet style name); wine-list wines without the
+    integers (e.g. WineManager.normalize_wine_format output, where 'type' may
+    be "Red") fall back to type_name / body_name / acidity_name"""
+    wine_type = _structure_value(wine, "type", _WINE_TYPE_LABELS, 0)
+    body = _structure_value(wine, "body", _BODY_LABELS, 3)
+    acidity = _structure_value(wine, "acidity", _ACIDITY_LABELS, 3)
+    sweet = bool(_SWEET_WINE_PATTERN.search((wine.get("wine_name") or "").lower()))
+    return wine_type, body, acidity, sweet
+
+
+def wine_profile(wine: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Wine structure on the PairingLogic 1-5 scales
+
+    Tannin: reds follow body (at least 2), dessert/port wines 3, rosés 2,
+    whites and sparkling 1. Sweetness: dessert types 5, sweet style names 3,
+    everything else 1.
+
+    Args:
+        wine: Catalog wine with 'type', 'body' and 'acidity' integers
+
+    Returns:
+        Dictionary with 'body', 'acidity', 'tannin' and 'sweetness'
+    """
+    wine_type, body, acidity, sweet = _wine_structure(wine)
+    if wine_type == WINE_TYPE_RED:
+        tannin = min(max(body, 2), 5)
+    elif wine_type == WINE_TYPE_DESSERT:
+        tannin = 3
+    elif wine_type == WINE_TYPE_ROSE:
+        tannin = 2
+    else:
+        tannin = 1
+    if wine_type == WINE_TYPE_DESSERT:
+        sweetness = 5
+    elif sweet:
+        sweetness = 3
+    else:
+        sweetness = 1
+    return {"body": body, "acidity": acidity, "tannin": tannin, "sweetness": sweetness}
+
+
+def dish_attributes(
+    ingredients: List[str],
+    tags: Optional[List[str]] = None,
+    dish_description: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Dish structure on the PairingLogic 1-5 scales
+
+    Spice, acidity and sweetness come from the Spicy, Acidic and Dessert
+    food categories (keywords in ingredients, tags and description); richness
+    starts at 3 and moves one step per rich or light tag / category.
+
+    Args:
+        ingredients: Ingredient names
+        tags: Dish flavor tags (e.g. 'Spicy', 'Creamy')
+        dish_description: Free-text description
+
+    Returns:
+        Dictionary with 'spice', 'acidity', 'richness' and 'sweetness'
+    """
+    categories = dish_food_categories(ingredients, tags, dish_description)
+    tag_set = {tag.lower() for tag in tags or []}
+    richness = 3
+    richness += len(tag_set & RICH_TAGS) + sum(1 for category in ("Red Meat", "Creamy", "Cheese") if category in categories)
+    richness -= len(tag_set & LIGHT_TAGS) + sum(1 for category in ("Seafood", "Vegetarian") if category in categories)
+    return {
+        "spice": _level(categories.get("Spicy", 0), 1),
+        "acidity": _level(categories.get("Acidic", 0), 2),
+        "richness": min(max(richness, 1), 5),
+        "sweetness": _level(categories.get("Dessert", 0), 1),
+    }
+
+
+def rule_hits(wine: Dict[str, int], dish: Dict[str, int]) -> List[str]:
+    """
+    RULE_WEIGHTS keys that fire for a wine profile against dish attributes
+
+    Args:
+        wine: wine_profile output
+        dish: dish_attributes output
+
+    Returns:
+        Fired rule names
+    """
+    hits = []
+    if PairingLogic.tannin_vs_spice_conflict(wine["tannin"], dish["spice"]):
+        hits.append("tannin_spice_conflict")
+    if PairingLogic.acid_vs_acid_congruence(wine["acidity"], dish["acidity"]):
+        hits.append("acid_congruence")
+    if PairingLogic.body_vs_richness_match(wine["body"], dish["richness"]):
+        hits.append("body_richness_match")
+    if not PairingLogic.sweetness_balance(wine["sweetness"], dish["sweetness"]):
+        hits.append("sweetness_imbalance")
+    return hits
+
+
+def rule_score(
+    wine: Dict[str, Any],
+    dish: Dict[str, int],
+    weights: Optional[Dict[str, float]] = None
+) -> Tuple[float, List[str]]:
+    """
+    Weighted rule score of a catalog wine for a dish
+
+    Args:
+        wine: Catalog wine
+        dish: dish_attributes output
+        weights: Rule weights (RULE_WEIGHTS if None)
+
+    Returns:
+        (score, fired rule names)
+    """
+    weights = weights or RULE_WEIGHTS
+    hits = rule_hits(wine_profile(wine), dish)
+    return sum(weights.get(hit, 0.0) for hit in hits), hits
+
+
+def rank_by_rules(
+    candidates: List[Dict[str, Any]],
+    ingredients: List[str],
+    tags: Optional[List[str]] = None,
+    dish_description: Optional[str] = None,
+    weights: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Re-rank Stage 2 candidates by rule score
+
+    The sort is stable, so ties keep the Stage 2 (molecular match) order.
+
+    Args:
+        candidates: Stage 2 matches ({'wine', 'shared_compounds', 'match_count', ...})
+        ingredients: Ingredient names
+        tags: Dish flavor tags
+        dish_description: Free-text description
+        weights: Rule weights (RULE_WEIGHTS if None)
+
+    Returns:
+        Copies of the matches with 'rule_score' and 'rule_hits', best first
+    """
+    dish = dish_attributes(ingredients, tags, dish_description)
+    ranked = []
+    for match in candidates:
+        score, hits = rule_score(match["wine"], dish, weights)
+        ranked.append({**match, "rule_score": score, "rule_hits": hits})
+    ranked.sort(key=lambda match: match["rule_score"], reverse=True)
+    return ranked
+
+
+class WineRuleColumns:
+    """
+    Wine structure of a catalog as int8 columns (wine_profile for every wine)
+
+    Attributes:
+        wine_ids: int64 wine ids (0 where missing)
+        type, body, acidity: int8 catalog columns
+        tannin, sweetness: int8 columns inferred as in wine_profile
+    """
+
+    def __init__(
+        self,
+        wine_ids: Sequence[int],
+        wine_type: Sequence[int],
+        body: Sequence[int],
+        acidity: Sequence[int],
+        sweet_names: Sequence[bool]
+    ):
+        self.wine_ids = np.asarray(wine_ids, dtype=np.int64)
+        self.type = np.asarray(wine_type, dtype=np.int8)
+        self.body = np.asarray(body, dtype=np.int8)
+        self.acidity = np.asarray(acidity, dtype=np.int8)
+        dessert = self.type == WINE_TYPE_DESSERT
+        self.tannin = np.select(
+            [self.type == WINE_TYPE_RED, dessert, self.type == WINE_TYPE_ROSE],
+            [np.clip(self.body, 2, 5), 3, 2],
+            default=1
+        ).astype(np.int8)
+        self.sweetness = np.where(dessert, 5, np.where(np.asarray(sweet_names, dtype=bool), 3, 1)).astype(np.int8)
+
+    def __len__(self) -> int:
+        return len(self.wine_ids)
+
+    @classmethod
+    def from_wines(cls, wines: Sequence[Dict[str, Any]]) -> "WineRuleColumns":
+        """
+        Columns for a wine list; snapshot-backed lists are read from their
+        int8 arrays without decoding the wine records
+
+        Args:
+            wines: Wine dictionaries or a utils.kb_snapshot.SnapshotWineList
+
+        Returns:
+            WineRuleColumns in the order of wines
+        """
+        from utils.kb_snapshot import SnapshotWineList
+        if isinstance(wines, SnapshotWineList):
+            snapshot = wines.snapshot
+            names = snapshot.string_columns["wine_name"]
+            return cls(
+                snapshot.wine_id,
+                snapshot.int8_columns["type"],
+                snapshot.int8_columns["body"],
+                snapshot.int8_columns["acidity"],
+                [bool(_SWEET_WINE_PATTERN.search(name.lower())) for name in names]
+            )
+        structure = [_wine_structure(wine) for wine in wines]
+        return cls(
+            [wine.get("wine_id") or 0 for wine in wines],
+            [row[0] for row in structure],
+            [row[1] for row in structure],
+            [row[2] for row in structure],
+            [row[3] for row in structure]
+        )
+
+
+def dish_attribute_matrix(dishes: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Dish structure of a menu (dish_attributes for every dish)
+
+    Args:
+        dishes: Menu-profile dishes ('ingredients', 'tags', 'name' / 'description')
+
+    Returns:
+        int8 array of shape (dishes, len(DISH_ATTRIBUTES))
+    """
+    matrix = np.ones((len(dishes), len(DISH_ATTRIBUTES)), dtype=np.int8)
+    for i, dish in enumerate(dishes):
+        attributes = dish_attributes(dish.get("ingredients", []), dish.get("tags"),
+                                     dish.get("description") or dish.get("name"))
+        matrix[i] = [attributes[name] for name in DISH_ATTRIBUTES]
+    return matrix
+
+
+def rule_hit_matrices(columns: WineRuleColumns, dish_matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Every PairingLogic rule for every dish x wine pair, in one broadcast each
+
+    Args:
+        columns: Wine columns
+        dish_matrix: dish_attribute_matrix output
+
+    Returns:
+        RULE_WEIGHTS key -> bool array of shape (dishes, wines)
+    """
+    spice, acidity, richness, sweetness = (dish_matrix[:, [i]] for i in range(len(DISH_ATTRIBUTES)))
+    return {
+        "tannin_spice_conflict": PairingLogic.tannin_vs_spice_conflict(columns.tannin, spice),
+        "acid_congruence": PairingLogic.acid_vs_acid_congruence(columns.acidity, acidity),
+        "body_richness_match": PairingLogic.body_vs_richness_match(columns.body, richness),
+        "sweetness_imbalance": ~PairingLogic.sweetness_balance(columns.sweetness, sweetness),
+    }
+
+
+def rule_score_matrix(
+    columns: WineRuleColumns,
+    dish_matrix: np.ndarray,
+    weights: Optional[Dict[str, float]] = None
+) -> np.ndarray:
+    """
+    Weighted rule scores for every dish x wine pair (rule_score, vectorised)
+
+    The result is additive: add it (scaled) to a compound-score matrix of the
+    same shape to combine molecular and structural evidence.
+
+    Args:
+        columns: Wine columns
+        dish_matrix: dish_attribute_matrix output
+        weights: Rule weights (RULE_WEIGHTS if None)
+
+    Returns:
+        float32 array of shape (dishes, wines)
+    """
+    weights = weights or RULE_WEIGHTS
+    scores = np.zeros((len(dish_matrix), len(columns)), dtype=np.float32)
+    for rule, hits in rule_hit_matrices(columns, dish_matrix).items():
+        weight = weights.get(rule, 0.0)
+        if weight:
+            np.add(scores, np.float32(weight), out=scores, where=hits)
+    return scores
@@ -4,12 +4,17 @@ Generates comprehensive reports on dish-wine pairings with scientific analysis
 """
 
 import json
-import os
-from pathlib import Path
 from typing import List, Dict, Any, Tuple, Optional
 from collections import defaultdict
 from datetime import datetime
-import google.genai as genai
+
+from utils.gemini_client import get_api_key, create_client, generate_content
+from core.events import publish, REPORT_EXPLANATION_GENERATED
+from utils.structured_log import get_logger, log_event
+from utils.metrics import timed_stage
+from utils.tracing import span
+
+logger = get_logger("report_generator")
 
 
 class ReportGenerator:
@@ -24,29 +29,24 @@ class ReportGenerator:
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
         """
-        # Get API key for Gemini explanations
-        if api_key is None:
-            api_key = os.getenv("GOOGLE_AI_API_KEY")
-            if api_key is None:
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("GOOGLE_AI_API_KEY")
-                except ImportError:
-                    pass
-        
-        self.api_key = api_key
-        if api_key:
-            self.client = genai.Client(api_key=api_key)
-            self.model_name = "gemini-3-flash-preview"
-        else:
-            self.client = None
+        # Get API key for Gemini explanations (client is created on first use)
+        self.api_key = get_api_key(api_key)
+        self.model_name = "gemini-3-flash-preview"
+        self._client = None
+    
+    @property
+    def client(self):
+        """Gemini client, created on first use (None without an API key)"""
+        if self._client is None and self.api_key:
+            self._client = create_client(self.api_key)
+        return self._client
     
     def _generate_scientific_analysis(
         self,
         dish: Dict[str, Any],
         wine: Dict[str, Any],
-        pairing_score: float
+        pairing_score: float,
+        score_breakdown: Optional[Dict[str, float]] = None
     ) -> Dict[str, Any]:
         """
         Generate scientific analysis of dish-wine pairing
@@ -54,7 +54,8 @@ class ReportGenerator:
         Args:
             dish: Dish dictionary with compounds
             wine: Wine dictionary with flavor_compounds
-            pairing_score: Jaccard similarity score
+            pairing_score: Hybrid pairing score
+            score_breakdown: Per-signal scores of the pair (PairingScores.breakdown)
             
         Returns:
             Dictionary with scientific analysis
@@ -63,14 +64,17 @@ class ReportGenerator:
         wine_compounds = set(wine.get("flavor_compounds", []))
         shared_compounds = dish_compounds & wine_compounds
         
-        return {
+        analysis = {
             "pairing_score": pairing_score,
             "dish_compounds_count": len(dish_compounds),
             "wine_compounds_count": len(wine_compounds),
             "shared_compounds_count": len(shared_compounds),
             "shared_compounds": sorted(list(shared_compounds)),
-            "matching_method": "Jaccard similarity based on flavor compounds"
+            "matching_method": "Weighted hybrid of flavor compounds, harmonize tags and sommelier rules"
         }
+        if score_breakdown is not None:
+            analysis["score_breakdown"] = score_breakdown
+        return analysis
     
     def _generate_sommelier_explanation(
         self,
@@ -113,7 +117,10 @@ Use everyday language, not technical jargon. Be warm and inviting.
 Explanation:"""
         
         try:
-            response = self.client.models.generate_content(
+            response = generate_content(
+                self.client,
+                "report_explanation",
+                trace_attributes={"dish": dish_name, "wine_name": wine_name},
                 model=self.model_name,
                 contents=prompt,
                 config={
@@ -252,6 +259,7 @@ Explanation:"""
         
         return report
     
+    @timed_stage("report", count=None)
     def generate_comprehensive_report(
         self,
         pairings: Dict[str, List[int]],
@@ -283,14 +291,9 @@ Explanation:"""
         # Create lookups
         wine_dict = {w.get("wine_id"): w for w in wines if w.get("wine_id") is not None}
         
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_report_gen_1","timestamp":int(__import__('time').time()*1000),"location":"report_generator.py:283","message":"Generating report","data":{"wine_count":len(wines),"wine_dict_size":len(wine_dict),"pairings_count":len(pairings),"menu_profile_size":len(menu_profile)},"runId":"run1","hypothesisId":"D"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "report.generating", "Generating report",
+                  wine_count=len(wines), wine_dict_size=len(wine_dict),
+                  pairings_count=len(pairings), menu_profile_size=len(menu_profile))
         
         # Generate wine rankings
         if wine_rankings is None:
@@ -330,6 +333,17 @@ Explanation:"""
             from .pairing_engine import PairingEngine
             pairing_engine = PairingEngine()
         
+        # Hybrid scores of every dish x wine pair (shared with pairing and ranking)
+        scores = pairing_engine.score_menu(menu_profile, wines) if menu_profile and wines else None
+        
+        # Explanations to generate (up to 3 wines per dish with a flavor profile)
+        total_explanations = sum(
+            min(len(pairings.get(dish_id, [])), 3)
+            for dish_id, dish in menu_profile.items()
+            if not dish.get("flavor_profile_note")
+        )
+        explanations_done = 0
+        
         # Process all dishes in menu_profile, including those with no pairings
         for dish_id, dish in menu_profile.items():
             wine_ids = pairings.get(dish_id, [])
@@ -364,26 +378,24 @@ Explanation:"""
                 if not wine:
                     continue
                 
-                # Calculate pairing score
-                pairing_score = pairing_engine.calculate_pairing_score(
-                    dish_id=dish_id,
-                    wine=wine,
-                    menu_profile=menu_profile
-                )
+                with span("report.wine_explanation", dish_id=dish_id, wine_id=wine_id):
+                    # Look up the pairing score and its per-signal breakdown
+                    breakdown = scores.breakdown(scores.dish_index(dish_id), scores.wine_index(wine_id))
                 
-                # Generate scientific analysis
-                scientific_analysis = self._generate_scientific_analysis(
-                    dish=dish,
-                    wine=wine,
-                    pairing_score=pairing_score
-                )
+                    # Generate scientific analysis
+                    scientific_analysis = self._generate_scientific_analysis(
+                        dish=dish,
+                        wine=wine,
+                        pairing_score=breakdown["score"],
+                        score_breakdown=breakdown
+                    )
                 
-                # Generate sommelier explanation (max 2 sentences)
-                sommelier_explanation = self._generate_sommelier_explanation(
-                    dish=dish,
-                    wine=wine,
-                    scientific_analysis=scientific_analysis
-                )
+                    # Generate sommelier explanation (max 2 sentences)
+                    sommelier_explanation = self._generate_sommelier_explanation(
+                        dish=dish,
+                        wine=wine,
+                        scientific_analysis=scientific_analysis
+                    )
                 
                 wine_pairings.append({
                     "wine_id": wine_id,
@@ -392,6 +404,17 @@ Explanation:"""
                     "scientific_analysis": scientific_analysis,
                     "sommelier_explanation": sommelier_explanation
                 })
+                
+                explanations_done += 1
+                dish_name = dish.get("name") or dish.get("dish_name", "Unknown")
+                publish(
+                    REPORT_EXPLANATION_GENERATED,
+                    current=explanations_done,
+                    total=total_explanations,
+                    dish=dish_name,
+                    wine_name=wine.get("wine_name", "Unknown"),
+                    message=f"Generated explanation {explanations_done}/{total_explanations}: {dish_name}"
+                )
             
             dish_pairings[dish_id] = {
                 "dish_name": dish.get("name") or dish.get("dish_name", "Unknown"),  # Use "name" field from normalized format
@@ -0,0 +1,406 @@
+"""
+Scoring module
+Every dish-wine pairing signal in one vectorised pass over precomputed
+feature blocks, plus their weighted sum:
+
+- compounds: shared flavor compounds / dish compounds (coverage, 0-1)
+- jaccard: shared compounds / union of the two compound sets (0-1)
+- harmonize: a dish ingredient and a wine harmonize tag contain one another (0/1)
+- rules: PairingLogic bonus/penalty (core.pairing_rules), scaled so the best
+  case is 1
+
+The score is the weighted mean of the signals (weights are normalized to sum
+to 1), so it is at most 1.
+
+WineFeatures and DishFeatures are built once (the catalog's are cached on the
+KnowledgeBase); ScoringEngine.score returns PairingScores holding the weighted
+score matrix and the per-signal matrices (the breakdown). The sommelier,
+pairing engine, ranker and report all read their scores from it.
+"""
+
+from itertools import chain
+from typing import Dict, List, Any, Optional, Sequence, Collection, FrozenSet
+
+import numpy as np
+
+from core.pairing_rules import RULE_WEIGHTS, WineRuleColumns, dish_attribute_matrix, rule_score_matrix
+from utils.config import DEFAULT_SCORING_WEIGHTS
+
+SIGNALS = ["compounds", "jaccard", "harmonize", "rules"]
+
+# rules signal = rule score / best possible rule score
+RULE_SCALE = sum(weight for weight in RULE_WEIGHTS.values() if weight > 0)
+
+
+def _csr(lists: List[Sequence[str]], vocabulary: Dict[str, int]):
+    """CSR rows of vocabulary ids (deduplicated, ascending); new items are added to vocabulary"""
+    for item in dict.fromkeys(chain.from_iterable(lists)):
+        vocabulary.setdefault(item, len(vocabulary))
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    ids = np.fromiter(map(vocabulary.__getitem__, chain.from_iterable(lists)), dtype=np.int64, count=int(lengths.sum()))
+    return _distinct_rows(lengths, ids, len(vocabulary))
+
+
+def _distinct_rows(lengths: np.ndarray, ids: np.ndarray, vocabulary_size: int):
+    """CSR (indptr, int32 indices) of rows given as lengths and concatenated ids, repeats dropped"""
+    # One sort of (row, id) keys drops repeats within a row
+    size = max(vocabulary_size, 1)
+    keys = np.sort(np.repeat(np.arange(len(lengths), dtype=np.int64), lengths) * size + ids.astype(np.int64))
+    keys = keys[np.concatenate((keys[:1] >= 0, keys[1:] != keys[:-1]))]
+    indptr = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // size, minlength=len(lengths)), out=indptr[1:])
+    return indptr, (keys % size).astype(np.int32)
+
+
+def postings(indptr: np.ndarray, indices: np.ndarray, vocabulary_size: int):
+    """
+    Invert CSR rows (column -> vocabulary ids) into postings (vocabulary id -> columns)
+
+    Args:
+        indptr: CSR row pointers (columns + 1)
+        indices: CSR vocabulary ids
+        vocabulary_size: Number of vocabulary ids
+
+    Returns:
+        (postings_indptr, postings_columns); columns ascend within each id
+    """
+    columns = np.repeat(np.arange(len(indptr) - 1, dtype=np.int32), np.diff(indptr))
+    order = np.argsort(indices, kind="stable")
+    postings_indptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=vocabulary_size), out=postings_indptr[1:])
+    return postings_indptr, columns[order]
+
+
+def postings_hit_counts(
+    row_items: Sequence[np.ndarray],
+    postings_indptr: np.ndarray,
+    postings_columns: np.ndarray,
+    columns: int
+) -> np.ndarray:
+    """
+    Per row, how many of its vocabulary ids each column holds
+
+    Only the postings of each row's ids are read, so the cost follows the
+    matches rather than the size of the catalog.
+
+    Args:
+        row_items: Per row, vocabulary ids (distinct)
+        postings_indptr, postings_columns: postings() output
+        columns: Number of columns
+
+    Returns:
+        int32 array (rows, columns)
+    """
+    counts = np.zeros((len(row_items), columns), dtype=np.int32)
+    for i, items in enumerate(row_items):
+        starts, ends = postings_indptr[items], postings_indptr[np.asarray(items) + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if total == 0:
+            continue
+        # Gather the postings of every id: run r covers starts[r]..ends[r]
+        offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        hits = postings_columns[offsets + np.arange(total)]
+        counts[i] = np.bincount(hits, minlength=columns)
+    return counts
+
+
+class WineFeatures:
+    """
+    Wine feature block: compound and harmonize-tag CSR arrays and rule columns
+
+    Attributes:
+        wine_ids: int64 wine ids (0 where missing)
+        vocabulary: compound -> id
+        compound_indptr, compound_indices: CSR wine -> compound ids
+        compound_counts: int32 compounds per wine
+        harmonize_tags: Lowercased tag vocabulary
+        harmonize_indptr, harmonize_indices: CSR wine -> tag ids
+        compound_postings, harmonize_postings: postings() of the two CSR arrays
+        rules: WineRuleColumns
+        excluded: Compounds left out of the CSR arrays (pruned vocabulary)
+    """
+
+    def __init__(
+        self,
+        wine_ids: Sequence[int],
+        vocabulary: Dict[str, int],
+        compound_indptr: np.ndarray,
+        compound_indices: np.ndarray,
+        harmonize_tags: List[str],
+        harmonize_indptr: np.ndarray,
+        harmonize_indices: np.ndarray,
+        rules: WineRuleColumns,
+        excluded: FrozenSet[str] = frozenset()
+    ):
+        self.wine_ids = np.asarray(wine_ids, dtype=np.int64)
+        self.vocabulary = vocabulary
+        self.compound_indptr = compound_indptr
+        self.compound_indices = compound_indices
+        self.compound_counts = np.diff(compound_indptr).astype(np.int32)
+        self.harmonize_tags = harmonize_tags
+        self.harmonize_indptr = harmonize_indptr
+        self.harmonize_indices = harmonize_indices
+        self.compound_postings = postings(compound_indptr, compound_indices, len(vocabulary))
+        self.harmonize_postings = postings(harmonize_indptr, harmonize_indices, len(harmonize_tags))
+        self.rules = rules
+        self.excluded = frozenset(excluded)
+
+    def __len__(self) -> int:
+        return len(self.wine_ids)
+
+    @classmethod
+    def from_wines(
+        cls,
+        wines: Sequence[Dict[str, Any]],
+        excluded: Collection[str] = frozenset()
+    ) -> "WineFeatures":
+        """
+        Feature block for a wine list; snapshot-backed lists are built from the
+        snapshot's CSR arrays without decoding the wine records
+
+        Args:
+            wines: Wine dictionaries or a utils.kb_snapshot.SnapshotWineList
+            excluded: Compounds to leave out (see CompoundStats.pruned_compounds)
+
+        Returns:
+            WineFeatures in the order of wines
+        """
+        from utils.kb_snapshot import SnapshotWineList
+        rules = WineRuleColumns.from_wines(wines)
+        if isinstance(wines, SnapshotWineList):
+            snapshot = wines.snapshot
+            vocabulary = {compound: i for i, compound in enumerate(snapshot.compounds.tolist())}
+            tag_indptr, tag_items = snapshot.list_columns["harmonize"]
+            tag_lists = [tag_items[int(tag_indptr[i]):int(tag_indptr[i + 1])] for i in range(len(wines))]
+            lengths, ids = np.diff(snapshot.wine_indptr), snapshot.wine_indices
+            if excluded:
+                dropped = np.zeros(len(vocabulary), dtype=bool)
+                dropped[[vocabulary[c] for c in excluded if c in vocabulary]] = True
+                keep = ~dropped[ids]
+                rows = np.repeat(np.arange(len(lengths)), lengths)
+                lengths, ids = np.bincount(rows[keep], minlength=len(lengths)), ids[keep]
+            compound_indptr, compound_indices = _distinct_rows(lengths, ids, len(vocabulary))
+        else:
+            vocabulary = {}
+            compound_lists = [wine.get("flavor_compounds", []) for wine in wines]
+            if excluded:
+                compound_lists = [[c for c in compounds if c not in excluded] for compounds in compound_lists]
+            compound_indptr, compound_indices = _csr(compound_lists, vocabulary)
+            tag_lists = [wine.get("harmonize", []) for wine in wines]
+
+        tag_index = {}
+        harmonize_indptr, harmonize_indices = _csr([[tag.lower() for tag in tags] for tags in tag_lists], tag_index)
+        return cls(rules.wine_ids, vocabulary, compound_indptr, compound_indices,
+                   list(tag_index), harmonize_indptr, harmonize_indices, rules, frozenset(excluded))
+
+
+class DishFeatures:
+    """
+    Dish feature block: compound ids in a wine block's vocabulary, harmonize
+    terms and rule attributes
+
+    Attributes:
+        dish_ids: Dish identifiers
+        compound_ids: Per dish, int32 ids of its compounds found in the vocabulary
+        compound_counts: int32 distinct compounds per dish (including unknown
+            ones, excluding the wine block's excluded compounds)
+        terms: Per dish, lowercased ingredient names (matched against harmonize tags)
+        attributes: dish_attribute_matrix output
+    """
+
+    def __init__(
+        self,
+        dish_ids: List[Any],
+        compound_ids: List[np.ndarray],
+        compound_counts: np.ndarray,
+        terms: List[List[str]],
+        attributes: np.ndarray
+    ):
+        self.dish_ids = dish_ids
+        self.compound_ids = compound_ids
+        self.compound_counts = compound_counts
+        self.terms = terms
+        self.attributes = attributes
+
+    def __len__(self) -> int:
+        return len(self.dish_ids)
+
+    @classmethod
+    def from_dishes(
+        cls,
+        dishes: Sequence[Dict[str, Any]],
+        wines: WineFeatures,
+        dish_ids: Optional[List[Any]] = None
+    ) -> "DishFeatures":
+        """
+        Feature block for dishes ('compounds', 'ingredients', 'tags', 'name' / 'description')
+
+        Args:
+            dishes: Dish dictionaries
+            wines: WineFeatures they are scored against
+            dish_ids: Identifiers (default: each dish's 'dish_id')
+
+        Returns:
+            DishFeatures in the order of dishes
+        """
+        vocabulary = wines.vocabulary
+        compound_ids, counts = [], []
+        for dish in dishes:
+            compounds = set(dish.get("compounds", [])) - wines.excluded
+            counts.append(len(compounds))
+            compound_ids.append(np.fromiter((vocabulary[c] for c in compounds if c in vocabulary), dtype=np.int32))
+        return cls(
+            dish_ids if dish_ids is not None else [dish.get("dish_id") for dish in dishes],
+            compound_ids,
+            np.asarray(counts, dtype=np.int32),
+            [[str(ingredient).lower() for ingredient in dish.get("ingredients", [])] for dish in dishes],
+            dish_attribute_matrix(dishes)
+        )
+
+    @classmethod
+    def from_menu_profile(cls, menu_profile: Dict[str, Dict[str, Any]], wines: WineFeatures) -> "DishFeatures":
+        return cls.from_dishes(list(menu_profile.values()), wines, dish_ids=list(menu_profile))
+
+
+class PairingScores:
+    """
+    Score matrix (dishes x wines) with its per-signal breakdown
+
+    Attributes:
+        dish_ids, wine_ids: Row and column identifiers
+        score: float32 weighted score
+        signals: SIGNALS name -> float32 matrix
+        shared_counts: int32 shared compound counts
+        matched: bool, wine shares a compound or a harmonize tag with the dish
+    """
+
+    def __init__(
+        self,
+        dish_ids: List[Any],
+        wine_ids: np.ndarray,
+        score: np.ndarray,
+        signals: Dict[str, np.ndarray],
+        shared_counts: np.ndarray
+    ):
+        self.dish_ids = dish_ids
+        self.wine_ids = wine_ids
+        self.score = score
+        self.signals = signals
+        self.shared_counts = shared_counts
+        self.matched = (shared_counts > 0) | (signals["harmonize"] > 0)
+        self._dish_index = {dish_id: i for i, dish_id in enumerate(dish_ids)}
+        self._wine_index = {}
+        for j, wine_id in enumerate(wine_ids.tolist()):
+            self._wine_index.setdefault(wine_id, j)
+
+    def dish_index(self, dish_id: Any) -> Optional[int]:
+        return self._dish_index.get(dish_id)
+
+    def wine_index(self, wine_id: int) -> Optional[int]:
+        return self._wine_index.get(wine_id)
+
+    def ranked(
+        self,
+        dish: int,
+        limit: Optional[int] = None,
+        matched_only: bool = True,
+        by: str = "score"
+    ) -> List[int]:
+        """
+        Wine columns for a dish row, best first (ties keep wine order)
+
+        Args:
+            dish: Dish row
+            limit: Maximum columns (all if None)
+            matched_only: Drop wines without a shared compound or harmonize tag
+            by: "score", a SIGNALS name or "shared_compounds" (which also drops
+                wines sharing no compound)
+
+        Returns:
+            Column indices
+        """
+        if by == "shared_compounds":
+            values, keep = self.shared_counts[dish], self.shared_counts[dish] > 0
+        else:
+            values = self.score[dish] if by == "score" else self.signals[by][dish]
+            keep = self.matched[dish] if matched_only else None
+        order = np.argsort(-values, kind="stable")
+        if keep is not None:
+            order = order[keep[order]]
+        return order[:limit].tolist()
+
+    def breakdown(self, dish: int, wine: int) -> Dict[str, float]:
+        """Weighted score, shared compound count and every signal of one pair"""
+        result = {"score": float(self.score[dish, wine]), "shared_compounds": int(self.shared_counts[dish, wine])}
+        result.update({name: float(matrix[dish, wine]) for name, matrix in self.signals.items()})
+        return result
+
+
+class ScoringEngine:
+    """
+    Weighted hybrid of the SIGNALS over dish and wine feature blocks
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            weights: Signal -> weight (DEFAULT_SCORING_WEIGHTS if None)
+
+        Raises:
+            ValueError: If a weight names an unknown signal or the weights sum to <= 0
+        """
+        weights = dict(DEFAULT_SCORING_WEIGHTS if weights is None else weights)
+        unknown = [name for name in weights if name not in SIGNALS]
+        if unknown:
+            raise ValueError(f"Unknown scoring signals: {', '.join(unknown)}. Available: {', '.join(SIGNALS)}")
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError("Scoring weights must sum to a positive value")
+        self.weights = {name: float(weights.get(name, 0.0)) / total for name in SIGNALS}
+
+    def score(self, dishes: DishFeatures, wines: WineFeatures) -> PairingScores:
+        """
+        Score every dish x wine pair
+
+        Args:
+            dishes: Dish features (built against wines)
+            wines: Wine features
+
+        Returns:
+            PairingScores
+        """
+        shared = postings_hit_counts(dishes.compound_ids, *wines.compound_postings, len(wines))
+
+        dish_sizes = dishes.compound_counts[:, None].astype(np.float32)
+        union = dish_sizes + wines.compound_counts[None, :] - shared
+        with np.errstate(divide="ignore", invalid="ignore"):
+            compounds = np.where(dish_sizes > 0, shared / dish_sizes, 0.0).astype(np.float32)
+            jaccard = np.where(union > 0, shared / union, 0.0).astype(np.float32)
+
+        # Substring match in either direction, as in the Stage 2 harmonize search
+        dish_tags = [
+            np.array([t for t, tag in enumerate(wines.harmonize_tags)
+                      if any(term in tag or tag in term for term in terms if term)], dtype=np.int64)
+            for terms in dishes.terms
+        ]
+        harmonize = (postings_hit_counts(dish_tags, *wines.harmonize_postings, len(wines)) > 0).astype(np.float32)
+
+        rules = rule_score_matrix(wines.rules, dishes.attributes) / np.float32(RULE_SCALE)
+
+        signals = {"compounds": compounds, "jaccard": jaccard, "harmonize": harmonize, "rules": rules}
+        score = np.zeros((len(dishes), len(wines)), dtype=np.float32)
+        for name, matrix in signals.items():
+            if self.weights[name]:
+                score += np.float32(self.weights[name]) * matrix
+        return PairingScores(dishes.dish_ids, wines.wine_ids, score, signals, shared)
+
+    def score_wines(
+        self,
+        dishes: Sequence[Dict[str, Any]],
+        wines: Sequence[Dict[str, Any]],
+        dish_ids: Optional[List[Any]] = None
+    ) -> PairingScores:
+        """score() for raw dish and wine dictionaries (features built on the fly)"""
+        wine_features = WineFeatures.from_wines(wines)
+        return self.score(DishFeatures.from_dishes(dishes, wine_features, dish_ids), wine_features)
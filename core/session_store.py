@@ -0,0 +1,250 @@
+"""
+Session-keyed state store
+Keeps per-session mutable pipeline state (menu profile, wines, pairings, ...)
+with LRU/TTL eviction and an overall memory cap. The knowledge base is shared
+by all sessions and is not counted against the cap.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Estimate the deep memory footprint of JSON-like data
+
+    Args:
+        obj: Nested dicts, lists, tuples, sets and scalars
+
+    Returns:
+        Approximate size in bytes (objects reachable twice are counted once)
+    """
+    seen = set()
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+class Session:
+    """
+    A single session's state and the lock serialising its updates
+
+    Pipeline stages should run through call() so concurrent requests of the
+    same session never interleave, while different sessions run in parallel.
+    """
+
+    def __init__(self, session_id: str, state: Any, store: "SessionStore"):
+        self.id = session_id
+        self.state = state
+        self.created_at = time.time()
+        self.last_access = self.created_at
+        self.size_bytes = 0
+        self.lock = threading.RLock()
+        self._store = store
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run func under the session lock and re-measure the session afterwards
+
+        Args:
+            func: Function updating or reading the session state
+            *args, **kwargs: Passed to func
+
+        Returns:
+            func's return value
+        """
+        with self.lock:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._store.update_size(self)
+
+
+class SessionStore:
+    """
+    LRU/TTL store of per-session state objects
+
+    Sessions idle for longer than ttl_seconds are dropped, and least recently
+    used sessions are evicted while there are more than max_sessions or the
+    measured state exceeds max_memory_bytes.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_sessions: int = 100,
+        ttl_seconds: float = 3600,
+        max_memory_bytes: Optional[int] = None,
+        size_of: Optional[Callable[[Any], int]] = None
+    ):
+        """
+        Initialize session store
+
+        Args:
+            factory: Creates the state object of a new session
+            max_sessions: Maximum number of live sessions
+            ttl_seconds: Idle time after which a session expires
+            max_memory_bytes: Cap on the summed session sizes (None for no cap)
+            size_of: Measures a state object (estimate_size if None)
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_bytes = max_memory_bytes
+        self.size_of = size_of or estimate_size
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[Session]:
+        """Get a live session (marking it recently used), or None"""
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._touch(session)
+            return session
+
+    def get_or_create(self, session_id: str) -> Session:
+        """Get a live session, creating it with the factory if needed"""
+        with self._lock:
+            self._evict_expired()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._touch(session)
+                return session
+
+        # Create outside the store lock; the factory may be slow
+        new_session = Session(session_id, self.factory(), self)
+
+        with self._lock:
+            # Another request may have created the session meanwhile
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = new_session
+                self._sessions[session_id] = session
+                self._evict_over_limits(keep=session_id)
+            self._touch(session)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session; returns whether it existed"""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def update_size(self, session: Session):
+        """Re-measure a session and evict others if the memory cap is exceeded"""
+        size = self.size_of(session.state)
+        with self._lock:
+            session.size_bytes = size
+            if session.id in self._sessions:
+                self._evict_over_limits(keep=session.id)
+
+    def memory_bytes(self) -> int:
+        """Summed measured size of all live sessions"""
+        with self._lock:
+            return sum(session.size_bytes for session in self._sessions.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": sum(s.size_bytes for s in self._sessions.values()),
+                "max_sessions": self.max_sessions,
+                "max_memory_bytes": self.max_memory_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+            }
+
+    def _touch(self, session: Session):
+        session.last_access = time.time()
+        self._sessions.move_to_end(session.id)
+
+    def _evict_expired(self):
+        if self.ttl_seconds is None:
+            return
+        cutoff = time.time() - self.ttl_seconds
+        # Oldest-accessed sessions come first
+        expired: List[str] = []
+        for session_id, session in self._sessions.items():
+            if session.last_access >= cutoff:
+                break
+            expired.append(session_id)
+        for session_id in expired:
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def _evict_over_limits(self, keep: str):
+        def over_limits() -> bool:
+            if len(self._sessions) > self.max_sessions:
+                return True
+            if self.max_memory_bytes is None:
+                return False
+            return sum(s.size_bytes for s in self._sessions.values()) > self.max_memory_bytes
+
+        while over_limits():
+            victim = next((sid for sid in self._sessions if sid != keep), None)
+            if victim is None:
+                break
+            del self._sessions[victim]
+            self.evictions += 1
+
+
+class IdentityCache:
+    """
+    Small LRU cache of values computed from specific objects
+
+    Components shared by every session (see CulinaryExpertApp.new_session)
+    cache per-menu / per-wine-list results here, so concurrent sessions keep
+    their own entries instead of evicting a single shared slot. Entries are
+    keyed by object identity and checked against a fingerprint of the
+    objects' contents.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        # (id, ...) -> (objects, fingerprint, value); the objects are held so their ids stay unique
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, objects: tuple, fingerprint: Any) -> Any:
+        """Value cached for these objects with this fingerprint, or None"""
+        key = tuple(id(obj) for obj in objects)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] != fingerprint:
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, objects: tuple, fingerprint: Any, value: Any):
+        """Cache value for these objects, evicting the least recently used entries"""
+        key = tuple(id(obj) for obj in objects)
+        with self._lock:
+            self._entries[key] = (objects, fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -4,16 +4,25 @@ Handles loading and merging wine lists from different sources
 """
 
 import json
-import os
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from utils.file_parsers import (
     parse_csv_wine_list,
     parse_json_wine_list,
     parse_xlsx_wine_list,
-    detect_file_type
+    detect_file_type,
+    source_name,
+    FileSource
 )
 from utils.config import DEFAULT_WINES_PATH
+from core.knowledge_base import get_knowledge_base
+from utils.gemini_client import get_api_key, create_client, upload_file, generate_content, is_rate_limit_error
+from core.events import publish, WINE_ENRICHED
+from utils.structured_log import get_logger, log_event
+from utils.metrics import record_cache_lookup, record_llm_retry, timed_stage
+from utils.tracing import span, traced
+
+logger = get_logger("wine_manager")
 
 
 class WineManager:
@@ -21,32 +30,35 @@ class WineManager:
     Manages wine lists from files and enriches them with flavor compounds
     """
     
-    def __init__(self, internal_wines_path: Path = None):
+    def __init__(self, internal_wines_path: Path = None, knowledge_base=None):
         """
         Initialize the Wine Manager
         
         Args:
             internal_wines_path: Path to internal wines JSON file (default from config)
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
         """
         if internal_wines_path is None:
             internal_wines_path = DEFAULT_WINES_PATH
         self.internal_wines_path = Path(internal_wines_path)
-        self.ingredient_flavor_map = None
-        self._load_ingredient_map()
+        # Ingredient flavor map for compound mapping (loads on first access)
+        self.knowledge_base = knowledge_base or get_knowledge_base()
     
-    def _load_ingredient_map(self):
-        """Load ingredient flavor map for compound mapping"""
-        ingredient_path = Path("processed_data") / "ingredient_flavor_map.json"
-        if ingredient_path.exists():
-            with open(ingredient_path, 'r', encoding='utf-8') as f:
-                self.ingredient_flavor_map = json.load(f)
+    @property
+    def ingredient_flavor_map(self) -> Optional[Dict[str, Any]]:
+        """Ingredient flavor map from the shared knowledge base (None if unavailable)"""
+        try:
+            return self.knowledge_base.ingredient_flavor_map
+        except FileNotFoundError:
+            return None
     
-    def load_wines(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+    @traced("wines.load")
+    def load_wines(self, file_paths: List[FileSource]) -> List[Dict[str, Any]]:
         """
         Load wines from one or more files (JSON, CSV, PDF, or XLSX)
         
         Args:
-            file_paths: List of paths to wine list files
+            file_paths: List of paths, bytes or binary file objects of wine lists
             
         Returns:
             List of normalized wine dictionaries
@@ -71,7 +83,7 @@ class WineManager:
                 raise ImportError(f"Missing required library for {file_type} parsing: {e}. "
                                   f"Please install with: pip install {e.name}")
             except Exception as e:
-                raise ValueError(f"Error parsing {file_type} file '{file_path}': {e}")
+                raise ValueError(f"Error parsing {file_type} file '{source_name(file_path) or '<upload>'}': {e}")
             
             # Normalize all wines
             normalized = [self.normalize_wine_format(wine) for wine in wines]
@@ -79,6 +91,7 @@ class WineManager:
         
         return all_wines
     
+    @timed_stage("enrichment")
     def enrich_wines_with_flavors(
         self,
         wines: List[Dict[str, Any]]
@@ -93,85 +106,65 @@ class WineManager:
         Returns:
             List of wines enriched with flavor_compounds
         """
-        import google.genai as genai
         import re
         
         # Load processed wines database
         processed_wines = []
-        internal_wines_path = DEFAULT_WINES_PATH
-        if internal_wines_path.exists():
-            try:
-                with open(internal_wines_path, 'r', encoding='utf-8') as f:
-                    processed_wines = json.load(f)
-                print(f"  Loaded {len(processed_wines)} wines from database")
-            except Exception as e:
-                print(f"  Warning: Failed to load processed wines: {e}")
+        wines_by_name = {}
+        try:
+            processed_wines = self.knowledge_base.wines
+            wines_by_name = self.knowledge_base.wine_by_name
+            print(f"  Loaded {len(processed_wines)} wines from database")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"  Warning: Failed to load processed wines: {e}")
         
         # Get API key for Gemini queries
-        api_key = os.getenv("GOOGLE_AI_API_KEY")
-        if api_key is None:
-            try:
-                from dotenv import load_dotenv
-                load_dotenv()
-                api_key = os.getenv("GOOGLE_AI_API_KEY")
-            except ImportError:
-                pass
+        api_key = get_api_key()
         
         if not api_key:
             print("Warning: GOOGLE_AI_API_KEY not found. Skipping Gemini enrichment.")
             client = None
         else:
             # Configure Gemini
-            client = genai.Client(api_key=api_key)
+            client = create_client(api_key)
         
         model_name = "gemini-3-flash-preview"
         
         enriched_wines = []
         
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_wine_enrich_1","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:129","message":"Starting wine enrichment","data":{"total_wines":len(wines),"processed_wines_count":len(processed_wines)},"runId":"run1","hypothesisId":"C"}) + "\n")
-        except: pass
-        # #endregion
+        log_event(logger, "wines.enrichment_started", "Starting wine enrichment",
+                  total_wines=len(wines), processed_wines_count=len(processed_wines))
         
+        total_wines = len(wines)
         for i, wine in enumerate(wines):
-            # #region agent log
-            try:
-                if i < 5 or i % 20 == 0:  # Log first 5 and every 20th
-                    with open(log_path, 'a', encoding='utf-8') as f:
-                        f.write(json_module.dumps({"id":"log_wine_enrich_2","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:137","message":"Processing wine","data":{"index":i,"wine_name":wine.get("wine_name", "Unknown")},"runId":"run1","hypothesisId":"C"}) + "\n")
-            except: pass
-            # #endregion
+            if i > 0:
+                # Every branch below finishes a wine before the next iteration
+                self._publish_wine_enriched(wines, i)
+            log_event(logger, "wines.processing", "Processing wine", index=i, wine_name=wine.get("wine_name", "Unknown"))
             wine_name = wine.get("wine_name", "Unknown")
             
             # First, try to find wine in processed_wines.json
             found_in_db = False
-            for db_wine in processed_wines:
-                db_wine_name = db_wine.get("wine_name", "").lower().strip()
-                if db_wine_name == wine_name.lower().strip():
-                    # Found in database - use its flavor profile
-                    enriched_wine = wine.copy()
-                    enriched_wine["flavor_compounds"] = db_wine.get("flavor_compounds", [])
-                    # Copy other useful fields if missing
-                    if not enriched_wine.get("grapes") and db_wine.get("grapes"):
-                        enriched_wine["grapes"] = db_wine["grapes"]
-                    if not enriched_wine.get("region") and db_wine.get("region"):
-                        enriched_wine["region"] = db_wine["region"]
-                    if not enriched_wine.get("winery") and db_wine.get("winery"):
-                        enriched_wine["winery"] = db_wine["winery"]
-                    enriched_wines.append(enriched_wine)
-                    found_in_db = True
-                    print(f"  Found '{wine_name}' in database with {len(enriched_wine['flavor_compounds'])} compounds")
-                    # #region agent log
-                    try:
-                        with open(log_path, 'a', encoding='utf-8') as f:
-                            f.write(json_module.dumps({"id":"log_wine_enrich_3","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:152","message":"Wine found in database","data":{"index":i,"wine_name":wine_name,"compounds_count":len(enriched_wine['flavor_compounds'])},"runId":"run1","hypothesisId":"C"}) + "\n")
-                    except: pass
-                    # #endregion
-                    break
+            db_wine = wines_by_name.get(wine_name.lower().strip())
+            record_cache_lookup("wine_enrichment", hit=db_wine is not None)
+            if db_wine is not None:
+                # Found in database - use its flavor profile
+                enriched_wine = wine.copy()
+                enriched_wine["flavor_compounds"] = db_wine.get("flavor_compounds", [])
+                # Copy other useful fields if missing
+                if not enriched_wine.get("grapes") and db_wine.get("grapes"):
+                    enriched_wine["grapes"] = db_wine["grapes"]
+                if not enriched_wine.get("region") and db_wine.get("region"):
+                    enriched_wine["region"] = db_wine["region"]
+                if not enriched_wine.get("winery") and db_wine.get("winery"):
+                    enriched_wine["winery"] = db_wine["winery"]
+                enriched_wines.append(enriched_wine)
+                found_in_db = True
+                print(f"  Found '{wine_name}' in database with {len(enriched_wine['flavor_compounds'])} compounds")
+                log_event(logger, "wines.found_in_db", "Wine found in database",
+                          index=i, wine_name=wine_name, compounds_count=len(enriched_wine["flavor_compounds"]))
             
             if found_in_db:
                 continue
@@ -221,7 +214,10 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
             response = None
             for attempt in range(max_retries):
                 try:
-                    response = client.models.generate_content(
+                    response = generate_content(
+                        client,
+                        "wine_enrichment",
+                        trace_attributes={"wine_name": wine_name, "attempt": attempt + 1},
                         model=model_name,
                         contents=prompt,
                         config={
@@ -235,7 +231,7 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
                 except Exception as api_error:
                     error_str = str(api_error)
                     # Check for 429 rate limit error
-                    if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower():
+                    if is_rate_limit_error(api_error):
                         # Extract retry delay from error message if available
                         retry_delay = 15  # Default 15 seconds
                         delay_match = re.search(r'retry in ([\d.]+)s', error_str, re.IGNORECASE)
@@ -244,7 +240,9 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
                         
                         if attempt < max_retries - 1:
                             print(f"  ⚠️  API quota exceeded for wine '{wine_name}'. Retrying in {retry_delay} seconds... (attempt {attempt + 1}/{max_retries})")
-                            time.sleep(retry_delay)
+                            record_llm_retry("wine_enrichment")
+                            with span("llm.retry_sleep", call_site="wine_enrichment", seconds=retry_delay):
+                                time.sleep(retry_delay)
                             continue
                         else:
                             print(f"  ❌ API quota exceeded for wine '{wine_name}' after {max_retries} attempts.")
@@ -256,7 +254,9 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
                         # Non-quota error - retry or give up
                         if attempt < max_retries - 1:
                             print(f"  ⚠️  Error enriching wine '{wine_name}': {error_str[:100]}. Retrying... (attempt {attempt + 1}/{max_retries})")
-                            time.sleep(2)
+                            record_llm_retry("wine_enrichment")
+                            with span("llm.retry_sleep", call_site="wine_enrichment", seconds=2):
+                                time.sleep(2)
                             continue
                         else:
                             print(f"Warning: Failed to enrich wine {wine_name}: {api_error}")
@@ -298,10 +298,9 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
                         for grape in enriched_wine.get("grapes", []):
                             grape_cleaned = self._clean_ingredient_name(grape)
                             # Try to find grape in ingredient map
-                            for ingredient_name, data in self.ingredient_flavor_map.items():
-                                if data.get("cleaned_name") == grape_cleaned:
-                                    compounds.update(data.get("compounds", []))
-                                    break
+                            ingredient_name = self.knowledge_base.find_ingredient_by_cleaned_name(grape_cleaned)
+                            if ingredient_name is not None:
+                                compounds.update(self.ingredient_flavor_map[ingredient_name].get("compounds", []))
                     
                     # Add compounds from Gemini (if any)
                     if "flavor_compounds" in result:
@@ -309,32 +308,34 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
                     
                     enriched_wine["flavor_compounds"] = list(compounds)
                     enriched_wines.append(enriched_wine)
-                    # #region agent log
-                    try:
-                        with open(log_path, 'a', encoding='utf-8') as f:
-                            f.write(json_module.dumps({"id":"log_wine_enrich_4","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:301","message":"Wine enriched via Gemini","data":{"index":i,"wine_name":wine_name,"compounds_count":len(compounds)},"runId":"run1","hypothesisId":"C"}) + "\n")
-                    except: pass
-                    # #endregion
+                    log_event(logger, "wines.enriched_via_llm", "Wine enriched via Gemini",
+                              index=i, wine_name=wine_name, compounds_count=len(compounds))
                 except Exception as e:
                     # If processing fails, use original wine
                     print(f"Warning: Failed to process response for wine {wine_name}: {e}")
                     enriched_wines.append(wine)
-                    # #region agent log
-                    try:
-                        with open(log_path, 'a', encoding='utf-8') as f:
-                            f.write(json_module.dumps({"id":"log_wine_enrich_5","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:320","message":"Wine enrichment failed","data":{"index":i,"wine_name":wine_name,"error":str(e)[:100]},"runId":"run1","hypothesisId":"C"}) + "\n")
-                    except: pass
-                    # #endregion
+                    log_event(logger, "wines.enrichment_failed", "Wine enrichment failed",
+                              index=i, wine_name=wine_name, error=str(e)[:100])
         
-        # #region agent log
-        try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_wine_enrich_6","timestamp":int(__import__('time').time()*1000),"location":"wine_manager.py:253","message":"Wine enrichment complete","data":{"total_enriched":len(enriched_wines)},"runId":"run1","hypothesisId":"C"}) + "\n")
-        except: pass
-        # #endregion
+        if total_wines:
+            self._publish_wine_enriched(wines, total_wines)
+        
+        log_event(logger, "wines.enrichment_complete", "Wine enrichment complete", total_enriched=len(enriched_wines))
         
         return enriched_wines
     
+    @staticmethod
+    def _publish_wine_enriched(wines: List[Dict[str, Any]], done: int):
+        """Publish progress after the first `done` wines were enriched"""
+        wine_name = wines[done - 1].get("wine_name", "Unknown")
+        publish(
+            WINE_ENRICHED,
+            current=done,
+            total=len(wines),
+            wine_name=wine_name,
+            message=f"Enriched wine {done}/{len(wines)}: {wine_name}"
+        )
+    
     def _clean_ingredient_name(self, name: str) -> str:
         """Clean ingredient name for matching"""
         import re
@@ -435,43 +436,33 @@ For flavor compounds, use standard chemical names (e.g., "Citral", "Geraniol", "
         
         return normalized
     
-    def _extract_wines_with_gemini(self, pdf_path: str) -> List[Dict[str, Any]]:
+    def _extract_wines_with_gemini(self, pdf_path: FileSource) -> List[Dict[str, Any]]:
         """
         Use Gemini to extract wines from PDF
         
         Args:
-            pdf_path: Path to PDF file
+            pdf_path: Path, bytes or binary file object of the PDF
             
         Returns:
             List of wine dictionaries
         """
         try:
-            import google.genai as genai
-            
             # Get API key
-            api_key = os.getenv("GOOGLE_AI_API_KEY")
-            if api_key is None:
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("GOOGLE_AI_API_KEY")
-                except ImportError:
-                    pass
+            api_key = get_api_key()
             
             if not api_key:
                 raise ValueError("GOOGLE_AI_API_KEY not found. Cannot extract wines from PDF.")
             
             # Upload PDF directly to Gemini Files API (no text extraction)
-            print(f"  Uploading PDF file directly via Gemini Files API: {pdf_path}")
+            print(f"  Uploading PDF file directly via Gemini Files API: {source_name(pdf_path) or '<upload>'}")
             
             # Configure Gemini
-            client = genai.Client(api_key=api_key)
+            client = create_client(api_key)
             model_name = "gemini-3-flash-preview"
             
-            # Upload PDF file directly to Gemini Files API
-            # Based on debug logs: client.files.upload() accepts file parameter (path string, PathLike, or file object)
-            # Signature: (*, file: Union[str, os.PathLike[str], io.IOBase], config: ...)
-            uploaded_file = client.files.upload(file=pdf_path)
+            # Upload PDF file directly to Gemini Files API (file objects are
+            # streamed as-is, without writing a temp file)
+            uploaded_file = upload_file(client, pdf_path, "application/pdf")
             print(f"  Uploaded PDF file: {uploaded_file.name}")
             
             prompt = """You are a wine expert analyzing a wine list document.
@@ -505,7 +496,9 @@ Return ONLY valid JSON in this format (no markdown, no code blocks):
   ]
 }"""
             
-            response = client.models.generate_content(
+            response = generate_content(
+                client,
+                "wine_list_extraction",
                 model=model_name,
                 contents=[prompt, uploaded_file],
                 config={
@@ -5,6 +5,7 @@ Ranks wines based on pairing frequency and match quality
 
 from typing import List, Dict, Any, Tuple
 from collections import defaultdict
+from utils.metrics import timed_stage
 
 
 class WineRanker:
@@ -47,6 +48,8 @@ class WineRanker:
         """
         Calculate average match quality score for each wine
         
+        Quality is the hybrid pairing score (PairingEngine.score_menu), floored at 0.
+        
         Args:
             pairings: Dictionary mapping dish_id -> list of wine_ids
             wines: List of wine dictionaries
@@ -61,22 +64,19 @@ class WineRanker:
         if pairing_engine is None:
             pairing_engine = PairingEngine()
         
-        # Create wine lookup
-        wine_dict = {w.get("wine_id"): w for w in wines if w.get("wine_id") is not None}
+        scores = pairing_engine.score_menu(menu_profile, wines)
         
-        # Calculate quality scores for each pairing
+        # Look up quality scores for each pairing
         quality_scores = defaultdict(list)
         
         for dish_id, wine_ids in pairings.items():
+            dish = scores.dish_index(dish_id)
+            if dish is None:
+                continue
             for wine_id in wine_ids:
-                wine = wine_dict.get(wine_id)
-                if wine:
-                    score = pairing_engine.calculate_pairing_score(
-                        dish_id=dish_id,
-                        wine=wine,
-                        menu_profile=menu_profile
-                    )
-                    quality_scores[wine_id].append(score)
+                wine = scores.wine_index(wine_id)
+                if wine is not None:
+                    quality_scores[wine_id].append(max(float(scores.score[dish, wine]), 0.0))
         
         # Calculate average quality per wine
         avg_quality = {}
@@ -85,6 +85,7 @@ class WineRanker:
         
         return avg_quality
     
+    @timed_stage("ranking")
     def rank_wines(
         self,
         wines: List[Dict[str, Any]],
@@ -5,6 +5,7 @@ Analyzes wines for similarity based on flavor compounds
 
 from typing import List, Dict, Any, Tuple, Set
 from utils.config import DEFAULT_SIMILARITY_THRESHOLD
+from utils.metrics import timed_stage
 
 
 class WineSimilarityAnalyzer:
@@ -50,6 +51,7 @@ class WineSimilarityAnalyzer:
         
         return intersection / union
     
+    @timed_stage("similarity")
     def find_similar_pairs(
         self, 
         wines: List[Dict[str, Any]], 
@@ -10,6 +10,8 @@ from pathlib import Path
 # Import the existing WineSommelier
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from wine_sommelier import WineSommelier
+from core.session_store import IdentityCache
+from utils.config import DEFAULT_SOMMELIER_FINALIZER, DEFAULT_SCORE_CACHE_ENTRIES
 
 
 class WineSommelierWrapper:
@@ -18,15 +20,23 @@ class WineSommelierWrapper:
     for use in core modules, especially for compound-based wine searching
     """
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-3-flash-preview"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gemini-3-flash-preview",
+        knowledge_base=None
+    ):
         """
         Initialize the Wine Sommelier Wrapper
         
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
             model_name: Gemini model to use
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
         """
-        self.sommelier = WineSommelier(api_key=api_key, model_name=model_name)
+        self.sommelier = WineSommelier(api_key=api_key, model_name=model_name, knowledge_base=knowledge_base)
+        # core.scoring.WineFeatures per wine list; the wrapper is shared by all sessions
+        self._wine_features = IdentityCache(DEFAULT_SCORE_CACHE_ENTRIES)
     
     def search_wines_by_compounds(
         self, 
@@ -74,7 +84,8 @@ class WineSommelierWrapper:
     def recommend_wine_for_dish(
         self,
         dish_description: Optional[str] = None,
-        dish_image: Optional[bytes] = None
+        dish_image: Optional[bytes] = None,
+        finalizer: str = DEFAULT_SOMMELIER_FINALIZER
     ) -> Dict[str, Any]:
         """
         Recommend wines for a single dish (reuses WineSommelier.recommend)
@@ -82,15 +93,29 @@ class WineSommelierWrapper:
         Args:
             dish_description: Text description of the dish
             dish_image: Image bytes or path to image file
+            finalizer: Stage 3 finalizer (see SOMMELIER_FINALIZERS)
             
         Returns:
             Recommendation dictionary with top_matches, reasoning, etc.
         """
         return self.sommelier.recommend(
             dish_description=dish_description,
-            dish_image=dish_image
+            dish_image=dish_image,
+            finalizer=finalizer
         )
     
+    def _features_for(self, wines: List[Dict[str, Any]]):
+        """WineFeatures of a wine list, reused while the same list (same wine ids) is searched"""
+        wine_ids = [wine.get("wine_id") for wine in wines]
+        cached = self._wine_features.get((wines,), wine_ids)
+        if cached is not None:
+            return cached
+        # Imported lazily: the scoring engine is numpy-based
+        from core.scoring import WineFeatures
+        features = WineFeatures.from_wines(wines, excluded=self.sommelier.knowledge_base.pruned_compounds)
+        self._wine_features.put((wines,), wine_ids, features)
+        return features
+    
     def find_best_wines_for_compounds(
         self,
         compounds: List[str],
@@ -113,22 +138,12 @@ class WineSommelierWrapper:
             matches = self.search_wines_by_compounds(compounds, max_results=max_wines * 10)
             wine_ids = [match["wine"]["wine_id"] for match in matches[:max_wines]]
         else:
-            # Search in provided wine list
-            compounds_set = set(compounds)
-            matches = []
-            
-            for wine in wines:
-                wine_compounds = set(wine.get("flavor_compounds", []))
-                shared = compounds_set.intersection(wine_compounds)
-                if shared:
-                    matches.append({
-                        "wine": wine,
-                        "shared_compounds": list(shared),
-                        "match_count": len(shared)
-                    })
-            
-            # Sort by match count
-            matches.sort(key=lambda x: x["match_count"], reverse=True)
-            wine_ids = [match["wine"]["wine_id"] for match in matches[:max_wines]]
+            # Search in provided wine list (shared compound counts from the scoring engine)
+            from core.scoring import DishFeatures
+            wine_features = self._features_for(wines)
+            scores = self.sommelier.scoring_engine.score(
+                DishFeatures.from_dishes([{"compounds": compounds}], wine_features), wine_features
+            )
+            wine_ids = [wines[index].get("wine_id") for index in scores.ranked(0, max_wines, by="shared_compounds")]
         
         return wine_ids
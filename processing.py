@@ -3,79 +3,21 @@ Wine Pairing AI - Data Processing Script
 Processes XWines and FlavorGraph datasets to create unified JSON Knowledge Base
 """
 
+import numpy as np
 import pandas as pd
 import json
 import ast
+import hashlib
+import inspect
 import re
 import os
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 
-
-class PairingLogic:
-    """
-    Sommelier Rules for Wine-Food Pairing
-    This class defines basic pairing rules that can be referenced by the AI model.
-    """
-    
-    # Tannin levels (1-5 scale)
-    TANNIN_SCALE = {
-        'Very Low': 1,
-        'Low': 2,
-        'Medium': 3,
-        'High': 4,
-        'Very High': 5
-    }
-    
-    # Acidity levels (1-5 scale)
-    ACIDITY_SCALE = {
-        'Very Low': 1,
-        'Low': 2,
-        'Medium': 3,
-        'High': 4,
-        'Very High': 5
-    }
-    
-    # Body levels (1-5 scale)
-    BODY_SCALE = {
-        'Very light-bodied': 1,
-        'Light-bodied': 2,
-        'Medium-bodied': 3,
-        'Full-bodied': 4,
-        'Very full-bodied': 5
-    }
-    
-    @staticmethod
-    def tannin_vs_spice_conflict(wine_tannin: int, food_spice: int) -> bool:
-        """
-        High tannin wines conflict with highly spiced foods.
-        Returns True if there's a conflict.
-        """
-        return wine_tannin >= 4 and food_spice >= 4
-    
-    @staticmethod
-    def acid_vs_acid_congruence(wine_acid: int, food_acid: int) -> bool:
-        """
-        Acidic wines pair well with acidic foods (congruence).
-        Returns True if pairing is good.
-        """
-        return abs(wine_acid - food_acid) <= 1
-    
-    @staticmethod
-    def body_vs_richness_match(wine_body: int, food_richness: int) -> bool:
-        """
-        Full-bodied wines pair with rich foods, light wines with delicate foods.
-        Returns True if pairing is good.
-        """
-        return abs(wine_body - food_richness) <= 1
-    
-    @staticmethod
-    def sweetness_balance(wine_sweetness: int, food_sweetness: int) -> bool:
-        """
-        Wine should be as sweet or sweeter than the food.
-        Returns True if pairing is good.
-        """
-        return wine_sweetness >= food_sweetness
+# PairingLogic moved to core.pairing_rules; imported here for existing callers
+from core.pairing_rules import PairingLogic
+from utils.kb_snapshot import KnowledgeBaseSnapshot, write_snapshot
 
 
 class WineProcessor:
@@ -160,38 +102,43 @@ class WineProcessor:
                 return [g.strip() for g in grapes_str.split(',') if g.strip()]
         return []
     
+    @staticmethod
+    def process_row(row: pd.Series) -> Dict[str, Any]:
+        """Process a single XWines CSV row into a wine record"""
+        return {
+            'wine_id': int(row['WineID']) if pd.notna(row['WineID']) else None,
+            'wine_name': str(row['WineName']) if pd.notna(row['WineName']) else 'Unknown',
+            'type': WineProcessor.normalize_type(row.get('Type', 'Unknown')),
+            'type_name': str(row['Type']) if pd.notna(row.get('Type')) else 'Unknown',
+            'body': WineProcessor.normalize_body(row.get('Body', 'Unknown')),
+            'body_name': str(row['Body']) if pd.notna(row.get('Body')) else 'Unknown',
+            'acidity': WineProcessor.normalize_acidity(row.get('Acidity', 'Unknown')),
+            'acidity_name': str(row['Acidity']) if pd.notna(row.get('Acidity')) else 'Unknown',
+            'grapes': WineProcessor.parse_grapes(row.get('Grapes', '')),
+            'abv': float(row['ABV']) if pd.notna(row.get('ABV')) else None,
+            'country': str(row['Country']) if pd.notna(row.get('Country')) else 'Unknown',
+            'region': str(row['RegionName']) if pd.notna(row.get('RegionName')) else 'Unknown',
+            'winery': str(row['WineryName']) if pd.notna(row.get('WineryName')) else 'Unknown',
+            'harmonize': ast.literal_eval(row['Harmonize']) if pd.notna(row.get('Harmonize')) else [],
+            'flavor_compounds': []  # Will be populated by flavor bridge
+        }
+    
     @staticmethod
     def process_wines(csv_path: str) -> List[Dict[str, Any]]:
         """Process XWines CSV into structured JSON"""
         df = pd.read_csv(csv_path)
-        wines = []
-        
-        for _, row in df.iterrows():
-            wine = {
-                'wine_id': int(row['WineID']) if pd.notna(row['WineID']) else None,
-                'wine_name': str(row['WineName']) if pd.notna(row['WineName']) else 'Unknown',
-                'type': WineProcessor.normalize_type(row.get('Type', 'Unknown')),
-                'type_name': str(row['Type']) if pd.notna(row.get('Type')) else 'Unknown',
-                'body': WineProcessor.normalize_body(row.get('Body', 'Unknown')),
-                'body_name': str(row['Body']) if pd.notna(row.get('Body')) else 'Unknown',
-                'acidity': WineProcessor.normalize_acidity(row.get('Acidity', 'Unknown')),
-                'acidity_name': str(row['Acidity']) if pd.notna(row.get('Acidity')) else 'Unknown',
-                'grapes': WineProcessor.parse_grapes(row.get('Grapes', '')),
-                'abv': float(row['ABV']) if pd.notna(row.get('ABV')) else None,
-                'country': str(row['Country']) if pd.notna(row.get('Country')) else 'Unknown',
-                'region': str(row['RegionName']) if pd.notna(row.get('RegionName')) else 'Unknown',
-                'winery': str(row['WineryName']) if pd.notna(row.get('WineryName')) else 'Unknown',
-                'harmonize': ast.literal_eval(row['Harmonize']) if pd.notna(row.get('Harmonize')) else [],
-                'flavor_compounds': []  # Will be populated by flavor bridge
-            }
-            wines.append(wine)
-        
-        return wines
+        return [WineProcessor.process_row(row) for _, row in df.iterrows()]
 
 
 class FlavorGraphProcessor:
     """Processes FlavorGraph dataset"""
     
+    # Edge types linking an ingredient node to a compound node
+    INGREDIENT_COMPOUND_EDGE_TYPES = ['ingr-fcomp', 'ingr-dcomp']
+    
+    # Rows per chunk when streaming the edges CSV
+    EDGE_CHUNK_SIZE = 50_000
+    
     @staticmethod
     def clean_ingredient_name(name: str) -> str:
         """Clean ingredient name for matching"""
@@ -204,6 +151,55 @@ class FlavorGraphProcessor:
         name = re.sub(r'[_\s]+', ' ', name)
         return name.strip()
     
+    @staticmethod
+    def _read_ingredient_compound_edges(edges_path: str,
+                                        ingredient_ids: np.ndarray,
+                                        compound_ids: np.ndarray,
+                                        chunk_size: int = None) -> pd.DataFrame:
+        """
+        Stream the edges CSV in chunks and keep only ingredient-compound links
+        
+        Each chunk is reduced to (ingredient_id, compound_id) integer pairs straight
+        away, so peak memory is bounded by the chunk size rather than the file size.
+        Edge direction is normalised so the ingredient is always in the first column.
+        """
+        chunk_size = chunk_size or FlavorGraphProcessor.EDGE_CHUNK_SIZE
+        edge_types = FlavorGraphProcessor.INGREDIENT_COMPOUND_EDGE_TYPES
+        
+        reader = pd.read_csv(
+            edges_path,
+            usecols=['id_1', 'id_2', 'edge_type'],
+            dtype={'id_1': np.int32, 'id_2': np.int32, 'edge_type': 'category'},
+            chunksize=chunk_size
+        )
+        
+        pairs = []
+        for chunk in reader:
+            edge_type = chunk['edge_type'].astype(str).str.lower()
+            chunk = chunk[edge_type.isin(edge_types).to_numpy()]
+            if chunk.empty:
+                continue
+            
+            id_1 = chunk['id_1'].to_numpy()
+            id_2 = chunk['id_2'].to_numpy()
+            
+            forward = np.isin(id_1, ingredient_ids) & np.isin(id_2, compound_ids)
+            backward = ~forward & np.isin(id_2, ingredient_ids) & np.isin(id_1, compound_ids)
+            
+            # Keep the original edge order so compound lists come out in file order
+            keep = forward | backward
+            pairs.append(pd.DataFrame({
+                'ingredient_id': np.where(forward, id_1, id_2)[keep],
+                'compound_id': np.where(forward, id_2, id_1)[keep]
+            }))
+        
+        if not pairs:
+            return pd.DataFrame({
+                'ingredient_id': np.empty(0, dtype=np.int32),
+                'compound_id': np.empty(0, dtype=np.int32)
+            })
+        return pd.concat(pairs, ignore_index=True)
+    
     @staticmethod
     def process_flavor_graph(nodes_path: str, edges_path: str) -> Dict[str, List[str]]:
         """
@@ -211,63 +207,41 @@ class FlavorGraphProcessor:
         Returns dictionary: {ingredient_name: [compound_names]}
         """
         # Load nodes
-        nodes_df = pd.read_csv(nodes_path)
+        nodes_df = pd.read_csv(
+            nodes_path,
+            usecols=['node_id', 'name', 'node_type'],
+            dtype={'node_id': np.int32, 'node_type': 'category'}
+        )
+        node_type = nodes_df['node_type'].astype(str).str.lower()
         
-        # Create node_id to name mapping for compounds
-        compound_map = {}
-        ingredient_map = {}
+        ingredients = nodes_df[(node_type == 'ingredient').to_numpy()][['node_id', 'name']].copy()
+        ingredients['name'] = ingredients['name'].astype(str)
+        ingredients['cleaned_name'] = ingredients['name'].map(FlavorGraphProcessor.clean_ingredient_name)
         
-        for _, row in nodes_df.iterrows():
-            node_id = int(row['node_id'])
-            name = str(row['name'])
-            node_type = str(row['node_type']).lower()
-            
-            if node_type == 'compound':
-                compound_map[node_id] = name
-            elif node_type == 'ingredient':
-                ingredient_map[node_id] = name
+        compounds = nodes_df[(node_type == 'compound').to_numpy()][['node_id', 'name']].copy()
+        compounds['name'] = compounds['name'].astype(str)
         
-        # Load edges
-        edges_df = pd.read_csv(edges_path)
+        # Join edges to node names on integer ids
+        edges = FlavorGraphProcessor._read_ingredient_compound_edges(
+            edges_path,
+            ingredients['node_id'].to_numpy(),
+            compounds['node_id'].to_numpy()
+        )
+        edges = edges.merge(
+            ingredients[['node_id', 'cleaned_name']].rename(columns={'node_id': 'ingredient_id'}),
+            on='ingredient_id', how='left', sort=False
+        ).merge(
+            compounds.rename(columns={'node_id': 'compound_id', 'name': 'compound_name'}),
+            on='compound_id', how='left', sort=False
+        )
         
-        # Create ingredient to compounds mapping
-        ingredient_compounds = {}
-        
-        for _, row in edges_df.iterrows():
-            id_1 = int(row['id_1'])
-            id_2 = int(row['id_2'])
-            edge_type = str(row['edge_type']).lower()
-            
-            # Check if this edge connects ingredient to compound
-            if edge_type in ['ingr-fcomp', 'ingr-dcomp']:
-                # Determine which is ingredient and which is compound
-                ingredient_id = None
-                compound_id = None
-                
-                if id_1 in ingredient_map and id_2 in compound_map:
-                    ingredient_id = id_1
-                    compound_id = id_2
-                elif id_2 in ingredient_map and id_1 in compound_map:
-                    ingredient_id = id_2
-                    compound_id = id_1
-                
-                if ingredient_id and compound_id:
-                    ingredient_name = ingredient_map[ingredient_id]
-                    compound_name = compound_map[compound_id]
-                    
-                    # Use cleaned name as key
-                    cleaned_name = FlavorGraphProcessor.clean_ingredient_name(ingredient_name)
-                    
-                    if cleaned_name not in ingredient_compounds:
-                        ingredient_compounds[cleaned_name] = []
-                    
-                    if compound_name not in ingredient_compounds[cleaned_name]:
-                        ingredient_compounds[cleaned_name].append(compound_name)
+        # Unique compounds per cleaned ingredient name, in first-seen edge order
+        edges = edges.drop_duplicates(subset=['cleaned_name', 'compound_name'])
+        ingredient_compounds = edges.groupby('cleaned_name', sort=False)['compound_name'].agg(list).to_dict()
         
         # Also create mapping with original names for reference
         ingredient_flavor_map = {}
-        for ingredient_id, ingredient_name in ingredient_map.items():
-            cleaned_name = FlavorGraphProcessor.clean_ingredient_name(ingredient_name)
+        for ingredient_name, cleaned_name in zip(ingredients['name'], ingredients['cleaned_name']):
             if cleaned_name in ingredient_compounds:
                 ingredient_flavor_map[ingredient_name] = {
                     'cleaned_name': cleaned_name,
@@ -275,6 +249,30 @@ class FlavorGraphProcessor:
                 }
         
         return ingredient_flavor_map
+    
+    @staticmethod
+    def read_node_metadata(nodes_path: str) -> Tuple[Set[str], Dict[str, str]]:
+        """
+        Read the FlavorGraph is_hub column
+        
+        For ingredient nodes it flags hubs ('hub' / 'no_hub'); for compound
+        nodes it holds the compound category ('food' / 'drug').
+        
+        Returns:
+            (hub ingredient names, compound name -> category); both empty if
+            the nodes file has no is_hub column
+        """
+        nodes_df = pd.read_csv(nodes_path, dtype={'node_type': 'category'})
+        if 'is_hub' not in nodes_df.columns:
+            return set(), {}
+        node_type = nodes_df['node_type'].astype(str).str.lower()
+        is_hub = nodes_df['is_hub'].astype(str).str.lower()
+        names = nodes_df['name'].astype(str)
+        
+        hub_ingredients = set(names[((node_type == 'ingredient') & (is_hub == 'hub')).to_numpy()])
+        compounds = ((node_type == 'compound') & nodes_df['is_hub'].notna()).to_numpy()
+        compound_categories = dict(zip(names[compounds], is_hub[compounds]))
+        return hub_ingredients, compound_categories
 
 
 class FlavorBridge:
@@ -301,89 +299,466 @@ class FlavorBridge:
     }
     
     @staticmethod
-    def create_flavor_bridge(wines: List[Dict[str, Any]], 
-                            ingredient_flavor_map: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """
-        Tag wines with flavor compounds based on their grapes
-        """
-        # Create a lookup for ingredient names (cleaned)
+    def build_compound_lookup(ingredient_flavor_map: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Create a lookup from cleaned ingredient name to compounds"""
         cleaned_to_compounds = {}
         for ingredient_name, data in ingredient_flavor_map.items():
             cleaned_name = data['cleaned_name']
             if cleaned_name not in cleaned_to_compounds:
                 cleaned_to_compounds[cleaned_name] = []
             cleaned_to_compounds[cleaned_name].extend(data['compounds'])
+        return cleaned_to_compounds
+    
+    @staticmethod
+    def derive_grape_compounds(grape: str, cleaned_to_compounds: Dict[str, List[str]]) -> List[str]:
+        """
+        Derive the flavor compounds contributed by a single grape variety
+        Returns unique compounds in derivation order
+        """
+        flavor_compounds = []
+        grape_lower = grape.lower().strip()
+        
+        # Try direct match with grape name
+        grape_cleaned = FlavorGraphProcessor.clean_ingredient_name(grape)
+        if grape_cleaned in cleaned_to_compounds:
+            flavor_compounds.extend(cleaned_to_compounds[grape_cleaned])
         
+        # Try grape flavor mappings
+        for grape_key, flavor_terms in FlavorBridge.GRAPE_FLAVOR_MAPPINGS.items():
+            if grape_key in grape_lower:
+                # Search for these flavor terms in ingredient map
+                for flavor_term in flavor_terms:
+                    flavor_cleaned = FlavorGraphProcessor.clean_ingredient_name(flavor_term)
+                    if flavor_cleaned in cleaned_to_compounds:
+                        flavor_compounds.extend(cleaned_to_compounds[flavor_cleaned])
+        
+        return list(dict.fromkeys(flavor_compounds))
+    
+    @staticmethod
+    def bridge_wine(wine: Dict[str, Any], grape_compounds: Dict[str, List[str]]) -> Dict[str, Any]:
+        """Tag a single wine using precomputed grape -> compounds derivations"""
+        flavor_compounds = []
+        for grape in wine.get('grapes', []):
+            flavor_compounds.extend(grape_compounds.get(grape, []))
+        
+        # Remove duplicates while preserving order
+        wine['flavor_compounds'] = list(dict.fromkeys(flavor_compounds))
+        return wine
+    
+    @staticmethod
+    def create_flavor_bridge(wines: List[Dict[str, Any]], 
+                            ingredient_flavor_map: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Tag wines with flavor compounds based on their grapes
+        """
+        cleaned_to_compounds = FlavorBridge.build_compound_lookup(ingredient_flavor_map)
+        
+        # Each distinct grape is derived once and shared by every wine using it
+        grape_compounds = {}
         for wine in wines:
-            flavor_compounds = []
-            grapes = wine.get('grapes', [])
-            
-            for grape in grapes:
-                grape_lower = grape.lower().strip()
-                
-                # Try direct match with grape name
-                grape_cleaned = FlavorGraphProcessor.clean_ingredient_name(grape)
-                if grape_cleaned in cleaned_to_compounds:
-                    flavor_compounds.extend(cleaned_to_compounds[grape_cleaned])
-                
-                # Try grape flavor mappings
-                for grape_key, flavor_terms in FlavorBridge.GRAPE_FLAVOR_MAPPINGS.items():
-                    if grape_key in grape_lower:
-                        # Search for these flavor terms in ingredient map
-                        for flavor_term in flavor_terms:
-                            flavor_cleaned = FlavorGraphProcessor.clean_ingredient_name(flavor_term)
-                            if flavor_cleaned in cleaned_to_compounds:
-                                flavor_compounds.extend(cleaned_to_compounds[flavor_cleaned])
-            
-            # Remove duplicates while preserving order
-            wine['flavor_compounds'] = list(dict.fromkeys(flavor_compounds))
+            for grape in wine.get('grapes', []):
+                if grape not in grape_compounds:
+                    grape_compounds[grape] = FlavorBridge.derive_grape_compounds(grape, cleaned_to_compounds)
+        
+        for wine in wines:
+            FlavorBridge.bridge_wine(wine, grape_compounds)
         
         return wines
 
 
+class BuildManifest:
+    """
+    Records content hashes of the last knowledge-base build so later runs can
+    reprocess only what changed
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.data = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self.data = {}
+        if self.data.get('version') != BuildManifest.VERSION:
+            self.data = {}
+    
+    @property
+    def is_empty(self) -> bool:
+        return not self.data
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+    
+    def save(self, **fields):
+        """Replace the manifest contents and write it to disk"""
+        self.data = {'version': BuildManifest.VERSION, **fields}
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def file_hash(*paths: Path) -> str:
+        """SHA-256 over the raw bytes of one or more files"""
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def content_hash(obj: Any) -> str:
+        """SHA-256 over a canonical JSON encoding of obj"""
+        encoded = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def row_hashes(df: pd.DataFrame) -> List[str]:
+        """SHA-1 per CSV row over its raw field values"""
+        return [
+            hashlib.sha1('\x1f'.join(map(str, row)).encode('utf-8')).hexdigest()
+            for row in df.itertuples(index=False, name=None)
+        ]
+
+
+class KnowledgeBaseBuilder:
+    """
+    Builds processed_wines.json and ingredient_flavor_map.json, incrementally
+    where possible
+    
+    A full build processes every source. An incremental build reuses the
+    previous outputs and only reprocesses wine rows whose content hash changed
+    (or which are new), plus wines whose grape -> compound derivation changed
+    because the ingredient map changed. Every wine row is reprocessed when the
+    wine processing code or its mapping tables changed (wine_processing_hash).
+    Changes to the FlavorGraph processing code itself need a --full build.
+    """
+    
+    def __init__(self, datasets_dir: Path = Path("Datasets"), output_dir: Path = Path("processed_data")):
+        self.datasets_dir = Path(datasets_dir)
+        self.output_dir = Path(output_dir)
+        self.wines_csv_path = self.datasets_dir / "XWines_Slim_1K_wines.csv"
+        self.nodes_path = self.datasets_dir / "nodes_191120.csv"
+        self.edges_path = self.datasets_dir / "edges_191120.csv"
+        self.pairing_ratings_path = self.datasets_dir / "wine_food_pairings.csv"
+        self.wines_output_path = self.output_dir / "processed_wines.json"
+        self.ingredient_output_path = self.output_dir / "ingredient_flavor_map.json"
+        self.snapshot_dir = self.output_dir / "kb_snapshot"
+        self.pairing_priors_path = self.output_dir / "pairing_priors.json"
+        self.compound_stats_path = self.output_dir / "compound_stats.json"
+        self.manifest = BuildManifest(self.output_dir / "build_manifest.json")
+        self.timings = {}
+        self.graph_hash = None
+        self.ingredient_map_rebuilt = False
+    
+    def _timed(self, step: str, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        self.timings[step] = time.perf_counter() - start
+        return result
+    
+    @staticmethod
+    def _load_json(path: Path) -> Any:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    @staticmethod
+    def _save_json(obj: Any, path: Path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+    
+    @staticmethod
+    def wine_processing_hash() -> str:
+        """
+        Hash of the code-side inputs of wine processing: the normalisation and
+        grape flavor mapping tables plus the source of the functions applying them
+        """
+        functions = (
+            WineProcessor.normalize_type, WineProcessor.normalize_body, WineProcessor.normalize_acidity,
+            WineProcessor.parse_grapes, WineProcessor.process_row,
+            FlavorBridge.derive_grape_compounds, FlavorBridge.bridge_wine,
+        )
+        return BuildManifest.content_hash({
+            'type_mapping': WineProcessor.TYPE_MAPPING,
+            'body_mapping': WineProcessor.BODY_MAPPING,
+            'acidity_mapping': WineProcessor.ACIDITY_MAPPING,
+            'grape_flavor_mappings': FlavorBridge.GRAPE_FLAVOR_MAPPINGS,
+            'functions': [inspect.getsource(function) for function in functions],
+        })
+    
+    def _can_build_incrementally(self) -> bool:
+        return (
+            not self.manifest.is_empty
+            and self.wines_output_path.exists()
+            and self.ingredient_output_path.exists()
+        )
+    
+    def _build_ingredient_map(self, incremental: bool) -> Dict[str, Any]:
+        """Reuse the existing ingredient map unless the FlavorGraph sources changed"""
+        sources_present = self.nodes_path.exists() and self.edges_path.exists()
+        graph_hash = BuildManifest.file_hash(self.nodes_path, self.edges_path) if sources_present else None
+        
+        if incremental:
+            if graph_hash is None:
+                print("  FlavorGraph sources not found, reusing existing ingredient map")
+                self.graph_hash = self.manifest.get('flavor_graph_hash')
+                self.ingredient_map_rebuilt = False
+                return self._load_json(self.ingredient_output_path)
+            if graph_hash == self.manifest.get('flavor_graph_hash'):
+                print("  FlavorGraph unchanged, reusing existing ingredient map")
+                self.graph_hash = graph_hash
+                self.ingredient_map_rebuilt = False
+                return self._load_json(self.ingredient_output_path)
+        
+        self.graph_hash = graph_hash
+        self.ingredient_map_rebuilt = True
+        return FlavorGraphProcessor.process_flavor_graph(self.nodes_path, self.edges_path)
+    
+    def build(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Build the knowledge base
+        
+        Args:
+            full: Force a clean rebuild of every output
+        
+        Returns:
+            Build statistics including per-step timings
+        """
+        self.output_dir.mkdir(exist_ok=True)
+        self.timings = {}
+        build_start = time.perf_counter()
+        
+        incremental = not full and self._can_build_incrementally()
+        mode = "incremental" if incremental else "full"
+        print(f"Build mode: {mode}")
+        
+        print("\nStep 1: Processing FlavorGraph dataset...")
+        ingredient_flavor_map = self._timed('flavor_graph', self._build_ingredient_map, incremental)
+        print(f"  Mapped {len(ingredient_flavor_map)} ingredients to compounds")
+        ingredient_map_hash = BuildManifest.content_hash(ingredient_flavor_map)
+        ingredient_map_changed = ingredient_map_hash != self.manifest.get('ingredient_map_hash')
+        processing_hash = self.wine_processing_hash()
+        processing_changed = incremental and processing_hash != self.manifest.get('wine_processing_hash')
+        if processing_changed:
+            print("  Wine processing code or mappings changed, reprocessing every wine row")
+        
+        print("\nStep 2: Processing XWines dataset...")
+        step_start = time.perf_counter()
+        df = pd.read_csv(self.wines_csv_path)
+        row_keys = [
+            str(int(wine_id)) if pd.notna(wine_id) else f"row:{i}"
+            for i, wine_id in enumerate(df['WineID'])
+        ]
+        row_hashes = dict(zip(row_keys, BuildManifest.row_hashes(df)))
+        
+        previous_rows = self.manifest.get('wine_rows', {}) if incremental else {}
+        previous_wines = {}
+        previous_order = []
+        if incremental:
+            for wine in self._load_json(self.wines_output_path):
+                key = str(wine.get('wine_id'))
+                previous_wines[key] = wine
+                previous_order.append(wine.get('wine_id'))
+        
+        wines = []
+        changed_keys = set()
+        for position, key in enumerate(row_keys):
+            if not processing_changed and key in previous_wines and previous_rows.get(key) == row_hashes[key]:
+                wines.append(previous_wines[key])
+            else:
+                wines.append(WineProcessor.process_row(df.iloc[position]))
+                changed_keys.add(key)
+        added = sum(1 for key in changed_keys if key not in previous_rows)
+        removed = len(set(previous_rows) - set(row_keys))
+        self.timings['wines'] = time.perf_counter() - step_start
+        print(f"  {len(wines)} wines: {len(changed_keys) - added} changed, {added} added, "
+              f"{removed} removed, {len(wines) - len(changed_keys)} reused")
+        
+        print("\nStep 3: Creating flavor bridge...")
+        step_start = time.perf_counter()
+        cleaned_to_compounds = FlavorBridge.build_compound_lookup(ingredient_flavor_map)
+        previous_derivations = self.manifest.get('grape_derivations', {}) if incremental else {}
+        
+        # With an unchanged ingredient map only grapes of reprocessed rows need deriving
+        if ingredient_map_changed or processing_changed or not incremental:
+            bridge_wines = wines
+        else:
+            bridge_wines = [wine for key, wine in zip(row_keys, wines) if key in changed_keys]
+        
+        grape_compounds = {}
+        for wine in bridge_wines:
+            for grape in wine.get('grapes', []):
+                if grape not in grape_compounds:
+                    grape_compounds[grape] = FlavorBridge.derive_grape_compounds(grape, cleaned_to_compounds)
+        
+        grape_derivations = dict(previous_derivations)
+        changed_grapes = set()
+        for grape, compounds in grape_compounds.items():
+            derivation_hash = BuildManifest.content_hash(compounds)
+            if previous_derivations.get(grape) != derivation_hash:
+                changed_grapes.add(grape)
+            grape_derivations[grape] = derivation_hash
+        
+        rebridge_wines = [
+            wine for key, wine in zip(row_keys, wines)
+            if key in changed_keys or any(grape in changed_grapes for grape in wine.get('grapes', []))
+        ]
+        # A reused wine sharing a changed grape also needs its other grapes' compounds
+        for wine in rebridge_wines:
+            for grape in wine.get('grapes', []):
+                if grape not in grape_compounds:
+                    grape_compounds[grape] = FlavorBridge.derive_grape_compounds(grape, cleaned_to_compounds)
+                    grape_derivations[grape] = BuildManifest.content_hash(grape_compounds[grape])
+        for wine in rebridge_wines:
+            FlavorBridge.bridge_wine(wine, grape_compounds)
+        rebridged = len(rebridge_wines)
+        
+        # Drop derivations for grapes no longer used by any wine
+        used_grapes = {grape for wine in wines for grape in wine.get('grapes', [])}
+        grape_derivations = {g: h for g, h in grape_derivations.items() if g in used_grapes}
+        self.timings['flavor_bridge'] = time.perf_counter() - step_start
+        wines_with_compounds = sum(1 for w in wines if w['flavor_compounds'])
+        print(f"  Re-bridged {rebridged} wines ({len(changed_grapes)} grape derivations changed)")
+        print(f"  Tagged {wines_with_compounds} wines with flavor compounds")
+        
+        print("\nStep 4: Saving processed data...")
+        step_start = time.perf_counter()
+        # Reordered CSV rows reorder the output too
+        reordered = previous_order != [wine.get('wine_id') for wine in wines]
+        wines_changed = not incremental or rebridged > 0 or removed > 0 or reordered
+        if wines_changed:
+            self._save_json(wines, self.wines_output_path)
+            print(f"  Saved {len(wines)} wines to {self.wines_output_path}")
+        else:
+            print(f"  {self.wines_output_path} is up to date")
+        
+        if self.ingredient_map_rebuilt:
+            self._save_json(ingredient_flavor_map, self.ingredient_output_path)
+            print(f"  Saved {len(ingredient_flavor_map)} ingredient mappings to {self.ingredient_output_path}")
+        else:
+            print(f"  {self.ingredient_output_path} is up to date")
+        self.timings['save'] = time.perf_counter() - step_start
+        
+        print("\nStep 5: Writing binary snapshot...")
+        step_start = time.perf_counter()
+        snapshot_fresh = KnowledgeBaseSnapshot.is_fresh(
+            self.snapshot_dir, self.wines_output_path, self.ingredient_output_path
+        )
+        if wines_changed or self.ingredient_map_rebuilt or not snapshot_fresh:
+            write_snapshot(wines, ingredient_flavor_map, self.snapshot_dir,
+                           self.wines_output_path, self.ingredient_output_path)
+            print(f"  Wrote memory-mapped snapshot to {self.snapshot_dir}")
+        else:
+            print(f"  {self.snapshot_dir} is up to date")
+        self.timings['snapshot'] = time.perf_counter() - step_start
+        
+        print("\nStep 6: Compiling pairing priors...")
+        step_start = time.perf_counter()
+        if self.pairing_ratings_path.exists():
+            # Imported here: the core package pulls in the whole pipeline
+            from core.pairing_priors import PairingPriors
+            ratings_hash = BuildManifest.file_hash(self.pairing_ratings_path)
+            previous_hash = None
+            if not full and self.pairing_priors_path.exists():
+                previous_hash = self._load_json(self.pairing_priors_path).get('source_hash')
+            if previous_hash != ratings_hash:
+                priors = PairingPriors.compile(self.pairing_ratings_path)
+                priors.save(self.pairing_priors_path)
+                print(f"  Compiled {len(priors.wine_keys)} wine keys x {len(priors.food_categories)} food categories "
+                      f"/ {len(priors.cuisines)} cuisines to {self.pairing_priors_path}")
+            else:
+                print(f"  {self.pairing_priors_path} is up to date")
+        else:
+            print(f"  {self.pairing_ratings_path} not found, skipping")
+        self.timings['pairing_priors'] = time.perf_counter() - step_start
+        
+        print("\nStep 7: Computing compound statistics...")
+        step_start = time.perf_counter()
+        stats_hash = BuildManifest.file_hash(self.wines_output_path, self.ingredient_output_path, self.nodes_path)
+        previous_hash = None
+        if not full and self.compound_stats_path.exists():
+            previous_hash = self._load_json(self.compound_stats_path).get('source_hash')
+        if previous_hash != stats_hash:
+            from core.compound_stats import CompoundStats
+            hub_ingredients, compound_categories = FlavorGraphProcessor.read_node_metadata(self.nodes_path)
+            compound_stats = CompoundStats.compile(
+                ingredient_flavor_map, wines,
+                hub_ingredients=hub_ingredients or None,
+                compound_categories=compound_categories,
+                source_hash=stats_hash
+            )
+            compound_stats.save(self.compound_stats_path)
+            print(f"  Counted {len(compound_stats.wine_counts)} wine compounds; "
+                  f"{len(compound_stats.pruned_compounds())} are hub or high-frequency compounds "
+                  f"({self.compound_stats_path})")
+        else:
+            print(f"  {self.compound_stats_path} is up to date")
+        self.timings['compound_stats'] = time.perf_counter() - step_start
+        
+        total = time.perf_counter() - build_start
+        self.timings['total'] = total
+        
+        last_full_seconds = total if mode == "full" else self.manifest.get('last_full_build_seconds')
+        self.manifest.save(
+            flavor_graph_hash=self.graph_hash,
+            ingredient_map_hash=ingredient_map_hash,
+            wine_processing_hash=processing_hash,
+            wines_csv_hash=BuildManifest.file_hash(self.wines_csv_path),
+            wine_rows=row_hashes,
+            grape_derivations=grape_derivations,
+            last_build={'mode': mode, 'seconds': round(total, 4), 'timestamp': time.time()},
+            last_full_build_seconds=round(last_full_seconds, 4) if last_full_seconds is not None else None
+        )
+        
+        return {
+            'mode': mode,
+            'wines': len(wines),
+            'changed_rows': len(changed_keys),
+            'added_rows': added,
+            'removed_rows': removed,
+            'rebridged_wines': rebridged,
+            'changed_grapes': len(changed_grapes),
+            'ingredient_map_rebuilt': self.ingredient_map_rebuilt,
+            'timings': dict(self.timings),
+            'last_full_build_seconds': last_full_seconds,
+            'wines_output_path': self.wines_output_path,
+            'ingredient_output_path': self.ingredient_output_path,
+            'snapshot_dir': self.snapshot_dir,
+            'pairing_priors_path': self.pairing_priors_path,
+            'compound_stats_path': self.compound_stats_path,
+        }
+
+
 def main():
     """Main processing function"""
-    # Define paths
-    datasets_dir = Path("Datasets")
-    output_dir = Path("processed_data")
-    
-    # Create output directory
-    output_dir.mkdir(exist_ok=True)
-    
-    print("Step 1: Processing XWines dataset...")
-    wines = WineProcessor.process_wines(datasets_dir / "XWines_Slim_1K_wines.csv")
-    print(f"  Processed {len(wines)} wines")
-    
-    print("\nStep 2: Processing FlavorGraph dataset...")
-    ingredient_flavor_map = FlavorGraphProcessor.process_flavor_graph(
-        datasets_dir / "nodes_191120.csv",
-        datasets_dir / "edges_191120.csv"
-    )
-    print(f"  Mapped {len(ingredient_flavor_map)} ingredients to compounds")
-    
-    print("\nStep 3: Creating flavor bridge...")
-    wines = FlavorBridge.create_flavor_bridge(wines, ingredient_flavor_map)
-    wines_with_compounds = sum(1 for w in wines if w['flavor_compounds'])
-    print(f"  Tagged {wines_with_compounds} wines with flavor compounds")
-    
-    print("\nStep 4: Saving processed data...")
-    
-    # Save processed wines
-    wines_output_path = output_dir / "processed_wines.json"
-    with open(wines_output_path, 'w', encoding='utf-8') as f:
-        json.dump(wines, f, indent=2, ensure_ascii=False)
-    print(f"  Saved {len(wines)} wines to {wines_output_path}")
-    
-    # Save ingredient flavor map
-    ingredient_output_path = output_dir / "ingredient_flavor_map.json"
-    with open(ingredient_output_path, 'w', encoding='utf-8') as f:
-        json.dump(ingredient_flavor_map, f, indent=2, ensure_ascii=False)
-    print(f"  Saved {len(ingredient_flavor_map)} ingredient mappings to {ingredient_output_path}")
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build the wine pairing knowledge base")
+    parser.add_argument("--full", action="store_true",
+                        help="Force a clean rebuild instead of an incremental one")
+    args = parser.parse_args()
+    
+    builder = KnowledgeBaseBuilder(Path("Datasets"), Path("processed_data"))
+    stats = builder.build(full=args.full)
     
     print("\nProcessing complete!")
+    print(f"\nBuild timings ({stats['mode']}):")
+    for step, seconds in stats['timings'].items():
+        print(f"  {step:<15} {seconds:8.3f}s")
+    if stats['mode'] == "incremental" and stats['last_full_build_seconds']:
+        full_seconds = stats['last_full_build_seconds']
+        speedup = full_seconds / stats['timings']['total'] if stats['timings']['total'] > 0 else 0.0
+        print(f"  Last full build took {full_seconds:.3f}s ({speedup:.1f}x slower than this run)")
+    
     print(f"\nOutput files:")
-    print(f"  - {wines_output_path}")
-    print(f"  - {ingredient_output_path}")
+    print(f"  - {stats['wines_output_path']}")
+    print(f"  - {stats['ingredient_output_path']}")
+    print(f"  - {stats['snapshot_dir']}/ (memory-mapped snapshot)")
+    print(f"  - {stats['pairing_priors_path']}")
+    print(f"  - {stats['compound_stats_path']}")
     print(f"\nPairingLogic class is available for reference in processing.py")
 
 
@@ -0,0 +1,96 @@
+"""
+Tests for compact API payloads: projection, cursor pagination and compression
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import web_ui.server as server
+from utils.payloads import paginate, project_wine
+
+
+def _wines(count):
+    return [
+        {
+            "wine_id": i,
+            "wine_name": f"Wine {i}",
+            "type_name": "Red",
+            "flavor_compounds": [f"compound_{j}" for j in range(50)],
+        }
+        for i in range(count)
+    ]
+
+
+def test_project_wine_drops_compounds():
+    wine = _wines(1)[0]
+
+    assert project_wine(wine, ["wine_id", "flavor_compounds"], include_compounds=False) == {
+        "wine_id": 0,
+        "flavor_compound_count": 50,
+    }
+    assert project_wine(wine) == wine
+
+
+def test_cursor_pagination_walks_every_item_once():
+    items = list(range(25))
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(items, cursor, limit=10)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    assert seen == items
+
+
+def test_stale_cursor_is_rejected():
+    _, cursor = paginate(list(range(25)), limit=10)
+
+    with pytest.raises(ValueError):
+        paginate(list(range(30)), cursor, limit=10)
+
+
+async def _fetch_wines(session_id):
+    transport = httpx.ASGITransport(app=server.app)
+    headers = {"X-Session-ID": session_id}
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver", headers=headers) as client:
+        full = await client.get("/api/wines", headers={"Accept-Encoding": "gzip"})
+        first = await client.get("/api/wines", params={"limit": 100, "include_compounds": "false", "fields": "wine_id,wine_name"})
+        second = await client.get("/api/wines", params={"limit": 100, "cursor": first.json()["next_cursor"]})
+        return full, first, second
+
+
+class WinesApp:
+    def __init__(self):
+        self.wines = _wines(150)
+        self.similar_pairs = []
+        self.wine_rankings = []
+
+    def new_session(self):
+        return WinesApp()
+
+    def session_state(self):
+        return {"wines": self.wines}
+
+
+def test_wine_list_is_paged_projected_and_compressed():
+    original_app = server.culinary_app
+    server.culinary_app = WinesApp()
+    try:
+        full, first, second = asyncio.run(_fetch_wines("payload-test-session"))
+    finally:
+        server.culinary_app = original_app
+        server.session_store.delete("payload-test-session")
+
+    # Large payloads are gzip-compressed and report their uncompressed size
+    assert full.headers["content-encoding"] == "gzip"
+    assert int(full.headers["x-payload-bytes"]) > int(full.headers["content-length"])
+    assert float(full.headers["x-serialize-ms"]) >= 0
+    assert len(full.json()["wines"]) == 150
+
+    assert first.json()["wine_count"] == 150
+    assert first.json()["wines"][0] == {"wine_id": 0, "wine_name": "Wine 0"}
+    assert [w["wine_id"] for w in second.json()["wines"]] == list(range(100, 150))
+    assert second.json()["next_cursor"] is None
@@ -0,0 +1,61 @@
+"""
+Tests for the compound document-frequency stats and the pruned scoring vocabulary
+"""
+
+from benchmarks.synthetic import make_wine
+from core.compound_stats import CompoundStats, load_compound_stats
+from core.knowledge_base import KnowledgeBase
+from core.scoring import DishFeatures, ScoringEngine, WineFeatures
+from utils.kb_snapshot import KnowledgeBaseSnapshot, write_snapshot
+
+# "a" is in every wine, "b" in every ingredient; "c" and "d" are rare
+WINES = [make_wine(wine_id, flavor_compounds=compounds)
+         for wine_id, compounds in enumerate([["a", "b", "c"], ["a", "c"], ["a", "d", "d"], ["a"]], start=1)]
+INGREDIENT_MAP = {"beef": {"cleaned_name": "beef", "compounds": ["b", "c"]},
+                  "lime": {"cleaned_name": "lime", "compounds": ["b", "d"]},
+                  "sage": {"cleaned_name": "sage", "compounds": ["b", "e"]}}
+
+
+def test_document_frequencies_and_pruned_vocabulary(tmp_path):
+    stats = CompoundStats.compile(INGREDIENT_MAP, WINES, hub_ingredients=["beef", "lime"],
+                                  compound_categories={"b": "food", "d": "drug", "zz": "food"})
+
+    assert (stats.ingredient_total, stats.hub_total, stats.wine_total) == (3, 2, 4)
+    assert stats.ingredient_counts == {"b": 3, "c": 1, "d": 1, "e": 1}
+    assert stats.hub_counts == {"b": 2, "c": 1, "d": 1}
+    # Repeated compounds in one wine count once
+    assert stats.wine_counts == {"a": 4, "b": 1, "c": 2, "d": 1}
+    assert stats.categories == {"b": "food", "d": "drug"}
+
+    assert stats.hub_compounds(0.75) == ["b"]
+    assert stats.pruned_compounds(hub_share=0.75, wine_share=0.75) == {"a", "b"}
+    assert stats.pruned_compounds(hub_share=None, wine_share=0.5) == {"a", "c"}
+    assert stats.pruned_compounds(hub_share=None, wine_share=None) == frozenset()
+
+    stats.source_hash = "abc"
+    stats.save(tmp_path / "compound_stats.json")
+    loaded = load_compound_stats(tmp_path / "compound_stats.json")
+    assert loaded.to_dict() == stats.to_dict() and loaded.source_hash == "abc"
+    # Without a compiled file the stats come from the given data (every mapped ingredient is a hub)
+    assert load_compound_stats(tmp_path / "missing.json", INGREDIENT_MAP, WINES).hub_total == 3
+
+
+def test_pruned_features_drop_compounds_on_list_and_snapshot(tmp_path):
+    write_snapshot(WINES, INGREDIENT_MAP, out_dir=tmp_path / "snapshot",
+                   wines_path=tmp_path / "wines.json", ingredient_map_path=tmp_path / "map.json")
+    dish = {"compounds": ["a", "c", "d"], "ingredients": []}
+    results = []
+    for wines in (WINES, KnowledgeBaseSnapshot(tmp_path / "snapshot").wines()):
+        features = WineFeatures.from_wines(wines, excluded={"a"})
+        results.append(ScoringEngine({"compounds": 1.0}).score(DishFeatures.from_dishes([dish], features), features))
+
+    for scores in results:
+        # "a" no longer counts for the dish or any wine: Wine 4 drops out
+        assert scores.shared_counts[0].tolist() == [1, 1, 1, 0]
+        assert scores.signals["compounds"][0].tolist() == [0.5, 0.5, 0.5, 0.0]
+        assert scores.ranked(0) == [0, 1, 2]
+
+    knowledge_base = KnowledgeBase.from_data(WINES, INGREDIENT_MAP, prune_compounds=True)
+    assert knowledge_base.pruned_compounds == knowledge_base.compound_stats.pruned_compounds()
+    assert "a" in knowledge_base.pruned_compounds
+    assert KnowledgeBase.from_data(WINES, INGREDIENT_MAP).pruned_compounds == frozenset()
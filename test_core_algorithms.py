@@ -0,0 +1,47 @@
+"""
+Tests for the core algorithm microbenchmarks and synthetic generators
+"""
+
+import pytest
+
+from benchmarks.core_algorithms import CASES, compare_to_baseline, run_benchmarks
+from benchmarks.synthetic import CompoundSampler, default_sampler, make_wines
+from core.knowledge_base import KnowledgeBase
+
+
+def test_wines_draw_compounds_from_real_vocabulary():
+    sampler = default_sampler()
+    wines = make_wines(50, seed=3, compounds_per_wine=40, sampler=sampler)
+
+    vocabulary = set(sampler.names)
+    assert all(set(wine["flavor_compounds"]) <= vocabulary for wine in wines)
+    assert all(len(set(wine["flavor_compounds"])) == len(wine["flavor_compounds"]) for wine in wines)
+    assert make_wines(50, seed=3, compounds_per_wine=40, sampler=sampler) == wines
+    # Frequent compounds dominate, as in the real data
+    first = sum(sampler.names[0] in wine["flavor_compounds"] for wine in wines)
+    last = sum(sampler.names[-1] in wine["flavor_compounds"] for wine in wines)
+    assert first > last
+
+
+def test_knowledge_base_from_data_reads_nothing_from_disk():
+    wines = make_wines(5, sampler=CompoundSampler.synthetic(100))
+    knowledge_base = KnowledgeBase.from_data(wines)
+
+    assert knowledge_base.get_wine_by_id(wines[2]["wine_id"]) is wines[2]
+    assert knowledge_base.ingredient_flavor_map == {}
+
+
+def test_every_case_runs_and_reports_json_results():
+    report = run_benchmarks(sizes=[20, 40], max_quadratic_size=20, dishes=3, verbose=False)
+
+    by_key = {(entry["case"], entry["size"]): entry for entry in report["results"]}
+    for name, (_, quadratic) in CASES.items():
+        assert (name, 20) in by_key
+        assert ((name, 40) in by_key) != quadratic
+    assert all(entry["median_s"] >= entry["min_s"] > 0 for entry in report["results"])
+
+    assert compare_to_baseline(report["results"], report) == []
+    faster = {"results": [dict(entry, median_s=entry["median_s"] / 10) for entry in report["results"]]}
+    assert len(compare_to_baseline(report["results"], faster)) == len(report["results"])
+    with pytest.raises(ValueError):
+        run_benchmarks(sizes=[10], cases=["nope"], verbose=False)
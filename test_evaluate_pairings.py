@@ -0,0 +1,60 @@
+"""
+Tests for the pairing quality evaluation harness
+"""
+
+import csv
+import math
+
+from benchmarks.evaluate_pairings import ENGINES, rated_wine_types, run_evaluation, score_ranking
+from benchmarks.synthetic import make_wine
+from core.knowledge_base import KnowledgeBase
+
+
+def test_catalog_wines_map_onto_rated_wine_types():
+    assert rated_wine_types(make_wine(1, type_name="Red", grapes=["Cabernet Sauvignon", "Merlot"])) == ["Cabernet Sauvignon", "Merlot"]
+    assert rated_wine_types(make_wine(2, type_name="Sparkling", grapes=["Chardonnay"], region="Champagne Grand Cru 'Bouzy'")) == ["Champagne"]
+    assert rated_wine_types(make_wine(3, "Vidal Icewine", "Dessert", grapes=["Vidal"])) == ["Ice Wine"]
+    assert rated_wine_types(make_wine(4, type_name="Rosé", grapes=["Zinfandel"])) == ["Provence Rosé", "White Zinfandel"]
+    assert rated_wine_types(make_wine(5, type_name="White", grapes=["Assyrtiko"])) == []
+
+
+def test_score_ranking_grades_against_the_ideal_order():
+    gains = {1: 3.0, 2: 2.0, 3: 1.0}
+    assert score_ranking([1, 2, 3], gains, {1, 2}, k=2) == {"ndcg": 1.0, "recall": 1.0, "judged": 1.0}
+    scored = score_ranking([9, 3], gains, {1, 2}, k=2)
+    assert math.isclose(scored["ndcg"], (1.0 / math.log2(3)) / (3.0 + 2.0 / math.log2(3)))
+    assert scored["recall"] == 0.0 and scored["judged"] == 0.5
+
+
+def test_run_evaluation_scores_every_engine(tmp_path):
+    ingredient_map = {"beef": {"cleaned_name": "beef", "compounds": ["a", "b", "c"]},
+                      "lemon": {"cleaned_name": "lemon", "compounds": ["x", "y"]}}
+    wines = [
+        make_wine(1, type_name="Red", grapes=["Malbec"], flavor_compounds=["a", "b", "c"], harmonize=["Beef"]),
+        make_wine(2, type_name="White", grapes=["Sauvignon Blanc"], flavor_compounds=["x", "y", "a"]),
+        make_wine(3, type_name="Red", grapes=["Pinot Noir"], flavor_compounds=["a"]),
+        make_wine(4, type_name="White", grapes=["Assyrtiko"], flavor_compounds=["b", "x"]),
+    ]
+    ratings = tmp_path / "ratings.csv"
+    with open(ratings, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["wine_type", "wine_category", "food_item", "food_category", "cuisine",
+                         "pairing_quality", "quality_label", "description"])
+        for wine_type, food_item, quality in [("Malbec", "grilled ribeye", 5), ("Malbec", "grilled ribeye", 4),
+                                              ("Sauvignon Blanc", "grilled ribeye", 2), ("Pinot Noir", "grilled ribeye", 3),
+                                              ("Sauvignon Blanc", "grilled salmon", 5), ("Malbec", "grilled salmon", 1),
+                                              ("Malbec", "unmapped dish", 3)]:
+            writer.writerow([wine_type, "", food_item, "Red Meat", "French", quality, "", ""])
+
+    report = run_evaluation(ks=[1, 3], knowledge_base=KnowledgeBase.from_data(wines, ingredient_map),
+                            ratings_path=ratings)
+
+    # grilled salmon keeps only lemon (no salmon, dill or butter in this map); the unmapped dish is skipped
+    assert report["catalog"] == {"wines": 4, "judged_wines": 3, "queries": 2, "food_items": 3}
+    assert list(report["engines"]) == list(ENGINES)
+    for result in report["engines"].values():
+        assert 0.0 <= result["@3"]["ndcg"] <= 1.0
+        assert result["latency_ms"]["p95"] >= result["latency_ms"]["p50"] >= 0
+        assert [entry["food_item"] for entry in result["per_query"]] == ["grilled ribeye", "grilled salmon"]
+    # Compound overlap puts the Malbec first for the steak and the Sauvignon Blanc first for the salmon
+    assert report["engines"]["compound_search"]["@1"]["ndcg"] == 1.0
@@ -0,0 +1,120 @@
+"""
+Tests for file parsers reading paths, bytes and in-memory uploads
+"""
+
+import asyncio
+import io
+
+import httpx
+import pandas as pd
+import pytest
+
+import web_ui.server as server
+from utils.file_parsers import (
+    SpooledUpload,
+    detect_file_type,
+    extract_text_from_pdf,
+    parse_csv_wine_list,
+    parse_xlsx_wine_list,
+)
+
+
+CSV_CONTENT = (
+    "wine_id,wine_name,type_name,grapes\n"
+    "1,Chablis Premier Cru,White,\"['Chardonnay']\"\n"
+    "2,Barolo,Red,Nebbiolo\n"
+).encode("utf-8")
+
+
+def _minimal_pdf(text):
+    """Build a one-page PDF showing text"""
+    stream = f"BT /F1 24 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(stream)).encode() + b" >>\nstream\n" + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+def _spooled(filename, content):
+    upload = SpooledUpload(filename, max_size=1024 * 1024)
+    upload.write(content)
+    upload.seek(0)
+    return upload
+
+
+def test_csv_from_path_bytes_and_upload_match(tmp_path):
+    path = tmp_path / "wines.csv"
+    path.write_bytes(CSV_CONTENT)
+    upload = _spooled("wines.csv", CSV_CONTENT)
+
+    from_path = parse_csv_wine_list(str(path))
+    assert parse_csv_wine_list(CSV_CONTENT) == from_path
+    assert parse_csv_wine_list(upload) == from_path
+    assert from_path[0]["grapes"] == ["Chardonnay"]
+    assert from_path[1]["wine_id"] == 2
+    # The caller's file object stays open for reuse
+    assert not upload.closed
+
+
+def test_xlsx_from_bytes():
+    buffer = io.BytesIO()
+    pd.DataFrame([{"Wine_Name": "Sancerre", "Type_Name": "White"}]).to_excel(buffer, index=False)
+
+    wines = parse_xlsx_wine_list(buffer.getvalue())
+    assert wines == [{"wine_name": "Sancerre", "type_name": "White"}]
+
+
+def test_pdf_text_from_upload():
+    pytest.importorskip("pdfplumber")
+    upload = _spooled("menu.pdf", _minimal_pdf("Oysters Mignonette"))
+
+    assert "Oysters Mignonette" in extract_text_from_pdf(upload)
+
+
+def test_detect_file_type_from_name_or_content():
+    assert detect_file_type("menu.TXT") == "txt"
+    assert detect_file_type(_spooled("photo.jpeg", b"\xff\xd8\xff")) == "jpg"
+    assert detect_file_type(_minimal_pdf("x")) == "pdf"
+    assert detect_file_type(b'[{"wine_name": "Barolo"}]') == "json"
+    assert detect_file_type(b"plain words") == "unknown"
+
+
+def test_missing_path_raises():
+    with pytest.raises(FileNotFoundError):
+        parse_csv_wine_list("does/not/exist.csv")
+
+
+def test_oversized_uploads_are_rejected():
+    async def post_uploads():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            too_big = b"x" * (server.MAX_FILE_SIZE + 1)
+            file_response = await client.post(
+                "/api/process-menu", files={"files": ("menu.txt", too_big, "text/plain")}
+            )
+            request_response = await client.post(
+                "/api/process-menu",
+                content=b"",
+                headers={"content-length": str(server.MAX_REQUEST_SIZE + 1)}
+            )
+            return file_response, request_response
+
+    file_response, request_response = asyncio.run(post_uploads())
+    assert file_response.status_code == 400
+    assert "exceeds maximum size" in file_response.json()["detail"]
+    # Rejected from Content-Length alone, before the body is parsed
+    assert request_response.status_code == 413
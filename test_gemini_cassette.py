@@ -0,0 +1,75 @@
+"""
+Tests for Gemini record/replay cassettes
+"""
+
+import io
+import json
+
+import pytest
+
+from benchmarks.workflow import run_workflow_benchmark
+from utils.fake_gemini import FakeGeminiClient, LatencyModel, use_fake_gemini
+from utils.gemini_cassette import CassetteMissError, RecordedError, record_gemini, replay_gemini
+from utils.gemini_client import create_client, generate_content, upload_file
+
+
+class FlakyModels:
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, **kwargs):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return FakeGeminiClient().respond(kwargs["contents"])
+
+
+def test_replay_serves_recorded_calls_in_order(tmp_path):
+    cassette = tmp_path / "calls.jsonl"
+    prompt = "Wine: Chateau Test. Type: Red"
+    with use_fake_gemini(FakeGeminiClient(seed=1)) as fake:
+        fake.models = FlakyModels()
+        with record_gemini(cassette):
+            client = create_client("key")
+            with pytest.raises(RuntimeError):
+                generate_content(client, "wine_enrichment", model="m", contents=prompt)
+            recorded = generate_content(client, "wine_enrichment", model="m", contents=prompt).text
+            uploaded = upload_file(client, io.BytesIO(b"%PDF menu"), "application/pdf")
+            menu = generate_content(client, "menu_extraction", model="m", contents=["Extract", uploaded]).text
+
+    lines = [json.loads(line) for line in cassette.read_text(encoding="utf-8").splitlines()]
+    assert [line["call_site"] for line in lines] == ["wine_enrichment", "wine_enrichment", "menu_extraction"]
+    assert "error" in lines[0] and lines[1]["latency_s"] >= 0 and lines[1]["response"]["usage"]["output_tokens"] > 0
+    assert lines[2]["contents"][1].startswith("file:")
+
+    waits = []
+    with replay_gemini(cassette, reproduce_latency=True) as replay:
+        replay.sleep = waits.append
+        client = create_client("key")
+        with pytest.raises(RecordedError, match="429"):
+            generate_content(client, "wine_enrichment", model="m", contents=prompt)
+        assert generate_content(client, "wine_enrichment", model="m", contents=prompt).text == recorded
+        # Exhausted: the last recorded response repeats
+        assert generate_content(client, "wine_enrichment", model="m", contents=prompt).text == recorded
+        uploaded = upload_file(client, b"%PDF menu", "application/pdf")
+        assert generate_content(client, "menu_extraction", model="m", contents=["Extract", uploaded]).text == menu
+        with pytest.raises(CassetteMissError):
+            generate_content(client, "wine_enrichment", model="other", contents=prompt)
+    assert replay.calls == {"wine_enrichment": 3, "menu_extraction": 1} and replay.misses == 1
+    assert len(waits) == 4
+
+
+def test_workflow_replays_a_recorded_run_offline(tmp_path):
+    cassette = tmp_path / "workflow.jsonl"
+    options = dict(kb_wines=30, list_wines=4, unknown_wines=1, dishes=3, unknown_ingredients=1)
+    with use_fake_gemini(FakeGeminiClient(latency=LatencyModel(median_ms=20))):
+        recorded = run_workflow_benchmark(record=str(cassette), **options)
+
+    replayed = run_workflow_benchmark(replay=str(cassette), **options)
+    fast = run_workflow_benchmark(replay=str(cassette), replay_latency=False, **options)
+
+    assert recorded["success"] and replayed["success"] and fast["success"]
+    assert replayed["cassette_misses"] == 0
+    assert replayed["llm_calls"] == recorded["llm_calls"] == fast["llm_calls"]
+    assert replayed["stages"]["report"]["llm_wait_ms"] >= 20 * recorded["llm_calls"]["report_explanation"] * 0.5
+    assert fast["total"]["llm_wait_ms"] < replayed["total"]["llm_wait_ms"]
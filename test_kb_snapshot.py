@@ -0,0 +1,84 @@
+"""
+Tests for the binary knowledge-base snapshot, its JSON fallback and shared ingredient map updates
+"""
+
+import json
+
+import pytest
+
+from core.knowledge_base import KnowledgeBase
+from utils.kb_snapshot import load_ingredient_flavor_map, load_processed_wines, write_snapshot
+
+WINES = [
+    {"wine_id": 1, "wine_name": "Bold Cabernet", "type": 4, "type_name": "Red", "body": 5,
+     "body_name": "Very full-bodied", "acidity": 3, "acidity_name": "Medium", "grapes": ["Cabernet Sauvignon"],
+     "abv": 14.5, "country": "Testland", "region": "North", "winery": "Hill", "harmonize": ["Beef", "Lamb"],
+     "flavor_compounds": ["a", "b"]},
+    {"wine_id": None, "wine_name": "Unknown", "type": 3, "type_name": "Unknown", "body": 3,
+     "body_name": "Unknown", "acidity": 3, "acidity_name": "Unknown", "grapes": [], "abv": None,
+     "country": "Unknown", "region": "Unknown", "winery": "Unknown", "harmonize": [], "flavor_compounds": []},
+]
+INGREDIENT_MAP = {"beef": {"cleaned_name": "beef", "compounds": ["b", "c"]},
+                  "Lime!": {"cleaned_name": "lime", "compounds": []}}
+
+
+def _write_sources(tmp_path, wines, ingredient_map):
+    paths = tmp_path / "wines.json", tmp_path / "map.json"
+    for path, data in zip(paths, (wines, ingredient_map)):
+        path.write_text(json.dumps(data), encoding="utf-8")
+    return paths
+
+
+def test_snapshot_views_equal_the_json(tmp_path):
+    wines_path, map_path = _write_sources(tmp_path, WINES, INGREDIENT_MAP)
+    write_snapshot(WINES, INGREDIENT_MAP, tmp_path / "snapshot", wines_path, map_path)
+    # Remove the JSON: the loaders must read the snapshot
+    wines_path.unlink()
+    map_path.unlink()
+
+    wines = load_processed_wines(wines_path, tmp_path / "snapshot", map_path)
+    ingredient_flavor_map = load_ingredient_flavor_map(map_path, tmp_path / "snapshot", wines_path)
+
+    assert type(wines).__name__ == "SnapshotWineList"
+    assert list(wines) == WINES
+    assert {name: dict(entry) for name, entry in ingredient_flavor_map.items()} == INGREDIENT_MAP
+
+
+def test_edited_source_makes_the_loaders_fall_back_to_json(tmp_path):
+    wines_path, map_path = _write_sources(tmp_path, WINES, INGREDIENT_MAP)
+    write_snapshot(WINES, INGREDIENT_MAP, tmp_path / "snapshot", wines_path, map_path)
+
+    edited = [dict(WINES[0], wine_name="Bolder Cabernet")]
+    _write_sources(tmp_path, edited, dict(INGREDIENT_MAP, sage={"cleaned_name": "sage", "compounds": ["d"]}))
+
+    assert load_processed_wines(wines_path, tmp_path / "snapshot", map_path) == edited
+    assert "sage" in load_ingredient_flavor_map(map_path, tmp_path / "snapshot", wines_path)
+
+    # Editing only the other source also makes the snapshot stale
+    write_snapshot(WINES, INGREDIENT_MAP, tmp_path / "snapshot", wines_path, map_path)
+    map_path.write_text(json.dumps({}), encoding="utf-8")
+    assert load_processed_wines(wines_path, tmp_path / "snapshot", map_path) == edited
+
+
+@pytest.mark.parametrize("from_snapshot", [False, True])
+def test_added_ingredients_never_mutate_a_map_being_read(tmp_path, from_snapshot):
+    wines_path, map_path = _write_sources(tmp_path, WINES, INGREDIENT_MAP)
+    if from_snapshot:
+        write_snapshot(WINES, INGREDIENT_MAP, tmp_path / "snapshot", wines_path, map_path)
+    knowledge_base = KnowledgeBase(wines_path, map_path, tmp_path / "snapshot")
+    assert knowledge_base.find_ingredient_by_cleaned_name("lime") == "Lime!"
+
+    # Another session enriching the map while this one iterates it
+    seen = []
+    for name, data in knowledge_base.ingredient_flavor_map.items():
+        seen.append(name)
+        knowledge_base.add_ingredient(f"{name} extra", f"{data['cleaned_name']} extra", ["z"])
+
+    assert seen == list(INGREDIENT_MAP)
+    assert len(knowledge_base.ingredient_flavor_map) == 4
+    assert knowledge_base.find_ingredient_by_cleaned_name("lime extra") == "Lime! extra"
+
+    assert knowledge_base.save_ingredient_flavor_map()
+    saved = json.loads(map_path.read_text(encoding="utf-8"))
+    assert saved["beef extra"] == {"cleaned_name": "beef extra", "compounds": ["z"]}
+    assert saved["beef"] == INGREDIENT_MAP["beef"]
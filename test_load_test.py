@@ -0,0 +1,31 @@
+"""
+Tests for the offline HTTP load test
+"""
+
+import web_ui.server as server
+from benchmarks.load_test import ENDPOINTS, percentile, run_load_test
+
+
+def test_percentile_interpolates_between_ranks():
+    assert percentile([], 50) is None
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile(list(range(101)), 95) == 95
+
+
+def test_load_test_drives_every_endpoint_per_restaurant():
+    saved = (server.culinary_app, server.app.state.llm_executor, server.app.state.cpu_executor)
+    report = run_load_test(restaurants=3, iterations=2, dishes=2, unknown_ingredients=1,
+                           list_wines=4, unknown_wines=1, kb_wines=30, latency_ms=1, sigma=0, llm_workers=4)
+
+    assert (server.culinary_app, server.app.state.llm_executor, server.app.state.cpu_executor) == saved
+    assert "loadtest-0-00000" not in server.session_store
+    assert report["workflows_completed"] == 6 and report["workflows_failed"] == 0
+    assert list(report["endpoints"]) == ENDPOINTS
+    for entry in report["endpoints"].values():
+        assert entry["requests"] == 6 and entry["errors"] == 0
+        assert 0 < entry["p50_ms"] <= entry["p95_ms"] <= entry["p99_ms"] <= entry["max_ms"]
+    # Unknown ingredients are enriched once; unknown wines on every run
+    assert report["llm_calls"]["menu_extraction"] == 6
+    assert report["llm_calls"]["ingredient_compounds"] == 3
+    assert report["llm_calls"]["wine_enrichment"] == 6
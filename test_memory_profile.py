@@ -0,0 +1,43 @@
+"""
+Tests for the synthetic catalog and the per-stage memory profile
+"""
+
+import json
+import os
+
+from benchmarks.memory_profile import compare_to_baseline, profile_workflow
+from benchmarks.synthetic import write_catalog
+
+
+def test_synthetic_catalog_matches_data_formats(tmp_path):
+    paths = write_catalog(tmp_path, wine_count=20, dish_count=3, list_wine_count=5, unknown_wine_count=2)
+
+    wines = json.loads(paths["wines"].read_text(encoding="utf-8"))
+    assert len(wines) == 20
+    assert {"wine_id", "wine_name", "type_name", "grapes", "flavor_compounds"} <= set(wines[0])
+    menu = json.loads(paths["menu_profile"].read_text(encoding="utf-8"))
+    assert all(dish["compounds"] and dish["ingredients"] for dish in menu.values())
+    wine_list = json.loads(paths["wine_list"].read_text(encoding="utf-8"))
+    assert len(wine_list) == 7
+    assert not paths["snapshot_dir"].exists()
+    # Same seed, same catalog
+    again = write_catalog(tmp_path / "again", wine_count=20, dish_count=3, list_wine_count=5, unknown_wine_count=2)
+    assert again["wines"].read_bytes() == paths["wines"].read_bytes()
+
+
+def test_profile_reports_every_stage_offline():
+    key = os.environ.get("GOOGLE_AI_API_KEY")
+    profile = profile_workflow(kb_wines=30, list_wines=10, dishes=3, top=3)
+
+    assert os.environ.get("GOOGLE_AI_API_KEY") == key
+    stages = {stage["stage"]: stage for stage in profile["stages"]}
+    assert list(stages) == ["process_menu", "load_wines", "analyze_wine_similarity",
+                            "pair_wines_to_dishes", "rank_wines", "generate_reports"]
+    load = stages["load_wines"]
+    assert load["peak_bytes"] >= load["net_bytes"] > 0
+    assert any("json/decoder.py" in site["site"] for site in load["top_sites"])
+    assert not any("benchmarks/" in site["site"] for stage in stages.values() for site in stage["top_sites"])
+
+    assert compare_to_baseline(profile["stages"], profile) == []
+    shrunk = {"stages": [dict(stage, peak_bytes=1) for stage in profile["stages"]]}
+    assert any(message.startswith("load_wines") for message in compare_to_baseline(profile["stages"], shrunk))
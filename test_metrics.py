@@ -0,0 +1,62 @@
+"""
+Tests for pipeline metrics and the /metrics endpoint
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import web_ui.server as server
+from utils.fake_gemini import FakeGeminiClient
+from utils.gemini_client import generate_content
+from utils.metrics import MetricsRegistry, format_summary_table, registry, timed_stage
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 2.0):
+        latency.observe(value, stage="pairing")
+
+    text = metrics.render_prometheus()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{stage="pairing",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="pairing",le="1"} 3' in text
+    assert 'test_seconds_bucket{stage="pairing",le="+Inf"} 4' in text
+    assert 'test_seconds_count{stage="pairing"} 4' in text
+    assert 0.1 <= latency.quantile(0.5, stage="pairing") <= 1.0
+
+
+def test_stage_and_llm_metrics_are_recorded():
+    registry.reset()
+
+    @timed_stage("ranking")
+    def rank(items):
+        return sorted(items)
+
+    rank([3, 1, 2])
+    with pytest.raises(RuntimeError):
+        generate_content(FakeGeminiClient(error=RuntimeError("429 RESOURCE_EXHAUSTED")), "wine_enrichment",
+                         model="m", contents="x")
+
+    assert registry.get("culinary_stage_items").series()[("ranking",)].sum == 3
+    assert registry.get("culinary_llm_rate_limited_total").value(call_site="wine_enrichment") == 1
+    summary = format_summary_table()
+    assert "ranking" in summary
+    assert "llm:wine_enrichment (rate_limited)" in summary
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    registry.reset()
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            await client.get("/api/session")
+            return await client.get("/metrics")
+
+    response = asyncio.run(fetch())
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'culinary_http_request_seconds_count{method="GET",route="/api/session",status="200"} 1' in response.text
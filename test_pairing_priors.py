@@ -0,0 +1,94 @@
+"""
+Tests for the rated-pairing priors and the no-LLM sommelier finalizer
+"""
+
+import csv
+
+import pytest
+
+from benchmarks.synthetic import make_wine
+from core.knowledge_base import KnowledgeBase
+from core.pairing_priors import PairingPriors, dish_cuisine, dish_food_categories, load_pairing_priors
+from wine_sommelier import WineSommelier
+
+RATINGS = [
+    # wine_type, wine_category, food_item, food_category, cuisine, pairing_quality
+    ("Malbec", "Red", "grilled ribeye", "Red Meat", "Argentinian", 5),
+    ("Malbec", "Red", "grilled ribeye", "Red Meat", "French", 4),
+    ("Malbec", "Red", "oysters", "Seafood", "French", 1),
+    ("Sauvignon Blanc", "White", "oysters", "Seafood", "French", 5),
+    ("Sauvignon Blanc", "White", "grilled ribeye", "Red Meat", "Argentinian", 2),
+    ("Champagne", "Sparkling", "oysters", "Seafood", "French", 4),
+]
+
+
+def _write_ratings(path):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["wine_type", "wine_category", "food_item", "food_category", "cuisine",
+                         "pairing_quality", "quality_label", "description"])
+        for row in RATINGS:
+            writer.writerow([*row, "", ""])
+    return path
+
+
+def test_compiled_tables_round_trip_and_fill_missing_cells(tmp_path):
+    priors = PairingPriors.compile(_write_ratings(tmp_path / "ratings.csv"))
+
+    assert priors.wine_keys == ["Champagne", "Malbec", "Sauvignon Blanc", "Red", "Sparkling", "White"]
+    assert priors.food_categories == ["Red Meat", "Seafood"]
+    table = dict(zip(priors.food_categories, priors.category_quality[priors.wine_keys.index("Malbec")]))
+    assert table == {"Red Meat": 4.5, "Seafood": 1.0}
+    # Champagne has no Red Meat rating: the cell takes its row mean
+    assert priors.category_quality[priors.wine_keys.index("Champagne")].tolist() == [4.0, 4.0]
+
+    priors.save(tmp_path / "priors.json")
+    loaded = load_pairing_priors(tmp_path / "priors.json", tmp_path / "missing.csv")
+    assert loaded.wine_keys == priors.wine_keys and loaded.source_hash == priors.source_hash
+    assert (loaded.cuisine_quality == priors.cuisine_quality).all()
+    with pytest.raises(FileNotFoundError):
+        load_pairing_priors(tmp_path / "missing.json", tmp_path / "missing.csv")
+
+    # Priors compiled from an older ratings file are recompiled from the current one
+    assert load_pairing_priors(tmp_path / "priors.json", tmp_path / "ratings.csv").source_hash == priors.source_hash
+    with open(tmp_path / "ratings.csv", 'a', encoding='utf-8', newline='') as f:
+        csv.writer(f).writerow(["Champagne", "Sparkling", "ribeye", "Red Meat", "French", 1, "", ""])
+    stale = load_pairing_priors(tmp_path / "priors.json", tmp_path / "ratings.csv")
+    assert stale.source_hash != priors.source_hash
+    assert stale.category_quality[stale.wine_keys.index("Champagne")].tolist() == [1.0, 4.0]
+
+
+def test_dishes_map_onto_food_categories_and_cuisines():
+    assert dish_food_categories(["beef", "blue_cheese"], ["Smoky"], "Grilled steaks") == {
+        "Red Meat": 2, "Cheese": 1, "Smoky BBQ": 1}
+    assert dish_food_categories(["hamburger bun"], []) == {"Red Meat": 1}
+    assert dish_cuisine("Argentinian asado with chimichurri") == "Argentinian"
+    assert dish_cuisine("Roast chicken") is None
+
+
+def test_priors_rerank_candidates_without_an_llm_call(tmp_path, monkeypatch):
+    monkeypatch.delenv("GOOGLE_AI_API_KEY", raising=False)
+    priors = PairingPriors.compile(_write_ratings(tmp_path / "ratings.csv"))
+    wines = [
+        make_wine(1, "Big Malbec", "Red", grapes=["Malbec"], flavor_compounds=["a", "b", "c"]),
+        make_wine(2, "Loire Sauvignon", "White", grapes=["Sauvignon Blanc"], flavor_compounds=["a", "b"]),
+        make_wine(3, "Grower Champagne", "Sparkling", grapes=["Chardonnay"], flavor_compounds=["a"],
+                  region="Champagne"),
+        make_wine(4, "Assyrtiko", "White", grapes=["Assyrtiko"], flavor_compounds=["a"]),
+    ]
+    ingredient_map = {"oyster": {"cleaned_name": "oyster", "compounds": ["a", "b", "c"]},
+                      "lemon": {"cleaned_name": "lemon", "compounds": ["b"]}}
+    sommelier = WineSommelier(knowledge_base=KnowledgeBase.from_data(wines, ingredient_map, pairing_priors=priors))
+
+    assert sommelier._match_ingredients_locally("Oysters on ice, lemon wedge") == ["oyster", "lemon"]
+    result = sommelier.recommend(dish_description="Oysters on ice, lemon wedge", finalizer="priors")
+
+    # Compound overlap alone would lead with the Malbec; the seafood ratings put it last.
+    # The unrated Assyrtiko falls back to the White category row.
+    assert result["top_matches"] == [2, 4, 3]
+    assert result["finalizer"] == "priors" and result["prior_quality"][2] == 5.0
+    assert [wine["wine_id"] for wine in result["wine_details"]] == [2, 4, 3]
+    assert "Seafood" in result["culinary_reasoning"] and "Loire Sauvignon" in result["scientific_reasoning"]
+    assert sommelier._client is None
+    with pytest.raises(ValueError):
+        sommelier.recommend(ingredients=["oyster"], finalizer="coin_flip")
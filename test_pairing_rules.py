@@ -0,0 +1,139 @@
+"""
+Tests for the sommelier pairing rules and the rules finalizer / LLM fallback
+"""
+
+import threading
+
+import pytest
+
+from benchmarks.synthetic import make_wine
+from core.knowledge_base import KnowledgeBase
+from core.wine_manager import WineManager
+from core.pairing_rules import (
+    WineRuleColumns,
+    dish_attribute_matrix,
+    dish_attributes,
+    rank_by_rules,
+    rule_score,
+    rule_score_matrix,
+    wine_profile,
+)
+from utils.fake_gemini import FakeGeminiClient, LatencyModel
+from utils.kb_snapshot import KnowledgeBaseSnapshot, write_snapshot
+from wine_sommelier import WineSommelier
+
+WINES = [
+    make_wine(1, "Bold Cabernet", "Red", "Very full-bodied", "Medium", ["a", "b", "c"]),
+    make_wine(2, "Crisp Riesling", "White", "Light-bodied", "High", ["a", "b"]),
+    make_wine(3, "Moscato d'Asti", "Sparkling", "Light-bodied", "Medium", ["a"]),
+    make_wine(4, "Tawny Port", "Dessert/Port", "Very full-bodied", "Medium", ["c"]),
+]
+INGREDIENT_MAP = {"chili": {"cleaned_name": "chili", "compounds": ["a", "b", "c"]},
+                  "lime": {"cleaned_name": "lime", "compounds": ["b"]}}
+
+
+def _sommelier(**kwargs):
+    return WineSommelier(knowledge_base=KnowledgeBase.from_data(WINES, INGREDIENT_MAP), **kwargs)
+
+
+def test_wine_profiles_and_dish_attributes():
+    assert wine_profile(WINES[0]) == {"body": 5, "acidity": 3, "tannin": 5, "sweetness": 1}
+    assert wine_profile(WINES[2])["sweetness"] == 3 and wine_profile(WINES[3])["sweetness"] == 5
+    assert dish_attributes(["chili", "lime"], ["Spicy", "Light"]) == {
+        "spice": 5, "acidity": 4, "richness": 2, "sweetness": 1}
+    assert dish_attributes(["beef", "cream"], ["Rich"])["richness"] == 5
+
+    candidates = [{"wine": wine, "shared_compounds": [], "match_count": 0} for wine in WINES]
+    ranked = rank_by_rules(candidates, ["chili", "lime"], ["Spicy", "Light"])
+    # The tannic Cabernet clashes with the heat; the light, high-acid Riesling fits best
+    assert [match["wine"]["wine_id"] for match in ranked] == [2, 3, 4, 1]
+    assert ranked[0]["rule_hits"] == ["acid_congruence", "body_richness_match"]
+    assert ranked[-1]["rule_hits"] == ["tannin_spice_conflict", "acid_congruence"]
+
+
+def test_rule_matrix_matches_the_per_pair_rules(tmp_path):
+    dishes = [
+        {"name": "Chili lime prawns", "ingredients": ["chili", "lime"], "tags": ["Spicy"]},
+        {"name": "Beef stew", "ingredients": ["beef", "cream"], "tags": ["Rich", "Heavy"]},
+        {"name": "Chocolate tart", "ingredients": ["chocolate"], "tags": ["Sweet"]},
+    ]
+    # A wine-list entry without the catalog integers falls back to the *_name fields
+    wines = WINES + [{"wine_id": 5, "wine_name": "House Red", "type_name": "Red", "body_name": "Full-bodied"}]
+
+    scores = rule_score_matrix(WineRuleColumns.from_wines(wines), dish_attribute_matrix(dishes))
+
+    assert scores.shape == (3, 5) and scores.dtype == "float32"
+    for i, dish in enumerate(dishes):
+        attributes = dish_attributes(dish["ingredients"], dish["tags"], dish["name"])
+        assert scores[i].tolist() == [rule_score(wine, attributes)[0] for wine in wines]
+
+    write_snapshot(WINES, INGREDIENT_MAP, out_dir=tmp_path / "snapshot",
+                   wines_path=tmp_path / "wines.json", ingredient_map_path=tmp_path / "map.json")
+    from_snapshot = WineRuleColumns.from_wines(KnowledgeBaseSnapshot(tmp_path / "snapshot").wines())
+    from_list = WineRuleColumns.from_wines(WINES)
+    for column in ("wine_ids", "type", "body", "acidity", "tannin", "sweetness"):
+        assert getattr(from_snapshot, column).tolist() == getattr(from_list, column).tolist()
+
+
+def test_uploaded_wine_list_labels_map_onto_the_scales():
+    # Uploads keep their own 'type'/'body'/'acidity' columns as strings next to the *_name fields
+    manager = WineManager(knowledge_base=KnowledgeBase.from_data(WINES, INGREDIENT_MAP))
+    uploaded = [manager.normalize_wine_format(wine) for wine in (
+        {"id": 5, "name": "House Red", "type": "red", "body": "Full-bodied", "acidity": "High"},
+        {"id": 6, "name": "House Dessert", "Type": "Dessert", "body": "Unknown", "acidity": "", "sweetness": "Sweet"},
+    )]
+    assert uploaded[0]["type"] == "red" and uploaded[0]["type_name"] == "red"
+
+    assert wine_profile(uploaded[0]) == {"body": 4, "acidity": 4, "tannin": 4, "sweetness": 1}
+    assert wine_profile(uploaded[1]) == {"body": 3, "acidity": 3, "tannin": 3, "sweetness": 5}
+    columns = WineRuleColumns.from_wines(WINES + uploaded)
+    assert columns.type.tolist()[-2:] == [4, 5] and columns.body.tolist()[-2:] == [4, 3]
+
+    candidates = [{"wine": wine, "shared_compounds": [], "match_count": 0} for wine in uploaded]
+    ranked = rank_by_rules(candidates, ["chili", "lime"], ["Spicy"])
+    assert [match["wine"]["wine_id"] for match in ranked] == [6, 5]
+
+
+def test_rules_finalizer_makes_no_llm_call(monkeypatch):
+    # No API key is needed until the Gemini client is used
+    monkeypatch.delenv("GOOGLE_AI_API_KEY", raising=False)
+    sommelier = _sommelier()
+
+    result = sommelier.recommend(dish_description="Chili lime prawns", tags=["Spicy"], finalizer="rules")
+
+    assert result["finalizer"] == "rules" and result["top_matches"] == [2, 3, 4]
+    assert result["rule_scores"][2] == 2.5
+    assert "Crisp Riesling: its acidity (4/5) matches the dish's" in result["culinary_reasoning"]
+    assert sommelier._client is None
+    with pytest.raises(RuntimeError, match="API key not found"):
+        sommelier.recommend(dish_description="Chili lime prawns", finalizer="llm")
+
+
+def test_llm_finalize_falls_back_when_rate_limited_or_slow():
+    sommelier = _sommelier()
+    sommelier._client = FakeGeminiClient(error=RuntimeError("429 RESOURCE_EXHAUSTED"))
+    result = sommelier.recommend(ingredients=["chili", "lime"], tags=["Spicy"])
+    assert result["finalizer"] == "rules" and result["fallback_reason"] == "rate limited"
+    assert result["top_matches"] == [2, 3, 4]
+
+    release = threading.Event()
+    sommelier = _sommelier(fallback_finalizer="rules", finalize_timeout=0.05)
+    # The fake call waits on the event (up to its 5s latency)
+    sommelier._client = FakeGeminiClient(latency=LatencyModel(median_ms=5000), sleep=release.wait)
+    try:
+        result = sommelier.recommend(ingredients=["chili", "lime"], tags=["Spicy"])
+    finally:
+        release.set()
+    assert result["fallback_reason"] == "timeout after 0.05s"
+
+    # Other errors, or no fallback configured, still surface
+    sommelier = _sommelier(fallback_finalizer=None)
+    sommelier._client = FakeGeminiClient(error=RuntimeError("429 RESOURCE_EXHAUSTED"))
+    with pytest.raises(RuntimeError):
+        sommelier.recommend(ingredients=["chili", "lime"])
+    sommelier = _sommelier()
+    sommelier._client = FakeGeminiClient(error=RuntimeError("500 internal"))
+    with pytest.raises(RuntimeError):
+        sommelier.recommend(ingredients=["chili", "lime"])
+    with pytest.raises(ValueError):
+        _sommelier(fallback_finalizer="llm")
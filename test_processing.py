@@ -0,0 +1,147 @@
+"""
+Tests for the FlavorGraph join and the incremental knowledge-base build (it must match a full build)
+"""
+
+import json
+import shutil
+
+import pandas as pd
+import pytest
+
+from processing import FlavorBridge, FlavorGraphProcessor, KnowledgeBaseBuilder
+
+INGREDIENTS = ["plum", "cherry", "chocolate", "blackberry", "pepper", "spice", "apple", "butter", "vanilla", "earth"]
+WINE_COLUMNS = ["WineID", "WineName", "Type", "Grapes", "Harmonize", "ABV", "Body", "Acidity",
+                "Country", "RegionName", "WineryName"]
+
+
+def _wine_row(wine_id, name, wine_type, grapes):
+    return [wine_id, name, wine_type, str(grapes), "['Beef']", 13.0, "Full-bodied", "Medium",
+            "Testland", "Test Valley", "Test Winery"]
+
+
+WINE_ROWS = [
+    _wine_row(1, "Merlot One", "Red", ["Merlot"]),
+    _wine_row(2, "Merlot Syrah Blend", "Red", ["Merlot", "Syrah"]),
+    _wine_row(3, "Syrah Three", "Red", ["Syrah"]),
+    _wine_row(4, "Chardonnay Four", "White", ["Chardonnay"]),
+    _wine_row(5, "Pinot Merlot", "Red", ["Pinot Noir", "Merlot"]),
+]
+
+
+def _write_datasets(datasets_dir, wine_rows):
+    datasets_dir.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(wine_rows, columns=WINE_COLUMNS).to_csv(datasets_dir / "XWines_Slim_1K_wines.csv", index=False)
+    nodes = [(i, name, "ingredient", "hub") for i, name in enumerate(INGREDIENTS)]
+    compound_ids = range(len(INGREDIENTS), 2 * len(INGREDIENTS) + 3)
+    nodes += [(node_id, f"compound_{node_id}", "compound", "food") for node_id in compound_ids]
+    pd.DataFrame(nodes, columns=["node_id", "name", "node_type", "is_hub"]).to_csv(
+        datasets_dir / "nodes_191120.csv", index=False)
+    # Each ingredient links to its own compound and the next two, so grapes overlap
+    edges = [(i, compound_ids[i + k], "ingr-fcomp") for i in range(len(INGREDIENTS)) for k in range(3)]
+    pd.DataFrame(edges, columns=["id_1", "id_2", "edge_type"]).to_csv(datasets_dir / "edges_191120.csv", index=False)
+
+
+def _build(datasets_dir, output_dir, full=False):
+    stats = KnowledgeBaseBuilder(datasets_dir, output_dir).build(full=full)
+    with open(output_dir / "processed_wines.json", encoding="utf-8") as f:
+        return stats, json.load(f)
+
+
+def _full_build_of(datasets_dir, tmp_path):
+    shutil.rmtree(tmp_path / "full", ignore_errors=True)
+    return _build(datasets_dir, tmp_path / "full", full=True)[1]
+
+
+@pytest.fixture
+def built(tmp_path):
+    datasets_dir = tmp_path / "Datasets"
+    _write_datasets(datasets_dir, WINE_ROWS)
+    _build(datasets_dir, tmp_path / "out", full=True)
+    return datasets_dir, tmp_path / "out"
+
+
+def test_incremental_row_edit_matches_full_build(built, tmp_path):
+    datasets_dir, output_dir = built
+    rows = [list(row) for row in WINE_ROWS]
+    rows[0] = _wine_row(1, "Merlot One Reserve", "Red", ["Merlot", "Pinot Noir"])
+    _write_datasets(datasets_dir, rows)
+
+    stats, incremental = _build(datasets_dir, output_dir)
+
+    assert stats["mode"] == "incremental" and stats["changed_rows"] == 1
+    assert incremental == _full_build_of(datasets_dir, tmp_path)
+
+
+def test_incremental_row_reorder_matches_full_build(built, tmp_path):
+    datasets_dir, output_dir = built
+    _write_datasets(datasets_dir, WINE_ROWS[::-1])
+
+    stats, incremental = _build(datasets_dir, output_dir)
+
+    assert stats["changed_rows"] == 0
+    assert [wine["wine_id"] for wine in incremental] == [5, 4, 3, 2, 1]
+    assert incremental == _full_build_of(datasets_dir, tmp_path)
+
+
+def test_changed_grape_derivation_rebridges_with_all_grapes(built, tmp_path):
+    datasets_dir, output_dir = built
+    # Pretend the Syrah derivation changed since the last build, then edit the Syrah row
+    manifest_path = output_dir / "build_manifest.json"
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    manifest["grape_derivations"]["Syrah"] = "stale"
+    manifest_path.write_text(json.dumps(manifest), encoding="utf-8")
+    rows = [list(row) for row in WINE_ROWS]
+    rows[2] = _wine_row(3, "Syrah Three Reserve", "Red", ["Syrah"])
+    _write_datasets(datasets_dir, rows)
+
+    stats, incremental = _build(datasets_dir, output_dir)
+
+    # The reused Merlot-Syrah blend is re-bridged and keeps its Merlot compounds
+    assert stats["changed_rows"] == 1 and stats["rebridged_wines"] == 2
+    assert incremental == _full_build_of(datasets_dir, tmp_path)
+
+
+def test_mapping_edit_reprocesses_every_row(built, tmp_path, monkeypatch):
+    datasets_dir, output_dir = built
+    mappings = dict(FlavorBridge.GRAPE_FLAVOR_MAPPINGS, merlot=["plum", "cherry", "chocolate", "earth"])
+    monkeypatch.setattr(FlavorBridge, "GRAPE_FLAVOR_MAPPINGS", mappings)
+
+    stats, incremental = _build(datasets_dir, output_dir)
+
+    assert stats["mode"] == "incremental" and stats["changed_rows"] == len(WINE_ROWS)
+    assert incremental == _full_build_of(datasets_dir, tmp_path)
+
+    rows = [list(row) for row in WINE_ROWS]
+    rows[0] = _wine_row(1, "Merlot One Reserve", "Red", ["Merlot"])
+    _write_datasets(datasets_dir, rows)
+    stats, incremental = _build(datasets_dir, output_dir)
+    assert stats["changed_rows"] == 1
+    assert incremental == _full_build_of(datasets_dir, tmp_path)
+
+
+def test_flavor_graph_join_keeps_edge_order_and_node_zero(tmp_path):
+    nodes = [(0, "Black Pepper!", "ingredient"), (1, "black pepper", "ingredient"), (2, "lime", "ingredient"),
+             (3, "basil", "ingredient"), (4, "piperine", "compound"), (5, "limonene", "compound"),
+             (6, "linalool", "compound")]
+    edges = [
+        (0, 4, "ingr-fcomp"),
+        (5, 2, "ingr-fcomp"),   # compound first: orientation is normalised
+        (0, 6, "ingr-dcomp"),
+        (1, 4, "ingr-fcomp"),   # duplicate of (cleaned name, compound) is dropped
+        (2, 6, "ingr-fcomp"),
+        (3, 6, "ingr-ingr"),    # not an ingredient-compound edge
+        (1, 5, "ingr-fcomp"),
+    ]
+    pd.DataFrame(nodes, columns=["node_id", "name", "node_type"]).to_csv(tmp_path / "nodes.csv", index=False)
+    pd.DataFrame(edges, columns=["id_1", "id_2", "edge_type"]).to_csv(tmp_path / "edges.csv", index=False)
+
+    ingredient_flavor_map = FlavorGraphProcessor.process_flavor_graph(tmp_path / "nodes.csv", tmp_path / "edges.csv")
+
+    # Node 0 is kept; names cleaning to the same key share one compound list in edge order
+    pepper = {"cleaned_name": "black pepper", "compounds": ["piperine", "linalool", "limonene"]}
+    assert ingredient_flavor_map == {
+        "Black Pepper!": pepper,
+        "black pepper": pepper,
+        "lime": {"cleaned_name": "lime", "compounds": ["limonene", "linalool"]},
+    }
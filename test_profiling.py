@@ -0,0 +1,68 @@
+"""
+Tests for the sampling profiler, the --profile helper and the debug endpoint
+"""
+
+import asyncio
+import pstats
+import threading
+
+import httpx
+
+import web_ui.server as server
+from utils.metrics import stage_timer
+from utils.profiling import SamplingProfiler, profiled
+
+
+def _busy_pairing(stop):
+    with stage_timer("pairing"):
+        while not stop.is_set():
+            sum(i * i for i in range(1000))
+
+
+def test_samples_are_attributed_to_the_running_stage():
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_pairing, args=(stop,))
+    profiler = SamplingProfiler(interval=0.002)
+    profiler.start()
+    worker.start()
+    try:
+        while profiler.sample_count < 20:
+            stop.wait(0.01)
+    finally:
+        stop.set()
+        worker.join()
+        profiler.stop()
+
+    assert profiler.stage_counts().get("pairing", 0) > 0
+    pairing_stacks = [line for line in profiler.collapsed().splitlines() if line.startswith("stage:pairing;")]
+    assert any("_busy_pairing (test_profiling.py:" in line for line in pairing_stacks)
+    assert "_busy_pairing" in profiler.pstats_text()
+
+
+def test_profiled_writes_cprofile_and_collapsed_files(tmp_path, capsys):
+    with profiled(str(tmp_path), "unit", interval=0.002) as paths:
+        with stage_timer("ranking"):
+            sorted(range(200000), key=lambda i: -i)
+
+    assert pstats.Stats(str(paths["prof"])).total_calls > 0
+    assert "Samples by pipeline stage" in paths["txt"].read_text(encoding="utf-8")
+    assert paths["collapsed"].exists()
+    assert "Profile written" in capsys.readouterr().out
+
+
+def test_debug_profile_requires_admin_token(monkeypatch):
+    async def fetch(headers):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.get("/api/debug/profile", params={"seconds": 0.1}, headers=headers)
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", None)
+    assert asyncio.run(fetch({})).status_code == 403
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "secret-token")
+    assert asyncio.run(fetch({"X-Admin-Token": "wrong"})).status_code == 403
+    response = asyncio.run(fetch({"X-Admin-Token": "secret-token"}))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["samples"] > 0
+    assert "collapsed" in body and "pstats" in body
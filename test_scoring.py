@@ -0,0 +1,124 @@
+"""
+Tests for the hybrid scoring engine and its consumers
+"""
+
+import pytest
+
+from benchmarks.synthetic import make_wine
+from core.knowledge_base import KnowledgeBase
+from core.menu_processor import MenuProcessor
+from core.pairing_engine import PairingEngine
+from core.pairing_rules import dish_attributes, rule_score
+from core.report_generator import ReportGenerator
+from core.scoring import RULE_SCALE, DishFeatures, ScoringEngine, WineFeatures
+from core.wine_ranker import WineRanker
+from core.wine_sommelier_wrapper import WineSommelierWrapper
+from utils.kb_snapshot import KnowledgeBaseSnapshot, write_snapshot
+
+WINES = [
+    make_wine(1, "Bold Cabernet", "Red", "Very full-bodied", "Medium", ["a", "b", "c", "d"],
+              harmonize=["Beef", "Lamb"]),
+    make_wine(2, "Crisp Riesling", "White", "Light-bodied", "High", ["a", "b"], harmonize=["Shellfish"]),
+    make_wine(3, "Oaked Chardonnay", "White", "Full-bodied", "Medium", ["e"], harmonize=["Poultry"]),
+    make_wine(4, "Tawny Port", "Dessert/Port", "Very full-bodied", "Medium", ["c", "c"]),
+]
+INGREDIENT_MAP = {"beef": {"cleaned_name": "beef", "compounds": ["a", "c"]},
+                  "lime": {"cleaned_name": "lime", "compounds": ["b"]}}
+MENU_PROFILE = {
+    "steak": {"name": "Grilled beef steak", "ingredients": ["beef"], "tags": ["Rich"], "compounds": ["a", "c", "x"]},
+    "prawns": {"name": "Lime prawns", "ingredients": ["lime"], "tags": ["Light"], "compounds": ["b"]},
+}
+
+
+def test_signals_and_weighted_score():
+    scores = ScoringEngine().score_wines(list(MENU_PROFILE.values()), WINES, dish_ids=list(MENU_PROFILE))
+
+    steak = scores.dish_index("steak")
+    assert scores.shared_counts[steak].tolist() == [2, 1, 0, 1]
+    # Coverage of the dish's 3 compounds, and overlap over the union (the Port's repeated "c" counts once)
+    assert scores.signals["compounds"][steak].tolist() == pytest.approx([2 / 3, 1 / 3, 0, 1 / 3])
+    assert scores.signals["jaccard"][steak].tolist() == pytest.approx([2 / 5, 1 / 4, 0, 1 / 3])
+    assert scores.signals["harmonize"][steak].tolist() == [1, 0, 0, 0]
+    attributes = dish_attributes(["beef"], ["Rich"], "Grilled beef steak")
+    assert scores.breakdown(steak, 0)["rules"] == pytest.approx(rule_score(WINES[0], attributes)[0] / RULE_SCALE)
+
+    weights = ScoringEngine().weights
+    expected = sum(weights[name] * scores.signals[name][steak] for name in weights)
+    assert scores.score[steak].tolist() == pytest.approx(expected.tolist())
+
+    # Unmatched wines are dropped; "shared_compounds" orders by compound overlap only
+    assert scores.ranked(steak) == [0, 3, 1]
+    assert scores.ranked(steak, limit=1) == [0]
+    assert scores.ranked(scores.dish_index("prawns"), by="shared_compounds") == [0, 1]
+    assert len(scores.ranked(steak, matched_only=False)) == 4
+
+
+def test_weights_are_normalized_and_validated():
+    assert ScoringEngine({"jaccard": 2.0}).weights == {"compounds": 0.0, "jaccard": 1.0, "harmonize": 0.0, "rules": 0.0}
+    scores = ScoringEngine({"jaccard": 1.0}).score_wines([MENU_PROFILE["steak"]], WINES)
+    assert scores.score.tolist() == scores.signals["jaccard"].tolist()
+
+    with pytest.raises(ValueError):
+        ScoringEngine({"tannin": 1.0})
+    with pytest.raises(ValueError):
+        ScoringEngine({"compounds": 0.0})
+
+
+def test_snapshot_features_score_like_list_features(tmp_path):
+    write_snapshot(WINES, INGREDIENT_MAP, out_dir=tmp_path / "snapshot",
+                   wines_path=tmp_path / "wines.json", ingredient_map_path=tmp_path / "map.json")
+    engine = ScoringEngine()
+    results = []
+    for wines in (WINES, KnowledgeBaseSnapshot(tmp_path / "snapshot").wines()):
+        features = WineFeatures.from_wines(wines)
+        results.append(engine.score(DishFeatures.from_menu_profile(MENU_PROFILE, features), features))
+
+    from_list, from_snapshot = results
+    assert from_snapshot.wine_ids.tolist() == from_list.wine_ids.tolist()
+    assert from_snapshot.shared_counts.tolist() == from_list.shared_counts.tolist()
+    for name in from_list.signals:
+        assert from_snapshot.signals[name].tolist() == from_list.signals[name].tolist()
+
+
+def test_pairing_ranking_and_report_read_one_score_matrix():
+    knowledge_base = KnowledgeBase.from_data(WINES, INGREDIENT_MAP)
+    engine = PairingEngine(
+        sommelier=WineSommelierWrapper(api_key="offline", knowledge_base=knowledge_base),
+        menu_processor=MenuProcessor(api_key="offline", knowledge_base=knowledge_base),
+        knowledge_base=knowledge_base
+    )
+
+    pairings = engine.pair_wines_to_dishes(MENU_PROFILE, WINES, max_wines_per_dish=2)
+    scores = engine.score_menu(MENU_PROFILE, WINES)
+
+    assert pairings == {"steak": [1, 4], "prawns": [2, 1]}
+    assert engine.score_menu(MENU_PROFILE, WINES) is scores
+    quality = WineRanker().rank_by_match_quality(pairings, WINES, MENU_PROFILE, pairing_engine=engine)
+    assert quality[4] == pytest.approx(float(scores.score[0, 3]))
+
+    # Empty key: no Gemini client, the report uses its fallback explanations
+    report = ReportGenerator(api_key="").generate_comprehensive_report(
+        pairings, WINES, menu_profile=MENU_PROFILE, pairing_engine=engine)
+    analysis = report["dish_pairings"]["steak"]["wines"][0]["scientific_analysis"]
+    assert analysis["score_breakdown"] == scores.breakdown(0, 0)
+    assert analysis["pairing_score"] == pytest.approx(float(scores.score[0, 0]))
+
+
+def test_interleaved_sessions_keep_their_cached_scores():
+    knowledge_base = KnowledgeBase.from_data(WINES, INGREDIENT_MAP)
+    sommelier = WineSommelierWrapper(api_key="offline", knowledge_base=knowledge_base)
+    engine = PairingEngine(sommelier=sommelier, menu_processor=MenuProcessor(api_key="offline",
+                           knowledge_base=knowledge_base), knowledge_base=knowledge_base)
+    # Two sessions sharing the engine, each with its own menu and wine list
+    menu_b, wines_b = {"prawns": dict(MENU_PROFILE["prawns"])}, WINES[:2]
+
+    scores_a = engine.score_menu(MENU_PROFILE, WINES)
+    features_a = sommelier._features_for(WINES)
+    scores_b = engine.score_menu(menu_b, wines_b)
+    features_b = sommelier._features_for(wines_b)
+
+    assert engine.score_menu(MENU_PROFILE, WINES) is scores_a and sommelier._features_for(WINES) is features_a
+    assert engine.score_menu(menu_b, wines_b) is scores_b and sommelier._features_for(wines_b) is features_b
+    # Editing a session's menu still recomputes its scores
+    menu_b["prawns"]["compounds"] = ["b", "c"]
+    assert engine.score_menu(menu_b, wines_b) is not scores_b
@@ -0,0 +1,100 @@
+"""
+Concurrency test for the web server
+Verifies that a slow pipeline stage does not block other requests
+"""
+
+import asyncio
+import time
+
+import httpx
+
+import web_ui.server as server
+
+
+SLOW_STAGE_SECONDS = 1.5
+
+
+class SlowApp:
+    """Stand-in for CulinaryExpertApp whose menu processing blocks like a long Gemini call"""
+
+    def __init__(self):
+        self.wines = []
+        self.menu_profile = {}
+        self.pairings = {}
+
+    def new_session(self):
+        return SlowApp()
+
+    def session_state(self):
+        return {"menu_profile": self.menu_profile, "wines": self.wines, "pairings": self.pairings}
+
+    def process_menu(self, menu_files=None, extract_wines=True):
+        time.sleep(SLOW_STAGE_SECONDS)
+        return {"menu_profile": {"dish_1": {"dish_name": "Test"}}, "extracted_wines": [], "has_wines": False}
+
+
+async def _run_concurrent_requests():
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        slow_started = time.perf_counter()
+        slow_request = asyncio.create_task(client.post(
+            "/api/process-menu",
+            files={"files": ("menu.txt", b"Grilled salmon with lemon", "text/plain")}
+        ))
+
+        # Let the slow request reach the worker pool
+        await asyncio.sleep(0.2)
+
+        fast_latencies = []
+        for _ in range(5):
+            started = time.perf_counter()
+            response = await client.get("/api/does-not-exist.html")
+            fast_latencies.append(time.perf_counter() - started)
+            assert response.status_code == 404
+        fast_finished_at = time.perf_counter() - slow_started
+        slow_still_running = not slow_request.done()
+
+        slow_response = await slow_request
+        slow_elapsed = time.perf_counter() - slow_started
+        return slow_response, slow_elapsed, fast_latencies, fast_finished_at, slow_still_running
+
+
+def test_slow_stage_does_not_block_other_requests():
+    """Requests served while a menu is processing must not wait for it"""
+    original_app = server.culinary_app
+    server.culinary_app = SlowApp()
+    try:
+        (slow_response, slow_elapsed, fast_latencies,
+         fast_finished_at, slow_still_running) = asyncio.run(_run_concurrent_requests())
+    finally:
+        server.culinary_app = original_app
+
+    print(f"Slow request: {slow_elapsed:.2f}s, fast requests max: {max(fast_latencies) * 1000:.1f}ms")
+
+    assert slow_response.status_code == 200
+    assert slow_response.json()["dish_count"] == 1
+    assert slow_elapsed >= SLOW_STAGE_SECONDS
+    # Every fast request finished while the slow stage was still running
+    assert slow_still_running
+    assert fast_finished_at < SLOW_STAGE_SECONDS
+    assert max(fast_latencies) < 0.5
+
+
+
+def test_app_can_start_again_after_shutdown():
+    """Each lifespan startup gets fresh worker pools (the previous shutdown closed its own)"""
+    async def start_and_run():
+        async with server.lifespan(server.app):
+            return await server.run_llm_stage(sum, [1, 2]), await server.run_cpu_stage(max, [1, 2])
+
+    saved = (server.app.state.llm_executor, server.app.state.cpu_executor)
+    try:
+        assert asyncio.run(start_and_run()) == (3, 2)
+        assert asyncio.run(start_and_run()) == (3, 2)
+    finally:
+        server.app.state.llm_executor, server.app.state.cpu_executor = saved
+
+
+if __name__ == "__main__":
+    test_slow_stage_does_not_block_other_requests()
+    print("✓ Server stays responsive during slow pipeline stages")
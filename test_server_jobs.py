@@ -0,0 +1,91 @@
+"""
+Job API test for the web server
+Verifies that submitted jobs return immediately and stream progress events over SSE
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+import web_ui.server as server
+from core.events import publish, MENU_FILE_EXTRACTED
+
+
+class ProgressApp:
+    """Stand-in for CulinaryExpertApp that publishes per-file progress from the worker pool"""
+
+    def __init__(self, file_count=3):
+        self.file_count = file_count
+        self.wines = []
+        self.menu_profile = {}
+        self.pairings = {}
+
+    def new_session(self):
+        return ProgressApp()
+
+    def session_state(self):
+        return {"menu_profile": self.menu_profile, "wines": self.wines, "pairings": self.pairings}
+
+    def process_menu(self, menu_files=None, extract_wines=True):
+        for i in range(1, self.file_count + 1):
+            time.sleep(0.05)
+            publish(MENU_FILE_EXTRACTED, current=i, total=self.file_count,
+                    message=f"Extracted file {i}/{self.file_count}")
+        return {"menu_profile": {"dish_1": {"dish_name": "Test"}}, "extracted_wines": [], "has_wines": False}
+
+
+def _parse_sse(body):
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+async def _run_job():
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        submitted = await client.post(
+            "/api/jobs/process-menu",
+            files={"files": ("menu.txt", b"Grilled salmon with lemon", "text/plain")}
+        )
+        job_id = submitted.json()["job_id"]
+
+        stream = await client.get(f"/api/jobs/{job_id}/events")
+        job = await client.get(f"/api/jobs/{job_id}")
+
+    # A client without the session cookie cannot read the job
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as other:
+        foreign = [(await other.get(url)).status_code for url in (f"/api/jobs/{job_id}", f"/api/jobs/{job_id}/events")]
+    return submitted, stream, job, foreign
+
+
+def test_job_streams_progress_events():
+    """A menu job returns a job id at once, then streams file progress and its result"""
+    original_app = server.culinary_app
+    server.culinary_app = ProgressApp()
+    try:
+        submitted, stream, job, foreign = asyncio.run(_run_job())
+    finally:
+        server.culinary_app = original_app
+
+    assert submitted.status_code == 202
+    assert submitted.json()["status"] == "pending"
+
+    assert stream.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(stream.text)
+    types = [event["type"] for event in events]
+    assert types[0] == "job.started"
+    assert types[-1] == "job.completed"
+
+    # Events published in the worker pool are attributed to the job
+    progress = [event for event in events if event["type"] == MENU_FILE_EXTRACTED]
+    assert [event["current"] for event in progress] == [1, 2, 3]
+    assert all(event["job_id"] == submitted.json()["job_id"] for event in events)
+
+    assert job.json()["status"] == "succeeded"
+    assert job.json()["result"]["dish_count"] == 1
+    assert foreign == [404, 404]
+
+
+if __name__ == "__main__":
+    test_job_streams_progress_events()
+    print("✓ Jobs stream progress events over SSE")
@@ -0,0 +1,129 @@
+"""
+Tests for the session-keyed state store
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from core.session_store import IdentityCache, SessionStore, estimate_size
+
+
+class State:
+    def __init__(self):
+        self.data = []
+
+
+def _make_store(**kwargs):
+    return SessionStore(factory=State, size_of=lambda state: estimate_size(state.data), **kwargs)
+
+
+def test_sessions_are_isolated():
+    store = _make_store()
+    first = store.get_or_create("restaurant-a")
+    second = store.get_or_create("restaurant-b")
+
+    first.call(first.state.data.append, "salmon")
+
+    assert store.get_or_create("restaurant-a") is first
+    assert first.state.data == ["salmon"]
+    assert second.state.data == []
+
+
+def test_least_recently_used_session_is_evicted():
+    store = _make_store(max_sessions=2)
+    store.get_or_create("session-1")
+    store.get_or_create("session-2")
+    store.get("session-1")  # session-2 is now least recently used
+    store.get_or_create("session-3")
+
+    assert "session-1" in store
+    assert "session-2" not in store
+    assert "session-3" in store
+    assert store.evictions == 1
+
+
+def test_idle_sessions_expire():
+    store = _make_store(ttl_seconds=0.05)
+    store.get_or_create("session-1")
+    time.sleep(0.1)
+
+    assert store.get("session-1") is None
+    assert len(store) == 0
+
+
+def test_memory_cap_evicts_other_sessions():
+    store = _make_store(max_memory_bytes=20_000)
+    old = store.get_or_create("session-old")
+    old.call(old.state.data.extend, [str(i) * 1500 for i in range(8)])
+    new = store.get_or_create("session-new")
+    new.call(new.state.data.extend, [chr(ord("a") + i) * 1500 for i in range(8)])
+
+    # The session just updated is kept; the least recently used one goes
+    assert "session-new" in store
+    assert "session-old" not in store
+    assert store.memory_bytes() <= 20_000
+
+
+def test_identity_cache_is_bounded_and_checks_fingerprints():
+    cache = IdentityCache(max_entries=2)
+    menus = [{"dish": i} for i in range(3)]
+    for i, menu in enumerate(menus[:2]):
+        cache.put((menu,), i, f"scores {i}")
+    assert cache.get((menus[0],), 0) == "scores 0"  # menus[1] is now least recently used
+    cache.put((menus[2],), 2, "scores 2")
+
+    assert len(cache) == 2 and cache.get((menus[1],), 1) is None
+    assert cache.get((menus[0],), 0) == "scores 0"
+    # An equal but distinct object, or a changed fingerprint, misses
+    assert cache.get(({"dish": 0},), 0) is None and cache.get((menus[0],), 5) is None
+
+
+class MenuApp:
+    """Stand-in for CulinaryExpertApp whose menu profile comes from the uploaded file"""
+
+    def __init__(self):
+        self.wines = []
+        self.menu_profile = {}
+        self.pairings = {}
+
+    def new_session(self):
+        return MenuApp()
+
+    def session_state(self):
+        return {"menu_profile": self.menu_profile}
+
+    def process_menu(self, menu_files=None, extract_wines=True):
+        # Uploads arrive as in-memory file objects
+        self.menu_profile = {"dish_1": {"dish_name": menu_files[0].read().decode("utf-8")}}
+        return {"menu_profile": self.menu_profile, "extracted_wines": [], "has_wines": False}
+
+
+async def _two_restaurants(server):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as first, \
+            httpx.AsyncClient(transport=transport, base_url="http://testserver") as second:
+        await first.post("/api/process-menu", files={"files": ("menu.txt", b"Oysters", "text/plain")})
+        await second.post("/api/process-menu", files={"files": ("menu.txt", b"Lamb", "text/plain")})
+        # Neither restaurant has pairings, but each sees only its own menu
+        first_session = (await first.get("/api/session")).json()
+        second_session = (await second.get("/api/session")).json()
+        return first_session, second_session
+
+
+def test_server_keeps_restaurants_apart():
+    import web_ui.server as server
+
+    original_app = server.culinary_app
+    server.culinary_app = MenuApp()
+    try:
+        first_session, second_session = asyncio.run(_two_restaurants(server))
+    finally:
+        server.culinary_app = original_app
+
+    assert first_session["session_id"] != second_session["session_id"]
+    first_state = server.session_store.get(first_session["session_id"]).state
+    second_state = server.session_store.get(second_session["session_id"]).state
+    assert first_state.menu_profile["dish_1"]["dish_name"] == "Oysters"
+    assert second_state.menu_profile["dish_1"]["dish_name"] == "Lamb"
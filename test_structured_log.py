@@ -0,0 +1,53 @@
+"""
+Tests for buffered structured logging
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+
+from utils.structured_log import (
+    configure_logging,
+    get_logger,
+    log_event,
+    run_context,
+    shutdown_logging,
+)
+
+
+def _read_events(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_events_are_sampled_and_tagged_with_run_id(tmp_path):
+    path = tmp_path / "debug.jsonl"
+    logger = get_logger("test")
+    configure_logging("DEBUG", str(path), sample_every={"test.loop": 10})
+    try:
+        with run_context("run-abc"):
+            for i in range(25):
+                log_event(logger, "test.loop", "Loop step", index=i)
+            # The run id follows the context into worker threads
+            ctx = contextvars.copy_context()
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(ctx.run, log_event, logger, "test.done", "Done", total=25).result()
+    finally:
+        shutdown_logging()
+
+    events = _read_events(path)
+    assert [e["data"]["index"] for e in events if e["event"] == "test.loop"] == [0, 10, 20]
+    assert events[-1]["event"] == "test.done"
+    assert events[-1]["data"] == {"total": 25}
+    assert {e["run_id"] for e in events} == {"run-abc"}
+
+
+def test_disabled_level_writes_nothing(tmp_path):
+    path = tmp_path / "debug.jsonl"
+    logger = get_logger("test")
+    configure_logging("INFO", str(path))
+    try:
+        log_event(logger, "test.debug", "Hidden", value=1)
+    finally:
+        shutdown_logging()
+
+    assert path.read_text(encoding="utf-8") == ""
@@ -0,0 +1,90 @@
+"""
+Tests for span tracing and Chrome trace export
+"""
+
+import asyncio
+import contextvars
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+import web_ui.server as server
+
+from utils.fake_gemini import FakeGeminiClient
+from utils.gemini_client import generate_content
+from utils.metrics import timed_stage
+from utils.structured_log import run_context
+from utils.tracing import enable_tracing, export_chrome_trace, span, to_chrome_trace, tracer
+
+
+@pytest.fixture
+def tracing():
+    tracer.clear()
+    enable_tracing()
+    yield tracer
+    enable_tracing(False)
+    tracer.clear()
+
+
+@timed_stage("pairing")
+def _pair(dish_ids):
+    for dish_id in dish_ids:
+        with span("pairing.dish", dish_id=dish_id):
+            generate_content(FakeGeminiClient(), "report_explanation", model="test-model", contents=dish_id)
+    return dish_ids
+
+
+def test_spans_nest_across_worker_threads(tracing, tmp_path):
+    with run_context("run-trace"):
+        ctx = contextvars.copy_context()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(ctx.run, _pair, ["d1", "d2"]).result()
+
+    spans = {s.span_id: s for s in tracing.spans("run-trace")}
+    by_name = {}
+    for s in spans.values():
+        by_name.setdefault(s.name, []).append(s)
+
+    stage = by_name["stage.pairing"][0]
+    assert stage.parent_id is None
+    assert stage.attributes["items"] == 2
+    assert [spans[s.parent_id].name for s in by_name["pairing.dish"]] == ["stage.pairing"] * 2
+    llm = by_name["llm.report_explanation"][0]
+    assert spans[llm.parent_id].name == "pairing.dish"
+    # Token counts come from the response's usage_metadata
+    assert llm.attributes["prompt_tokens"] == 1 and llm.attributes["output_tokens"] > 1
+    assert llm.attributes["total_tokens"] == llm.attributes["prompt_tokens"] + llm.attributes["output_tokens"]
+
+    path = export_chrome_trace("run-trace", str(tmp_path / "trace.json"))
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    complete = [e for e in events if e["ph"] == "X"]
+    assert len(complete) == 5
+    assert all(e["dur"] >= 0 and e["ts"] >= 0 for e in complete)
+    assert {e["args"]["span_id"] for e in complete} == set(spans)
+
+
+def test_disabled_tracing_records_nothing():
+    tracer.clear()
+    with span("ignored") as s:
+        s.set(value=1)
+
+    assert tracer.run_ids() == []
+    with pytest.raises(ValueError):
+        to_chrome_trace("default")
+
+
+def test_trace_endpoints_require_the_admin_token(tracing, monkeypatch):
+    with run_context("run-secret"):
+        with span("pairing.dish", dish_id="steak"):
+            pass
+
+    async def fetch(headers):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", headers=headers) as client:
+            return [(await client.get(url)).status_code for url in ("/api/traces", "/api/traces/run-secret")]
+
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "s3cret")
+    assert asyncio.run(fetch({})) == [403, 403]
+    assert asyncio.run(fetch({"X-Admin-Token": "s3cret"})) == [200, 200]
@@ -0,0 +1,62 @@
+"""
+Tests for the fake Gemini client and the offline workflow benchmark
+"""
+
+import json
+import os
+
+from benchmarks.workflow import run_workflow_benchmark
+from utils.fake_gemini import FakeGeminiClient, LatencyModel, use_fake_gemini
+from utils.gemini_client import create_client, generate_content
+
+
+def test_fake_client_answers_each_call_site_from_the_prompt():
+    waits = []
+    client = FakeGeminiClient(latency=LatencyModel(median_ms=100, sigma=0.5, seed=1), sleep=waits.append)
+
+    menu = "STARTERS\nBeet Salad - beet, goat cheese\n\nWINE LIST\nChateau Test | Red | Bordeaux | Merlot\n"
+    extracted = json.loads(generate_content(client, "menu_extraction", contents="Document: " + menu).text)
+    assert extracted["dishes"] == [{"dish_name": "Beet Salad", "category": "appetizer",
+                                    "key_ingredients": ["beet", "goat cheese"], "dominant_flavors": ["Savory"]}]
+    assert extracted["wines"] == [{"wine_name": "Chateau Test", "type_name": "Red",
+                                   "region": "Bordeaux", "grapes": ["Merlot"]}]
+
+    prompt = "assign up to 70 flavor compounds to the ingredient: beet\n\nReturn ONLY a JSON array"
+    compounds = json.loads(generate_content(client, "ingredient_compounds", contents=prompt).text)
+    assert compounds and json.loads(generate_content(client, "ingredient_compounds", contents=prompt).text) == compounds
+
+    enrichment = json.loads(generate_content(
+        client, "wine_enrichment", contents="Wine: Chateau Test. Grapes: Merlot, Malbec. Type: Red\n").text)
+    assert enrichment["grapes"] == ["Merlot", "Malbec"] and enrichment["flavor_compounds"]
+
+    candidates = [{"wine_id": 7, "match_count": 2, "shared_compounds": ["Linalool"]},
+                  {"wine_id": 9, "match_count": 5, "shared_compounds": ["Citral"]}]
+    prompt = f"CANDIDATE WINES (2 wines):\n{json.dumps(candidates)}\n\nSELECTION CRITERIA:"
+    assert json.loads(generate_content(client, "sommelier_finalize", contents=prompt).text)["top_matches"] == [9, 7]
+
+    assert client.calls == {"menu_extraction": 1, "ingredient_compounds": 2, "wine_enrichment": 1, "sommelier_finalize": 1}
+    assert len(waits) == 5 and len(set(waits)) == 5 and all(wait > 0 for wait in waits)
+
+
+def test_use_fake_gemini_restores_the_real_backend():
+    key = os.environ.get("GOOGLE_AI_API_KEY")
+    with use_fake_gemini() as client:
+        assert create_client(os.environ["GOOGLE_AI_API_KEY"]) is client
+    assert os.environ.get("GOOGLE_AI_API_KEY") == key
+
+
+def test_workflow_benchmark_splits_llm_wait_from_local_time():
+    report = run_workflow_benchmark(kb_wines=40, list_wines=6, unknown_wines=2, dishes=4,
+                                    unknown_ingredients=2, menus=2, latency_ms=5, sigma=0)
+
+    assert report["success"], report["error"]
+    assert report["llm_calls"]["menu_extraction"] == 2
+    assert report["llm_calls"]["ingredient_compounds"] == 2
+    assert report["llm_calls"]["wine_enrichment"] == 2
+    stages = report["stages"]
+    assert list(stages) == ["extraction", "enrichment", "similarity", "pairing", "ranking", "report"]
+    assert stages["enrichment"]["llm_calls"] == 2 and stages["enrichment"]["llm_wait_ms"] >= 10
+    assert stages["similarity"]["llm_wait_ms"] == 0 and stages["similarity"]["local_ms"] > 0
+    total = report["total"]
+    assert total["llm_calls"] == sum(report["llm_calls"].values())
+    assert abs(total["wall_ms"] - total["llm_wait_ms"] - total["local_ms"]) < 0.01
@@ -10,9 +10,12 @@ from .file_parsers import (
     detect_file_type,
     extract_text_from_pdf,
     read_excel_content,
-    read_csv_content
+    read_csv_content,
+    FileSource,
+    SpooledUpload,
 )
 from .config import DEFAULT_CONFIG
+from .structured_log import get_logger, log_event, run_context, configure_logging
 
 __all__ = [
     'parse_csv_wine_list',
@@ -23,5 +26,11 @@ __all__ = [
     'extract_text_from_pdf',
     'read_excel_content',
     'read_csv_content',
+    'FileSource',
+    'SpooledUpload',
     'DEFAULT_CONFIG',
+    'get_logger',
+    'log_event',
+    'run_context',
+    'configure_logging',
 ]
@@ -10,6 +10,10 @@ DEFAULT_PROCESSED_DATA_DIR = Path("processed_data")
 DEFAULT_WINES_PATH = DEFAULT_PROCESSED_DATA_DIR / "processed_wines.json"
 DEFAULT_INGREDIENT_MAP_PATH = DEFAULT_PROCESSED_DATA_DIR / "ingredient_flavor_map.json"
 DEFAULT_MENU_PROFILE_PATH = DEFAULT_PROCESSED_DATA_DIR / "menu_flavor_profile.json"
+DEFAULT_KB_SNAPSHOT_DIR = DEFAULT_PROCESSED_DATA_DIR / "kb_snapshot"
+DEFAULT_PAIRING_PRIORS_PATH = DEFAULT_PROCESSED_DATA_DIR / "pairing_priors.json"
+DEFAULT_PAIRING_RATINGS_PATH = Path("Datasets") / "wine_food_pairings.csv"
+DEFAULT_COMPOUND_STATS_PATH = DEFAULT_PROCESSED_DATA_DIR / "compound_stats.json"
 
 # Default thresholds
 DEFAULT_SIMILARITY_THRESHOLD = 0.7  # For wine similarity
@@ -29,6 +33,47 @@ DEFAULT_MAX_WINES_PER_COMBO = 3
 DEFAULT_MIN_WINES_PER_FLAVOR = 5
 DEFAULT_MAX_WINES_PER_FLAVOR = 11
 
+# Sommelier Stage 3: "llm" (Gemini picks from the candidates), "priors"
+# (rated-pairing lookup re-rank) or "rules" (PairingLogic rule score); the
+# last two make no LLM call
+SOMMELIER_FINALIZERS = ["llm", "priors", "rules"]
+DEFAULT_SOMMELIER_FINALIZER = "llm"
+# Local finalizer used when the LLM finalize is rate limited or takes longer
+# than the timeout (None disables the fallback)
+DEFAULT_SOMMELIER_FALLBACK = "rules"
+DEFAULT_SOMMELIER_FINALIZE_TIMEOUT_SECONDS = 30.0
+# Candidates passed from Stage 2 to Stage 3
+DEFAULT_SOMMELIER_CANDIDATES = 20
+
+# Hybrid pairing score weights (core/scoring.py, normalized to sum to 1):
+# compound coverage, Jaccard, harmonize-tag match and sommelier rules
+DEFAULT_SCORING_WEIGHTS = {"compounds": 1.0, "jaccard": 0.0, "harmonize": 0.5, "rules": 0.5}
+
+# Pruned compound vocabulary (core/compound_stats.py): drop hub compounds
+# (linked to at least this share of FlavorGraph hub ingredients) and compounds
+# found in at least this share of wines when the scoring feature blocks are
+# built. Off by default: it costs some pairing quality (see README Benchmarks)
+DEFAULT_PRUNE_COMPOUNDS = False
+DEFAULT_HUB_COMPOUND_SHARE = 0.5
+DEFAULT_MAX_COMPOUND_WINE_SHARE = 0.5
+
+# Server worker pools (LLM I/O-bound stages vs CPU-bound scoring stages)
+DEFAULT_LLM_POOL_WORKERS = 8
+DEFAULT_CPU_POOL_WORKERS = 2
+
+# Server sessions (per-restaurant pipeline state, LRU/TTL evicted)
+DEFAULT_MAX_SESSIONS = 100
+DEFAULT_SESSION_TTL_SECONDS = 3600
+DEFAULT_SESSION_MEMORY_MB = 512
+
+# Score / wine-feature cache entries on components shared by all sessions
+DEFAULT_SCORE_CACHE_ENTRIES = 16
+
+# Structured logging: per-iteration events kept 1 in N (see utils/structured_log.py)
+DEFAULT_LOG_SAMPLE_EVERY = {
+    "wines.processing": 20,
+}
+
 # Default random combination settings
 DEFAULT_MAX_PLATES_PER_COMBO = 9
 DEFAULT_NUM_RANDOM_COMBOS = 50
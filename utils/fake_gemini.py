@@ -0,0 +1,343 @@
+"""
+Fake Gemini client
+Offline stand-in for google.genai clients, for benchmarks and tests. Each
+response is generated from the prompt (menu text, ingredient, wine, dish and
+candidate names) in the format its call site parses, after a simulated
+latency. No network calls and no quota.
+
+Usage:
+    with use_fake_gemini(FakeGeminiClient(latency=LatencyModel(median_ms=800, sigma=0.4))):
+        app = CulinaryExpertApp()
+        app.run_full_workflow(menu_files=["menu.txt"])
+"""
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Any, Optional
+
+from utils.gemini_client import current_call_site, set_client_factory
+
+# Compounds used when no vocabulary is given
+DEFAULT_VOCABULARY = [
+    "Linalool", "Geraniol", "Citral", "Limonene", "Nerol", "Eugenol", "Vanillin", "Furaneol",
+    "beta-Damascenone", "beta-Ionone", "Rotundone", "Guaiacol", "Diacetyl", "Ethyl hexanoate",
+    "Ethyl octanoate", "Isoamyl acetate", "Hexanal", "cis-3-Hexenol", "Methional", "Sotolon",
+    "2-Phenylethanol", "gamma-Decalactone", "delta-Decalactone", "Benzaldehyde", "Acetaldehyde",
+    "1-Octen-3-ol", "Pyrazine", "Thiamine", "Maltol", "Cinnamaldehyde", "Carvone", "Menthol",
+    "Thymol", "Allicin", "Capsaicin", "Piperine", "Glutamate", "Trimethylamine", "Skatole", "Indole",
+]
+GRAPES = ["Cabernet Sauvignon", "Merlot", "Pinot Noir", "Syrah", "Chardonnay",
+          "Sauvignon Blanc", "Riesling", "Nebbiolo", "Tempranillo", "Grenache"]
+CATEGORIES = {"SALAD": "salad", "STARTER": "appetizer", "APPETIZER": "appetizer",
+              "MAIN": "main", "ENTREE": "main", "DESSERT": "dessert"}
+_STOPWORDS = {"with", "and", "the", "a", "an", "of", "in", "on", "served", "fresh", "over", "style"}
+
+
+class LatencyModel:
+    """
+    Simulated call latency: log-normal around a median, plus time per output token
+
+    Args:
+        median_ms: Median latency
+        sigma: Log-normal shape (0 = always the median; 0.5 gives p95 ~2.3x the median)
+        per_token_ms: Extra latency per output token
+        max_ms: Upper bound (None = unbounded)
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        median_ms: float = 0.0,
+        sigma: float = 0.0,
+        per_token_ms: float = 0.0,
+        max_ms: Optional[float] = None,
+        seed: int = 0
+    ):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.per_token_ms = per_token_ms
+        self.max_ms = max_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, output_tokens: int = 0) -> float:
+        """Latency in seconds for a response of output_tokens tokens"""
+        with self._lock:
+            noise = self._rng.gauss(0.0, 1.0)
+        latency_ms = self.median_ms * math.exp(self.sigma * noise) + self.per_token_ms * output_tokens
+        if self.max_ms is not None:
+            latency_ms = min(latency_ms, self.max_ms)
+        return max(latency_ms, 0.0) / 1000
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, _token_count(text))
+
+
+class FakeUploadedFile:
+    def __init__(self, name: str, content: bytes):
+        self.name = name
+        self.content = content
+
+
+class _FakeModels:
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def generate_content(self, model: str = None, contents=None, config=None, **kwargs) -> FakeResponse:
+        return self._client.respond(contents)
+
+
+class _FakeFiles:
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+
+    def upload(self, file=None, config=None) -> FakeUploadedFile:
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, 'rb') as f:
+                content = f.read()
+        else:
+            content = file.read()
+        with self._client._lock:
+            self._client.uploads += 1
+            name = f"files/fake-{self._client.uploads}"
+        return FakeUploadedFile(name, content)
+
+
+class FakeGeminiClient:
+    """
+    Drop-in for google.genai.Client (models.generate_content and files.upload)
+
+    Responses are deterministic for a given prompt and seed. Call counts per
+    call site are kept in `calls`.
+
+    Args:
+        latency: Latency model (no delay if None)
+        vocabulary: Compound names for generated flavor profiles
+        seed: Seed for generated content
+        sleep: Function used to wait out the latency (e.g. threading.Event().wait
+            to hold calls until the event is set)
+        error: Exception raised by generate_content after the latency instead of
+            responding (e.g. RuntimeError("429 RESOURCE_EXHAUSTED"))
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        vocabulary: Optional[List[str]] = None,
+        seed: int = 0,
+        sleep: Callable[[float], None] = time.sleep,
+        error: Optional[Exception] = None
+    ):
+        self.latency = latency or LatencyModel()
+        self.vocabulary = list(vocabulary or DEFAULT_VOCABULARY)
+        self.seed = seed
+        self.sleep = sleep
+        self.error = error
+        self.calls: Counter = Counter()
+        self.uploads = 0
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+        self.files = _FakeFiles(self)
+        self._handlers: Dict[str, Callable[[str, List[Any]], Any]] = {
+            "menu_extraction": self._menu_extraction,
+            "recipe_extraction": self._recipe_extraction,
+            "wine_list_extraction": self._wine_list_extraction,
+            "ingredient_compounds": lambda prompt, parts: self._compounds(_after(prompt, "to the ingredient:"), 40),
+            "recipe_ingredient_compounds": lambda prompt, parts: self._compounds(_after(prompt, "Ingredient:"), 5),
+            "wine_enrichment": self._wine_enrichment,
+            "report_explanation": self._report_explanation,
+            "sommelier_ingredients": self._sommelier_ingredients,
+            "sommelier_finalize": self._sommelier_finalize,
+        }
+
+    def respond(self, contents) -> FakeResponse:
+        """
+        Build the response for a generate_content call, after the simulated latency
+
+        Raises:
+            Exception: The configured error, if any
+        """
+        parts = contents if isinstance(contents, list) else [contents]
+        prompt = "\n".join(part for part in parts if isinstance(part, str))
+        call_site = current_call_site.get() or "unknown"
+        with self._lock:
+            self.calls[call_site] += 1
+
+        handler = self._handlers.get(call_site)
+        result = handler(prompt, parts) if handler else {}
+        text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False)
+
+        response = FakeResponse(text, _token_count(prompt))
+        self.sleep(self.latency.sample(response.usage_metadata.candidates_token_count))
+        if self.error is not None:
+            raise self.error
+        return response
+
+    # Generated content
+
+    def _rng(self, *keys) -> random.Random:
+        return random.Random(":".join(str(key) for key in (self.seed,) + keys))
+
+    def _compounds(self, name: str, count: int) -> List[str]:
+        rng = self._rng("compounds", name.lower().strip())
+        return rng.sample(self.vocabulary, min(count, len(self.vocabulary)))
+
+    def _document(self, prompt: str, parts: List[Any], marker: str) -> str:
+        """Document text: after the marker in the prompt, or the uploaded file's text"""
+        for part in parts:
+            if isinstance(part, FakeUploadedFile):
+                return part.content.decode("utf-8", errors="ignore")
+        return _after(prompt, marker, to_line_end=False)
+
+    def _menu_extraction(self, prompt: str, parts: List[Any]) -> Dict[str, Any]:
+        return parse_menu_text(self._document(prompt, parts, "Document:"))
+
+    def _wine_list_extraction(self, prompt: str, parts: List[Any]) -> Dict[str, Any]:
+        return {"wines": parse_menu_text(self._document(prompt, parts, "Document:"), default_section="wines")["wines"]}
+
+    def _recipe_extraction(self, prompt: str, parts: List[Any]) -> Dict[str, Any]:
+        recipe = self._document(prompt, parts, "Recipe/Dish:").strip()
+        lines = [line.strip() for line in recipe.splitlines() if line.strip()]
+        name = lines[0] if lines else "Chef's Special"
+        return {
+            "dish_name": name,
+            "key_ingredients": _ingredient_words(" ".join(lines[1:]) or name),
+            "dominant_flavors": self._rng("flavors", name).sample(["Rich", "Savory", "Acidic", "Sweet", "Umami", "Light"], 2),
+        }
+
+    def _wine_enrichment(self, prompt: str, parts: List[Any]) -> Dict[str, Any]:
+        description = _after(prompt, "Wine:")
+        grapes_match = re.search(r"Grapes: ([^.]+)\.", description)
+        if grapes_match:
+            grapes = [grape.strip() for grape in grapes_match.group(1).split(",") if grape.strip()]
+        else:
+            grapes = self._rng("grapes", description).sample(GRAPES, 2)
+        return {"grapes": grapes, "flavor_compounds": self._compounds(description, 30)}
+
+    def _report_explanation(self, prompt: str, parts: List[Any]) -> str:
+        dish = _after(prompt, "Dish:") or "this dish"
+        wine = _after(prompt, "Wine:") or "this wine"
+        shared = _after(prompt, "Shared flavor compounds:")
+        reason = f"they share {shared}" if shared and shared != "None" else "their flavors balance each other"
+        return (f"{wine} is a lovely match for {dish} because {reason}. "
+                f"Its structure lifts the dish without overpowering it.")
+
+    def _sommelier_ingredients(self, prompt: str, parts: List[Any]) -> List[str]:
+        return _ingredient_words(_after(prompt, "Dish:", to_line_end=False))
+
+    def _sommelier_finalize(self, prompt: str, parts: List[Any]) -> Dict[str, Any]:
+        match = re.search(r"CANDIDATE WINES \(\d+ wines\):\n(.*?)\n\nSELECTION CRITERIA", prompt, re.DOTALL)
+        candidates = json.loads(match.group(1)) if match else []
+        candidates.sort(key=lambda wine: wine.get("match_count", 0), reverse=True)
+        top = candidates[:3]
+        shared = sorted({compound for wine in top for compound in wine.get("shared_compounds", [])[:2]})
+        return {
+            "top_matches": [wine.get("wine_id") for wine in top],
+            "scientific_reasoning": f"Shared compounds: {', '.join(shared) or 'none'}.",
+            "culinary_reasoning": f"{top[0].get('wine_name') if top else 'These wines'} balances the dish.",
+            "upsell_tip": "A step up in complexity for a memorable meal.",
+        }
+
+
+def parse_menu_text(text: str, default_section: str = "dishes") -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Parse a plain-text menu into extraction results
+
+    Lines under a header containing WINE are wines ("Name | Type | Region |
+    Grapes"); other lines are dishes ("Name - ingredient, ingredient"), with
+    the category taken from the last SALADS/STARTERS/MAINS/DESSERTS header.
+    """
+    result = {"dishes": [], "wines": []}
+    section = default_section
+    category = "main"
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.isupper() and not any(separator in line for separator in ("|", " - ")):
+            section = "wines" if "WINE" in line else "dishes"
+            category = next((value for key, value in CATEGORIES.items() if key in line), category)
+            continue
+        if section == "wines":
+            fields = [field.strip() for field in line.split("|")]
+            wine = {"wine_name": fields[0], "type_name": fields[1] if len(fields) > 1 else "Red"}
+            if len(fields) > 2 and fields[2]:
+                wine["region"] = fields[2]
+            if len(fields) > 3 and fields[3]:
+                wine["grapes"] = [grape.strip() for grape in fields[3].split(",")]
+            result["wines"].append(wine)
+        elif " - " in line:
+            name, ingredients = line.split(" - ", 1)
+            result["dishes"].append({
+                "dish_name": name.strip(),
+                "category": category,
+                "key_ingredients": [item.strip() for item in ingredients.split(",") if item.strip()],
+                "dominant_flavors": ["Savory"],
+            })
+    return result
+
+
+def _after(prompt: str, marker: str, to_line_end: bool = True) -> str:
+    """Text following the last occurrence of marker (to the end of its line by default)"""
+    index = prompt.rfind(marker)
+    if index < 0:
+        return ""
+    rest = prompt[index + len(marker):]
+    if to_line_end:
+        rest = rest.split("\n", 1)[0]
+    return rest.strip().strip('"')
+
+
+def _ingredient_words(text: str, limit: int = 8) -> List[str]:
+    words = [word for word in re.findall(r"[a-z]+", text.lower()) if len(word) > 2 and word not in _STOPWORDS]
+    return list(dict.fromkeys(words))[:limit]
+
+
+def _token_count(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+@contextmanager
+def use_fake_gemini(client: Optional[FakeGeminiClient] = None, api_key: str = "fake-gemini-key"):
+    """
+    Serve every Gemini client created inside the block from a fake client
+
+    Also sets GOOGLE_AI_API_KEY to a placeholder so components that require a
+    key can be constructed; both are restored on exit.
+
+    Args:
+        client: Fake client (a zero-latency FakeGeminiClient if None)
+        api_key: Placeholder key
+
+    Yields:
+        The fake client
+    """
+    client = client or FakeGeminiClient()
+    previous_key = os.environ.get("GOOGLE_AI_API_KEY")
+    os.environ["GOOGLE_AI_API_KEY"] = api_key
+    previous_factory = set_client_factory(lambda key: client)
+    try:
+        yield client
+    finally:
+        set_client_factory(previous_factory)
+        if previous_key is None:
+            os.environ.pop("GOOGLE_AI_API_KEY", None)
+        else:
+            os.environ["GOOGLE_AI_API_KEY"] = previous_key
@@ -1,25 +1,133 @@
 """
 File parsing utilities for wine lists and other data files
+
+Parsers accept a FileSource: a path, the raw bytes, or an open binary file
+object (e.g. an upload spooled in memory), so uploads can be parsed without
+a round trip through a temporary file.
 """
 
+import io
 import json
 import csv
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union, BinaryIO, TextIO, Iterator
+
+# A file on disk, its raw content, or an open binary file object
+FileSource = Union[str, Path, bytes, BinaryIO]
 
+# Bytes read to sniff the type of unnamed content
+SNIFF_BYTES = 512
 
-def detect_file_type(file_path: str) -> str:
+
+class SpooledUpload(tempfile.SpooledTemporaryFile):
     """
-    Detect file type from extension
+    Spooled temporary file that remembers the uploaded file name
+    
+    Content stays in memory up to max_size bytes and only then rolls over
+    to disk.
+    """
+    
+    def __init__(self, filename: str, max_size: int = 0):
+        super().__init__(max_size=max_size)
+        self.filename = filename
+
+
+def source_name(source: FileSource) -> Optional[str]:
+    """
+    Get the file name of a source
     
     Args:
-        file_path: Path to file
+        source: Path, bytes, or file object
         
     Returns:
-        File type: 'csv', 'json', 'xlsx', 'pdf', or 'unknown'
+        Path or file name, or None for unnamed content
+    """
+    if isinstance(source, (str, Path)):
+        return str(source)
+    name = getattr(source, 'filename', None) or getattr(source, 'name', None)
+    return name if isinstance(name, str) else None
+
+
+def _check_exists(source: FileSource, message: str):
+    """Raise FileNotFoundError if source is a path that does not exist"""
+    if isinstance(source, (str, Path)) and not Path(source).exists():
+        raise FileNotFoundError(f"{message}: {source}")
+
+
+@contextmanager
+def open_binary(source: FileSource) -> Iterator[BinaryIO]:
     """
-    path = Path(file_path)
-    ext = path.suffix.lower()
+    Open a source for binary reading, positioned at the start
+    
+    Paths are opened and closed; bytes are wrapped without copying to disk;
+    file objects are rewound and left open for the caller.
+    """
+    if isinstance(source, (str, Path)):
+        with open(source, 'rb') as f:
+            yield f
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(source)
+    else:
+        source.seek(0)
+        yield source
+
+
+@contextmanager
+def open_text(source: FileSource, encoding: str = 'utf-8') -> Iterator[TextIO]:
+    """Open a source for text reading (see open_binary)"""
+    if isinstance(source, (str, Path)):
+        with open(source, 'r', encoding=encoding, newline='') as f:
+            yield f
+        return
+    
+    with open_binary(source) as binary:
+        text = io.TextIOWrapper(binary, encoding=encoding, newline='')
+        try:
+            yield text
+        finally:
+            # Detach so closing the wrapper never closes the caller's file
+            text.detach()
+
+
+def read_bytes(source: FileSource) -> bytes:
+    """Read the whole content of a source"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    with open_binary(source) as f:
+        return f.read()
+
+
+def _sniff_file_type(head: bytes) -> str:
+    """Guess a file type from its first bytes"""
+    if head.startswith(b'%PDF'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        return 'xlsx'
+    if head.startswith(b'\x89PNG'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    stripped = head.lstrip()
+    if stripped.startswith((b'{', b'[')):
+        return 'json'
+    return 'unknown'
+
+
+def detect_file_type(source: FileSource, filename: Optional[str] = None) -> str:
+    """
+    Detect file type from extension, or from the content of unnamed sources
+    
+    Args:
+        source: Path, bytes, or file object
+        filename: Name to take the extension from (defaults to the source's name)
+        
+    Returns:
+        File type: 'csv', 'json', 'xlsx', 'pdf', 'txt', 'jpg', 'png', or 'unknown'
+    """
+    name = filename or source_name(source)
+    ext = Path(name).suffix.lower() if name else ''
     
     if ext == '.csv':
         return 'csv'
@@ -29,25 +137,33 @@ def detect_file_type(file_path: str) -> str:
         return 'xlsx'
     elif ext == '.pdf':
         return 'pdf'
+    elif ext == '.txt':
+        return 'txt'
+    elif ext in ['.jpg', '.jpeg']:
+        return 'jpg'
+    elif ext == '.png':
+        return 'png'
+    elif not ext and not isinstance(source, (str, Path)):
+        with open_binary(source) as f:
+            head = f.read(SNIFF_BYTES)
+        return _sniff_file_type(head)
     else:
         return 'unknown'
 
 
-def parse_json_wine_list(file_path: str) -> List[Dict[str, Any]]:
+def parse_json_wine_list(source: FileSource) -> List[Dict[str, Any]]:
     """
     Parse JSON wine list file
     
     Args:
-        file_path: Path to JSON file
+        source: Path, bytes, or file object of the JSON file
         
     Returns:
         List of wine dictionaries
     """
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Wine list file not found: {file_path}")
+    _check_exists(source, "Wine list file not found")
     
-    with open(path, 'r', encoding='utf-8') as f:
+    with open_binary(source) as f:
         data = json.load(f)
     
     # Handle different JSON structures
@@ -66,7 +182,7 @@ def parse_json_wine_list(file_path: str) -> List[Dict[str, Any]]:
         raise ValueError(f"Invalid JSON structure: expected list or dict, got {type(data)}")
 
 
-def parse_csv_wine_list(file_path: str) -> List[Dict[str, Any]]:
+def parse_csv_wine_list(source: FileSource) -> List[Dict[str, Any]]:
     """
     Parse CSV wine list file
     
@@ -74,18 +190,16 @@ def parse_csv_wine_list(file_path: str) -> List[Dict[str, Any]]:
     - wine_id, wine_name, type_name, body_name, acidity_name, grapes, country, region, winery, etc.
     
     Args:
-        file_path: Path to CSV file
+        source: Path, bytes, or file object of the CSV file
         
     Returns:
         List of wine dictionaries
     """
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Wine list file not found: {file_path}")
+    _check_exists(source, "Wine list file not found")
     
     wines = []
     
-    with open(path, 'r', encoding='utf-8') as f:
+    with open_text(source) as f:
         reader = csv.DictReader(f)
         
         for row in reader:
@@ -117,12 +231,12 @@ def parse_csv_wine_list(file_path: str) -> List[Dict[str, Any]]:
     return wines
 
 
-def parse_xlsx_wine_list(file_path: str, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+def parse_xlsx_wine_list(source: FileSource, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Parse XLSX/XLS wine list file
     
     Args:
-        file_path: Path to Excel file
+        source: Path, bytes, or file object of the Excel file
         sheet_name: Name of sheet to read (None = first sheet)
         
     Returns:
@@ -135,18 +249,17 @@ def parse_xlsx_wine_list(file_path: str, sheet_name: Optional[str] = None) -> Li
             "pandas is required for XLSX parsing. Install it with: pip install pandas openpyxl"
         )
     
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Wine list file not found: {file_path}")
+    _check_exists(source, "Wine list file not found")
     
     try:
         # Read Excel file
         # Use openpyxl engine for .xlsx files, xlrd for .xls (if available)
-        if sheet_name:
-            df = pd.read_excel(path, sheet_name=sheet_name, engine='openpyxl')
-        else:
-            # Read first sheet by default
-            df = pd.read_excel(path, sheet_name=0, engine='openpyxl')
+        with open_binary(source) as f:
+            if sheet_name:
+                df = pd.read_excel(f, sheet_name=sheet_name, engine='openpyxl')
+            else:
+                # Read first sheet by default
+                df = pd.read_excel(f, sheet_name=0, engine='openpyxl')
         
         # Handle empty DataFrame
         if df.empty:
@@ -205,10 +318,10 @@ def parse_xlsx_wine_list(file_path: str, sheet_name: Optional[str] = None) -> Li
             f"openpyxl is required for XLSX parsing. Install it with: pip install openpyxl"
         ) from e
     except Exception as e:
-        raise ValueError(f"Failed to parse XLSX file {file_path}: {e}") from e
+        raise ValueError(f"Failed to parse XLSX file {source_name(source) or '<upload>'}: {e}") from e
 
 
-def parse_pdf_wine_list(file_path: str) -> List[Dict[str, Any]]:
+def parse_pdf_wine_list(source: FileSource) -> List[Dict[str, Any]]:
     """
     Parse PDF wine list file
     
@@ -216,7 +329,7 @@ def parse_pdf_wine_list(file_path: str) -> List[Dict[str, Any]]:
     Falls back to text extraction if no tables are found.
     
     Args:
-        file_path: Path to PDF file
+        source: Path, bytes, or file object of the PDF file
         
     Returns:
         List of wine dictionaries
@@ -228,14 +341,12 @@ def parse_pdf_wine_list(file_path: str) -> List[Dict[str, Any]]:
             "pdfplumber is required for PDF parsing. Install it with: pip install pdfplumber"
         )
     
-    path = Path(file_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Wine list file not found: {file_path}")
+    _check_exists(source, "Wine list file not found")
     
     wines = []
     
     try:
-        with pdfplumber.open(path) as pdf:
+        with open_binary(source) as f, pdfplumber.open(f) as pdf:
             all_tables = []
             
             # Extract tables from all pages
@@ -281,7 +392,7 @@ def parse_pdf_wine_list(file_path: str) -> List[Dict[str, Any]]:
             f"pdfplumber is required for PDF parsing. Install it with: pip install pdfplumber"
         ) from e
     except Exception as e:
-        raise ValueError(f"Failed to parse PDF file {file_path}: {e}") from e
+        raise ValueError(f"Failed to parse PDF file {source_name(source) or '<upload>'}: {e}") from e
     
     return wines
 
@@ -360,12 +471,12 @@ def _parse_pdf_text(pdf) -> List[Dict[str, Any]]:
     return wines
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+def extract_text_from_pdf(source: FileSource) -> str:
     """
     Extract all text from PDF file
     
     Args:
-        pdf_path: Path to PDF file
+        source: Path, bytes, or file object of the PDF file
         
     Returns:
         Extracted text content
@@ -377,20 +488,18 @@ def extract_text_from_pdf(pdf_path: str) -> str:
             "pdfplumber is required for PDF text extraction. Install it with: pip install pdfplumber"
         )
     
-    path = Path(pdf_path)
-    if not path.exists():
-        raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+    _check_exists(source, "PDF file not found")
     
     full_text = ""
     
     try:
-        with pdfplumber.open(path) as pdf:
+        with open_binary(source) as f, pdfplumber.open(f) as pdf:
             for page in pdf.pages:
                 text = page.extract_text()
                 if text:
                     full_text += text + "\n"
     except Exception as e:
-        raise ValueError(f"Failed to extract text from PDF {pdf_path}: {e}") from e
+        raise ValueError(f"Failed to extract text from PDF {source_name(source) or '<upload>'}: {e}") from e
     
     return full_text
 
@@ -439,12 +548,12 @@ def extract_images_from_pdf(pdf_path: str) -> List[bytes]:
     return images
 
 
-def read_excel_content(excel_path: str) -> str:
+def read_excel_content(source: FileSource) -> str:
     """
     Convert Excel file content to text representation for Gemini
     
     Args:
-        excel_path: Path to Excel file
+        source: Path, bytes, or file object of the Excel file
         
     Returns:
         Text representation of Excel content
@@ -456,48 +565,46 @@ def read_excel_content(excel_path: str) -> str:
             "pandas is required for Excel reading. Install it with: pip install pandas openpyxl"
         )
     
-    path = Path(excel_path)
-    if not path.exists():
-        raise FileNotFoundError(f"Excel file not found: {excel_path}")
+    _check_exists(source, "Excel file not found")
     
     try:
         # Read all sheets
-        excel_file = pd.ExcelFile(path, engine='openpyxl')
-        text_parts = []
-        
-        for sheet_name in excel_file.sheet_names:
-            df = pd.read_excel(excel_file, sheet_name=sheet_name, engine='openpyxl')
+        with open_binary(source) as f:
+            excel_file = pd.ExcelFile(f, engine='openpyxl')
+            text_parts = []
             
-            # Convert DataFrame to text representation
-            text_parts.append(f"Sheet: {sheet_name}\n")
-            text_parts.append(df.to_string(index=False))
-            text_parts.append("\n\n")
+            for sheet_name in excel_file.sheet_names:
+                df = pd.read_excel(excel_file, sheet_name=sheet_name, engine='openpyxl')
+                
+                # Convert DataFrame to text representation
+                text_parts.append(f"Sheet: {sheet_name}\n")
+                text_parts.append(df.to_string(index=False))
+                text_parts.append("\n\n")
         
         return "\n".join(text_parts)
     
     except Exception as e:
-        raise ValueError(f"Failed to read Excel file {excel_path}: {e}") from e
+        raise ValueError(f"Failed to read Excel file {source_name(source) or '<upload>'}: {e}") from e
 
 
-def read_csv_content(csv_path: str) -> str:
+def read_csv_content(source: FileSource) -> str:
     """
     Convert CSV file content to text representation for Gemini
     
     Args:
-        csv_path: Path to CSV file
+        source: Path, bytes, or file object of the CSV file
         
     Returns:
         Text representation of CSV content
     """
-    path = Path(csv_path)
-    if not path.exists():
-        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    _check_exists(source, "CSV file not found")
     
     try:
         import pandas as pd
         
         # Read CSV
-        df = pd.read_csv(path)
+        with open_binary(source) as f:
+            df = pd.read_csv(f)
         
         # Convert to text representation
         return df.to_string(index=False)
@@ -505,7 +612,7 @@ def read_csv_content(csv_path: str) -> str:
     except Exception as e:
         # Fallback: read as plain text
         try:
-            with open(path, 'r', encoding='utf-8') as f:
+            with open_text(source) as f:
                 return f.read()
         except Exception as e2:
-            raise ValueError(f"Failed to read CSV file {csv_path}: {e}") from e2
+            raise ValueError(f"Failed to read CSV file {source_name(source) or '<upload>'}: {e}") from e2
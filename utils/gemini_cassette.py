@@ -0,0 +1,379 @@
+"""
+Gemini record/replay cassettes
+Record mode wraps every client create_client returns and appends each
+generate_content request, response (text and token counts), latency and error
+to a JSON-lines cassette. Replay mode answers the same requests from the
+cassette, without network access, optionally sleeping for the recorded
+latencies.
+
+Requests are matched on call site, model, contents and config (uploaded files
+and images by a hash of their bytes). Identical requests are replayed in the
+order they were recorded, repeating the last response once exhausted.
+
+Usage:
+    with record_gemini("cassettes/dinner_menu.jsonl"):
+        CulinaryExpertApp().run_full_workflow(menu_files=["menu.pdf"])
+
+    with replay_gemini("cassettes/dinner_menu.jsonl", reproduce_latency=True):
+        CulinaryExpertApp().run_full_workflow(menu_files=["menu.pdf"])
+
+Or for a whole process (app.py, web server): CULINARY_GEMINI_RECORD=PATH or
+CULINARY_GEMINI_REPLAY=PATH (plus CULINARY_GEMINI_REPLAY_LATENCY=1).
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Union
+
+from utils.gemini_client import current_call_site, get_client_factory, set_client_factory, token_counts
+
+# Placeholder key set during replay when no real one is configured
+REPLAY_API_KEY = "cassette-replay"
+
+
+class CassetteMissError(ValueError):
+    """No recorded response matches a request"""
+
+
+class RecordedError(Exception):
+    """Replayed error of a recorded call (same message, so retry logic behaves as recorded)"""
+
+
+class _Usage:
+    def __init__(self, counts: Dict[str, int]):
+        self.prompt_token_count = counts.get("prompt_tokens")
+        self.candidates_token_count = counts.get("output_tokens")
+        self.total_token_count = counts.get("total_tokens")
+
+
+class CassetteResponse:
+    """Replayed response: the recorded text and token counts"""
+
+    def __init__(self, text: Optional[str], usage: Dict[str, int]):
+        self.text = text
+        self.usage_metadata = _Usage(usage)
+
+
+class CassetteFile:
+    """Replayed upload reference"""
+
+    def __init__(self, name: str, sha256: str):
+        self.name = name
+        self.sha256 = sha256
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_upload(file) -> bytes:
+    """Bytes of an upload source (path or file object, whose position is restored)"""
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, 'rb') as f:
+            return f.read()
+    position = file.tell()
+    data = file.read()
+    file.seek(position)
+    return data
+
+
+def _part_token(part: Any, uploads: Dict[int, str]) -> str:
+    """Stable stand-in for a non-text contents part"""
+    if isinstance(part, CassetteFile):
+        return f"file:{part.sha256}"
+    if id(part) in uploads:
+        return f"file:{uploads[id(part)]}"
+    if isinstance(part, (bytes, bytearray)):
+        return f"bytes:{_sha256(bytes(part))}"
+    if hasattr(part, "tobytes"):
+        # PIL image
+        return f"image:{_sha256(part.tobytes())}"
+    return f"object:{type(part).__name__}"
+
+
+def describe_request(call_site: str, kwargs: Dict[str, Any], uploads: Optional[Dict[int, str]] = None) -> Dict[str, Any]:
+    """
+    JSON-safe form of a generate_content request and its match key
+
+    Args:
+        call_site: Call site label (see generate_content)
+        kwargs: generate_content arguments (model, contents, config)
+        uploads: id(upload reference) -> content hash, for uploaded files
+
+    Returns:
+        Dictionary with 'call_site', 'model', 'contents', 'config' and 'key'
+    """
+    contents = kwargs.get("contents")
+    parts = contents if isinstance(contents, list) else [contents]
+    request = {
+        "call_site": call_site,
+        "model": kwargs.get("model"),
+        "contents": [part if isinstance(part, str) else _part_token(part, uploads or {}) for part in parts],
+        "config": json.loads(json.dumps(kwargs.get("config"), sort_keys=True, default=str)),
+    }
+    request["key"] = _sha256(json.dumps(request, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return request
+
+
+class Cassette:
+    """
+    Recorded interactions, one JSON object per line
+
+    Args:
+        path: Cassette file
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Read all interactions
+
+        Raises:
+            FileNotFoundError: If the cassette does not exist
+        """
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def clear(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text("", encoding='utf-8')
+
+    def append(self, interaction: Dict[str, Any]):
+        line = json.dumps(interaction, ensure_ascii=False, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+class _RecordingModels:
+    def __init__(self, client: "RecordingClient"):
+        self._client = client
+
+    def generate_content(self, **kwargs):
+        client = self._client
+        request = describe_request(current_call_site.get() or "unknown", kwargs, client.uploads)
+        started = time.perf_counter()
+        try:
+            response = client.inner.models.generate_content(**kwargs)
+        except Exception as e:
+            client.cassette.append({**request, "latency_s": round(time.perf_counter() - started, 6),
+                                    "error": str(e)})
+            raise
+        client.cassette.append({
+            **request,
+            "latency_s": round(time.perf_counter() - started, 6),
+            "response": {"text": getattr(response, "text", None), "usage": token_counts(response)},
+        })
+        return response
+
+
+class _RecordingFiles:
+    def __init__(self, client: "RecordingClient"):
+        self._client = client
+
+    def upload(self, file=None, config=None, **kwargs):
+        sha256 = _sha256(_read_upload(file))
+        uploaded = self._client.inner.files.upload(file=file, config=config, **kwargs)
+        # Keep the reference alive so its id is not reused while it can be sent
+        self._client.uploads[id(uploaded)] = sha256
+        self._client.uploaded.append(uploaded)
+        return uploaded
+
+
+class RecordingClient:
+    """
+    Client wrapper appending every generate_content call to a cassette
+
+    Args:
+        inner: Client that makes the calls (google.genai.Client or a fake)
+        cassette: Cassette to append to
+    """
+
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.uploads: Dict[int, str] = {}
+        self.uploaded: List[Any] = []
+        self.models = _RecordingModels(self)
+        self.files = _RecordingFiles(self)
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+
+class _ReplayModels:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+
+    def generate_content(self, **kwargs):
+        return self._client.replay(kwargs)
+
+
+class _ReplayFiles:
+    def __init__(self, client: "ReplayClient"):
+        self._client = client
+
+    def upload(self, file=None, config=None, **kwargs):
+        sha256 = _sha256(_read_upload(file))
+        return CassetteFile(f"files/cassette-{sha256[:12]}", sha256)
+
+
+class ReplayClient:
+    """
+    Client answering generate_content from recorded interactions
+
+    Calls served per call site are kept in `calls`.
+
+    Args:
+        interactions: Recorded interactions (Cassette.load())
+        reproduce_latency: Sleep for each call's recorded latency
+        latency_scale: Factor applied to recorded latencies
+        sleep: Function used to wait out the latency
+    """
+
+    def __init__(
+        self,
+        interactions: List[Dict[str, Any]],
+        reproduce_latency: bool = False,
+        latency_scale: float = 1.0,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.reproduce_latency = reproduce_latency
+        self.latency_scale = latency_scale
+        self.sleep = sleep
+        self.calls: Counter = Counter()
+        self.misses = 0
+        self._queues: Dict[str, deque] = {}
+        for interaction in interactions:
+            self._queues.setdefault(interaction["key"], deque()).append(interaction)
+        self._lock = threading.Lock()
+        self.models = _ReplayModels(self)
+        self.files = _ReplayFiles(self)
+
+    def replay(self, kwargs: Dict[str, Any]):
+        """
+        Recorded response (or error) for a generate_content request
+
+        Raises:
+            CassetteMissError: If the request was never recorded
+            RecordedError: If the recorded call failed
+        """
+        call_site = current_call_site.get() or "unknown"
+        request = describe_request(call_site, kwargs)
+        with self._lock:
+            queue = self._queues.get(request["key"])
+            if not queue:
+                self.misses += 1
+                raise CassetteMissError(
+                    f"No recorded {call_site} response for request {request['key'][:12]} "
+                    f"(model {request['model']}, prompt {str(request['contents'][0])[:80]!r})"
+                )
+            interaction = queue.popleft() if len(queue) > 1 else queue[0]
+            self.calls[call_site] += 1
+
+        if self.reproduce_latency:
+            self.sleep(interaction.get("latency_s", 0.0) * self.latency_scale)
+        if "error" in interaction:
+            raise RecordedError(interaction["error"])
+        response = interaction["response"]
+        return CassetteResponse(response.get("text"), response.get("usage", {}))
+
+
+@contextmanager
+def record_gemini(path: Union[str, Path], append: bool = False):
+    """
+    Record every generate_content call made inside the block
+
+    Calls go to the client create_client would otherwise return (google.genai,
+    or an installed fake).
+
+    Args:
+        path: Cassette file
+        append: Add to an existing cassette instead of starting a new one
+
+    Yields:
+        The Cassette
+    """
+    cassette = Cassette(path)
+    if not append:
+        cassette.clear()
+    inner_factory = get_client_factory()
+    previous_factory = set_client_factory(lambda key: RecordingClient(inner_factory(key), cassette))
+    try:
+        yield cassette
+    finally:
+        set_client_factory(previous_factory)
+
+
+@contextmanager
+def replay_gemini(
+    path: Union[str, Path],
+    reproduce_latency: bool = False,
+    latency_scale: float = 1.0
+):
+    """
+    Serve every Gemini client created inside the block from a cassette
+
+    Sets GOOGLE_AI_API_KEY to a placeholder if no key is configured; it is
+    restored on exit.
+
+    Args:
+        path: Cassette file
+        reproduce_latency: Sleep for each call's recorded latency
+        latency_scale: Factor applied to recorded latencies
+
+    Yields:
+        The ReplayClient
+
+    Raises:
+        FileNotFoundError: If the cassette does not exist
+    """
+    client = ReplayClient(Cassette(path).load(), reproduce_latency, latency_scale)
+    previous_key = os.environ.get("GOOGLE_AI_API_KEY")
+    if not previous_key:
+        os.environ["GOOGLE_AI_API_KEY"] = REPLAY_API_KEY
+    previous_factory = set_client_factory(lambda key: client)
+    try:
+        yield client
+    finally:
+        set_client_factory(previous_factory)
+        if previous_key is None:
+            os.environ.pop("GOOGLE_AI_API_KEY", None)
+        else:
+            os.environ["GOOGLE_AI_API_KEY"] = previous_key
+
+
+def configure_cassette_from_env() -> Optional[str]:
+    """
+    Install record or replay mode for the whole process from
+    CULINARY_GEMINI_RECORD / CULINARY_GEMINI_REPLAY (cassette paths);
+    CULINARY_GEMINI_REPLAY_LATENCY=1 reproduces recorded latencies
+
+    Returns:
+        "record", "replay" or None
+    """
+    record_path = os.getenv("CULINARY_GEMINI_RECORD")
+    replay_path = os.getenv("CULINARY_GEMINI_REPLAY")
+    if replay_path:
+        reproduce_latency = os.getenv("CULINARY_GEMINI_REPLAY_LATENCY", "").lower() in ("1", "true", "yes", "on")
+        client = ReplayClient(Cassette(replay_path).load(), reproduce_latency)
+        if not os.environ.get("GOOGLE_AI_API_KEY"):
+            os.environ["GOOGLE_AI_API_KEY"] = REPLAY_API_KEY
+        set_client_factory(lambda key: client)
+        return "replay"
+    if record_path:
+        cassette = Cassette(record_path)
+        inner_factory = get_client_factory()
+        set_client_factory(lambda key: RecordingClient(inner_factory(key), cassette))
+        return "record"
+    return None
@@ -0,0 +1,160 @@
+"""
+Gemini client helpers
+Resolves the API key and creates google.genai clients only when first needed
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Optional
+
+from utils.metrics import llm_call_seconds, llm_rate_limited
+from utils.tracing import span
+
+# Replaces google.genai in create_client when set (see set_client_factory)
+_client_factory: Optional[Callable[[str], Any]] = None
+
+# Call site of the generate_content call in progress (read by fake clients)
+current_call_site: ContextVar[Optional[str]] = ContextVar("current_call_site", default=None)
+
+
+def get_api_key(api_key: Optional[str] = None) -> Optional[str]:
+    """
+    Resolve the Google AI API key
+
+    Args:
+        api_key: Explicit key (returned unchanged if given)
+
+    Returns:
+        Key from the argument, GOOGLE_AI_API_KEY env var or .env file, or None
+    """
+    if api_key is not None:
+        return api_key
+
+    api_key = os.getenv("GOOGLE_AI_API_KEY")
+    if api_key is None:
+        # Try .env file
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+            api_key = os.getenv("GOOGLE_AI_API_KEY")
+        except ImportError:
+            pass
+    return api_key
+
+
+def create_client(api_key: str):
+    """
+    Create a google.genai client (imports the SDK on first call)
+
+    Args:
+        api_key: Google AI API key
+
+    Returns:
+        google.genai.Client instance (or the installed factory's client)
+    """
+    return get_client_factory()(api_key)
+
+
+def genai_client(api_key: str):
+    """google.genai.Client for api_key (the default client factory)"""
+    import google.genai as genai
+    return genai.Client(api_key=api_key)
+
+
+def set_client_factory(factory: Optional[Callable[[str], Any]]) -> Optional[Callable[[str], Any]]:
+    """
+    Route create_client through factory(api_key), e.g. to inject a fake client
+    (see utils.fake_gemini); None restores google.genai
+
+    Args:
+        factory: Client factory or None
+
+    Returns:
+        The factory it replaces (None for google.genai), to restore later
+    """
+    global _client_factory
+    previous, _client_factory = _client_factory, factory
+    return previous
+
+
+def get_client_factory() -> Callable[[str], Any]:
+    """Factory create_client currently uses (genai_client unless replaced)"""
+    return _client_factory or genai_client
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Whether an API error is a 429 / quota rejection"""
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str or "quota" in error_str.lower()
+
+
+def generate_content(client, call_site: str, trace_attributes: Optional[Dict[str, Any]] = None, **kwargs):
+    """
+    Call client.models.generate_content, recording latency and outcome metrics
+    and a trace span
+
+    Args:
+        client: google.genai.Client
+        call_site: Metrics label of the caller (e.g. "wine_enrichment")
+        trace_attributes: Extra span attributes (e.g. dish or wine name)
+        **kwargs: Arguments for generate_content (model, contents, config)
+
+    Returns:
+        Model response
+    """
+    with span(f"llm.{call_site}", model=kwargs.get("model"), **(trace_attributes or {})) as llm_span:
+        started = time.perf_counter()
+        token = current_call_site.set(call_site)
+        try:
+            response = client.models.generate_content(**kwargs)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                outcome = "rate_limited"
+                llm_rate_limited.inc(call_site=call_site)
+            else:
+                outcome = "error"
+            llm_call_seconds.observe(time.perf_counter() - started, call_site=call_site, outcome=outcome)
+            raise
+        finally:
+            current_call_site.reset(token)
+        llm_call_seconds.observe(time.perf_counter() - started, call_site=call_site, outcome="ok")
+        llm_span.set(**token_counts(response))
+        return response
+
+
+def token_counts(response) -> Dict[str, int]:
+    """Prompt/output/total token counts from a response's usage metadata (empty if absent)"""
+    usage = getattr(response, "usage_metadata", None)
+    counts = {}
+    for name, attribute in (
+        ("prompt_tokens", "prompt_token_count"),
+        ("output_tokens", "candidates_token_count"),
+        ("total_tokens", "total_token_count"),
+    ):
+        value = getattr(usage, attribute, None)
+        if isinstance(value, int):
+            counts[name] = value
+    return counts
+
+
+def upload_file(client, source, mime_type: str):
+    """
+    Upload a file to the Gemini Files API
+    
+    Args:
+        client: google.genai.Client
+        source: Path, bytes, or binary file object (uploaded without a temp file)
+        mime_type: MIME type of the content (e.g. "application/pdf")
+        
+    Returns:
+        Uploaded file reference usable in generate_content contents
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return client.files.upload(file=source)
+    if isinstance(source, (bytes, bytearray)):
+        import io
+        source = io.BytesIO(source)
+    else:
+        source.seek(0)
+    return client.files.upload(file=source, config={"mime_type": mime_type})
@@ -0,0 +1,506 @@
+"""
+Binary knowledge-base snapshot
+Memory-mapped NumPy layout of processed_wines.json and ingredient_flavor_map.json
+
+The snapshot directory holds one .npy file per array:
+- a shared compound vocabulary (UTF-8 string table)
+- CSR indptr/indices arrays for wine -> compounds and ingredient -> compounds
+- columnar wine attributes (numeric columns, string tables, CSR string lists)
+
+Every array is opened with np.load(mmap_mode='r'), so loading is near-instant
+and the pages are shared between worker processes. Records are decoded lazily
+on first access.
+"""
+
+import json
+from collections.abc import Mapping, MutableMapping, Sequence
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+from utils.config import (
+    DEFAULT_WINES_PATH,
+    DEFAULT_INGREDIENT_MAP_PATH,
+    DEFAULT_KB_SNAPSHOT_DIR
+)
+
+
+SNAPSHOT_VERSION = 1
+
+# Wine columns stored as UTF-8 string tables
+WINE_STRING_COLUMNS = [
+    'wine_name', 'type_name', 'body_name', 'acidity_name', 'country', 'region', 'winery'
+]
+
+# Wine columns stored as CSR lists of strings
+WINE_LIST_COLUMNS = ['grapes', 'harmonize']
+
+# Wine columns stored as int8 (normalized 1-5 scales)
+WINE_INT8_COLUMNS = ['type', 'body', 'acidity']
+
+# Field order of processed_wines.json records
+WINE_FIELD_ORDER = [
+    'wine_id', 'wine_name', 'type', 'type_name', 'body', 'body_name', 'acidity',
+    'acidity_name', 'grapes', 'abv', 'country', 'region', 'winery', 'harmonize',
+    'flavor_compounds'
+]
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _encode_strings(strings: Iterable[str]):
+    """Encode strings into a UTF-8 byte blob plus int64 offsets"""
+    encoded = [str(s).encode('utf-8') for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8) if encoded else np.zeros(0, dtype=np.uint8)
+    return data, offsets
+
+
+def _save_strings(out_dir: Path, name: str, strings: Iterable[str]):
+    data, offsets = _encode_strings(strings)
+    np.save(out_dir / f"{name}.data.npy", data)
+    np.save(out_dir / f"{name}.offsets.npy", offsets)
+
+
+def _save_string_lists(out_dir: Path, name: str, lists: List[List[str]]):
+    indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    if lists:
+        indptr[1:] = np.cumsum([len(items) for items in lists])
+    np.save(out_dir / f"{name}.indptr.npy", indptr)
+    _save_strings(out_dir, f"{name}.items", [item for items in lists for item in items])
+
+
+def _build_csr(compound_lists: List[List[str]], vocab_index: Dict[str, int]):
+    indptr = np.zeros(len(compound_lists) + 1, dtype=np.int64)
+    if compound_lists:
+        indptr[1:] = np.cumsum([len(compounds) for compounds in compound_lists])
+    indices = np.fromiter(
+        (vocab_index[c] for compounds in compound_lists for c in compounds),
+        dtype=np.int32,
+        count=int(indptr[-1])
+    )
+    return indptr, indices
+
+
+def _source_stat(path: Path) -> Optional[Dict[str, int]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def write_snapshot(
+    wines: List[Dict[str, Any]],
+    ingredient_flavor_map: Dict[str, Any],
+    out_dir: Path = DEFAULT_KB_SNAPSHOT_DIR,
+    wines_path: Path = DEFAULT_WINES_PATH,
+    ingredient_map_path: Path = DEFAULT_INGREDIENT_MAP_PATH
+) -> Path:
+    """
+    Write a binary snapshot of the knowledge base
+
+    Args:
+        wines: Processed wine records
+        ingredient_flavor_map: Ingredient -> {'cleaned_name', 'compounds'} map
+        out_dir: Snapshot directory
+        wines_path: JSON file the wines were saved to (recorded for staleness checks)
+        ingredient_map_path: JSON file the ingredient map was saved to
+
+    Returns:
+        Path to the snapshot directory
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # Shared compound vocabulary, in first-seen order
+    vocab_index = {}
+    for data in ingredient_flavor_map.values():
+        for compound in data.get('compounds', []):
+            vocab_index.setdefault(compound, len(vocab_index))
+    for wine in wines:
+        for compound in wine.get('flavor_compounds', []):
+            vocab_index.setdefault(compound, len(vocab_index))
+    _save_strings(out_dir, 'compounds', vocab_index.keys())
+
+    # Ingredient -> compounds
+    ingredient_names = list(ingredient_flavor_map.keys())
+    _save_strings(out_dir, 'ingredient_names', ingredient_names)
+    _save_strings(out_dir, 'ingredient_cleaned_names',
+                  [ingredient_flavor_map[name].get('cleaned_name', '') for name in ingredient_names])
+    indptr, indices = _build_csr(
+        [ingredient_flavor_map[name].get('compounds', []) for name in ingredient_names], vocab_index
+    )
+    np.save(out_dir / 'ingredient_compounds.indptr.npy', indptr)
+    np.save(out_dir / 'ingredient_compounds.indices.npy', indices)
+
+    # Wine -> compounds
+    indptr, indices = _build_csr([wine.get('flavor_compounds', []) for wine in wines], vocab_index)
+    np.save(out_dir / 'wine_compounds.indptr.npy', indptr)
+    np.save(out_dir / 'wine_compounds.indices.npy', indices)
+
+    # Columnar wine attributes
+    wine_ids = [wine.get('wine_id') for wine in wines]
+    np.save(out_dir / 'wine_id.npy', np.array([w if w is not None else 0 for w in wine_ids], dtype=np.int64))
+    np.save(out_dir / 'wine_id.valid.npy', np.array([w is not None for w in wine_ids], dtype=bool))
+    for column in WINE_INT8_COLUMNS:
+        np.save(out_dir / f'{column}.npy', np.array([wine.get(column, 3) for wine in wines], dtype=np.int8))
+    np.save(out_dir / 'abv.npy', np.array(
+        [wine['abv'] if wine.get('abv') is not None else np.nan for wine in wines], dtype=np.float64
+    ))
+    for column in WINE_STRING_COLUMNS:
+        _save_strings(out_dir, column, [wine.get(column, 'Unknown') for wine in wines])
+    for column in WINE_LIST_COLUMNS:
+        _save_string_lists(out_dir, column, [list(wine.get(column, [])) for wine in wines])
+
+    meta = {
+        'version': SNAPSHOT_VERSION,
+        'wine_count': len(wines),
+        'ingredient_count': len(ingredient_names),
+        'compound_count': len(vocab_index),
+        'sources': {
+            'wines': _source_stat(wines_path),
+            'ingredient_map': _source_stat(ingredient_map_path),
+        }
+    }
+    with open(out_dir / 'meta.json', 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+    return out_dir
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+def _load_array(path: Path) -> np.ndarray:
+    try:
+        return np.load(path, mmap_mode='r')
+    except ValueError:
+        # Zero-length arrays cannot be memory-mapped
+        return np.load(path)
+
+
+class StringTable(Sequence):
+    """Read-only view over a UTF-8 string table"""
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+        self._decoded = None
+
+    @classmethod
+    def load(cls, snapshot_dir: Path, name: str) -> "StringTable":
+        return cls(_load_array(snapshot_dir / f"{name}.data.npy"),
+                   _load_array(snapshot_dir / f"{name}.offsets.npy"))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self._decoded is not None:
+            return self._decoded[index]
+        if index < 0:
+            index += len(self)
+        start, end = int(self._offsets[index]), int(self._offsets[index + 1])
+        return bytes(self._data[start:end]).decode('utf-8')
+
+    def tolist(self) -> List[str]:
+        """Decode the whole table once and cache it"""
+        if self._decoded is None:
+            blob = bytes(self._data)
+            offsets = self._offsets.tolist()
+            self._decoded = [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(self))]
+        return self._decoded
+
+
+class KnowledgeBaseSnapshot:
+    """
+    Memory-mapped knowledge-base snapshot
+    """
+
+    def __init__(self, snapshot_dir: Path = DEFAULT_KB_SNAPSHOT_DIR):
+        self.snapshot_dir = Path(snapshot_dir)
+        meta_path = self.snapshot_dir / 'meta.json'
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Knowledge-base snapshot not found: {self.snapshot_dir}")
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {self.meta.get('version')}")
+
+        d = self.snapshot_dir
+        self.compounds = StringTable.load(d, 'compounds')
+        self.ingredient_names = StringTable.load(d, 'ingredient_names')
+        self.ingredient_cleaned_names = StringTable.load(d, 'ingredient_cleaned_names')
+        self.ingredient_indptr = _load_array(d / 'ingredient_compounds.indptr.npy')
+        self.ingredient_indices = _load_array(d / 'ingredient_compounds.indices.npy')
+        self.wine_indptr = _load_array(d / 'wine_compounds.indptr.npy')
+        self.wine_indices = _load_array(d / 'wine_compounds.indices.npy')
+        self.wine_id = _load_array(d / 'wine_id.npy')
+        self.wine_id_valid = _load_array(d / 'wine_id.valid.npy')
+        self.abv = _load_array(d / 'abv.npy')
+        self.int8_columns = {c: _load_array(d / f'{c}.npy') for c in WINE_INT8_COLUMNS}
+        self.string_columns = {c: StringTable.load(d, c) for c in WINE_STRING_COLUMNS}
+        self.list_columns = {
+            c: (_load_array(d / f'{c}.indptr.npy'), StringTable.load(d, f'{c}.items'))
+            for c in WINE_LIST_COLUMNS
+        }
+
+    @staticmethod
+    def is_fresh(snapshot_dir: Path = DEFAULT_KB_SNAPSHOT_DIR,
+                 wines_path: Path = DEFAULT_WINES_PATH,
+                 ingredient_map_path: Path = DEFAULT_INGREDIENT_MAP_PATH) -> bool:
+        """
+        Check that a snapshot exists and was written from the current JSON files
+
+        JSON files that are missing are ignored; JSON files modified after the
+        snapshot (e.g. new ingredients saved by MenuExtractor) make it stale.
+        """
+        meta_path = Path(snapshot_dir) / 'meta.json'
+        if not meta_path.exists():
+            return False
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+        if meta.get('version') != SNAPSHOT_VERSION:
+            return False
+        sources = meta.get('sources', {})
+        for key, path in (('wines', wines_path), ('ingredient_map', ingredient_map_path)):
+            current = _source_stat(path)
+            if current is not None and current != sources.get(key):
+                return False
+        return True
+
+    def wine_compound_ids(self, index: int) -> np.ndarray:
+        return self.wine_indices[self.wine_indptr[index]:self.wine_indptr[index + 1]]
+
+    def ingredient_compound_ids(self, index: int) -> np.ndarray:
+        return self.ingredient_indices[self.ingredient_indptr[index]:self.ingredient_indptr[index + 1]]
+
+    def _decode_compounds(self, ids: np.ndarray) -> List[str]:
+        vocab = self.compounds.tolist()
+        return [vocab[i] for i in ids.tolist()]
+
+    def _decode_list(self, column: str, index: int) -> List[str]:
+        indptr, items = self.list_columns[column]
+        return items[int(indptr[index]):int(indptr[index + 1])]
+
+    def wine_record(self, index: int) -> Dict[str, Any]:
+        """Decode one wine into the processed_wines.json record format"""
+        abv = float(self.abv[index])
+        record = {
+            'wine_id': int(self.wine_id[index]) if self.wine_id_valid[index] else None,
+            'abv': None if np.isnan(abv) else abv,
+            'flavor_compounds': self._decode_compounds(self.wine_compound_ids(index)),
+        }
+        for column, values in self.int8_columns.items():
+            record[column] = int(values[index])
+        for column, table in self.string_columns.items():
+            record[column] = table[index]
+        for column in WINE_LIST_COLUMNS:
+            record[column] = self._decode_list(column, index)
+        return {field: record[field] for field in WINE_FIELD_ORDER}
+
+    def wines(self) -> "SnapshotWineList":
+        return SnapshotWineList(self)
+
+    def ingredient_flavor_map(self) -> "SnapshotIngredientMap":
+        return SnapshotIngredientMap(self)
+
+
+class SnapshotWineList(Sequence):
+    """List-like view of snapshot wines; records are decoded on first access"""
+
+    def __init__(self, snapshot: KnowledgeBaseSnapshot):
+        self._snapshot = snapshot
+        self._records = [None] * int(snapshot.meta['wine_count'])
+
+    @property
+    def snapshot(self) -> KnowledgeBaseSnapshot:
+        """Underlying snapshot (columnar access without decoding records)"""
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        record = self._records[index]
+        if record is None:
+            record = self._snapshot.wine_record(index)
+            self._records[index] = record
+        return record
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class IngredientEntry(Mapping):
+    """Lazy {'cleaned_name', 'compounds'} entry backed by the snapshot"""
+
+    def __init__(self, snapshot: KnowledgeBaseSnapshot, index: int):
+        self._snapshot = snapshot
+        self._index = index
+        self._compounds = None
+
+    def __getitem__(self, key):
+        if key == 'cleaned_name':
+            return self._snapshot.ingredient_cleaned_names[self._index]
+        if key == 'compounds':
+            if self._compounds is None:
+                self._compounds = self._snapshot._decode_compounds(
+                    self._snapshot.ingredient_compound_ids(self._index)
+                )
+            return self._compounds
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(('cleaned_name', 'compounds'))
+
+    def __len__(self) -> int:
+        return 2
+
+
+class SnapshotIngredientMap(MutableMapping):
+    """
+    Dict-like view of the snapshot ingredient map
+
+    Entries are decoded lazily. Writes (e.g. ingredients added via Gemini) go to
+    an in-memory overlay. Serialise with json.dump(..., default=dict).
+    """
+
+    def __init__(self, snapshot: KnowledgeBaseSnapshot):
+        self._snapshot = snapshot
+        self._names = snapshot.ingredient_names.tolist()
+        self._index = {name: i for i, name in enumerate(self._names)}
+        self._entries = {}
+        self._overlay = {}
+        self._deleted = set()
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            return self._overlay[key]
+        if key in self._deleted or key not in self._index:
+            raise KeyError(key)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = IngredientEntry(self._snapshot, self._index[key])
+            self._entries[key] = entry
+        return entry
+
+    def __setitem__(self, key, value):
+        self._deleted.discard(key)
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key in self._overlay:
+            del self._overlay[key]
+            if key not in self._index:
+                return
+        elif key not in self._index or key in self._deleted:
+            raise KeyError(key)
+        self._deleted.add(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._overlay or (key in self._index and key not in self._deleted)
+
+    def copy(self) -> "SnapshotIngredientMap":
+        """Copy sharing the snapshot; the overlay and deletions are copied"""
+        clone = SnapshotIngredientMap.__new__(SnapshotIngredientMap)
+        clone._snapshot = self._snapshot
+        clone._names = self._names
+        clone._index = self._index
+        clone._entries = dict(self._entries)
+        clone._overlay = dict(self._overlay)
+        clone._deleted = set(self._deleted)
+        return clone
+
+    def __iter__(self):
+        for name in self._names:
+            if name not in self._deleted:
+                yield name
+        for name in self._overlay:
+            if name not in self._index:
+                yield name
+
+    def __len__(self) -> int:
+        extra = sum(1 for name in self._overlay if name not in self._index)
+        return len(self._names) - len(self._deleted) + extra
+
+
+# ---------------------------------------------------------------------------
+# Loaders used by the application modules
+# ---------------------------------------------------------------------------
+
+def _load_snapshot(snapshot_dir: Path, wines_path: Path,
+                   ingredient_map_path: Path) -> Optional[KnowledgeBaseSnapshot]:
+    if not KnowledgeBaseSnapshot.is_fresh(snapshot_dir, wines_path, ingredient_map_path):
+        return None
+    try:
+        return KnowledgeBaseSnapshot(snapshot_dir)
+    except (OSError, ValueError):
+        return None
+
+
+def load_processed_wines(
+    wines_path: Path = DEFAULT_WINES_PATH,
+    snapshot_dir: Path = DEFAULT_KB_SNAPSHOT_DIR,
+    ingredient_map_path: Path = DEFAULT_INGREDIENT_MAP_PATH
+) -> Sequence:
+    """
+    Load processed wines, preferring a fresh binary snapshot over JSON
+
+    The snapshot is fresh only if neither JSON source (wines_path,
+    ingredient_map_path) changed since it was written.
+
+    Raises:
+        FileNotFoundError: If neither the snapshot nor the JSON file exists
+    """
+    snapshot = _load_snapshot(snapshot_dir, wines_path, ingredient_map_path)
+    if snapshot is not None:
+        return snapshot.wines()
+
+    wines_path = Path(wines_path)
+    if not wines_path.exists():
+        raise FileNotFoundError(f"Wines file not found: {wines_path}")
+    with open(wines_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def load_ingredient_flavor_map(
+    ingredient_map_path: Path = DEFAULT_INGREDIENT_MAP_PATH,
+    snapshot_dir: Path = DEFAULT_KB_SNAPSHOT_DIR,
+    wines_path: Path = DEFAULT_WINES_PATH
+) -> MutableMapping:
+    """
+    Load the ingredient flavor map, preferring a fresh binary snapshot over JSON
+
+    The snapshot is fresh only if neither JSON source (ingredient_map_path,
+    wines_path) changed since it was written.
+
+    Raises:
+        FileNotFoundError: If neither the snapshot nor the JSON file exists
+    """
+    snapshot = _load_snapshot(snapshot_dir, wines_path, ingredient_map_path)
+    if snapshot is not None:
+        return snapshot.ingredient_flavor_map()
+
+    ingredient_map_path = Path(ingredient_map_path)
+    if not ingredient_map_path.exists():
+        raise FileNotFoundError(f"Ingredient flavor map not found: {ingredient_map_path}")
+    with open(ingredient_map_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,340 @@
+"""
+Pipeline metrics
+Dependency-free counters and histograms for stage latency, throughput and
+LLM calls. The server exposes them in Prometheus text format at /metrics and
+the CLI prints a summary table at the end of a run.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.profiling import stage_marker
+from utils.tracing import span
+
+# Latency buckets in seconds (LLM calls take seconds, scoring stages milliseconds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Item count buckets (dishes, wines, pairs per stage run)
+COUNT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Pipeline stages, in workflow order
+STAGES = ("extraction", "enrichment", "similarity", "pairing", "ranking", "report")
+
+
+class Counter:
+    """Monotonic counter with one value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "sum", "max")
+
+    def __init__(self, size: int):
+        self.bucket_counts = [0] * size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+
+class Histogram:
+    """Bucketed histogram with one series per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One extra slot for observations above the last bucket (+Inf)
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.bucket_counts[index] += 1
+            series.count += 1
+            series.sum += value
+            series.max = max(series.max, value)
+
+    def series(self) -> Dict[Tuple[str, ...], _HistogramSeries]:
+        with self._lock:
+            return dict(self._series)
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """
+        Estimate a quantile by interpolating within buckets
+
+        Args:
+            q: Quantile in [0, 1]
+            **labels: Series labels
+
+        Returns:
+            Estimated value, or None if the series is empty
+        """
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        series = self._series.get(key)
+        if series is None or series.count == 0:
+            return None
+
+        rank = q * series.count
+        cumulative = 0
+        for index, bucket_count in enumerate(series.bucket_counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else series.max
+                upper = min(upper, series.max)
+                fraction = (rank - cumulative) / bucket_count
+                return lower + (max(upper, lower) - lower) * fraction
+            cumulative += bucket_count
+        return series.max
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], float]]:
+        samples = []
+        for key, series in sorted(self.series().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series.bucket_counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key + (_format_number(bound),), cumulative))
+            samples.append((f"{self.name}_bucket", key + ("+Inf",), series.count))
+            samples.append((f"{self.name}_sum", key, series.sum))
+            samples.append((f"{self.name}_count", key, series.count))
+        return samples
+
+
+class MetricsRegistry:
+    """Named collection of counters and histograms"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def reset(self):
+        """Clear every recorded value (metrics stay registered)"""
+        with self._lock:
+            for metric in self._metrics.values():
+                with metric._lock:
+                    if isinstance(metric, Histogram):
+                        metric._series.clear()
+                    else:
+                        metric._values.clear()
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            label_names = metric.labels + (("le",) if isinstance(metric, Histogram) else ())
+            for sample_name, key, value in metric.samples():
+                names = label_names if len(key) == len(label_names) else metric.labels
+                label_text = ",".join(
+                    f'{name}="{_escape_label(label)}"' for name, label in zip(names, key)
+                )
+                suffix = f"{{{label_text}}}" if label_text else ""
+                lines.append(f"{sample_name}{suffix} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+stage_seconds = registry.histogram(
+    "culinary_stage_seconds", "Wall time of a pipeline stage run", ["stage"]
+)
+stage_items = registry.histogram(
+    "culinary_stage_items", "Items produced by a pipeline stage run", ["stage"], COUNT_BUCKETS
+)
+stage_errors = registry.counter(
+    "culinary_stage_errors_total", "Pipeline stage runs that raised", ["stage"]
+)
+llm_call_seconds = registry.histogram(
+    "culinary_llm_call_seconds", "Latency of a single LLM request", ["call_site", "outcome"]
+)
+llm_retries = registry.counter(
+    "culinary_llm_retries_total", "LLM requests retried after an error", ["call_site"]
+)
+llm_rate_limited = registry.counter(
+    "culinary_llm_rate_limited_total", "LLM requests rejected with 429 / quota errors", ["call_site"]
+)
+llm_cache_lookups = registry.counter(
+    "culinary_llm_cache_lookups_total",
+    "Lookups answered from local data (hit) instead of an LLM request (miss)",
+    ["call_site", "result"]
+)
+http_request_seconds = registry.histogram(
+    "culinary_http_request_seconds", "API request latency", ["method", "route", "status"]
+)
+
+
+@contextmanager
+def stage_timer(stage: str):
+    """
+    Time a pipeline stage run (also recorded as a "stage.<name>" trace span,
+    with the thread's CPU time as cpu_ms, and attributed in CPU profiles)
+
+    Args:
+        stage: Stage name (see STAGES)
+
+    Yields:
+        Dict whose "items" entry, if set, is recorded as the stage's item count
+    """
+    record = {"items": None}
+    with span(f"stage.{stage}") as stage_span, stage_marker(stage):
+        started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield record
+        except Exception:
+            stage_errors.inc(stage=stage)
+            raise
+        finally:
+            stage_seconds.observe(time.perf_counter() - started, stage=stage)
+            stage_span.set(cpu_ms=round((time.thread_time() - cpu_started) * 1000, 3))
+            if record["items"] is not None:
+                stage_items.observe(record["items"], stage=stage)
+                stage_span.set(items=record["items"])
+
+
+def timed_stage(stage: str, count: Optional[Callable] = len):
+    """
+    Decorator recording a method as one run of a pipeline stage
+
+    Args:
+        stage: Stage name (see STAGES)
+        count: Function mapping the result to its item count (None to skip)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage) as record:
+                result = func(*args, **kwargs)
+                if count is not None:
+                    record["items"] = count(result)
+                return result
+        return wrapper
+    return decorator
+
+
+def record_cache_lookup(call_site: str, hit: bool):
+    """Count a local lookup that avoided (hit) or required (miss) an LLM request"""
+    llm_cache_lookups.inc(call_site=call_site, result="hit" if hit else "miss")
+
+
+def record_llm_retry(call_site: str):
+    """Count an LLM request that is about to be retried"""
+    llm_retries.inc(call_site=call_site)
+
+
+def format_summary_table() -> str:
+    """
+    Summarise stage and LLM metrics as a plain-text table
+
+    Returns:
+        Table text (empty string if nothing was recorded)
+    """
+    rows = []
+    stage_series = stage_seconds.series()
+    item_series = stage_items.series()
+    ordered = sorted(stage_series, key=lambda key: STAGES.index(key[0]) if key[0] in STAGES else len(STAGES))
+    for key in ordered:
+        series = stage_series[key]
+        items = item_series.get(key)
+        rows.append((
+            key[0],
+            series.count,
+            series.sum,
+            stage_seconds.quantile(0.5, stage=key[0]),
+            stage_seconds.quantile(0.95, stage=key[0]),
+            int(items.sum) if items else None,
+        ))
+
+    llm_series = llm_call_seconds.series()
+    for (call_site, outcome), series in sorted(llm_series.items()):
+        rows.append((
+            f"llm:{call_site} ({outcome})",
+            series.count,
+            series.sum,
+            llm_call_seconds.quantile(0.5, call_site=call_site, outcome=outcome),
+            llm_call_seconds.quantile(0.95, call_site=call_site, outcome=outcome),
+            None,
+        ))
+
+    if not rows:
+        return ""
+
+    header = f"{'Stage':<36} {'Runs':>5} {'Total s':>9} {'p50 s':>8} {'p95 s':>8} {'Items':>7}"
+    lines = [header, "-" * len(header)]
+    for name, runs, total, p50, p95, items in rows:
+        lines.append(
+            f"{name:<36} {runs:>5} {total:>9.3f} {p50 or 0:>8.3f} {p95 or 0:>8.3f} "
+            f"{'' if items is None else items:>7}"
+        )
+
+    counters = []
+    for _, (call_site,), value in llm_retries.samples():
+        counters.append(f"{call_site}: {int(value)} retries")
+    for _, (call_site,), value in llm_rate_limited.samples():
+        counters.append(f"{call_site}: {int(value)} rate limited")
+    for _, (call_site, result), value in llm_cache_lookups.samples():
+        counters.append(f"{call_site}: {int(value)} cache {result}s")
+    if counters:
+        lines.append("")
+        lines.extend(f"  {text}" for text in counters)
+    return "\n".join(lines)
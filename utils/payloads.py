@@ -0,0 +1,122 @@
+"""
+API payload helpers
+Field projection and cursor pagination for list responses, so clients only
+receive the records and fields they need.
+"""
+
+import base64
+import json
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+# Largest page a client may request
+MAX_PAGE_SIZE = 500
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields parameter
+
+    Args:
+        fields: e.g. "wine_id,wine_name,type_name" (None or empty for all fields)
+
+    Returns:
+        List of field names, or None for all fields
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    return names or None
+
+
+def project_wine(
+    wine: Dict[str, Any],
+    fields: Optional[List[str]] = None,
+    include_compounds: bool = True
+) -> Dict[str, Any]:
+    """
+    Project a wine dictionary onto the requested fields
+
+    Args:
+        wine: Wine dictionary
+        fields: Fields to keep (None for all)
+        include_compounds: Whether to keep the flavor_compounds list; when
+            dropped, flavor_compound_count is returned instead
+
+    Returns:
+        New wine dictionary
+    """
+    if fields is None:
+        projected = dict(wine)
+    else:
+        projected = {name: wine[name] for name in fields if name in wine}
+
+    if not include_compounds and "flavor_compounds" in projected:
+        compounds = projected.pop("flavor_compounds")
+        projected["flavor_compound_count"] = len(compounds or [])
+    return projected
+
+
+def encode_cursor(offset: int, total: int) -> str:
+    """Encode a page position as an opaque cursor"""
+    raw = json.dumps({"o": offset, "n": total}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, total: int) -> int:
+    """
+    Decode a cursor back into an offset
+
+    Args:
+        cursor: Cursor from a previous page
+        total: Current length of the list being paged
+
+    Returns:
+        Offset of the next page
+
+    Raises:
+        ValueError: If the cursor is malformed or the list changed since it was issued
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset, issued_total = int(data["o"]), int(data["n"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    if issued_total != total:
+        raise ValueError("Cursor is stale: the list changed since it was issued")
+    if not 0 <= offset <= total:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return offset
+
+
+def paginate(
+    items: Sequence[Any],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Slice one page out of a list
+
+    Args:
+        items: Full list
+        cursor: Cursor from the previous page (None for the first page)
+        limit: Page size (None for everything after the cursor)
+
+    Returns:
+        (page items, cursor of the next page or None on the last page)
+
+    Raises:
+        ValueError: On an invalid cursor or limit
+    """
+    total = len(items)
+    offset = decode_cursor(cursor, total) if cursor else 0
+
+    if limit is None:
+        return list(items[offset:]), None
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    end = min(offset + limit, total)
+    next_cursor = encode_cursor(end, total) if end < total else None
+    return list(items[offset:end]), next_cursor
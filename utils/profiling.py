@@ -0,0 +1,275 @@
+"""
+CPU profiling
+A statistical sampler that records every thread's stack at a fixed interval,
+tagged with the pipeline stage the thread was running, plus a helper that
+profiles a whole CLI run with cProfile and the sampler.
+
+Outputs:
+- collapsed stacks ("stage:pairing;app.py:run (12);... 42"), the input format
+  of flamegraph.pl, speedscope and similar flame graph tools
+- pstats (cProfile for CLI runs; built from samples for the server endpoint,
+  since cProfile only sees the thread that enabled it)
+"""
+
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# Default sampling interval (seconds)
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# Stack depth kept per sample (innermost frames are dropped beyond this)
+MAX_STACK_DEPTH = 128
+# Stage label of samples taken outside any pipeline stage
+NO_STAGE = "(none)"
+
+# Thread id -> pipeline stage currently running in it (see stage_marker)
+_thread_stages: Dict[int, str] = {}
+
+
+@contextmanager
+def stage_marker(stage: str):
+    """
+    Mark the current thread as running a pipeline stage, for sample attribution
+
+    Args:
+        stage: Stage name
+    """
+    thread_id = threading.get_ident()
+    previous = _thread_stages.get(thread_id)
+    _thread_stages[thread_id] = stage
+    try:
+        yield
+    finally:
+        if previous is None:
+            _thread_stages.pop(thread_id, None)
+        else:
+            _thread_stages[thread_id] = previous
+
+
+FrameKey = Tuple[str, int, str]  # (filename, first line, function name), as in pstats
+
+
+class SamplingProfiler:
+    """
+    Sample the stacks of all threads from a background thread
+
+    Usage:
+        profiler = SamplingProfiler()
+        profiler.start()
+        ...
+        profiler.stop()
+        print(profiler.collapsed())
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()  # (stage, stack of FrameKey, outermost first) -> count
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self.started_at
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples[(_thread_stages.get(thread_id, NO_STAGE), tuple(stack))] += 1
+            self.sample_count += 1
+
+    def stage_counts(self) -> Dict[str, int]:
+        """Samples per pipeline stage (across all threads)"""
+        counts: Counter = Counter()
+        for (stage, _), count in self.samples.items():
+            counts[stage] += count
+        return dict(counts.most_common())
+
+    def collapsed(self, include_idle: bool = False) -> str:
+        """
+        Collapsed stacks, one "frame;frame;... count" line per distinct stack
+
+        Args:
+            include_idle: Keep samples outside any stage whose innermost frame
+                is a wait (idle pool workers, the event loop's selector)
+        """
+        lines = []
+        for (stage, stack), count in self.samples.most_common():
+            if not include_idle and stage == NO_STAGE and stack and _is_idle(stack[-1]):
+                continue
+            frames = [f"stage:{stage}"] + [_frame_label(frame) for frame in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def to_pstats_dict(self) -> Dict[FrameKey, tuple]:
+        """
+        Build a pstats-compatible stats dictionary from the samples
+
+        Call counts are sample counts; times are samples x interval (self
+        time for the innermost frame, cumulative time for every frame on
+        the stack, counted once per sample).
+        """
+        self_samples: Counter = Counter()
+        cumulative_samples: Counter = Counter()
+        callers: Dict[FrameKey, Counter] = {}
+        for (_, stack), count in self.samples.items():
+            if not stack:
+                continue
+            self_samples[stack[-1]] += count
+            for frame in set(stack):
+                cumulative_samples[frame] += count
+            for caller, callee in zip(stack, stack[1:]):
+                callers.setdefault(callee, Counter())[caller] += count
+
+        stats = {}
+        for frame, cumulative in cumulative_samples.items():
+            own = self_samples.get(frame, 0)
+            frame_callers = {
+                caller: (n, n, 0.0, n * self.interval)
+                for caller, n in callers.get(frame, {}).items()
+            }
+            stats[frame] = (cumulative, cumulative, own * self.interval, cumulative * self.interval, frame_callers)
+        return stats
+
+    def pstats_bytes(self) -> bytes:
+        """Samples as a marshalled stats file, loadable with pstats.Stats(path)"""
+        return marshal.dumps(self.to_pstats_dict())
+
+    def pstats_text(self, limit: int = 40, sort: str = "cumulative") -> str:
+        """Top functions as a pstats table"""
+        return format_pstats(_StatsSource(self.to_pstats_dict()), limit, sort)
+
+
+class _StatsSource:
+    """Adapter letting pstats.Stats load an in-memory stats dictionary"""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def format_pstats(source, limit: int = 40, sort: str = "cumulative") -> str:
+    """
+    Render pstats output as text
+
+    Args:
+        source: cProfile.Profile, stats file path or stats source
+        limit: Number of functions to list
+        sort: pstats sort key
+    """
+    import io
+    import pstats
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(source, stream=buffer)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return buffer.getvalue()
+
+
+def _frame_label(frame: FrameKey) -> str:
+    filename, line, name = frame
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _is_idle(frame: FrameKey) -> bool:
+    return frame[2] in ("wait", "select", "poll", "_worker", "get", "sleep", "accept")
+
+
+@contextmanager
+def profiled(output_dir: str = "profiles", name: str = "run", interval: float = DEFAULT_SAMPLE_INTERVAL):
+    """
+    Profile the enclosed block with cProfile and the sampler, then write
+    <name>-<timestamp>.prof (cProfile stats), .txt (top functions and samples
+    per stage) and .collapsed (stage-tagged flame graph input)
+
+    Args:
+        output_dir: Directory for the profile files
+        name: File name prefix
+        interval: Sampling interval in seconds
+
+    Yields:
+        Dict that receives the written paths ("prof", "txt", "collapsed")
+    """
+    import cProfile
+
+    paths: Dict[str, Path] = {}
+    sampler = SamplingProfiler(interval)
+    profile = cProfile.Profile()
+    sampler.start()
+    profile.enable()
+    try:
+        yield paths
+    finally:
+        profile.disable()
+        sampler.stop()
+
+        directory = Path(output_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = directory / f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+        paths["prof"] = stem.with_suffix(".prof")
+        paths["txt"] = stem.with_suffix(".txt")
+        paths["collapsed"] = stem.with_suffix(".collapsed")
+
+        profile.dump_stats(str(paths["prof"]))
+        with open(paths["txt"], 'w', encoding='utf-8') as f:
+            f.write(format_stage_counts(sampler.stage_counts(), sampler.interval))
+            f.write("\n")
+            f.write(format_pstats(profile))
+        with open(paths["collapsed"], 'w', encoding='utf-8') as f:
+            f.write(sampler.collapsed())
+
+        print(f"\n✓ Profile written ({sampler.duration:.1f}s, {sampler.sample_count} samples):")
+        for kind in ("prof", "txt", "collapsed"):
+            print(f"  - {paths[kind]}")
+
+
+def format_stage_counts(stage_counts: Dict[str, int], interval: float) -> str:
+    """Sampled CPU time per pipeline stage as a small table"""
+    total = sum(stage_counts.values()) or 1
+    lines = ["Samples by pipeline stage:"]
+    for stage, count in stage_counts.items():
+        lines.append(f"  {stage:<20} {count:>7} samples  ~{count * interval:8.2f}s  {count / total:6.1%}")
+    return "\n".join(lines) + "\n"
+
+
+def add_profile_argument(parser):
+    """Add the --profile [DIR] option to a CLI argument parser"""
+    parser.add_argument(
+        "--profile", nargs="?", const="profiles", default=None, metavar="DIR",
+        help="Profile the run (cProfile + stage-tagged samples) and write the results to DIR (default: profiles)"
+    )
+
+
+def maybe_profiled(output_dir: Optional[str], name: str):
+    """profiled(output_dir, name) if output_dir is set, otherwise a no-op context"""
+    if output_dir:
+        return profiled(output_dir, name)
+    return nullcontext({})
@@ -0,0 +1,246 @@
+"""
+Structured logging
+JSON-lines event logging on top of the standard logging module:
+
+- log_event() records an event id, message and data fields; when the level
+  is disabled it returns after a single isEnabledFor() check
+- records go through a QueueHandler, so the calling thread never formats or
+  writes them; a QueueListener thread writes them through one open file,
+  flushed at most once a second
+- high-volume events can be sampled (keep 1 in N per event id)
+- every record carries the run id of the current context (see run_context)
+
+Logging is off unless configure_logging() is called, e.g. by
+configure_from_env() when CULINARY_LOG_LEVEL is set.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Optional
+
+from utils.config import DEFAULT_LOG_SAMPLE_EVERY
+
+# Root of the application's loggers
+LOGGER_NAMESPACE = "culinary"
+
+# Correlation id of the current run (request, job or CLI workflow); copied
+# into worker threads with the context
+current_run_id: ContextVar[Optional[str]] = ContextVar("current_run_id", default=None)
+
+_root_logger = logging.getLogger(LOGGER_NAMESPACE)
+_root_logger.addHandler(logging.NullHandler())
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_sampler: Optional["EventSampler"] = None
+_configure_lock = threading.Lock()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a logger in the application namespace
+
+    Args:
+        name: Component name (e.g. "wine_manager")
+    """
+    return logging.getLogger(f"{LOGGER_NAMESPACE}.{name}")
+
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+@contextmanager
+def run_context(run_id: Optional[str] = None):
+    """
+    Tag every event logged inside the block with a run id
+
+    Args:
+        run_id: Correlation id (a new one is generated if None)
+    """
+    token = current_run_id.set(run_id or new_run_id())
+    try:
+        yield current_run_id.get()
+    finally:
+        current_run_id.reset(token)
+
+
+def log_event(logger: logging.Logger, event: str, message: str, level: int = logging.DEBUG, **data):
+    """
+    Log a structured event
+
+    Args:
+        logger: Logger from get_logger()
+        event: Stable event id (e.g. "wines.enrichment_started"), used for sampling
+        message: Human-readable message
+        level: Logging level (DEBUG by default)
+        **data: Event fields (must be JSON-serialisable)
+    """
+    if not logger.isEnabledFor(level):
+        return
+    # Sample before building the record, which is the expensive part
+    sampler = _sampler
+    if sampler is not None and not sampler.keep(event):
+        return
+    logger.log(level, message, extra={"event": event, "run_id": current_run_id.get(), "data": data})
+
+
+class EventSampler:
+    """Keep the first and then every N-th occurrence of each sampled event id"""
+
+    def __init__(self, sample_every: Optional[Dict[str, int]] = None):
+        self.sample_every = dict(sample_every or {})
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def keep(self, event: str) -> bool:
+        every = self.sample_every.get(event, 1)
+        if every <= 1:
+            return True
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        return count % every == 0
+
+
+class _PassThroughQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as-is; formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """File handler that flushes at most every flush_interval seconds (and on close)"""
+
+    def __init__(self, filename: str, flush_interval: float = 1.0):
+        super().__init__(filename, encoding="utf-8")
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.stream.write(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": int(record.created * 1000),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "location": f"{record.module}:{record.lineno}",
+            "data": getattr(record, "data", {}),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    level: str = "DEBUG",
+    path: Optional[str] = None,
+    sample_every: Optional[Dict[str, int]] = None
+) -> logging.handlers.QueueListener:
+    """
+    Enable structured logging (replaces any previous configuration)
+
+    Args:
+        level: Minimum level name (e.g. "DEBUG", "INFO")
+        path: JSON-lines output file (stderr if None)
+        sample_every: Event id -> keep 1 in N (DEFAULT_LOG_SAMPLE_EVERY if None)
+
+    Returns:
+        The running QueueListener
+    """
+    global _listener, _queue_handler, _sampler
+    with _configure_lock:
+        _stop_listener()
+
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            target = BufferedFileHandler(path)
+        else:
+            target = logging.StreamHandler()
+        target.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _PassThroughQueueHandler(log_queue)
+        _sampler = EventSampler(DEFAULT_LOG_SAMPLE_EVERY if sample_every is None else sample_every)
+        _root_logger.addHandler(_queue_handler)
+        _root_logger.setLevel(level.upper())
+        _root_logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, target)
+        _listener.start()
+        return _listener
+
+
+def configure_from_env() -> bool:
+    """
+    Enable structured logging when CULINARY_LOG_LEVEL is set
+
+    CULINARY_LOG_FILE sets the output file and CULINARY_LOG_SAMPLE overrides
+    sampling as "event=N,event=N".
+
+    Returns:
+        Whether logging was enabled
+    """
+    level = os.getenv("CULINARY_LOG_LEVEL")
+    if not level:
+        return False
+
+    sample_every = dict(DEFAULT_LOG_SAMPLE_EVERY)
+    for item in os.getenv("CULINARY_LOG_SAMPLE", "").split(","):
+        event, _, every = item.partition("=")
+        if event.strip() and every.strip().isdigit():
+            sample_every[event.strip()] = int(every)
+
+    configure_logging(level, os.getenv("CULINARY_LOG_FILE"), sample_every)
+    return True
+
+
+def shutdown_logging():
+    """Flush queued records and disable structured logging"""
+    with _configure_lock:
+        _stop_listener()
+        _root_logger.setLevel(logging.NOTSET)
+        _root_logger.propagate = True
+
+
+def _stop_listener():
+    global _listener, _queue_handler, _sampler
+    _sampler = None
+    if _queue_handler is not None:
+        _root_logger.removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,238 @@
+"""
+Span tracing
+Lightweight nested spans (LLM calls, retry sleeps, CPU phases) grouped by run
+id and exported as Chrome trace-event JSON, viewable offline in Perfetto
+(ui.perfetto.dev) or chrome://tracing.
+
+Tracing is off unless enable_tracing() is called (or CULINARY_TRACE is set);
+until then span() records nothing and traced() calls straight through.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from utils.structured_log import current_run_id
+
+# Spans recorded without a run id are grouped under this id
+DEFAULT_RUN_ID = "default"
+# Most recent runs kept in memory, and spans kept per run
+MAX_TRACED_RUNS = 50
+MAX_SPANS_PER_RUN = 20000
+
+
+class Span:
+    """One timed operation; attributes are shown as args in the trace viewer"""
+
+    __slots__ = ("name", "span_id", "parent_id", "run_id", "start_ns", "end_ns", "thread_id", "thread_name", "attributes")
+
+    def __init__(self, name: str, parent_id: Optional[str], run_id: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.run_id = run_id
+        self.attributes = attributes
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, **attributes):
+        """Add or update span attributes"""
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    """Stand-in yielded while tracing is disabled"""
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Innermost open span of the current context (parent of new spans); copied
+# into worker threads with the context
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Collects finished spans per run id (most recent runs only)"""
+
+    def __init__(self, max_runs: int = MAX_TRACED_RUNS, max_spans_per_run: int = MAX_SPANS_PER_RUN):
+        self.enabled = False
+        self.max_runs = max_runs
+        self.max_spans_per_run = max_spans_per_run
+        self._runs: "OrderedDict[str, List[Span]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, span: Span):
+        with self._lock:
+            spans = self._runs.get(span.run_id)
+            if spans is None:
+                spans = self._runs[span.run_id] = []
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            else:
+                self._runs.move_to_end(span.run_id)
+            if len(spans) < self.max_spans_per_run:
+                spans.append(span)
+
+    def run_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._runs)
+
+    def spans(self, run_id: str) -> List[Span]:
+        with self._lock:
+            return list(self._runs.get(run_id, []))
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+
+tracer = Tracer()
+
+
+def enable_tracing(enabled: bool = True):
+    """Turn span recording on or off"""
+    tracer.enabled = enabled
+
+
+def configure_tracing_from_env() -> bool:
+    """
+    Enable tracing when CULINARY_TRACE is set to a true value
+
+    Returns:
+        Whether tracing is enabled
+    """
+    if os.getenv("CULINARY_TRACE", "").lower() in ("1", "true", "yes", "on"):
+        enable_tracing()
+    return tracer.enabled
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Record the enclosed block as a span, nested under the current span
+
+    Args:
+        name: Span name (e.g. "llm.wine_enrichment")
+        **attributes: Span attributes (e.g. dish_id, wine_count, tokens)
+
+    Yields:
+        The span (call .set() to add attributes, e.g. results)
+    """
+    if not tracer.enabled:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current_span.get()
+    run_id = current_run_id.get() or (parent.run_id if parent else DEFAULT_RUN_ID)
+    current = Span(name, parent.span_id if parent else None, run_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        current.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        tracer.record(current)
+
+
+def traced(name: Optional[str] = None):
+    """
+    Decorator recording each call as a span
+
+    Args:
+        name: Span name (default: the function's qualified name)
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def to_chrome_trace(run_id: str) -> Dict[str, Any]:
+    """
+    Build Chrome trace-event JSON for a run
+
+    Args:
+        run_id: Run id (job id, request X-Run-ID or CLI run id)
+
+    Returns:
+        {"traceEvents": [...], "displayTimeUnit": "ms"}
+
+    Raises:
+        ValueError: If no spans were recorded for the run
+    """
+    spans = tracer.spans(run_id)
+    if not spans:
+        raise ValueError(f"No trace recorded for run: {run_id}")
+
+    origin = min(s.start_ns for s in spans)
+    pid = os.getpid()
+    events = [{"ph": "M", "name": "process_name", "pid": pid, "args": {"name": f"run {run_id}"}}]
+    threads = {}
+    for s in spans:
+        threads.setdefault(s.thread_id, s.thread_name)
+    for thread_id, thread_name in threads.items():
+        events.append({"ph": "M", "name": "thread_name", "pid": pid, "tid": thread_id, "args": {"name": thread_name}})
+
+    for s in sorted(spans, key=lambda item: item.start_ns):
+        args = dict(s.attributes)
+        args["span_id"] = s.span_id
+        if s.parent_id:
+            args["parent_id"] = s.parent_id
+        events.append({
+            "ph": "X",
+            "name": s.name,
+            "cat": s.name.split(".", 1)[0],
+            "pid": pid,
+            "tid": s.thread_id,
+            "ts": (s.start_ns - origin) / 1000,
+            "dur": ((s.end_ns or s.start_ns) - s.start_ns) / 1000,
+            "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def export_chrome_trace(run_id: str, path: str) -> Path:
+    """
+    Write a run's spans as a Chrome trace-event JSON file
+
+    Args:
+        run_id: Run id
+        path: Output file path
+
+    Returns:
+        Path of the written file
+    """
+    output = Path(path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(to_chrome_trace(run_id), f, default=str)
+    return output
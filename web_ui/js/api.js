@@ -6,6 +6,10 @@
 const API_BASE = '/api';
 const MAX_RETRIES = 3;
 const RETRY_DELAY = 1000; // 1 second
+const JOB_POLL_INTERVAL = 1000; // 1 second
+const JOB_TERMINAL_EVENTS = ['job.completed', 'job.failed'];
+// Wine lists only need summary fields in the browser (no flavor compound lists)
+const COMPACT_WINE_QUERY = 'include_compounds=false&fields=wine_id,wine_name,type_name,region,winery';
 
 /**
  * Show network error with retry option
@@ -52,6 +56,65 @@ async function apiRequest(url, options = {}, retries = MAX_RETRIES) {
     }
 }
 
+/**
+ * Submit a background job
+ */
+async function submitJob(jobPath, formData) {
+    return apiRequest(`${API_BASE}/jobs/${jobPath}`, {
+        method: 'POST',
+        body: formData
+    });
+}
+
+/**
+ * Stream a job's progress events (Server-Sent Events)
+ * Resolves with the terminal event, or null if the stream closed early
+ */
+function streamJobEvents(jobId, onEvent) {
+    return new Promise((resolve) => {
+        const source = new EventSource(`${API_BASE}/jobs/${jobId}/events`);
+
+        source.onmessage = (message) => {
+            const event = JSON.parse(message.data);
+            if (onEvent) onEvent(event);
+            if (JOB_TERMINAL_EVENTS.includes(event.type)) {
+                source.close();
+                resolve(event);
+            }
+        };
+
+        source.onerror = () => {
+            // EventSource reconnects on its own unless the stream is closed for good
+            if (source.readyState === EventSource.CLOSED) {
+                resolve(null);
+            }
+        };
+    });
+}
+
+/**
+ * Run a background job, reporting progress events, and return its result
+ */
+async function runJob(jobPath, formData, onProgress) {
+    const { job_id: jobId } = await submitJob(jobPath, formData);
+
+    await streamJobEvents(jobId, (event) => {
+        if (onProgress && event.message) onProgress(event.message, event);
+    });
+
+    // Fetch the result (poll in case the event stream was cut off)
+    let job = await apiRequest(`${API_BASE}/jobs/${jobId}`);
+    while (job.status === 'pending' || job.status === 'running') {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL));
+        job = await apiRequest(`${API_BASE}/jobs/${jobId}`);
+    }
+
+    if (job.status !== 'succeeded') {
+        throw new Error(job.error || `Job ${job.status}`);
+    }
+    return job.result;
+}
+
 /**
  * Process menu files
  */
@@ -64,12 +127,7 @@ async function processMenu(files, onProgress) {
     try {
         if (onProgress) onProgress('Uploading files...');
         
-        const response = await apiRequest(`${API_BASE}/process-menu`, {
-            method: 'POST',
-            body: formData
-        });
-
-        return response;
+        return await runJob('process-menu', formData, onProgress);
     } catch (error) {
         throw new Error(`Failed to process menu: ${error.message}`);
     }
@@ -97,12 +155,7 @@ async function processWines(options, onProgress) {
     try {
         if (onProgress) onProgress('Processing wines...');
         
-        const response = await apiRequest(`${API_BASE}/process-wines`, {
-            method: 'POST',
-            body: formData
-        });
-
-        return response;
+        return await runJob(`process-wines?${COMPACT_WINE_QUERY}`, formData, onProgress);
     } catch (error) {
         throw new Error(`Failed to process wines: ${error.message}`);
     }
@@ -149,7 +202,7 @@ async function pairWines() {
  */
 async function rankWines() {
     try {
-        const response = await apiRequest(`${API_BASE}/rank-wines`, {
+        const response = await apiRequest(`${API_BASE}/rank-wines?${COMPACT_WINE_QUERY}`, {
             method: 'POST'
         });
 
@@ -162,17 +215,12 @@ async function rankWines() {
 /**
  * Generate report
  */
-async function generateReport(format = 'dict') {
+async function generateReport(format = 'dict', onProgress) {
     const formData = new FormData();
     formData.append('format', format);
 
     try {
-        const response = await apiRequest(`${API_BASE}/generate-report`, {
-            method: 'POST',
-            body: formData
-        });
-
-        return response;
+        return await runJob('generate-report', formData, onProgress);
     } catch (error) {
         throw new Error(`Failed to generate report: ${error.message}`);
     }
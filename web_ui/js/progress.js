@@ -78,6 +78,47 @@ class ProgressTracker {
         }
     }
 
+    /**
+     * Show progress within the current step
+     * @param {string} text - Detail message (e.g. "Enriched wine 3/20: ...")
+     * @param {number} fraction - Completed share of the current step (0-1)
+     */
+    setDetail(text, fraction = null) {
+        if (this.cancelled) return;
+
+        const progressFill = document.getElementById('progress-fill');
+        const progressText = document.getElementById('progress-text');
+        if (!progressFill || !progressText) return;
+
+        if (fraction !== null && this.currentStep > 0) {
+            const clamped = Math.min(Math.max(fraction, 0), 1);
+            const percentage = ((this.currentStep - 1 + clamped) / this.totalSteps) * 100;
+            progressFill.style.width = `${percentage}%`;
+        }
+
+        const stepName = this.steps[this.currentStep - 1];
+        progressText.textContent = stepName
+            ? `Step ${this.currentStep} of ${this.totalSteps}: ${stepName} — ${text}`
+            : text;
+    }
+
+    /**
+     * Update from a server progress event
+     * @param {Object} event - Event with message and optional current/total
+     * @param {string} stepName - Step the event belongs to (never moves backwards)
+     */
+    updateFromEvent(event, stepName = null) {
+        if (this.cancelled || !event) return;
+
+        const stepIndex = stepName ? this.steps.indexOf(stepName) : -1;
+        if (stepIndex + 1 > this.currentStep) {
+            this.setStep(stepName);
+        }
+
+        const fraction = event.total ? event.current / event.total : null;
+        this.setDetail(event.message || event.type, fraction);
+    }
+
     /**
      * Update progress display
      */
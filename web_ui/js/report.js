@@ -147,6 +147,23 @@ function updateProcessButton() {
     }
 }
 
+// Progress step each server event type belongs to
+const PROGRESS_EVENT_STEPS = {
+    'menu.file_extracted': 'Extracting dishes',
+    'menu.dish_compounds_built': 'Mapping flavors',
+    'wines.wine_enriched': 'Enriching with flavors',
+    'report.explanation_generated': 'Generating report'
+};
+
+/**
+ * Show a server progress event on the progress tracker
+ */
+function showProgressEvent(progressTracker, event) {
+    if (progressTracker && event) {
+        progressTracker.updateFromEvent(event, PROGRESS_EVENT_STEPS[event.type]);
+    }
+}
+
 /**
  * Process menu files
  */
@@ -172,12 +189,11 @@ async function processMenuFiles() {
         progressTracker.nextStep();
 
         // Process menu
-        const result = await processMenu(reportState.menuFiles, (status) => {
-            progressTracker.nextStep();
+        const result = await processMenu(reportState.menuFiles, (status, event) => {
+            showProgressEvent(progressTracker, event);
         });
 
-        progressTracker.nextStep();
-        progressTracker.nextStep();
+        progressTracker.setStep('Detecting wines');
         progressTracker.nextStep();
 
         reportState.menuResult = result;
@@ -374,8 +390,12 @@ async function continueWithWines() {
             wine_files: addFiles ? reportState.wineFiles : []
         };
 
-        const result = await processWines(wineOptions, (status) => {
-            if (progressTracker) progressTracker.nextStep();
+        const result = await processWines(wineOptions, (status, event) => {
+            if (event) {
+                showProgressEvent(progressTracker, event);
+            } else if (progressTracker) {
+                progressTracker.nextStep();
+            }
         });
 
         reportState.wineResult = result;
@@ -424,7 +444,9 @@ async function continueWithPairing() {
 
         // Generate report
         if (progressTracker) progressTracker.nextStep();
-        const reportResult = await generateReport('dict');
+        const reportResult = await generateReport('dict', (status, event) => {
+            showProgressEvent(progressTracker, event);
+        });
         reportState.report = reportResult.report;
 
         if (progressTracker) progressTracker.nextStep();
@@ -5,13 +5,23 @@ Provides API endpoints for menu processing, wine pairing, and report generation
 
 import os
 import json
-import tempfile
+import asyncio
+import contextvars
+import functools
+import hmac
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request, Query, Depends
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, PlainTextResponse, Response
 import sys
 import os
 
@@ -23,9 +33,125 @@ sys.path.insert(0, str(project_root))
 os.chdir(project_root)
 
 from app import CulinaryExpertApp
+from utils.config import (
+    DEFAULT_LLM_POOL_WORKERS,
+    DEFAULT_CPU_POOL_WORKERS,
+    DEFAULT_MAX_SESSIONS,
+    DEFAULT_SESSION_TTL_SECONDS,
+    DEFAULT_SESSION_MEMORY_MB,
+)
+from core.events import job_context
+from core.jobs import Job, JobManager, TERMINAL_EVENTS
+from core.session_store import Session, SessionStore, estimate_size
+from utils.file_parsers import SpooledUpload
+from utils.payloads import parse_fields, project_wine, paginate
+from utils.metrics import registry, http_request_seconds
+from utils.tracing import tracer, to_chrome_trace, configure_tracing_from_env
+from utils.profiling import SamplingProfiler, DEFAULT_SAMPLE_INTERVAL
+from utils.structured_log import get_logger, log_event, run_context, configure_from_env
+from utils.gemini_cassette import configure_cassette_from_env
+
+# Structured debug logging and span tracing are off unless CULINARY_LOG_LEVEL
+# / CULINARY_TRACE are set; Gemini record/replay needs CULINARY_GEMINI_RECORD
+# / CULINARY_GEMINI_REPLAY
+configure_from_env()
+configure_tracing_from_env()
+configure_cassette_from_env()
+logger = get_logger("server")
+
+# Bounded worker pools so pipeline stages never block the event loop.
+# LLM stages (Gemini calls, retries with sleeps) and CPU stages (similarity,
+# pairing, ranking) get separate pools so slow LLM calls cannot starve scoring.
+# They live on app.state: each lifespan startup creates a fresh pair and its
+# shutdown closes them, so the app can be started again in the same process.
+def create_executors() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """New (LLM, CPU) worker pools sized from the environment"""
+    return (
+        ThreadPoolExecutor(
+            max_workers=int(os.getenv("LLM_POOL_WORKERS", DEFAULT_LLM_POOL_WORKERS)),
+            thread_name_prefix="llm"
+        ),
+        ThreadPoolExecutor(
+            max_workers=int(os.getenv("CPU_POOL_WORKERS", DEFAULT_CPU_POOL_WORKERS)),
+            thread_name_prefix="cpu"
+        ),
+    )
+
+
+async def run_in_pool(executor: ThreadPoolExecutor, func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking function in a worker pool and await its result"""
+    loop = asyncio.get_running_loop()
+    # Copy the context so the worker sees the caller's current job id
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(executor, ctx.run, functools.partial(func, *args, **kwargs))
+
+
+async def run_llm_stage(func: Callable, *args, **kwargs) -> Any:
+    """Run an LLM-bound pipeline stage in the LLM worker pool"""
+    return await run_in_pool(app.state.llm_executor, func, *args, **kwargs)
+
+
+async def run_cpu_stage(func: Callable, *args, **kwargs) -> Any:
+    """Run a CPU-bound pipeline stage in the CPU worker pool"""
+    return await run_in_pool(app.state.cpu_executor, func, *args, **kwargs)
+
+
+# Background jobs whose progress is streamed over Server-Sent Events
+job_manager = JobManager()
+# Strong references to running job tasks (asyncio only keeps weak ones)
+background_tasks = set()
+
+# Seconds between SSE keepalive comments while a job is quiet
+SSE_KEEPALIVE_SECONDS = 15
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.llm_executor, app.state.cpu_executor = create_executors()
+    yield
+    for task in list(background_tasks):
+        task.cancel()
+    app.state.llm_executor.shutdown(wait=False, cancel_futures=True)
+    app.state.cpu_executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MeasuredJSONResponse(JSONResponse):
+    """
+    JSON response reporting its serialisation cost in headers
+    
+    X-Payload-Bytes is the uncompressed body size and X-Serialize-Ms the time
+    spent encoding it. Handlers returning this class directly skip FastAPI's
+    jsonable_encoder pass; only values json cannot encode go through it.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        started = time.perf_counter()
+        body = json.dumps(
+            content,
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+            default=jsonable_encoder
+        ).encode("utf-8")
+        self.serialize_ms = (time.perf_counter() - started) * 1000
+        return body
+    
+    def init_headers(self, headers=None):
+        super().init_headers(headers)
+        self.raw_headers.append((b"x-payload-bytes", str(len(self.body)).encode("latin-1")))
+        self.raw_headers.append((b"x-serialize-ms", f"{self.serialize_ms:.2f}".encode("latin-1")))
+
+
+# Content type of the Prometheus text exposition format served at /metrics
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Responses smaller than this are sent uncompressed
+GZIP_MINIMUM_SIZE = 4 * 1024
 
 # Initialize FastAPI app
-app = FastAPI(title="AI Culinary Expert API")
+app = FastAPI(title="AI Culinary Expert API", lifespan=lifespan, default_response_class=MeasuredJSONResponse)
+# Pools for transports that skip lifespan events (e.g. httpx.ASGITransport); startup replaces them
+app.state.llm_executor, app.state.cpu_executor = create_executors()
 
 # CORS configuration for localhost
 app.add_middleware(
@@ -34,8 +160,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Payload-Bytes", "X-Serialize-Ms", "X-Run-ID"],
 )
 
+# Compress large JSON payloads (event streams are left uncompressed)
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE)
+
 # Mount static files (HTML, CSS, JS)
 static_dir = Path(__file__).parent
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -67,18 +197,60 @@ async def serve_assets(file_path: str):
         return FileResponse(asset_file, media_type=media_type)
     raise HTTPException(status_code=404, detail="Asset file not found")
 
-# Global app instance (could be improved with dependency injection)
+# Template app instance; every session gets its own state on top of its
+# shared modules and knowledge base (see CulinaryExpertApp.new_session)
 culinary_app = None
 
 def get_app():
-    """Get or create CulinaryExpertApp instance"""
+    """Get or create the template CulinaryExpertApp instance"""
     global culinary_app
     if culinary_app is None:
         culinary_app = CulinaryExpertApp()
     return culinary_app
 
+# Per-session pipeline state, so concurrent restaurants don't overwrite
+# each other's menu profile, wines and pairings
+session_store = SessionStore(
+    factory=lambda: get_app().new_session(),
+    max_sessions=int(os.getenv("MAX_SESSIONS", DEFAULT_MAX_SESSIONS)),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", DEFAULT_SESSION_TTL_SECONDS)),
+    max_memory_bytes=int(float(os.getenv("SESSION_MEMORY_MB", DEFAULT_SESSION_MEMORY_MB)) * 1024 * 1024),
+    size_of=lambda app_instance: estimate_size(app_instance.session_state())
+)
+
+SESSION_COOKIE = "session_id"
+SESSION_HEADER = "x-session-id"
+SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+@app.middleware("http")
+async def attach_session_id(request: Request, call_next):
+    """Identify the session by X-Session-ID header or cookie, issuing a new id if missing"""
+    session_id = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+    is_new = not (session_id and SESSION_ID_PATTERN.match(session_id))
+    if is_new:
+        session_id = uuid.uuid4().hex
+    request.state.session_id = session_id
+    
+    # Correlate everything logged while handling this request
+    with run_context() as run_id:
+        response = await call_next(request)
+    response.headers["x-run-id"] = run_id
+    if is_new:
+        response.set_cookie(SESSION_COOKIE, session_id, httponly=True, samesite="lax")
+    return response
+
+def get_session(request: Request) -> Session:
+    """Get or create the caller's session"""
+    return session_store.get_or_create(request.state.session_id)
+
 # File validation constants
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_UPLOAD_FILES = 10
+# Request bodies above this are rejected before they are read
+MAX_REQUEST_SIZE = MAX_FILE_SIZE * MAX_UPLOAD_FILES + 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+# Accepted uploads stay in memory (parsers read them directly, no temp file)
+UPLOAD_SPOOL_MAX_MEMORY = MAX_FILE_SIZE
 ALLOWED_EXTENSIONS = {'.pdf', '.txt', '.jpg', '.jpeg', '.png', '.xlsx', '.csv', '.json'}
 
 def validate_file(file: UploadFile) -> Dict[str, Any]:
@@ -96,10 +268,39 @@ def validate_file(file: UploadFile) -> Dict[str, Any]:
             'error': f'File type {file_ext} not supported. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
         }
     
-    # Note: File size check would need to read the file
-    # We'll do a basic check here, but full validation happens after upload
+    # Size is checked while the upload is spooled (see spool_uploads)
     return {'valid': True, 'error': None}
 
+@app.middleware("http")
+async def reject_oversized_requests(request: Request, call_next):
+    """Reject request bodies over MAX_REQUEST_SIZE from Content-Length, before reading them"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_SIZE:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Request exceeds maximum upload size of {MAX_REQUEST_SIZE // (1024 * 1024)}MB"}
+        )
+    return await call_next(request)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record API request latency by route template (not raw path, to bound label values)"""
+    started = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    http_request_seconds.observe(
+        time.perf_counter() - started,
+        method=request.method,
+        route=getattr(route, "path", "unmatched"),
+        status=response.status_code
+    )
+    return response
+
+@app.get("/metrics")
+async def metrics():
+    """Pipeline, LLM and request metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/")
 async def root():
     """Serve index.html"""
@@ -140,71 +341,145 @@ async def register(username: str = Form(...), password: str = Form(...), confirm
         }
     }
 
-@app.post("/api/process-menu")
-async def process_menu(files: List[UploadFile] = File(...)):
+def list_query(
+    fields: Optional[str] = Query(None, description="Comma-separated wine fields to return"),
+    include_compounds: bool = Query(True, description="Include flavor_compounds lists"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: Optional[int] = Query(None, description="Page size (all items if omitted)")
+) -> Dict[str, Any]:
+    """Projection and pagination parameters shared by list endpoints"""
+    return {
+        "fields": parse_fields(fields),
+        "include_compounds": include_compounds,
+        "cursor": cursor,
+        "limit": limit,
+    }
+
+def list_page(items: List[Any], query: Dict[str, Any], project: Optional[Callable] = None):
     """
-    Process menu files and extract dishes and wines
+    Slice and project one page of a list
     
     Returns:
-        Dict with menu_profile, extracted_wines, has_wines, and progress info
+        (projected page items, next cursor or None)
     """
     try:
-        app_instance = get_app()
+        page, next_cursor = paginate(items, query["cursor"], query["limit"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if project is not None:
+        page = [project(item) for item in page]
+    return page, next_cursor
+
+def wines_payload(wines: List[Dict[str, Any]], query: Dict[str, Any]) -> Dict[str, Any]:
+    page, next_cursor = list_page(
+        wines, query,
+        lambda wine: project_wine(wine, query["fields"], query["include_compounds"])
+    )
+    return {"success": True, "wines": page, "wine_count": len(wines), "next_cursor": next_cursor}
+
+def similar_pairs_payload(similar_pairs: List[tuple], query: Dict[str, Any]) -> Dict[str, Any]:
+    page, next_cursor = list_page(
+        similar_pairs, query,
+        lambda pair: {"wine_id1": pair[0], "wine_id2": pair[1], "similarity": pair[2]}
+    )
+    return {"success": True, "similar_pairs": page, "pair_count": len(similar_pairs), "next_cursor": next_cursor}
+
+def rankings_payload(rankings: List[tuple], query: Dict[str, Any]) -> Dict[str, Any]:
+    page, next_cursor = list_page(
+        rankings, query,
+        lambda rank: {
+            "wine_id": rank[0],
+            "score": rank[1],
+            "wine": project_wine(rank[2], query["fields"], query["include_compounds"])
+        }
+    )
+    return {"success": True, "rankings": page, "rank_count": len(rankings), "next_cursor": next_cursor}
+
+async def spool_uploads(files: List[UploadFile]) -> List[SpooledUpload]:
+    """
+    Validate uploaded files and copy them in chunks into spooled files
+    
+    Files over MAX_FILE_SIZE are rejected from their reported size before any
+    copying, or as soon as the copied chunks exceed the limit.
+    
+    Args:
+        files: Uploaded files
         
-        # Validate files
-        validated_files = []
+    Returns:
+        In-memory files the parsers read directly (caller closes them with close_uploads)
+    """
+    if len(files) > MAX_UPLOAD_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_UPLOAD_FILES} files can be uploaded at once")
+    
+    uploads = []
+    try:
         for file in files:
             validation = validate_file(file)
             if not validation['valid']:
                 raise HTTPException(status_code=400, detail=validation['error'])
-            validated_files.append(file)
-        
-        if not validated_files:
-            raise HTTPException(status_code=400, detail="No valid files provided")
-        
-        # Save uploaded files temporarily
-        temp_files = []
-        try:
-            for file in validated_files:
-                # Check file size
-                content = await file.read()
-                if len(content) > MAX_FILE_SIZE:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"File {file.filename} exceeds maximum size of 10MB"
-                    )
-                
-                # Save to temp file
-                temp_file = tempfile.NamedTemporaryFile(
-                    delete=False,
-                    suffix=Path(file.filename).suffix
-                )
-                temp_file.write(content)
-                temp_file.close()
-                temp_files.append(temp_file.name)
             
-            # Process menu files
-            menu_result = app_instance.process_menu(
-                menu_files=temp_files,
-                extract_wines=True
+            too_large = HTTPException(
+                status_code=400,
+                detail=f"File {file.filename} exceeds maximum size of 10MB"
             )
+            if file.size is not None and file.size > MAX_FILE_SIZE:
+                raise too_large
             
-            return {
-                "success": True,
-                "menu_profile": menu_result.get("menu_profile", {}),
-                "extracted_wines": menu_result.get("extracted_wines", []),
-                "has_wines": menu_result.get("has_wines", False),
-                "dish_count": len(menu_result.get("menu_profile", {})),
-                "wine_count": len(menu_result.get("extracted_wines", []))
-            }
+            upload = SpooledUpload(file.filename, max_size=UPLOAD_SPOOL_MAX_MEMORY)
+            uploads.append(upload)
+            size = 0
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise too_large
+                upload.write(chunk)
+            upload.seek(0)
+    except Exception:
+        close_uploads(uploads)
+        raise
+    return uploads
+
+def close_uploads(uploads: List[SpooledUpload]):
+    """Release spooled upload files"""
+    for upload in uploads:
+        upload.close()
+
+async def run_process_menu(session: Session, uploads: List[SpooledUpload]) -> Dict[str, Any]:
+    """Extract dishes and wines from uploaded menu files into the session"""
+    # Process menu files (Gemini extraction) off the event loop
+    menu_result = await run_llm_stage(
+        session.call,
+        session.state.process_menu,
+        menu_files=uploads,
+        extract_wines=True
+    )
+    
+    return {
+        "success": True,
+        "menu_profile": menu_result.get("menu_profile", {}),
+        "extracted_wines": menu_result.get("extracted_wines", []),
+        "has_wines": menu_result.get("has_wines", False),
+        "dish_count": len(menu_result.get("menu_profile", {})),
+        "wine_count": len(menu_result.get("extracted_wines", []))
+    }
+
+@app.post("/api/process-menu")
+async def process_menu(request: Request, files: List[UploadFile] = File(...)):
+    """
+    Process menu files and extract dishes and wines
+    
+    Returns:
+        Dict with menu_profile, extracted_wines, has_wines, and progress info
+    """
+    try:
+        if not files:
+            raise HTTPException(status_code=400, detail="No valid files provided")
         
+        uploads = await spool_uploads(files)
+        try:
+            return await run_process_menu(get_session(request), uploads)
         finally:
-            # Clean up temp files
-            for temp_file in temp_files:
-                try:
-                    os.unlink(temp_file)
-                except:
-                    pass
+            close_uploads(uploads)
     
     except HTTPException:
         raise
@@ -214,12 +489,84 @@ async def process_menu(files: List[UploadFile] = File(...)):
             detail=f"Error processing menu files: {str(e)}"
         )
 
+def parse_detected_wines(use_detected_wines: bool, detected_wines: Optional[str]) -> List[Dict[str, Any]]:
+    """Parse the JSON list of wines detected in menu files (empty if unused or invalid)"""
+    if use_detected_wines and detected_wines:
+        try:
+            detected = json.loads(detected_wines)
+            if isinstance(detected, list):
+                return detected
+        except json.JSONDecodeError:
+            pass
+    return []
+
+def enrich_session_wines(app_instance: CulinaryExpertApp, wine_sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Enrich wines with flavors and store them as the session's wines"""
+    app_instance.wines = app_instance.wine_manager.enrich_wines_with_flavors(wine_sources)
+    return app_instance.wines
+
+async def run_process_wines(
+    session: Session,
+    uploads: List[SpooledUpload],
+    detected: List[Dict[str, Any]],
+    use_knowledge_base: bool,
+    query: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Collect wines from all selected sources and enrich them with flavors
+    
+    Args:
+        session: Session receiving the enriched wines
+        uploads: Uploaded wine files
+        detected: Wines detected in menu files
+        use_knowledge_base: Whether to add the internal knowledge base wines
+        query: Projection/pagination of the returned wines (see list_query)
+    """
+    app_instance = session.state
+    
+    wine_sources = list(detected)
+    
+    # Load wines from uploaded files
+    if uploads:
+        wines_from_files = await run_llm_stage(app_instance.wine_manager.load_wines, uploads)
+        wine_sources.extend(wines_from_files)
+    
+    # Add knowledge base wines if requested
+    if use_knowledge_base:
+        try:
+            # Use the shared knowledge base wines
+            kb_wines = await run_cpu_stage(
+                lambda: [app_instance.wine_manager.normalize_wine_format(w)
+                         for w in app_instance.knowledge_base.wines]
+            )
+            wine_sources.extend(kb_wines)
+        except Exception as e:
+            # Knowledge base might not be available, continue without it
+            pass
+    
+    if not wine_sources:
+        raise HTTPException(
+            status_code=400,
+            detail="No wine sources selected. Please select at least one wine source."
+        )
+    
+    log_event(logger, "server.wines_enriching", "About to enrich wines", wine_sources_count=len(wine_sources))
+    
+    # Enrich wines with flavors and store them in the session
+    enriched_wines = await run_llm_stage(session.call, enrich_session_wines, app_instance, wine_sources)
+    
+    log_event(logger, "server.wines_enriched", "Wines enriched", enriched_count=len(enriched_wines))
+    
+    return wines_payload(enriched_wines, query)
+
 @app.post("/api/process-wines")
 async def process_wines(
+    request: Request,
     wine_files: Optional[List[UploadFile]] = File(None),
     use_detected_wines: bool = Form(False),
     use_knowledge_base: bool = Form(False),
-    detected_wines: Optional[str] = Form(None)  # JSON string of detected wines
+    detected_wines: Optional[str] = Form(None),  # JSON string of detected wines
+    query: Dict[str, Any] = Depends(list_query)
 ):
     """
     Process wine files and enrich with flavors
@@ -229,105 +576,16 @@ async def process_wines(
         use_detected_wines: Whether to use wines detected in menu
         use_knowledge_base: Whether to use internal knowledge base
         detected_wines: JSON string of wines detected in menu files
+        query: fields/include_compounds/cursor/limit query parameters
     """
     try:
-        app_instance = get_app()
-        
-        wine_sources = []
-        
-        # Add detected wines if requested
-        if use_detected_wines and detected_wines:
-            try:
-                detected = json.loads(detected_wines)
-                if isinstance(detected, list):
-                    wine_sources.extend(detected)
-            except json.JSONDecodeError:
-                pass
-        
-        # Add uploaded wine files
-        if wine_files:
-            temp_files = []
-            try:
-                for file in wine_files:
-                    validation = validate_file(file)
-                    if not validation['valid']:
-                        raise HTTPException(status_code=400, detail=validation['error'])
-                    
-                    content = await file.read()
-                    if len(content) > MAX_FILE_SIZE:
-                        raise HTTPException(
-                            status_code=400,
-                            detail=f"File {file.filename} exceeds maximum size of 10MB"
-                        )
-                    
-                    temp_file = tempfile.NamedTemporaryFile(
-                        delete=False,
-                        suffix=Path(file.filename).suffix
-                    )
-                    temp_file.write(content)
-                    temp_file.close()
-                    temp_files.append(temp_file.name)
-                
-                # Load wines from files
-                wines_from_files = app_instance.wine_manager.load_wines(temp_files)
-                wine_sources.extend(wines_from_files)
-            
-            finally:
-                for temp_file in temp_files:
-                    try:
-                        os.unlink(temp_file)
-                    except:
-                        pass
-        
-        # Add knowledge base wines if requested
-        if use_knowledge_base:
-            try:
-                # Load from internal processed_wines.json
-                from utils.config import DEFAULT_WINES_PATH
-                wines_path = Path(DEFAULT_WINES_PATH)
-                if wines_path.exists():
-                    with open(wines_path, 'r', encoding='utf-8') as f:
-                        kb_wines = json.load(f)
-                    # Normalize wines
-                    kb_wines = [app_instance.wine_manager.normalize_wine_format(w) for w in kb_wines]
-                    wine_sources.extend(kb_wines)
-            except Exception as e:
-                # Knowledge base might not be available, continue without it
-                pass
-        
-        if not wine_sources:
-            raise HTTPException(
-                status_code=400,
-                detail="No wine sources selected. Please select at least one wine source."
-            )
-        
-        # #region agent log
-        log_path = Path(".cursor/debug.log")
-        try:
-            import json as json_module
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_server_wine_1","timestamp":int(__import__('time').time()*1000),"location":"server.py:304","message":"About to enrich wines","data":{"wine_sources_count":len(wine_sources)},"runId":"run1","hypothesisId":"F"}) + "\n")
-        except: pass
-        # #endregion
-        
-        # Enrich wines with flavors
-        enriched_wines = app_instance.wine_manager.enrich_wines_with_flavors(wine_sources)
-        
-        # #region agent log
+        detected = parse_detected_wines(use_detected_wines, detected_wines)
+        uploads = await spool_uploads(wine_files or [])
         try:
-            with open(log_path, 'a', encoding='utf-8') as f:
-                f.write(json_module.dumps({"id":"log_server_wine_2","timestamp":int(__import__('time').time()*1000),"location":"server.py:312","message":"Wines enriched","data":{"enriched_count":len(enriched_wines)},"runId":"run1","hypothesisId":"F"}) + "\n")
-        except: pass
-        # #endregion
-        
-        # Store in app instance
-        app_instance.wines = enriched_wines
-        
-        return {
-            "success": True,
-            "wines": enriched_wines,
-            "wine_count": len(enriched_wines)
-        }
+            payload = await run_process_wines(get_session(request), uploads, detected, use_knowledge_base, query)
+            return MeasuredJSONResponse(payload)
+        finally:
+            close_uploads(uploads)
     
     except HTTPException:
         raise
@@ -338,28 +596,22 @@ async def process_wines(
         )
 
 @app.post("/api/analyze-similarity")
-async def analyze_similarity(threshold: Optional[float] = Form(None)):
+async def analyze_similarity(
+    request: Request,
+    threshold: Optional[float] = Form(None),
+    query: Dict[str, Any] = Depends(list_query)
+):
     """Analyze wine similarity"""
     try:
-        app_instance = get_app()
+        session = get_session(request)
+        app_instance = session.state
         
         if not app_instance.wines:
             raise HTTPException(status_code=400, detail="No wines loaded. Please process wines first.")
         
-        similar_pairs = app_instance.analyze_wine_similarity(threshold=threshold)
+        similar_pairs = await run_cpu_stage(session.call, app_instance.analyze_wine_similarity, threshold=threshold)
         
-        return {
-            "success": True,
-            "similar_pairs": [
-                {
-                    "wine_id1": pair[0],
-                    "wine_id2": pair[1],
-                    "similarity": pair[2]
-                }
-                for pair in similar_pairs
-            ],
-            "pair_count": len(similar_pairs)
-        }
+        return MeasuredJSONResponse(similar_pairs_payload(similar_pairs, query))
     
     except HTTPException:
         raise
@@ -370,10 +622,11 @@ async def analyze_similarity(threshold: Optional[float] = Form(None)):
         )
 
 @app.post("/api/pair-wines")
-async def pair_wines():
+async def pair_wines(request: Request):
     """Pair wines to dishes"""
     try:
-        app_instance = get_app()
+        session = get_session(request)
+        app_instance = session.state
         
         if not app_instance.menu_profile:
             raise HTTPException(status_code=400, detail="No menu profile loaded. Please process menu first.")
@@ -381,7 +634,7 @@ async def pair_wines():
         if not app_instance.wines:
             raise HTTPException(status_code=400, detail="No wines loaded. Please process wines first.")
         
-        pairings = app_instance.pair_wines_to_dishes()
+        pairings = await run_cpu_stage(session.call, app_instance.pair_wines_to_dishes)
         
         return {
             "success": True,
@@ -399,28 +652,18 @@ async def pair_wines():
         )
 
 @app.post("/api/rank-wines")
-async def rank_wines():
+async def rank_wines(request: Request, query: Dict[str, Any] = Depends(list_query)):
     """Rank wines by match count and quality"""
     try:
-        app_instance = get_app()
+        session = get_session(request)
+        app_instance = session.state
         
         if not app_instance.pairings:
             raise HTTPException(status_code=400, detail="No pairings found. Please pair wines first.")
         
-        rankings = app_instance.rank_wines()
+        rankings = await run_cpu_stage(session.call, app_instance.rank_wines)
         
-        return {
-            "success": True,
-            "rankings": [
-                {
-                    "wine_id": rank[0],
-                    "score": rank[1],
-                    "wine": rank[2]
-                }
-                for rank in rankings
-            ],
-            "rank_count": len(rankings)
-        }
+        return MeasuredJSONResponse(rankings_payload(rankings, query))
     
     except HTTPException:
         raise
@@ -430,21 +673,42 @@ async def rank_wines():
             detail=f"Error ranking wines: {str(e)}"
         )
 
+@app.get("/api/wines")
+async def list_wines(request: Request, query: Dict[str, Any] = Depends(list_query)):
+    """Page through the session's processed wines"""
+    return MeasuredJSONResponse(wines_payload(get_session(request).state.wines or [], query))
+
+@app.get("/api/similar-pairs")
+async def list_similar_pairs(request: Request, query: Dict[str, Any] = Depends(list_query)):
+    """Page through the session's similar wine pairs"""
+    return MeasuredJSONResponse(similar_pairs_payload(get_session(request).state.similar_pairs or [], query))
+
+@app.get("/api/rankings")
+async def list_rankings(request: Request, query: Dict[str, Any] = Depends(list_query)):
+    """Page through the session's wine rankings"""
+    return MeasuredJSONResponse(rankings_payload(get_session(request).state.wine_rankings or [], query))
+
+def check_report_ready(session: Session):
+    """Raise a 400 error unless the session has pairings to report on"""
+    if not session.state.pairings:
+        raise HTTPException(status_code=400, detail="No pairings found. Please complete pairing first.")
+
+async def run_generate_report(session: Session, format: str) -> Dict[str, Any]:
+    """Generate the session's comprehensive report (Gemini explanations) off the event loop"""
+    report = await run_llm_stage(session.call, session.state.generate_reports, format=format)
+    
+    return {
+        "success": True,
+        "report": report
+    }
+
 @app.post("/api/generate-report")
-async def generate_report(format: str = Form("dict")):
+async def generate_report(request: Request, format: str = Form("dict")):
     """Generate comprehensive report"""
     try:
-        app_instance = get_app()
-        
-        if not app_instance.pairings:
-            raise HTTPException(status_code=400, detail="No pairings found. Please complete pairing first.")
-        
-        report = app_instance.generate_reports(format=format)
-        
-        return {
-            "success": True,
-            "report": report
-        }
+        session = get_session(request)
+        check_report_ready(session)
+        return await run_generate_report(session, format)
     
     except HTTPException:
         raise
@@ -454,6 +718,248 @@ async def generate_report(format: str = Form("dict")):
             detail=f"Error generating report: {str(e)}"
         )
 
+def start_job(
+    kind: str,
+    session_id: str,
+    work: Callable,
+    uploads: Optional[List[SpooledUpload]] = None
+) -> Job:
+    """
+    Run a pipeline coroutine as a background job
+    
+    Args:
+        kind: Job kind (e.g. "process-menu")
+        session_id: Session starting the job; only it can read the job
+        work: Zero-argument coroutine function producing the job result
+        uploads: Uploaded files to close when the job ends
+        
+    Returns:
+        The created job
+    """
+    job = job_manager.create(kind, session_id)
+    
+    async def runner():
+        # Events published and logged by the stages (also in worker threads) go to this job
+        with job_context(job.id), run_context(job.id):
+            job_manager.mark_running(job)
+            try:
+                result = await work()
+            except HTTPException as e:
+                job_manager.mark_failed(job, str(e.detail))
+            except Exception as e:
+                job_manager.mark_failed(job, f"Error running {kind}: {str(e)}")
+            else:
+                job_manager.mark_succeeded(job, result)
+            finally:
+                close_uploads(uploads or [])
+    
+    task = asyncio.create_task(runner())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return job
+
+def job_accepted(job: Job) -> JSONResponse:
+    return JSONResponse(status_code=202, content={"success": True, "job_id": job.id, "status": job.status})
+
+@app.post("/api/jobs/process-menu")
+async def submit_process_menu(request: Request, files: List[UploadFile] = File(...)):
+    """Start menu processing in the background; progress via /api/jobs/{job_id}/events"""
+    if not files:
+        raise HTTPException(status_code=400, detail="No valid files provided")
+    uploads = await spool_uploads(files)
+    session = get_session(request)
+    job = start_job(
+        "process-menu",
+        request.state.session_id,
+        lambda: run_process_menu(session, uploads),
+        uploads
+    )
+    return job_accepted(job)
+
+@app.post("/api/jobs/process-wines")
+async def submit_process_wines(
+    request: Request,
+    wine_files: Optional[List[UploadFile]] = File(None),
+    use_detected_wines: bool = Form(False),
+    use_knowledge_base: bool = Form(False),
+    detected_wines: Optional[str] = Form(None),
+    query: Dict[str, Any] = Depends(list_query)
+):
+    """Start wine processing in the background; progress via /api/jobs/{job_id}/events"""
+    detected = parse_detected_wines(use_detected_wines, detected_wines)
+    uploads = await spool_uploads(wine_files or [])
+    session = get_session(request)
+    job = start_job(
+        "process-wines",
+        request.state.session_id,
+        lambda: run_process_wines(session, uploads, detected, use_knowledge_base, query),
+        uploads
+    )
+    return job_accepted(job)
+
+@app.post("/api/jobs/generate-report")
+async def submit_generate_report(request: Request, format: str = Form("dict")):
+    """Start report generation in the background; progress via /api/jobs/{job_id}/events"""
+    session = get_session(request)
+    check_report_ready(session)
+    job = start_job("generate-report", request.state.session_id, lambda: run_generate_report(session, format))
+    return job_accepted(job)
+
+def get_job_or_404(job_id: str, request: Request) -> Job:
+    """The job, if it exists and was started by the requesting session"""
+    job = job_manager.get(job_id)
+    # Other sessions' jobs are reported as missing, not forbidden, so ids cannot be probed
+    if job is None or job.session_id != request.state.session_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, request: Request):
+    """Job status, and its result once it has succeeded"""
+    return get_job_or_404(job_id, request).to_dict(include_result=True)
+
+def format_sse(event_id: int, event: Dict[str, Any]) -> str:
+    return f"id: {event_id}\ndata: {json.dumps(event)}\n\n"
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+    Server-Sent Events stream of a job's progress
+    
+    Replays the events recorded so far (after Last-Event-ID when reconnecting),
+    then streams new ones until the job completes or fails.
+    """
+    job = get_job_or_404(job_id, request)
+    try:
+        last_event_id = int(request.headers.get("last-event-id", -1))
+    except ValueError:
+        last_event_id = -1
+    
+    async def event_stream():
+        queue, backlog = job.listen()
+        try:
+            event_id = 0
+            for event in backlog:
+                if event_id > last_event_id:
+                    yield format_sse(event_id, event)
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+                event_id += 1
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event_id > last_event_id:
+                    yield format_sse(event_id, event)
+                if event["type"] in TERMINAL_EVENTS:
+                    return
+                event_id += 1
+        finally:
+            job.stop_listening(queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/session")
+async def get_session_info(request: Request):
+    """Current session id and store usage"""
+    session = session_store.get(request.state.session_id)
+    return {
+        "session_id": request.state.session_id,
+        "active": session is not None,
+        "size_bytes": session.size_bytes if session else 0,
+        "store": session_store.stats()
+    }
+
+@app.delete("/api/session")
+async def delete_session(request: Request):
+    """Discard the current session's pipeline state"""
+    return {"success": True, "deleted": session_store.delete(request.state.session_id)}
+
+# Admin-only debug endpoints require this token in the X-Admin-Token header
+# (disabled while ADMIN_TOKEN is unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MAX_PROFILE_SECONDS = 60
+profile_lock = asyncio.Lock()
+
+def require_admin(request: Request):
+    """Reject requests without the admin token"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Debug endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/api/debug/profile", dependencies=[Depends(require_admin)])
+async def debug_profile(
+    seconds: float = Query(10, gt=0, le=MAX_PROFILE_SECONDS),
+    format: str = Query("json", pattern="^(json|collapsed|pstats)$"),
+    interval_ms: float = Query(DEFAULT_SAMPLE_INTERVAL * 1000, ge=1, le=100)
+):
+    """
+    Sample the stacks of all server threads for `seconds`
+    
+    Returns:
+        json: samples per pipeline stage, pstats table and collapsed stacks;
+        collapsed: flame graph input file; pstats: stats file for pstats.Stats
+    """
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async with profile_lock:
+        profiler = SamplingProfiler(interval_ms / 1000)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining the sampler waits at most one interval
+            profiler.stop()
+    
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    if format == "collapsed":
+        return PlainTextResponse(
+            profiler.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.collapsed"'}
+        )
+    if format == "pstats":
+        return Response(
+            profiler.pstats_bytes(),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{stamp}.prof"'}
+        )
+    return {
+        "seconds": round(profiler.duration, 3),
+        "interval_ms": interval_ms,
+        "samples": profiler.sample_count,
+        "stages": profiler.stage_counts(),
+        "pstats": profiler.pstats_text(),
+        "collapsed": profiler.collapsed()
+    }
+
+@app.get("/api/traces", dependencies=[Depends(require_admin)])
+async def list_traces():
+    """Run ids with recorded trace spans (most recent last)"""
+    return {"enabled": tracer.enabled, "run_ids": tracer.run_ids()}
+
+@app.get("/api/traces/{run_id}", dependencies=[Depends(require_admin)])
+async def get_trace(run_id: str):
+    """
+    Chrome trace-event JSON for a run (job id or X-Run-ID), viewable in Perfetto
+    """
+    try:
+        trace = to_chrome_trace(run_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return JSONResponse(
+        trace,
+        headers={"Content-Disposition": f'attachment; filename="trace-{run_id}.json"'}
+    )
+
 # Serve HTML files directly (must be last route to catch all unmatched paths)
 @app.get("/{path:path}")
 async def serve_static(path: str):
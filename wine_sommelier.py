@@ -3,12 +3,27 @@ Wine Sommelier AI - Gemini 3 Flash Integration
 Uses molecular flavor science to recommend wine pairings
 """
 
+import contextvars
+import functools
 import json
-import os
 import re
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Union
-import google.genai as genai
+
+from utils.config import (
+    DEFAULT_SOMMELIER_CANDIDATES,
+    DEFAULT_SOMMELIER_FALLBACK,
+    DEFAULT_SOMMELIER_FINALIZE_TIMEOUT_SECONDS,
+    DEFAULT_SOMMELIER_FINALIZER,
+    SOMMELIER_FINALIZERS,
+)
+from utils.gemini_client import get_api_key, create_client, generate_content, is_rate_limit_error
+from utils.tracing import span, traced
+from utils.profiling import add_profile_argument, maybe_profiled
+
+# Stage 3 finalizers that make no API call (usable as the LLM fallback)
+LOCAL_FINALIZERS = [name for name in SOMMELIER_FINALIZERS if name != "llm"]
 
 
 class WineSommelier:
@@ -17,62 +32,84 @@ class WineSommelier:
     Recommends wines based on molecular flavor compound analysis
     """
     
-    def __init__(self, api_key: Optional[str] = None, model_name: str = "gemini-3-flash-preview"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model_name: str = "gemini-3-flash-preview",
+        knowledge_base=None,
+        fallback_finalizer: Optional[str] = DEFAULT_SOMMELIER_FALLBACK,
+        finalize_timeout: Optional[float] = DEFAULT_SOMMELIER_FINALIZE_TIMEOUT_SECONDS
+    ):
         """
         Initialize the Wine Sommelier
         
         Args:
             api_key: Google AI API key (if None, reads from GOOGLE_AI_API_KEY env var)
             model_name: Gemini model to use (default: gemini-3-flash-preview)
+            knowledge_base: Shared KnowledgeBase (process-wide instance if None)
+            fallback_finalizer: Local finalizer ("priors" or "rules") used when the LLM
+                finalize is rate limited or times out (None re-raises)
+            finalize_timeout: Seconds to wait for the LLM finalize before falling back
+                (None waits indefinitely)
+        
+        Raises:
+            ValueError: If fallback_finalizer is unknown
         """
-        # Get API key from parameter or environment
-        if api_key is None:
-            api_key = os.getenv("GOOGLE_AI_API_KEY")
-            if api_key is None:
-                # Try .env file
-                try:
-                    from dotenv import load_dotenv
-                    load_dotenv()
-                    api_key = os.getenv("GOOGLE_AI_API_KEY")
-                except ImportError:
-                    pass
-        
-        if not api_key:
-            raise ValueError(
-                "API key not found. Please set GOOGLE_AI_API_KEY environment variable "
-                "or pass api_key parameter."
-            )
+        if fallback_finalizer is not None and fallback_finalizer not in LOCAL_FINALIZERS:
+            raise ValueError(f"Unknown fallback finalizer: {fallback_finalizer}. "
+                             f"Available: {', '.join(LOCAL_FINALIZERS)}")
         
-        # Configure Gemini
-        self.client = genai.Client(api_key=api_key)
+        # The key is checked when the Gemini client is first used (see client property),
+        # so the "priors" and "rules" finalizers work without one
+        self.api_key = get_api_key(api_key)
         self.model_name = model_name
-        
-        # Load knowledge base
-        self.wines = None
-        self.ingredient_flavor_map = None
-        self._load_knowledge_base()
+        self._client = None
+        self.fallback_finalizer = fallback_finalizer
+        self.finalize_timeout = finalize_timeout
+        self._scoring_engine = None
+        
+        # Attach knowledge base (wines and ingredient map load on first access)
+        if knowledge_base is None:
+            # Imported here: core imports this module via WineSommelierWrapper
+            from core.knowledge_base import get_knowledge_base
+            knowledge_base = get_knowledge_base()
+        self.knowledge_base = knowledge_base
     
-    def _load_knowledge_base(self):
-        """Load processed wines and ingredient flavor map from JSON files"""
-        processed_data_dir = Path("processed_data")
-        
-        # Load wines
-        wines_path = processed_data_dir / "processed_wines.json"
-        if not wines_path.exists():
-            raise FileNotFoundError(f"Wines file not found: {wines_path}")
-        
-        with open(wines_path, 'r', encoding='utf-8') as f:
-            self.wines = json.load(f)
-        
-        # Load ingredient flavor map
-        ingredient_path = processed_data_dir / "ingredient_flavor_map.json"
-        if not ingredient_path.exists():
-            raise FileNotFoundError(f"Ingredient flavor map not found: {ingredient_path}")
-        
-        with open(ingredient_path, 'r', encoding='utf-8') as f:
-            self.ingredient_flavor_map = json.load(f)
+    @property
+    def client(self):
+        """
+        Gemini client, created on first use
         
-        print(f"Loaded {len(self.wines)} wines and {len(self.ingredient_flavor_map)} ingredients")
+        Raises:
+            ValueError: If no API key is found
+        """
+        if self._client is None:
+            if not self.api_key:
+                raise ValueError(
+                    "API key not found. Please set GOOGLE_AI_API_KEY environment variable "
+                    "or pass api_key parameter."
+                )
+            self._client = create_client(self.api_key)
+        return self._client
+    
+    @property
+    def scoring_engine(self):
+        """Hybrid pairing scorer (core.scoring.ScoringEngine), created on first use"""
+        if self._scoring_engine is None:
+            # Imported lazily: the scoring engine is numpy-based
+            from core.scoring import ScoringEngine
+            self._scoring_engine = ScoringEngine()
+        return self._scoring_engine
+    
+    @property
+    def wines(self) -> List[Dict[str, Any]]:
+        """Internal wine database from the shared knowledge base"""
+        return self.knowledge_base.wines
+    
+    @property
+    def ingredient_flavor_map(self) -> Dict[str, Any]:
+        """Ingredient flavor map from the shared knowledge base"""
+        return self.knowledge_base.ingredient_flavor_map
     
     def _repair_json(self, json_str: str) -> str:
         """
@@ -308,7 +345,10 @@ Dish: """
                 import PIL.Image
                 import io
                 image = PIL.Image.open(io.BytesIO(dish_image))
-                response = self.client.models.generate_content(
+                response = generate_content(
+                    self.client,
+                    "sommelier_ingredients",
+                    trace_attributes={"input": "image"},
                     model=self.model_name,
                     contents=[prompt, image],
                     config={
@@ -319,7 +359,10 @@ Dish: """
                 )
             else:
                 # For text input
-                response = self.client.models.generate_content(
+                response = generate_content(
+                    self.client,
+                    "sommelier_ingredients",
+                    trace_attributes={"input": "text"},
                     model=self.model_name,
                     contents=prompt,
                     config={
@@ -368,16 +411,53 @@ Dish: """
         except Exception as e:
             raise RuntimeError(f"Error identifying ingredients: {e}")
     
-    def _find_candidate_wines(self, ingredients: List[str], max_candidates: int = 20) -> List[Dict[str, Any]]:
+    def _match_ingredients_locally(self, dish_description: str) -> List[str]:
+        """
+        Stage 1 without an API call: ingredient map entries named in the description
+        
+        Args:
+            dish_description: Text description of the dish
+        
+        Returns:
+            Ingredient map keys, longest names first
+        """
+        from core.knowledge_base import clean_ingredient_name
+        text = f" {clean_ingredient_name(dish_description)} "
+        matches = []
+        for cleaned, ingredient in sorted(self.knowledge_base.cleaned_name_index.items(), key=lambda item: -len(item[0])):
+            if f" {cleaned} " in text or f" {cleaned}s " in text or f" {cleaned}es " in text:
+                matches.append(ingredient)
+        return matches
+    
+    def _score_catalog(self, dish: Dict[str, Any]):
+        """core.scoring.PairingScores of one dish against every catalog wine"""
+        # Imported lazily: the scoring engine is numpy-based
+        from core.scoring import DishFeatures
+        wine_features = self.knowledge_base.wine_features
+        return self.scoring_engine.score(DishFeatures.from_dishes([dish], wine_features), wine_features)
+    
+    def _find_candidate_wines(
+        self,
+        ingredients: List[str],
+        max_candidates: int = 20,
+        tags: Optional[List[str]] = None,
+        dish_description: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """
         Stage 2: Python-based molecular search to find candidate wines
         
+        Candidates are ranked by the hybrid pairing score (core.scoring):
+        compound overlap, harmonize tags and sommelier rules.
+        
         Args:
             ingredients: List of ingredient names
             max_candidates: Maximum number of candidate wines to return
+            tags: Dish flavor tags (sommelier rules)
+            dish_description: Dish description (sommelier rules)
         
         Returns:
-            List of candidate wines with match information
+            List of candidate wines with match information ('score' holds the
+            per-signal breakdown)
         """
         # Helper function to clean ingredient name for matching
         def clean_name(name: str) -> str:
@@ -402,12 +482,11 @@ Dish: """
                 continue
             
             # Try cleaned name match
-            for map_ingredient, data in self.ingredient_flavor_map.items():
-                if data.get("cleaned_name") == cleaned:
-                    compounds = data.get("compounds", [])
-                    dish_compounds.update(compounds)
-                    matched_ingredients.append(map_ingredient)
-                    break
+            map_ingredient = self.knowledge_base.find_ingredient_by_cleaned_name(cleaned)
+            if map_ingredient is not None:
+                compounds = self.ingredient_flavor_map[map_ingredient].get("compounds", [])
+                dish_compounds.update(compounds)
+                matched_ingredients.append(map_ingredient)
             
             # Try partial match
             for map_ingredient, data in self.ingredient_flavor_map.items():
@@ -420,61 +499,27 @@ Dish: """
         
         if not dish_compounds:
             print(f"Warning: No compounds found for ingredients: {ingredients}")
-            # Fallback: return wines based on harmonize tags
-            candidates = []
-            for wine in self.wines:
-                harmonize = wine.get("harmonize", [])
-                # Simple keyword matching
-                for ingredient in ingredients:
-                    for tag in harmonize:
-                        if ingredient.lower() in tag.lower() or tag.lower() in ingredient.lower():
-                            candidates.append({
-                                "wine": wine,
-                                "shared_compounds": [],
-                                "match_count": 0,
-                                "match_type": "harmonize"
-                            })
-                            break
-                    if candidates and candidates[-1]["wine"]["wine_id"] == wine["wine_id"]:
-                        break
-            return candidates[:max_candidates]
-        
-        # Search wines by compounds
-        matches = self.search_wines_by_compounds(list(dish_compounds))
-        
-        # Also check harmonize tags
-        harmonize_matches = []
-        for wine in self.wines:
-            harmonize = wine.get("harmonize", [])
-            for ingredient in ingredients:
-                for tag in harmonize:
-                    if ingredient.lower() in tag.lower() or tag.lower() in ingredient.lower():
-                        # Check if already in matches
-                        if not any(m["wine"]["wine_id"] == wine["wine_id"] for m in matches):
-                            harmonize_matches.append({
-                                "wine": wine,
-                                "shared_compounds": [],
-                                "match_count": 0,
-                                "match_type": "harmonize"
-                            })
-                        break
-                if harmonize_matches and harmonize_matches[-1]["wine"]["wine_id"] == wine["wine_id"]:
-                    break
-        
-        # Combine and deduplicate
-        all_matches = matches + harmonize_matches
-        seen_ids = set()
-        unique_matches = []
-        for match in all_matches:
-            wine_id = match["wine"]["wine_id"]
-            if wine_id not in seen_ids:
-                seen_ids.add(wine_id)
-                unique_matches.append(match)
-        
-        # Sort: compound matches first (by match_count), then harmonize matches
-        unique_matches.sort(key=lambda x: (x.get("match_type") != "harmonize", -x.get("match_count", 0)))
-        
-        return unique_matches[:max_candidates]
+        
+        # One pass over the catalog: compound overlap, harmonize tags and sommelier rules
+        # (wines matching on neither compounds nor harmonize tags are dropped)
+        scores = self._score_catalog({
+            "compounds": dish_compounds,
+            "ingredients": ingredients,
+            "tags": tags or [],
+            "description": dish_description,
+        })
+        candidates = []
+        for index in scores.ranked(0, max_candidates):
+            wine = self.wines[index]
+            shared = [c for c in dict.fromkeys(wine.get("flavor_compounds", [])) if c in dish_compounds]
+            candidates.append({
+                "wine": wine,
+                "shared_compounds": shared,
+                "match_count": len(shared),
+                "match_type": "compound" if shared else "harmonize",
+                "score": scores.breakdown(0, index),
+            })
+        return candidates
     
     def _finalize_recommendation(
         self,
@@ -553,7 +598,10 @@ IMPORTANT:
 """
         
         try:
-            response = self.client.models.generate_content(
+            response = generate_content(
+                self.client,
+                "sommelier_finalize",
+                trace_attributes={"candidate_count": len(candidate_wines)},
                 model=self.model_name,
                 contents=prompt,
                 config={
@@ -617,7 +665,7 @@ IMPORTANT:
             # Add wine details for convenience
             result["wine_details"] = []
             for wine_id in result["top_matches"]:
-                wine = next((w for w in self.wines if w.get("wine_id") == wine_id), None)
+                wine = self.knowledge_base.get_wine_by_id(wine_id)
                 if wine:
                     result["wine_details"].append(wine)
                 else:
@@ -631,10 +679,191 @@ IMPORTANT:
         except Exception as e:
             raise RuntimeError(f"Error finalizing recommendation: {e}")
     
+    def _finalize_with_priors(
+        self,
+        candidate_wines: List[Dict[str, Any]],
+        ingredients: List[str],
+        dish_description: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Stage 3 without an API call: re-rank candidates by rated-pairing priors
+        
+        Args:
+            candidate_wines: List of candidate wines from Stage 2
+            ingredients: List of identified ingredients
+            dish_description: Original dish description
+            tags: Dish flavor tags
+        
+        Returns:
+            Final recommendation dictionary (same keys as _finalize_recommendation,
+            plus 'prior_quality' per wine and 'finalizer')
+        """
+        if not candidate_wines:
+            raise ValueError("No candidate wines found")
+        
+        from core.pairing_priors import dish_food_categories
+        priors = self.knowledge_base.pairing_priors
+        top = priors.rerank(candidate_wines, ingredients, tags, dish_description)[:3]
+        wines = [match["wine"] for match in top]
+        names = [self._wine_label(wine) for wine in wines]
+        
+        categories = dish_food_categories(ingredients, tags, dish_description)
+        dish_kind = " and ".join(sorted(categories, key=categories.get, reverse=True)[:2]) if categories else "similar"
+        qualities = ", ".join(f"{name} {match['prior_quality']:.1f}/5" for name, match in zip(names, top))
+        lead = wines[0]
+        
+        return {
+            "top_matches": [wine.get("wine_id") for wine in wines],
+            "scientific_reasoning": self._molecular_reasoning(top),
+            "culinary_reasoning": f"Rated pairings for {dish_kind} dishes favour these styles: {qualities}.",
+            "upsell_tip": self._local_upsell_tip(lead, len(candidate_wines)),
+            "wine_details": wines,
+            "prior_quality": {wine.get("wine_id"): match["prior_quality"] for wine, match in zip(wines, top)},
+            "finalizer": "priors",
+        }
+    
+    def _finalize_with_rules(
+        self,
+        candidate_wines: List[Dict[str, Any]],
+        ingredients: List[str],
+        dish_description: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Stage 3 without an API call: re-rank candidates by sommelier rules
+        (core.pairing_rules: body/richness, acid/acid, tannin/spice, sweetness)
+        
+        Args:
+            candidate_wines: List of candidate wines from Stage 2
+            ingredients: List of identified ingredients
+            dish_description: Original dish description
+            tags: Dish flavor tags
+        
+        Returns:
+            Final recommendation dictionary (same keys as _finalize_recommendation,
+            plus 'rule_scores' and 'rule_hits' per wine and 'finalizer')
+        """
+        if not candidate_wines:
+            raise ValueError("No candidate wines found")
+        
+        from core.pairing_rules import dish_attributes, rank_by_rules, wine_profile
+        top = rank_by_rules(candidate_wines, ingredients, tags, dish_description)[:3]
+        wines = [match["wine"] for match in top]
+        dish = dish_attributes(ingredients, tags, dish_description)
+        
+        culinary = [f"Dish structure: richness {dish['richness']}/5, acidity {dish['acidity']}/5, "
+                    f"spice {dish['spice']}/5, sweetness {dish['sweetness']}/5."]
+        for wine, match in zip(wines, top):
+            profile = wine_profile(wine)
+            notes = {
+                "body_richness_match": f"its body ({profile['body']}/5) suits the dish's richness",
+                "acid_congruence": f"its acidity ({profile['acidity']}/5) matches the dish's",
+                "tannin_spice_conflict": "its tannin may clash with the heat",
+                "sweetness_imbalance": "it is less sweet than the dish",
+            }
+            reasons = [notes[hit] for hit in match["rule_hits"]] or ["no structural rule applies"]
+            culinary.append(f"{self._wine_label(wine)}: {'; '.join(reasons)}.")
+        
+        return {
+            "top_matches": [wine.get("wine_id") for wine in wines],
+            "scientific_reasoning": self._molecular_reasoning(top),
+            "culinary_reasoning": " ".join(culinary),
+            "upsell_tip": self._local_upsell_tip(wines[0], len(candidate_wines)),
+            "wine_details": wines,
+            "rule_scores": {wine.get("wine_id"): match["rule_score"] for wine, match in zip(wines, top)},
+            "rule_hits": {wine.get("wine_id"): match["rule_hits"] for wine, match in zip(wines, top)},
+            "finalizer": "rules",
+        }
+    
+    @staticmethod
+    def _wine_label(wine: Dict[str, Any]) -> str:
+        return wine.get("wine_name", f"Wine #{wine.get('wine_id')}")
+    
+    def _molecular_reasoning(self, top: List[Dict[str, Any]]) -> str:
+        """Templated scientific reasoning from the shared compounds of the chosen matches"""
+        molecular = []
+        for match in top:
+            name = self._wine_label(match["wine"])
+            shared = match.get("shared_compounds", [])
+            if shared:
+                molecular.append(f"{name} shares {len(shared)} flavor compounds with the dish "
+                                 f"(including {', '.join(sorted(shared, key=lambda c: (not c[:1].isalpha(), c.lower()))[:3])}).")
+            else:
+                tags_text = ", ".join(match["wine"].get("harmonize", [])) or "its style"
+                molecular.append(f"{name} is a traditional match for this dish ({tags_text}).")
+        return " ".join(molecular)
+    
+    def _local_upsell_tip(self, lead: Dict[str, Any], candidate_count: int) -> str:
+        return (f"{self._wine_label(lead)} ({lead.get('type_name', 'wine')}, "
+                f"{lead.get('region') or lead.get('country') or 'unknown region'}) "
+                f"is the strongest of {candidate_count} molecular candidates for this dish.")
+    
+    def _finalize_locally(self, finalizer: str, **kwargs) -> Dict[str, Any]:
+        if finalizer == "priors":
+            return self._finalize_with_priors(**kwargs)
+        return self._finalize_with_rules(**kwargs)
+    
+    def _finalize_with_llm(
+        self,
+        candidate_wines: List[Dict[str, Any]],
+        ingredients: List[str],
+        dish_description: Optional[str] = None,
+        tags: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Stage 3 via _finalize_recommendation, falling back to the local
+        fallback_finalizer when Gemini is rate limited or slower than
+        finalize_timeout
+        
+        Returns:
+            Final recommendation dictionary ('finalizer' is "llm", or the fallback
+            name plus 'fallback_reason')
+        
+        Raises:
+            ValueError: If the response cannot be parsed
+            RuntimeError: On other API errors, or any API error without a fallback
+        """
+        kwargs = {"candidate_wines": candidate_wines, "ingredients": ingredients, "dish_description": dish_description}
+        if self.fallback_finalizer is None:
+            result = self._finalize_recommendation(**kwargs)
+            result["finalizer"] = "llm"
+            return result
+        
+        try:
+            if self.finalize_timeout is None:
+                result = self._finalize_recommendation(**kwargs)
+            else:
+                # Run in a worker thread (with the current trace context) so a slow call can be abandoned
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sommelier-finalize")
+                try:
+                    future = executor.submit(contextvars.copy_context().run, self._finalize_recommendation, **kwargs)
+                    result = future.result(timeout=self.finalize_timeout)
+                finally:
+                    executor.shutdown(wait=False)
+        except FutureTimeoutError:
+            reason = f"timeout after {self.finalize_timeout:g}s"
+        except RuntimeError as e:
+            if not is_rate_limit_error(e):
+                raise
+            reason = "rate limited"
+        else:
+            result["finalizer"] = "llm"
+            return result
+        
+        print(f"  LLM finalize {reason}; falling back to the {self.fallback_finalizer} finalizer")
+        result = self._finalize_locally(self.fallback_finalizer, tags=tags, **kwargs)
+        result["fallback_reason"] = reason
+        return result
+    
+    @traced("sommelier.recommend")
     def recommend(
         self,
         dish_description: Optional[str] = None,
-        dish_image: Optional[Union[bytes, str]] = None
+        dish_image: Optional[Union[bytes, str]] = None,
+        ingredients: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        finalizer: str = DEFAULT_SOMMELIER_FINALIZER
     ) -> Dict[str, Any]:
         """
         Recommend wine pairings for a dish using efficient two-stage approach
@@ -643,9 +872,19 @@ IMPORTANT:
         Stage 2: Python-based molecular search (no API call)
         Stage 3: Final selection with top candidates (small prompt)
         
+        With finalizer="priors" Stage 3 re-ranks the candidates by rated-pairing
+        priors instead, with finalizer="rules" by sommelier rules (body/richness,
+        acidity, tannin/spice, sweetness); Stage 1 then matches ingredient names in
+        the description locally (falling back to Gemini for images or when nothing
+        matches), so a text recommendation makes no API call. With "llm" a rate
+        limited or timed out Stage 3 falls back to fallback_finalizer.
+        
         Args:
             dish_description: Text description of the dish (e.g., "Grilled sea bass with lemon butter sauce")
             dish_image: Image bytes or path to image file
+            ingredients: Known ingredients (skips Stage 1)
+            tags: Dish flavor tags (e.g. menu profile 'tags'), used by the local finalizers
+            finalizer: One of SOMMELIER_FINALIZERS
         
         Returns:
             Dictionary with:
@@ -653,11 +892,16 @@ IMPORTANT:
             - scientific_reasoning: Detailed molecular explanation
             - culinary_reasoning: Human-friendly explanation
             - upsell_tip: Value proposition
+            - finalizer: Stage 3 that produced the result (plus fallback_reason
+              when the LLM one fell back)
         
         Raises:
-            ValueError: If neither dish_description nor dish_image provided
-            ValueError: If API key not configured
+            ValueError: If neither dish_description, dish_image nor ingredients provided
+            ValueError: If finalizer is unknown
         """
+        if finalizer not in SOMMELIER_FINALIZERS:
+            raise ValueError(f"Unknown finalizer: {finalizer}. Available: {', '.join(SOMMELIER_FINALIZERS)}")
+        
         # Handle image input
         image_data = None
         if dish_image:
@@ -673,20 +917,30 @@ IMPORTANT:
             else:
                 raise ValueError("dish_image must be bytes or file path string")
         
-        if not dish_description and not image_data:
+        if not dish_description and not image_data and not ingredients:
             raise ValueError("Either dish_description or dish_image must be provided")
         
         # STAGE 1: Identify ingredients (small prompt, ~100-500 tokens)
-        print("Stage 1: Identifying ingredients...")
-        ingredients = self._identify_ingredients(
-            dish_description=dish_description,
-            dish_image=image_data
-        )
-        print(f"  Identified ingredients: {', '.join(ingredients)}")
+        if not ingredients:
+            print("Stage 1: Identifying ingredients...")
+            with span("sommelier.identify_ingredients", has_image=image_data is not None) as stage_span:
+                if finalizer != "llm" and dish_description and not image_data:
+                    ingredients = self._match_ingredients_locally(dish_description)
+                    stage_span.set(local=True)
+                if not ingredients:
+                    ingredients = self._identify_ingredients(
+                        dish_description=dish_description,
+                        dish_image=image_data
+                    )
+                stage_span.set(ingredient_count=len(ingredients))
+            print(f"  Identified ingredients: {', '.join(ingredients)}")
         
         # STAGE 2: Python-based molecular search (no API call)
         print("Stage 2: Finding candidate wines by molecular match...")
-        candidate_wines = self._find_candidate_wines(ingredients, max_candidates=20)
+        with span("sommelier.find_candidates", wine_count=len(self.wines)) as stage_span:
+            candidate_wines = self._find_candidate_wines(ingredients, max_candidates=DEFAULT_SOMMELIER_CANDIDATES,
+                                                         tags=tags, dish_description=dish_description)
+            stage_span.set(candidate_count=len(candidate_wines))
         print(f"  Found {len(candidate_wines)} candidate wines")
         
         if not candidate_wines:
@@ -694,17 +948,22 @@ IMPORTANT:
         
         # STAGE 3: Final selection with only top candidates (small prompt, ~2000-5000 tokens)
         print("Stage 3: Finalizing recommendation...")
-        result = self._finalize_recommendation(
-            candidate_wines=candidate_wines,
-            ingredients=ingredients,
-            dish_description=dish_description
-        )
+        with span("sommelier.finalize", candidate_count=len(candidate_wines), finalizer=finalizer) as stage_span:
+            finalize = self._finalize_with_llm if finalizer == "llm" else functools.partial(self._finalize_locally, finalizer)
+            result = finalize(
+                candidate_wines=candidate_wines,
+                ingredients=ingredients,
+                dish_description=dish_description,
+                tags=tags
+            )
+            if "fallback_reason" in result:
+                stage_span.set(fallback=result["finalizer"], fallback_reason=result["fallback_reason"])
         
         return result
     
     def get_wine_by_id(self, wine_id: int) -> Optional[Dict[str, Any]]:
         """Get full wine details by ID"""
-        return next((w for w in self.wines if w.get("wine_id") == wine_id), None)
+        return self.knowledge_base.get_wine_by_id(wine_id)
     
     def search_wines_by_compounds(self, compounds: List[str]) -> List[Dict[str, Any]]:
         """
@@ -716,28 +975,31 @@ IMPORTANT:
         Returns:
             List of wines that share at least one compound, sorted by number of matches
         """
-        matches = []
         compounds_set = set(compounds)
-        
-        for wine in self.wines:
-            wine_compounds = set(wine.get("flavor_compounds", []))
-            shared = compounds_set.intersection(wine_compounds)
-            if shared:
-                matches.append({
-                    "wine": wine,
-                    "shared_compounds": list(shared),
-                    "match_count": len(shared)
-                })
-        
-        # Sort by match count (descending)
-        matches.sort(key=lambda x: x["match_count"], reverse=True)
+        scores = self._score_catalog({"compounds": compounds_set})
+        matches = []
+        for index in scores.ranked(0, by="shared_compounds"):
+            wine = self.wines[index]
+            shared = [c for c in dict.fromkeys(wine.get("flavor_compounds", [])) if c in compounds_set]
+            matches.append({
+                "wine": wine,
+                "shared_compounds": shared,
+                "match_count": len(shared)
+            })
         return matches
 
 
 def main():
     """Example usage"""
+    import argparse
     import sys
     
+    parser = argparse.ArgumentParser(description="Recommend wines for an example dish")
+    parser.add_argument("--finalizer", choices=SOMMELIER_FINALIZERS, default=DEFAULT_SOMMELIER_FINALIZER,
+                        help="Stage 3: Gemini selection, rated-pairing priors or sommelier rules (no API call)")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+    
     # Initialize sommelier
     try:
         sommelier = WineSommelier()
@@ -753,9 +1015,11 @@ def main():
     print("-" * 70)
     
     try:
-        result = sommelier.recommend(
-            dish_description="Veal Saltimbocca:Ingredients:2 thin veal scallopini (pounded to uniform thickness), 4 slices of prosciutto, Large bunch of fresh sage leaves, 4 tbsp butter, 2 tbsp olive oil, Splash of white wine (or Marsala), Salt and pepper to taste"
-        )
+        with maybe_profiled(args.profile, "sommelier"):
+            result = sommelier.recommend(
+                dish_description="Veal Saltimbocca:Ingredients:2 thin veal scallopini (pounded to uniform thickness), 4 slices of prosciutto, Large bunch of fresh sage leaves, 4 tbsp butter, 2 tbsp olive oil, Splash of white wine (or Marsala), Salt and pepper to taste",
+                finalizer=args.finalizer
+            )
         
         print("\nTOP 3 WINE RECOMMENDATIONS:")
         print(f"Wine IDs: {result['top_matches']}")